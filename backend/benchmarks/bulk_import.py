@@ -0,0 +1,178 @@
+"""
+Benchmark: importing a 100k-row agent roster, per-row vs chunked set-based import.
+
+Builds a scratch SQLite database with ADMs and a roster of N agents (1% of
+rows repeat an earlier phone, 1% have a blank name, 1% point at an unknown
+ADM), then imports it in-process over ASGI:
+
+  - before:  the original ``bulk_import_agents`` (one duplicate-phone SELECT
+             and one flush per row, one transaction), kept here as a
+             baseline. It is slow, so it runs on the first --baseline-rows
+             rows only.
+  - JSON:    POST /agents/bulk-import          (``import_models``)
+  - CSV:     POST /agents/bulk-import/stream   (``import_stream``), the
+             roster streamed as a CSV body
+
+and reports rows/s, created and error counts, and peak traced memory
+(tracemalloc slows every variant alike, so compare the rates, not the
+absolute times).
+Each run starts from an empty agents table. The created and error counts
+must match the roster: every clean row created, every bad row reported.
+
+Run from backend/:
+  python -m benchmarks.bulk_import [--rows 100000] [--baseline-rows 10000]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bulk_import_bench_')}/bench.db"
+os.environ["DEBUG"] = "false"
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI  # noqa: E402
+from sqlalchemy import delete, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from database import Base, SessionLocal, engine, get_db  # noqa: E402
+from models import ADM, Agent  # noqa: E402
+from routes.agents import router as agents_router  # noqa: E402
+from schemas import AgentBulkImport  # noqa: E402
+
+FIELDS = ["name", "phone", "location", "state", "language", "assigned_adm_id"]
+
+legacy_router = APIRouter(prefix="/legacy/agents")
+
+
+@legacy_router.post("/bulk-import")
+def legacy_bulk_import_agents(data: AgentBulkImport, db: Session = Depends(get_db)):
+    """bulk_import_agents as it was: a SELECT and a flush per row, one transaction."""
+    created = []
+    errors = []
+    for i, agent_data in enumerate(data.agents):
+        try:
+            existing = db.query(Agent).filter(Agent.phone == agent_data.phone).first()
+            if existing:
+                errors.append({"index": i, "phone": agent_data.phone, "error": "Duplicate phone"})
+                continue
+            agent = Agent(**agent_data.model_dump())
+            db.add(agent)
+            db.flush()
+            created.append({"index": i, "id": agent.id, "name": agent.name})
+        except Exception as e:
+            errors.append({"index": i, "error": str(e)})
+    db.commit()
+    return {"total_submitted": len(data.agents), "created": len(created), "errors_count": len(errors)}
+
+
+def _roster(n: int, n_adms: int) -> tuple[list[dict], int]:
+    """Rows, and how many of them are bad (repeated phone, blank name or unknown ADM)."""
+    rows, bad = [], 0
+    for i in range(n):
+        row = {"name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune", "state": "Maharashtra",
+               "language": "Hindi", "assigned_adm_id": i % n_adms + 1}
+        if i % 100 == 37 and i > 0:
+            row["phone"] = f"9{i - 1:09d}"
+            bad += 1
+        elif i % 100 == 53:
+            row["name"] = ""
+            bad += 1
+        elif i % 100 == 71:
+            row["assigned_adm_id"] = n_adms + 1_000
+            bad += 1
+        rows.append(row)
+    return rows, bad
+
+
+def _csv(rows: list[dict]) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+def _seed(n_adms: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [
+            {"id": i + 1, "name": f"ADM {i + 1}", "phone": f"80000{i:05d}", "region": "North"}
+            for i in range(n_adms)
+        ])
+        db.commit()
+
+
+def _reset() -> None:
+    with SessionLocal() as db:
+        db.execute(delete(Agent))
+        db.commit()
+
+
+async def _post(app: FastAPI, path: str, **kwargs) -> tuple[dict, float, int]:
+    """Response body, elapsed seconds and peak traced memory (bytes) of one request."""
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None,
+    ) as client:
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = await client.post(path, **kwargs)
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    assert response.status_code == 200, (response.status_code, response.text[:500])
+    return response.json(), seconds, peak
+
+
+def _report(label: str, n: int, body: dict, seconds: float, peak: int) -> None:
+    print(
+        f"{label:7} {n:,} rows in {seconds:7.2f}s ({n / seconds:8,.0f} rows/s)   "
+        f"created {body['created']:,}   errors {body['errors_count']:,}   "
+        f"peak traced memory {peak / 2**20:,.0f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--baseline-rows", type=int, default=10_000, help="rows for the per-row baseline (0 skips it)")
+    parser.add_argument("--adms", type=int, default=200)
+    args = parser.parse_args()
+
+    _seed(args.adms)
+    app = FastAPI()
+    app.include_router(agents_router)
+    app.include_router(legacy_router)
+
+    if args.baseline_rows:
+        rows, _ = _roster(args.baseline_rows, args.adms)
+        # The original endpoint has no FK check; keep its rows valid for a fair timing
+        rows = [r for r in rows if r["name"] and r["assigned_adm_id"] <= args.adms]
+        body, seconds, peak = asyncio.run(_post(app, "/legacy/agents/bulk-import", json={"agents": rows}))
+        _report("before", len(rows), body, seconds, peak)
+        _reset()
+
+    rows, bad = _roster(args.rows, args.adms)
+    # The JSON endpoint validates the whole body up front; send it only the rows that parse
+    json_rows = [r for r in rows if r["name"]]
+    body, seconds, peak = asyncio.run(_post(app, "/agents/bulk-import", json={"agents": json_rows}))
+    _report("JSON", len(json_rows), body, seconds, peak)
+    assert body["created"] == args.rows - bad, body["created"]
+    _reset()
+
+    body, seconds, peak = asyncio.run(_post(
+        app, "/agents/bulk-import/stream", content=_csv(rows), headers={"content-type": "text/csv"},
+    ))
+    _report("CSV", args.rows, body, seconds, peak)
+    assert body["created"] == args.rows - bad, body["created"]
+    assert body["errors_count"] == bad, body["errors_count"]
+
+
+if __name__ == "__main__":
+    main()
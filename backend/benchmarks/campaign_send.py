@@ -0,0 +1,158 @@
+"""
+End-to-end benchmark: one campaign to N agents through the channel stub.
+
+Builds a scratch SQLite database with N agents, creates and launches a
+gentle_checkin campaign over WhatsApp, and delivers it with the campaign
+runner against benchmarks/channel_stub.py (with simulated API latency).
+Reports throughput and the runner's own per-message overhead (fetch,
+render, state writes — everything except waiting on the API).
+
+With --crash-after K the runner is killed after K batches, its lease is
+expired, and a second claim resumes the campaign; the report shows how
+many messages were sent twice (at most the batch in flight).
+
+Run from backend/:
+  python -m benchmarks.campaign_send [--agents 50000] [--latency-ms 40] [--rate 0] [--crash-after 0]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_SCRATCH = tempfile.mkdtemp(prefix="campaign_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_SCRATCH}/bench.db"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import insert, update  # noqa: E402
+
+from benchmarks.channel_stub import ChannelStub  # noqa: E402
+from config import settings  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import ADM, Agent, Campaign, CampaignRecipient  # noqa: E402
+from services.campaigns import campaign_engine, campaign_metrics  # noqa: E402
+
+_STATES = ["dormant", "at_risk", "dormant", "onboarded"]
+_REASONS = ["economic.commission_too_low", "training_gap.exam_failed", "personal.health_issues", None]
+
+
+def _seed(n_agents: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    n_adms = max(1, n_agents // 200)
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [
+            {"id": i + 1, "name": f"ADM {i + 1}", "phone": f"90000{i:05d}",
+             "region": "West - Mumbai" if i % 2 else "North", "telegram_chat_id": str(100000 + i)}
+            for i in range(n_adms)
+        ])
+        db.execute(insert(Agent), [
+            {"name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune",
+             "language": "English" if i % 3 else "Hindi", "lifecycle_state": _STATES[i % 4],
+             "dormancy_reason": _REASONS[i % 4], "dormancy_duration_days": i % 120,
+             "assigned_adm_id": i % n_adms + 1, "engagement_score": float(i % 100)}
+            for i in range(n_agents)
+        ])
+        db.commit()
+
+
+def _create_campaign() -> int:
+    with SessionLocal() as db:
+        campaign = campaign_engine.create(
+            db, "Benchmark check-in", "gentle_checkin",
+            segment={"lifecycle_states": ["dormant", "at_risk"]},
+            params={"contextual_message": "It has been a while since we spoke. Can we help with anything?"},
+        )
+        campaign_engine.launch(db, campaign)
+        db.commit()
+        return campaign.id
+
+
+def _expire_lease(campaign_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(update(Campaign).where(Campaign.id == campaign_id).values(claimed_until=None))
+        db.commit()
+
+
+async def _crash_after(batches: int) -> None:
+    """Run the runner until it has recorded ``batches`` batches, then kill it."""
+    recorded = 0
+    original = campaign_engine._record
+
+    def counting_record(*args):
+        nonlocal recorded
+        lease = original(*args)
+        recorded += 1
+        return lease
+
+    campaign_engine._record = counting_record
+    task = asyncio.create_task(campaign_engine.run_next())
+    try:
+        while recorded < batches and not task.done():
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.005)  # let the next batch get in flight
+    finally:
+        task.cancel()
+        campaign_engine._record = original
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def _run(args) -> None:
+    async with ChannelStub(latency_ms=args.latency_ms, fail_rate=args.fail_rate) as stub:
+        settings.ENABLE_WHATSAPP = True
+        settings.WHATSAPP_API_URL = stub.url
+        settings.WHATSAPP_API_TOKEN = "bench"
+        settings.WHATSAPP_PHONE_NUMBER_ID = "1000"
+        settings.CAMPAIGN_SEND_RATE = args.rate
+        settings.CHANNEL_SEND_CONCURRENCY = args.concurrency
+        settings.CAMPAIGN_BATCH_SIZE = args.batch_size
+
+        campaign_id = _create_campaign()
+        started = time.perf_counter()
+        if args.crash_after:
+            await _crash_after(args.crash_after)
+            print(f"killed after {args.crash_after} batches ({stub.requests:,} requests so far); resuming")
+            _expire_lease(campaign_id)
+        while await campaign_engine.run_next():
+            pass
+        elapsed = time.perf_counter() - started
+
+        with SessionLocal() as db:
+            campaign = db.get(Campaign, campaign_id)
+            pending = db.query(CampaignRecipient).filter(
+                CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.status == "pending",
+            ).count()
+            metrics = campaign_metrics(campaign)
+            print(
+                f"{campaign.total_recipients:,} recipients: {campaign.sent_count:,} sent, "
+                f"{campaign.failed_count:,} failed, {pending} pending, status {campaign.status}"
+            )
+            print(
+                f"wall {elapsed:.2f}s = {campaign.total_recipients / elapsed:,.0f} msg/s   "
+                f"API wait {campaign.send_seconds:.2f}s   runner overhead {campaign.overhead_seconds:.2f}s "
+                f"({metrics['overhead_ms_per_message']} ms/msg)"
+            )
+            print(f"stub: {stub.stats()}   duplicate sends: {stub.requests - campaign.total_recipients}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, default=50_000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=0.0, help="messages/second limit (0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--crash-after", type=int, default=0, help="kill the runner after K batches")
+    args = parser.parse_args()
+
+    _seed(args.agents)
+    print(f"{args.agents:,} agents seeded in {_SCRATCH}")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Local stand-in for the WhatsApp Cloud API and the Telegram Bot API.
+
+Answers the two calls ``services.channels`` makes:
+
+  POST /{phone_number_id}/messages   -> {"messages": [{"id": "wamid.N"}]}
+  POST /bot{token}/sendMessage       -> {"ok": true, "result": {"message_id": N}}
+
+with configurable latency and failure rate (failures are HTTP 500), keeps
+HTTP/1.1 connections alive like the real APIs, and counts what it served;
+GET /stats returns the counters. Pure asyncio, no dependencies, so it can
+run inside a benchmark process or on its own:
+
+  WHATSAPP_API_URL=http://127.0.0.1:8900 TELEGRAM_API_URL=http://127.0.0.1:8900 ...
+  python -m benchmarks.channel_stub --port 8900 --latency-ms 40 --fail-rate 0.01
+
+It also plays the other direction: ``drive()`` (or --drive URL) posts
+WhatsApp webhook deliveries of agent replies to the platform and records
+how long each took to be acknowledged.
+
+Run from backend/.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+# Agent replies for drive(), one per intent plus free text
+REPLIES = [
+    "STOP", "Yes, I am interested", "No, not now", "Hi", "Please call me",
+    "My commission is not paid yet", "How do I sell term insurance?",
+    "I have a complaint about my payout", "When is the next training?", "ok thanks",
+]
+
+
+def whatsapp_webhook(message_id: str, sender: str, text: str, timestamp: Optional[int] = None) -> dict:
+    """One inbound text message in the WhatsApp Cloud API webhook shape."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "stub", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "messages": [{
+                "id": message_id, "from": sender, "type": "text", "text": {"body": text},
+                "timestamp": str(timestamp or int(time.time())),
+            }],
+        }}]}],
+    }
+
+
+class ChannelStub:
+    """In-process stub server; ``async with ChannelStub() as stub: stub.url``."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 fail_rate: float = 0.0, seed: int = 7):
+        self.host, self.port = host, port
+        self.latency = latency_ms / 1000
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self.bodies: list[dict] = []
+        self.keep_bodies = False
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def stats(self) -> dict:
+        span = (self._last - self._first) if self._first is not None and self._last != self._first else None
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "requests_per_second": round(self.requests / span, 1) if span else None,
+        }
+
+    async def start(self) -> "ChannelStub":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "ChannelStub":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def drive(self, url: str, payloads: Iterable[dict], concurrency: int = 50) -> dict:
+        """POST each payload to ``url`` over ``concurrency`` keep-alive connections.
+
+        Returns the status counts and acknowledgement latencies (ms).
+        """
+        target = urlsplit(url)
+        queue: asyncio.Queue = asyncio.Queue()
+        for payload in payloads:
+            queue.put_nowait(json.dumps(payload).encode())
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+
+        async def connection():
+            reader, writer = await asyncio.open_connection(target.hostname, target.port or 80)
+            try:
+                while not queue.empty():
+                    body = queue.get_nowait()
+                    started = time.perf_counter()
+                    writer.write(
+                        f"POST {target.path or '/'} HTTP/1.1\r\nHost: {target.netloc}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                        + body
+                    )
+                    await writer.drain()
+                    head = await reader.readuntil(b"\r\n\r\n")
+                    lines = head.decode("latin-1").split("\r\n")
+                    length = next(
+                        (int(line.split(":", 1)[1]) for line in lines[1:] if line.lower().startswith("content-length:")),
+                        0,
+                    )
+                    await reader.readexactly(length)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    status = int(lines[0].split(" ", 2)[1])
+                    statuses[status] = statuses.get(status, 0) + 1
+            finally:
+                writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(max(1, min(concurrency, queue.qsize())))))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+
+        def pct(p: float) -> Optional[float]:
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2) if latencies else None
+
+        return {
+            "sent": len(latencies),
+            "statuses": statuses,
+            "seconds": round(elapsed, 2),
+            "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+            "ack_ms_p50": pct(0.50),
+            "ack_ms_p99": pct(0.99),
+            "ack_ms_max": pct(1.0),
+        }
+
+    def _respond(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method != "POST":
+            return 405, {"error": "method not allowed"}
+
+        now = time.perf_counter()
+        self._first = self._first if self._first is not None else now
+        self._last = now
+        self.requests += 1
+        if self.keep_bodies:
+            self.bodies.append(json.loads(body or b"{}"))
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            self.failures += 1
+            return 500, {"error": {"message": "stub failure"}}
+        if path.endswith("/messages"):
+            return 200, {"messaging_product": "whatsapp", "messages": [{"id": f"wamid.{self.requests}"}]}
+        if path.endswith("/sendMessage"):
+            return 200, {"ok": True, "result": {"message_id": self.requests}}
+        return 404, {"error": "unknown endpoint"}
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {
+                    k.strip().lower(): v.strip()
+                    for k, _, v in (line.partition(":") for line in lines[1:] if line)
+                }
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload = self._respond(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'ERROR'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve_forever(args) -> None:
+    async with ChannelStub(args.host, args.port, args.latency_ms, args.fail_rate) as stub:
+        print(f"Channel stub listening on {stub.url} (latency {args.latency_ms} ms, fail rate {args.fail_rate})")
+        while True:
+            await asyncio.sleep(10)
+            if stub.requests:
+                print(stub.stats())
+
+
+async def _drive(args) -> None:
+    rng = random.Random(args.seed)
+    payloads = (
+        whatsapp_webhook(f"wamid.drive.{i}", f"91{9000000000 + rng.randrange(args.agents)}", rng.choice(REPLIES))
+        for i in range(args.messages)
+    )
+    print(await ChannelStub().drive(args.drive, payloads, args.concurrency))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drive", metavar="URL", help="post agent replies to this webhook URL instead of serving")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--agents", type=int, default=50_000, help="senders are 919000000000 + [0, agents)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_drive(args) if args.drive else _serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
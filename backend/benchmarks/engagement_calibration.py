@@ -0,0 +1,126 @@
+"""
+Calibration check: no single event may drop an engaged agent's score below the sweep's AT_RISK threshold.
+
+The nightly lifecycle sweep moves active / licensed agents to AT_RISK when
+their engagement score is below LIFECYCLE_ENGAGEMENT_AT_RISK (inactivity
+has its own rule, LIFECYCLE_AT_RISK_DAYS). For a few agent histories:
+
+  - new:     no scored activity yet (also the first event of an agent
+             whose seeded score is kept until then)
+  - steady:  a connected call every 5 days for 60 days and a quiz at 70
+  - fading:  one connected call 20 days ago
+
+it folds in each possible single event (an interaction with every outcome
+and sentiment, a quiz at 0, a ticket) and scores the agent every day until
+the inactivity rule would take over. Every score must stay at or above the
+threshold, as must the history alone as it ages. It also checks that the
+score still reacts: consecutive unanswered calls for a new agent must
+cross the threshold within --max-misses calls. Scores come from
+``score_rows`` (NumPy when installed) and must match ``engagement_score``.
+
+Run from backend/:
+  python -m benchmarks.engagement_calibration [--max-misses 5]
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='engagement_calibration_')}/bench.db")
+os.environ["DEBUG"] = "false"
+
+from config import settings  # noqa: E402
+from domain.engagement import (  # noqa: E402
+    CONNECTED_OUTCOMES, COUNTERS, EngagementCounters, apply_event, engagement_score, interaction_event,
+    quiz_event, ticket_event,
+)
+from domain.enums import ContactOutcome  # noqa: E402
+from services.engagement import score_rows  # noqa: E402
+
+OUTCOMES = sorted({o.value for o in ContactOutcome} | CONNECTED_OUTCOMES | {"declined"})
+SENTIMENTS = (None, -1.0, -0.5, 0.0, 1.0)
+
+
+def _histories(now: datetime) -> dict[str, list]:
+    steady = [interaction_event(1, now - timedelta(days=d), "connected", 0.3) for d in range(60, 0, -5)]
+    steady.append(quiz_event(1, now - timedelta(days=3), 70))
+    return {
+        "new": [],
+        "steady": steady,
+        "fading": [interaction_event(1, now - timedelta(days=20), "connected")],
+    }
+
+
+def _single_events(now: datetime) -> dict[str, object]:
+    events = {
+        f"{outcome} (sentiment {sentiment})": interaction_event(1, now, outcome, sentiment)
+        for outcome in OUTCOMES for sentiment in SENTIMENTS
+    }
+    events["quiz at 0"] = quiz_event(1, now, 0)
+    events["ticket"] = ticket_event(1, now)
+    return events
+
+
+def _counters(events: list, start: datetime) -> EngagementCounters:
+    counters = EngagementCounters(start)
+    for event in events:
+        apply_event(counters, event, settings.ENGAGEMENT_HALF_LIFE_DAYS)
+    return counters
+
+
+def _scores(counters: EngagementCounters, days: range, now: datetime) -> list[float]:
+    """Scores on each day, through score_rows; checked against engagement_score."""
+    row = (1, *(getattr(counters, name) for name in COUNTERS), counters.as_of, counters.last_active_at)
+    scores = []
+    for d in days:
+        at = now + timedelta(days=d)
+        score = score_rows([row], at)[0]
+        reference = engagement_score(
+            counters, at, settings.ENGAGEMENT_HALF_LIFE_DAYS, settings.ENGAGEMENT_RECENCY_HALF_LIFE_DAYS,
+        )
+        assert abs(score - reference) <= 0.1 + 1e-9, (score, reference)
+        scores.append(score)
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-misses", type=int, default=5,
+                        help="consecutive unanswered calls within which a new agent must cross the threshold")
+    args = parser.parse_args()
+
+    threshold = settings.LIFECYCLE_ENGAGEMENT_AT_RISK
+    now = datetime.utcnow().replace(microsecond=0)
+    days = range(settings.LIFECYCLE_AT_RISK_DAYS)
+    print(f"threshold {threshold}   days checked 0..{days[-1]}")
+
+    problems = []
+    for name, history in _histories(now).items():
+        start = now - timedelta(days=61)
+        alone = _scores(_counters(history, start), days, now)
+        worst_label, worst = "(no event)", min(alone)
+        for label, event in _single_events(now).items():
+            lowest = min(_scores(_counters(history + [event], start), days, now))
+            if lowest < worst:
+                worst_label, worst = label, lowest
+        print(f"  {name:7} score now {alone[0]:5.1f}   lowest after one event {worst:5.1f}   ({worst_label})")
+        if worst < threshold:
+            problems.append(f"{name}: {worst_label} takes the score to {worst}")
+
+    misses = []
+    for n in range(1, args.max_misses + 1):
+        misses.append(interaction_event(1, now - timedelta(days=args.max_misses - n), "not_answered"))
+        score = _scores(_counters(misses, now - timedelta(days=args.max_misses)), range(1), now)[0]
+        print(f"  new agent, {n} unanswered call(s): {score:5.1f}")
+        if score < threshold:
+            break
+    else:
+        problems.append(f"{args.max_misses} unanswered calls leave a new agent at {score}")
+
+    assert not problems, problems
+    print("no single event crosses the threshold; sustained misses do")
+
+
+if __name__ == "__main__":
+    main()
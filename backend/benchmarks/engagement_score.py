@@ -0,0 +1,144 @@
+"""
+Benchmark: engagement scores over 10M interactions, incremental vs full recompute.
+
+Generates M interactions for N agents spread over the last D days, in time
+order, with quiz scores (5%) and feedback tickets (2%) mixed in, and
+computes every agent's decayed counters two ways:
+
+  - incremental: each event built and folded in with
+    ``domain.engagement.apply_event``, as ``EngagementEngine.observe`` does
+    when an interaction is logged (O(1) per event, database excluded)
+  - full recompute: the accumulator ``EngagementEngine.rebuild`` uses, fed
+    the same rows chunk by chunk (one bincount per counter with NumPy,
+    the apply_event loop without it)
+
+then scores both with ``score_rows`` and checks they agree on every agent.
+
+Run from backend/:
+  python -m benchmarks.engagement_score [--interactions 10000000] [--agents 200000] [--days 365] [--chunk 1000000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='engagement_bench_')}/bench.db")
+os.environ["DEBUG"] = "false"
+
+from config import settings  # noqa: E402
+from domain.engagement import (  # noqa: E402
+    COUNTERS, EngagementCounters, apply_event, interaction_event, quiz_event, ticket_event,
+)
+from services.engagement import new_totals, np, score_rows  # noqa: E402
+
+OUTCOMES = (
+    "connected", "not_answered", "callback_requested", "busy", "follow_up_scheduled",
+    "switched_off", "detailed_discussion", "wrong_number",
+)
+
+
+def _chunks(args, now: datetime):
+    """(interaction rows, other events) per chunk, both in time order.
+
+    Interaction rows are shaped as rebuild reads them:
+    (id, agent_id, created_at, outcome, sentiment_score).
+    """
+    rng = random.Random(args.seed)
+    start = now - timedelta(days=args.days)
+    step = args.days * 86400.0 / args.interactions
+    agents = args.agents
+    for first in range(0, args.interactions, args.chunk):
+        last = min(first + args.chunk, args.interactions)
+        rows, others = [], []
+        for i in range(first, last):
+            at = start + timedelta(seconds=(i + rng.random()) * step)
+            agent_id = rng.randrange(1, agents + 1)
+            sentiment = round(rng.uniform(-1.0, 1.0), 2) if rng.random() < 0.4 else None
+            rows.append((i, agent_id, at, rng.choice(OUTCOMES), sentiment))
+            roll = rng.random()
+            if roll < 0.05:
+                others.append(quiz_event(agent_id, at, rng.randint(0, 100)))
+            elif roll < 0.07:
+                others.append(ticket_event(agent_id, at))
+        yield rows, others
+
+
+def _counter_rows(counters: dict) -> list[tuple]:
+    return [
+        (agent_id, *(getattr(c, name) for name in COUNTERS), c.as_of, c.last_active_at)
+        for agent_id, c in sorted(counters.items())
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--interactions", type=int, default=10_000_000)
+    parser.add_argument("--agents", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=365, help="history the interactions span")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="rows per chunk (rebuild reads in chunks too)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    now = datetime.utcnow().replace(microsecond=0)
+    half_life = settings.ENGAGEMENT_HALF_LIFE_DAYS
+    incremental: dict[int, EngagementCounters] = {}
+    totals = new_totals(now)
+    events = 0
+    incremental_seconds = recompute_seconds = generate_seconds = 0.0
+
+    started = time.perf_counter()
+    for rows, others in _chunks(args, now):
+        generate_seconds += time.perf_counter() - started
+
+        # Incremental: one event at a time, in arrival order
+        started = time.perf_counter()
+        merged = sorted(
+            [interaction_event(r[1], r[2], r[3], r[4]) for r in rows] + others,
+            key=lambda e: e.occurred_at,
+        )
+        for event in merged:
+            state = incremental.get(event.agent_id)
+            if state is None:
+                state = incremental[event.agent_id] = EngagementCounters(event.occurred_at)
+            apply_event(state, event, half_life)
+        incremental_seconds += time.perf_counter() - started
+
+        # Full recompute: the chunk as rebuild feeds it
+        started = time.perf_counter()
+        totals.add_interactions(rows)
+        totals.add(others)
+        recompute_seconds += time.perf_counter() - started
+
+        events += len(merged)
+        print(f"  {events:,} events", end="\r", flush=True)
+        started = time.perf_counter()
+
+    print(f"{args.interactions:,} interactions + {events - args.interactions:,} quiz / ticket events "
+          f"for {len(incremental):,} agents (generated in {generate_seconds:.1f}s)")
+    print(f"incremental:    {incremental_seconds:7.2f}s   {incremental_seconds / events * 1e6:6.2f} us/event   "
+          f"{events / incremental_seconds:12,.0f} events/s")
+    print(f"full recompute: {recompute_seconds:7.2f}s   {recompute_seconds / events * 1e6:6.2f} us/event   "
+          f"{events / recompute_seconds:12,.0f} events/s   ({'numpy' if np is not None else 'python'})")
+
+    started = time.perf_counter()
+    incremental_rows = _counter_rows(incremental)
+    incremental_scores = score_rows(incremental_rows, now)
+    score_seconds = time.perf_counter() - started
+    recompute_rows = totals.rows()
+    recompute_scores = score_rows(recompute_rows, now)
+    print(f"score_rows:     {score_seconds:7.2f}s for {len(incremental_rows):,} agents")
+
+    by_agent = dict(zip((r[0] for r in incremental_rows), incremental_scores))
+    recomputed = dict(zip((r[0] for r in recompute_rows), recompute_scores))
+    assert by_agent.keys() == recomputed.keys()
+    worst = max(abs(by_agent[a] - recomputed[a]) for a in by_agent)
+    print(f"max |incremental - recompute| = {worst:.2f} over {len(by_agent):,} agents "
+          f"(scores are rounded to 0.1)")
+    assert worst <= 0.1 + 1e-9
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark: event-loop stalls under mixed load, sync Session vs AsyncSession handlers.
+
+Builds a scratch SQLite database and serves, in-process over ASGI:
+
+  - POST /feedback/           ``submit_feedback`` as it is now (AsyncSession)
+  - POST /legacy/feedback/    the same handler as it was: ``async def`` on the
+                              sync Session from ``get_db`` (kept here as a
+                              baseline)
+  - GET  /ping                a handler that does no I/O at all
+
+Every SQL statement is delayed by --latency-ms in the thread that runs it,
+standing in for the round trip to a hosted PostgreSQL. For each variant,
+C concurrent clients mix feedback submissions with pings while a probe task
+sleeps 1 ms at a time and records how late it wakes up. A loop that never
+blocks wakes up on time whatever the load; each blocking DB call delays
+every other request on the process by its full round trip.
+
+Reports probe lag (p50 / p99 / max), throughput and submission latency per
+variant. (Ping latency is not reported: the client shares the loop, so its
+clock only starts once the loop is free again.)
+
+Keep C at or below the pool's 15 connections: beyond that the sync variant
+blocks the loop waiting for a connection that only another request on the
+same loop can give back, and every stall lasts pool_timeout (30 s).
+
+Run from backend/:
+  python -m benchmarks.event_loop_stall [--requests 2000] [--concurrency 12] [--latency-ms 2]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+_SCRATCH = tempfile.mkdtemp(prefix="event_loop_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_SCRATCH}/bench.db"
+os.environ["DEBUG"] = "false"
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from database import Base, SessionLocal, async_engine, engine, get_db  # noqa: E402
+from models import ADM, Agent, Feedback  # noqa: E402
+from routes.feedback import router as feedback_router  # noqa: E402
+from schemas import FeedbackCreate, FeedbackResponse  # noqa: E402
+
+legacy_router = APIRouter(prefix="/legacy/feedback")
+ping_router = APIRouter()
+
+
+@ping_router.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+@legacy_router.post("/", response_model=FeedbackResponse, status_code=201)
+async def legacy_submit_feedback(data: FeedbackCreate, db: Session = Depends(get_db)):
+    """submit_feedback as it was (no raw_text, so no AI calls): sync queries on the event loop."""
+    agent = db.query(Agent).filter(Agent.id == data.agent_id).first()
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    adm = db.query(ADM).filter(ADM.id == data.adm_id).first()
+    if not adm:
+        raise HTTPException(status_code=404, detail="ADM not found")
+    feedback = Feedback(**data.model_dump())
+    db.add(feedback)
+    db.commit()
+    db.refresh(feedback)
+    return feedback
+
+
+def _install_latency(latency_ms: float) -> None:
+    """Sleep before every statement, in whichever thread executes it."""
+    delay = latency_ms / 1000
+
+    def trace(_statement: str) -> None:
+        time.sleep(delay)
+
+    @event.listens_for(engine, "connect")
+    def sync_connect(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(trace)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def async_connect(dbapi_connection, connection_record):
+        # aiosqlite owns the sqlite3 connection in its own thread; set the callback there
+        dbapi_connection.run_async(lambda conn: conn._execute(conn._conn.set_trace_callback, trace))
+
+
+def _seed(n_adms: int, n_agents: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [
+            {"id": i + 1, "name": f"ADM {i + 1}", "phone": f"80000{i:05d}", "region": "North"}
+            for i in range(n_adms)
+        ])
+        db.execute(insert(Agent), [
+            {"id": i + 1, "name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune",
+             "lifecycle_state": "dormant", "assigned_adm_id": i % n_adms + 1}
+            for i in range(n_agents)
+        ])
+        db.commit()
+
+
+def _pct(values: list, p: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 1) if values else 0.0
+
+
+async def _probe(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - started - 0.001)
+
+
+async def _variant(app: FastAPI, feedback_path: str, args) -> dict:
+    rng = random.Random(args.seed)
+    jobs = []
+    for _ in range(args.requests):
+        if rng.random() < args.write_share:
+            jobs.append(("POST", feedback_path, {
+                "agent_id": rng.randrange(args.agents) + 1, "adm_id": rng.randrange(args.adms) + 1,
+                "category": "support_issues", "priority": "medium",
+            }))
+        else:
+            jobs.append(("GET", "/ping", None))
+    jobs.reverse()
+
+    latencies: dict[str, list[float]] = {"POST": [], "GET": []}
+    statuses: dict[int, int] = {}
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            while jobs:
+                method, path, body = jobs.pop()
+                started = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                latencies[method].append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        probe = asyncio.create_task(_probe(lags, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        seconds = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    return {
+        "seconds": seconds, "statuses": statuses, "latencies": latencies, "lags": lags,
+    }
+
+
+async def _run(args) -> None:
+    app = FastAPI()
+    app.include_router(feedback_router)
+    app.include_router(legacy_router)
+    app.include_router(ping_router)
+
+    results = {}
+    for name, path in (("sync Session (before)", "/legacy/feedback/"), ("AsyncSession (after)", "/feedback/")):
+        result = results[name] = await _variant(app, path, args)
+        print(
+            f"{name:22} {args.requests:,} requests in {result['seconds']:.2f}s "
+            f"({args.requests / result['seconds']:,.0f} req/s)   statuses {result['statuses']}   "
+            f"submit p50 {_pct(result['latencies']['POST'], 0.5)} ms  p99 {_pct(result['latencies']['POST'], 0.99)} ms\n"
+            f"{'':22} loop lag p50 {_pct(result['lags'], 0.5)} ms  p99 {_pct(result['lags'], 0.99)} ms  "
+            f"max {_pct(result['lags'], 1.0)} ms   ({len(result['lags']):,} probes)"
+        )
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2_000, help="requests per variant")
+    parser.add_argument("--concurrency", type=int, default=12, help="clients (at most 15, see above)")
+    parser.add_argument("--write-share", type=float, default=0.3, help="share of requests that submit feedback (the rest ping)")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated round trip per SQL statement")
+    parser.add_argument("--adms", type=int, default=50)
+    parser.add_argument("--agents", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    _seed(args.adms, args.agents)
+    _install_latency(args.latency_ms)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
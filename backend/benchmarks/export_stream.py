@@ -0,0 +1,187 @@
+"""
+Benchmark: a 1M-row interaction export must stream in constant memory, first byte under 200 ms.
+
+Builds a scratch SQLite database with N interactions and calls
+GET /export/interactions on the app in-process, straight through ASGI
+(httpx's ASGITransport buffers whole bodies, so it is not used here). The
+driver counts bytes and rows as they are sent and throws them away, so
+what it measures is the server:
+
+  - before: the whole result read into memory and encoded into one CSV
+            body, which is what any export without a cursor comes down to
+            (kept here as a baseline; --skip-baseline leaves it out)
+  - after:  ``export_response`` (``yield_per`` batches into a generator
+            ``StreamingResponse``), as CSV and as NDJSON
+
+For each it reports time to first byte, total time, rows/s, bytes, and
+how far the process's peak RSS rose above its RSS at the start of the
+request (Linux only: it reads and resets VmHWM in /proc). It fails if a streamed export takes longer than --max-first-byte-ms
+to its first byte or grows RSS by more than --max-rss-mib.
+
+Run from backend/:
+  python -m benchmarks.export_stream [--rows 1000000]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='export_bench_')}/bench.db"
+os.environ["DEBUG"] = "false"
+
+from fastapi import APIRouter, FastAPI  # noqa: E402
+from fastapi.responses import Response  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import ADM, Agent, Interaction  # noqa: E402
+from routes.exports import router as exports_router  # noqa: E402
+from services.exporter import export_columns  # noqa: E402
+
+OUTCOMES = ["connected", "not_answered", "busy", "callback_requested", "declined"]
+
+legacy_router = APIRouter(prefix="/legacy/export")
+
+
+@legacy_router.get("/interactions")
+def legacy_export_interactions():
+    """Read every row, then encode one CSV body."""
+    columns = export_columns(Interaction)
+    with SessionLocal() as db:
+        rows = db.execute(select(*columns).order_by(Interaction.id)).all()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c.name for c in columns])
+    writer.writerows(rows)
+    return Response(buf.getvalue(), media_type="text/csv; charset=utf-8")
+
+
+def _memory_mib(field: str) -> float:
+    """VmRSS (current) or VmHWM (peak since the last reset) of this process, from /proc."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not in /proc/self/status")
+
+
+def _reset_peak() -> None:
+    """Reset VmHWM to the current RSS (Linux 4.0+)."""
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def _seed(n: int, n_agents: int = 5_000, n_adms: int = 50) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [
+            {"id": i + 1, "name": f"ADM {i + 1}", "phone": f"80000{i:05d}", "region": "North"}
+            for i in range(n_adms)
+        ])
+        db.execute(insert(Agent), [
+            {"id": i + 1, "name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune",
+             "assigned_adm_id": i % n_adms + 1}
+            for i in range(n_agents)
+        ])
+        for start in range(0, n, 50_000):
+            db.execute(insert(Interaction), [
+                {"agent_id": i % n_agents + 1, "adm_id": i % n_adms + 1, "type": "call",
+                 "outcome": OUTCOMES[i % len(OUTCOMES)], "notes": f"Call {i}: discussed renewals, wants a callback",
+                 "duration_minutes": i % 30, "follow_up_date": date.today() + timedelta(days=i % 14),
+                 "follow_up_status": "pending", "created_at": now - timedelta(minutes=i)}
+                for i in range(start, min(n, start + 50_000))
+            ])
+        db.commit()
+
+
+async def _get(app: FastAPI, path: str) -> dict:
+    """Call the app directly; count the body as it is sent."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "server": ("bench", 80), "client": ("bench", 1), "root_path": "",
+        "path": path.split("?")[0], "raw_path": path.split("?")[0].encode(),
+        "query_string": path.partition("?")[2].encode(), "headers": [(b"host", b"bench")],
+    }
+    stats = {"status": None, "first_byte": None, "bytes": 0, "lines": 0}
+    _reset_peak()
+    rss_start = _memory_mib("VmRSS")
+    started = time.perf_counter()
+
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client stays connected until the body is complete
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if body and stats["first_byte"] is None:
+                stats["first_byte"] = time.perf_counter() - started
+            stats["bytes"] += len(body)
+            stats["lines"] += body.count(b"\n")
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    stats["seconds"] = time.perf_counter() - started
+    stats["rss_peak"] = _memory_mib("VmHWM") - rss_start
+    return stats
+
+
+def _report(label: str, stats: dict, rows: int) -> None:
+    print(
+        f"{label:15} status {stats['status']}   first byte {stats['first_byte'] * 1000:8.1f} ms   "
+        f"total {stats['seconds']:6.2f}s ({rows / stats['seconds']:8,.0f} rows/s)   "
+        f"{stats['bytes'] / 2**20:6,.0f} MiB sent   RSS +{stats['rss_peak']:6,.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--max-first-byte-ms", type=float, default=200.0)
+    parser.add_argument("--max-rss-mib", type=float, default=64.0, help="allowed RSS growth of a streamed export")
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    _seed(args.rows)
+    print(f"seeded {args.rows:,} interactions in {time.perf_counter() - started:.1f}s")
+
+    app = FastAPI()
+    app.include_router(exports_router)
+    app.include_router(legacy_router)
+
+    runs = [("CSV (after)", "/export/interactions?format=csv", 1),
+            ("NDJSON (after)", "/export/interactions?format=ndjson", 0)]
+    # Last, so memory it leaves to the allocator doesn't flatter the streamed runs
+    if not args.skip_baseline:
+        runs.append(("CSV (before)", "/legacy/export/interactions", 1))
+    for label, path, header_lines in runs:
+        stats = asyncio.run(_get(app, path))
+        _report(label, stats, args.rows)
+        assert stats["status"] == 200, stats
+        assert stats["lines"] == args.rows + header_lines, stats["lines"]
+        if "after" in label:
+            assert stats["first_byte"] * 1000 < args.max_first_byte_ms, stats["first_byte"]
+            assert stats["rss_peak"] < args.max_rss_mib, stats["rss_peak"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Load test: agent replies through the WhatsApp webhook, end to end.
+
+Builds a scratch SQLite database with N agents, serves the webhook route
+with uvicorn in-process, and has benchmarks/channel_stub.py post M agent
+replies to it (the same stub also plays the WhatsApp/Telegram APIs the bot
+replies go to, with simulated latency). Reports:
+
+  - ack latency of the webhook (p50 / p99), which is what the provider sees
+  - processing throughput: replies classified, recorded and answered per second
+  - interactions and signals written, replies sent
+
+First it times ``classify_intent`` against the original pattern-by-pattern
+classifier (kept here as a baseline) and checks they agree on every message.
+
+Run from backend/:
+  python -m benchmarks.inbound_load [--agents 50000] [--messages 20000] [--concurrency 50] [--latency-ms 40]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import tempfile
+import time
+
+_SCRATCH = tempfile.mkdtemp(prefix="inbound_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_SCRATCH}/bench.db"
+os.environ["DEBUG"] = "false"
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from benchmarks.channel_stub import REPLIES, ChannelStub, whatsapp_webhook  # noqa: E402
+from config import settings  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from domain.whatsapp_templates import _INTENT_PATTERNS, Intent, classify_intent  # noqa: E402
+from models import ADM, Agent, AgentSignal, Interaction  # noqa: E402
+from routes.inbound import router as webhooks_router  # noqa: E402
+from services.inbound_router import inbound_router  # noqa: E402
+
+_LEGACY_PRIORITY = [
+    Intent.STOP, Intent.COMMISSION_QUESTION, Intent.COMPLAINT, Intent.PRODUCT_QUESTION,
+    Intent.TRAINING_REQUEST, Intent.ADM_REQUEST, Intent.POSITIVE_CONFIRMATION,
+    Intent.NEGATIVE_CONFIRMATION, Intent.GREETING,
+]
+
+
+def legacy_classify_intent(text: str) -> str:
+    """classify_intent as it was: one regex search per intent, in priority order."""
+    text = (text or "").strip()
+    if not text:
+        return Intent.UNKNOWN
+    for intent_key in _LEGACY_PRIORITY:
+        pattern = _INTENT_PATTERNS.get(intent_key)
+        if pattern and pattern.search(text):
+            return intent_key
+    return Intent.UNKNOWN
+
+
+def _texts(n: int, seed: int = 7) -> list[str]:
+    """Replies as agents write them: the canned ones plus longer free text."""
+    rng = random.Random(seed)
+    filler = ("sir", "please", "my", "policy", "customer", "today", "kal", "payment", "call", "ji", "the", "for")
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(filler) for _ in range(rng.randint(0, 25))]
+        words.insert(rng.randint(0, len(words)), rng.choice(REPLIES))
+        texts.append(" ".join(words))
+    return texts
+
+
+def _bench_classifier(n: int) -> None:
+    texts = _texts(n)
+    started = time.perf_counter()
+    before = [legacy_classify_intent(t) for t in texts]
+    legacy_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    after = [classify_intent(t) for t in texts]
+    seconds = time.perf_counter() - started
+    mismatches = sum(1 for a, b in zip(before, after) if a != b)
+    print(
+        f"classify_intent x{n:,}: before {legacy_seconds:.3f}s   after {seconds:.3f}s   "
+        f"({legacy_seconds / seconds:.1f}x)   mismatches {mismatches}"
+    )
+    assert mismatches == 0
+
+
+def _seed(n_agents: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    n_adms = max(1, n_agents // 200)
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [
+            {"id": i + 1, "name": f"ADM {i + 1}", "phone": f"80000{i:05d}", "region": "North",
+             "telegram_chat_id": str(100000 + i)}
+            for i in range(n_adms)
+        ])
+        db.execute(insert(Agent), [
+            {"name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune",
+             "language": "English" if i % 3 else "Hindi", "lifecycle_state": "dormant",
+             "assigned_adm_id": i % n_adms + 1}
+            for i in range(n_agents)
+        ])
+        db.commit()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _counts() -> tuple[int, int]:
+    with SessionLocal() as db:
+        return (
+            db.execute(select(func.count()).select_from(Interaction)).scalar(),
+            db.execute(select(func.count()).select_from(AgentSignal)).scalar(),
+        )
+
+
+async def _run(args) -> None:
+    app = FastAPI()
+    app.include_router(webhooks_router)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+
+    async with ChannelStub(latency_ms=args.latency_ms) as stub:
+        settings.ENABLE_WHATSAPP = True
+        settings.WHATSAPP_API_URL = stub.url
+        settings.WHATSAPP_API_TOKEN = "bench"
+        settings.WHATSAPP_PHONE_NUMBER_ID = "1000"
+        settings.TELEGRAM_API_URL = stub.url
+        settings.TELEGRAM_BOT_TOKEN = "bench"
+        settings.WHATSAPP_APP_SECRET = ""
+        settings.INBOUND_QUEUE_SIZE = max(settings.INBOUND_QUEUE_SIZE, args.messages)
+
+        inbound_router.start()
+        while not server.started or not len(inbound_router.index):
+            await asyncio.sleep(0.01)
+
+        rng = random.Random(args.seed)
+        texts = _texts(args.messages, args.seed)
+        payloads = [
+            whatsapp_webhook(f"wamid.bench.{i}", f"91{9000000000 + rng.randrange(args.agents)}", text)
+            for i, text in enumerate(texts)
+        ]
+        started = time.perf_counter()
+        acks = await stub.drive(f"http://127.0.0.1:{port}/webhooks/whatsapp", payloads, args.concurrency)
+        await inbound_router.drain()
+        elapsed = time.perf_counter() - started
+
+        stats = inbound_router.stats()
+        interactions, signals = _counts()
+        print(
+            f"webhook: {acks['sent']:,} deliveries {acks['statuses']} in {acks['seconds']}s "
+            f"({acks['requests_per_second']:,} req/s)   ack p50 {acks['ack_ms_p50']} ms   "
+            f"p99 {acks['ack_ms_p99']} ms   max {acks['ack_ms_max']} ms"
+        )
+        print(
+            f"processed {stats.get('processed', 0):,} in {elapsed:.2f}s = "
+            f"{stats.get('processed', 0) / elapsed:,.0f} msg/s   errors {stats.get('errors', 0)}   "
+            f"unknown senders {stats.get('unknown_sender', 0)}"
+        )
+        print(
+            f"interactions {interactions:,}   signals {signals:,}   replies sent {stats.get('replies_sent', 0):,} "
+            f"(failed {stats.get('replies_failed', 0)})   stub {stub.stats()}"
+        )
+        print(f"intents: {stats['intents']}")
+
+        await inbound_router.stop()
+    server.should_exit = True
+    await serving
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, default=50_000)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50, help="webhook connections")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="simulated WhatsApp/Telegram API latency")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    _bench_classifier(args.messages)
+    _seed(args.agents)
+    print(f"{args.agents:,} agents seeded in {_SCRATCH}")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
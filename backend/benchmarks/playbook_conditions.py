@@ -0,0 +1,116 @@
+"""
+Microbenchmark: playbook branching-rule evaluation.
+
+Evaluates every next-step rule of the six default playbooks against N
+synthetic agent contexts, three ways:
+
+  - before:   the original evaluator, which re-ran the condition regex and
+              value parsing on every evaluation (kept here as a baseline)
+  - memoized: ``evaluate_condition``, which looks the compiled condition
+              up by its text on each call
+  - compiled: predicates from ``compile_condition`` held by the caller,
+              as ``compile_rules`` / the playbook registry do
+
+Each rule is measured in its stored dict form and rendered as the
+equivalent string condition ("quiz_score >= 60"); all three must agree
+on every result.
+
+Run from backend/:  python -m benchmarks.playbook_conditions [--contexts 100000]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from domain.playbook_engine import (
+    _OPS, _get_nested, _parse_value, compile_condition, evaluate_condition, get_default_playbooks,
+)
+
+_LEGACY_PATTERN = re.compile(
+    r"(\w+(?:\.\w+)*)\s*(==|!=|>=|<=|>|<|in|contains)\s*(.+?)(?:\s+AND\s+|$)",
+    re.IGNORECASE,
+)
+
+
+def legacy_evaluate(condition, context: dict) -> bool:
+    """The evaluator as it was before conditions were compiled."""
+    if isinstance(condition, dict):
+        op_func = _OPS.get(condition.get("op", "=="))
+        if op_func is None:
+            return False
+        try:
+            return op_func(_get_nested(context, condition.get("field", "")), condition.get("value"))
+        except (TypeError, ValueError):
+            return False
+
+    condition = str(condition).strip()
+    if condition.lower() == "default" or not condition:
+        return True
+    matches = _LEGACY_PATTERN.findall(condition)
+    if not matches:
+        return False
+    for field_name, op, raw_value in matches:
+        op_func = _OPS.get(op.lower())
+        if op_func is None:
+            return False
+        try:
+            if not op_func(_get_nested(context, field_name), _parse_value(raw_value)):
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def _as_text(condition: dict) -> str:
+    return f"{condition['field']} {condition['op']} {condition['value']}"
+
+
+def _contexts(n: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    categories = ["training_gap", "economic", "operational", "personal", "engagement", None]
+    return [
+        {
+            "agent_replied": rng.random() < 0.4,
+            "dormancy_reason_category": rng.choice(categories),
+            "quiz_score": rng.randint(0, 100),
+            "lifecycle_state": rng.choice(["dormant", "at_risk", "licensed"]),
+        }
+        for _ in range(n)
+    ]
+
+
+def _time(run) -> tuple[float, list]:
+    started = time.perf_counter()
+    results = run()
+    return time.perf_counter() - started, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--contexts", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rules = [
+        rule["condition"]
+        for playbook in get_default_playbooks()
+        for step in playbook["steps"]
+        for rule in step.get("next_step_rules", [])
+    ]
+    contexts = _contexts(args.contexts)
+    print(f"{len(rules)} rules x {len(contexts):,} contexts = {len(rules) * len(contexts):,} evaluations")
+
+    for label, conditions in (("dict rules", rules), ("string rules", [_as_text(r) for r in rules])):
+        predicates = [compile_condition(c) for c in conditions]
+        before, expected = _time(lambda: [legacy_evaluate(c, ctx) for ctx in contexts for c in conditions])
+        memoized, by_text = _time(lambda: [evaluate_condition(c, ctx) for ctx in contexts for c in conditions])
+        compiled, by_predicate = _time(lambda: [p(ctx) for ctx in contexts for p in predicates])
+        assert by_text == expected and by_predicate == expected, f"{label}: results differ from the baseline"
+        print(
+            f"{label:>12}: before {before:5.2f}s   memoized {memoized:5.2f}s (x{before / memoized:.1f})"
+            f"   compiled {compiled:5.2f}s (x{before / compiled:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Query-plan regression check: the hottest filters must be served by their indexes, not a table scan.
+
+Seeds a scratch database with a realistic spread of rows, runs ANALYZE,
+and asks the database for the plan of each hot query, written the way the
+routes write it:
+
+  - overdue follow-ups per ADM          ix_interactions_adm_followup
+  - ADM portfolio by lifecycle state    ix_agents_adm_lifecycle
+  - duplicate-ticket check on submit    ix_feedback_tickets_dedup
+  - department queue, newest first      ix_department_queue_dept_status_created
+  - ticket conversation thread          ix_ticket_messages_ticket_created
+  - ADM lookup by Telegram chat         ix_adms_telegram_chat_id
+
+Twice: first with those indexes dropped (the baseline), then after
+``database.ensure_indexes()`` has put them back, which is also what a
+deployed database goes through at startup. Reports each plan and the
+median query time, and fails if any query in the second run still scans
+its table or doesn't use its index.
+
+SQLite (the default, a temporary file) is checked with EXPLAIN QUERY PLAN.
+With DATABASE_URL pointing at an empty PostgreSQL database the check runs
+EXPLAIN (FORMAT JSON) and fails on any Seq Scan node. The plans are taken
+with enable_seqscan off, so a Seq Scan means no index can serve the query;
+small tables such as adms would otherwise be scanned on cost alone. The
+timings use the default planner settings.
+
+Run from backend/:
+  python -m benchmarks.query_plans [--agents 20000] [--repeat 50]
+  DATABASE_URL=postgresql://localhost/query_plans_bench python -m benchmarks.query_plans
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='query_plans_bench_')}/bench.db"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import desc, func, insert, select, text  # noqa: E402
+
+from config import settings  # noqa: E402
+from database import Base, engine, ensure_indexes  # noqa: E402
+from models import ADM, Agent, DepartmentQueue, FeedbackTicket, Interaction, TicketMessage  # noqa: E402
+
+BUCKETS = ["underwriting", "finance", "contest", "operations", "product"]
+STATES = ["dormant", "contacted", "engaged", "trained", "active", "at_risk"]
+
+
+def _cases(n_adms: int) -> list[tuple[str, str, str, object]]:
+    """(label, table, expected index, statement) per hot query."""
+    today = date.today()
+    return [
+        ("overdue follow-ups", "interactions", "ix_interactions_adm_followup",
+         select(func.count(Interaction.id)).where(
+             Interaction.adm_id == n_adms // 2,
+             Interaction.follow_up_status == "pending",
+             Interaction.follow_up_date < today,
+         )),
+        ("portfolio by state", "agents", "ix_agents_adm_lifecycle",
+         select(Agent).where(
+             Agent.assigned_adm_id == n_adms // 2,
+             Agent.lifecycle_state == "dormant",
+             Agent.last_contact_date.is_(None),
+         ).limit(5)),
+        ("duplicate ticket", "feedback_tickets", "ix_feedback_tickets_dedup",
+         select(FeedbackTicket).where(
+             FeedbackTicket.agent_id == 42,
+             FeedbackTicket.adm_id == 42 % n_adms + 1,
+             FeedbackTicket.bucket == "finance",
+             FeedbackTicket.status != "closed",
+             FeedbackTicket.created_at >= datetime.utcnow() - timedelta(days=30),
+         ).order_by(desc(FeedbackTicket.created_at)).limit(1)),
+        ("department queue", "department_queue", "ix_department_queue_dept_status_created",
+         select(DepartmentQueue).where(
+             DepartmentQueue.department == "finance",
+             DepartmentQueue.status == "open",
+         ).order_by(desc(DepartmentQueue.created_at), desc(DepartmentQueue.id)).limit(50)),
+        ("ticket thread", "ticket_messages", "ix_ticket_messages_ticket_created",
+         select(TicketMessage).where(TicketMessage.ticket_id == 1234).order_by(TicketMessage.created_at)),
+        ("ADM by chat", "adms", "ix_adms_telegram_chat_id",
+         select(ADM).where(ADM.telegram_chat_id == str(7_000_000 + n_adms // 2))),
+    ]
+
+
+def _seed(n_agents: int, n_adms: int) -> None:
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count(ADM.id))).scalar():
+            raise SystemExit(f"{engine.url!r} already has data; point DATABASE_URL at an empty database")
+        conn.execute(insert(ADM), [
+            {"id": i + 1, "name": f"ADM {i + 1}", "phone": f"80000{i:05d}", "region": "North",
+             "telegram_chat_id": str(7_000_000 + i + 1)}
+            for i in range(n_adms)
+        ])
+        conn.execute(insert(Agent), [
+            {"id": i + 1, "name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune",
+             "lifecycle_state": rng.choice(STATES), "assigned_adm_id": i % n_adms + 1}
+            for i in range(n_agents)
+        ])
+        conn.execute(insert(Interaction), [
+            {"agent_id": i % n_agents + 1, "adm_id": i % n_adms + 1, "type": "call", "outcome": "connected",
+             "follow_up_status": rng.choice(["pending", "completed", "completed", "completed"]),
+             "follow_up_date": now - timedelta(days=rng.randrange(-30, 90))}
+            for i in range(n_agents * 5)
+        ])
+        conn.execute(insert(FeedbackTicket), [
+            {"id": i + 1, "ticket_id": f"FB-BENCH-{i + 1:07d}", "agent_id": i % n_agents + 1,
+             "adm_id": i % n_adms + 1, "bucket": rng.choice(BUCKETS),
+             "status": rng.choice(["received", "responded", "closed", "closed"]),
+             "created_at": now - timedelta(days=rng.randrange(365))}
+            for i in range(n_agents * 2)
+        ])
+        conn.execute(insert(DepartmentQueue), [
+            {"ticket_id": i + 1, "department": rng.choice(BUCKETS),
+             "status": rng.choice(["open", "responded", "closed", "closed"]),
+             "created_at": now - timedelta(days=rng.randrange(365))}
+            for i in range(n_agents * 2)
+        ])
+        conn.execute(insert(TicketMessage), [
+            {"ticket_id": i % (n_agents * 2) + 1, "sender_type": "adm", "message_text": "bench",
+             "created_at": now - timedelta(minutes=i)}
+            for i in range(n_agents * 5)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _plan(conn, statement) -> list[str]:
+    compiled = statement.compile(dialect=engine.dialect)
+    if compiled.positiontup is not None:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    if not settings.is_postgres:
+        return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params)]
+
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    try:
+        document = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params).scalar()
+    finally:
+        conn.exec_driver_sql("RESET enable_seqscan")
+    if isinstance(document, str):
+        document = json.loads(document)
+    steps = []
+
+    def walk(node: dict) -> None:
+        step = node["Node Type"]
+        if "Index Name" in node:
+            step += f" using {node['Index Name']}"
+        if "Relation Name" in node:
+            step += f" on {node['Relation Name']}"
+        steps.append(step)
+        for child in node.get("Plans", ()):
+            walk(child)
+
+    walk(document[0]["Plan"])
+    return steps
+
+
+def _median_ms(conn, statement, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(statement).all()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def _run(label: str, cases, repeat: int) -> list[str]:
+    """Print each plan; return the problems found."""
+    problems = []
+    print(label)
+    with engine.connect() as conn:
+        for name, table, index, statement in cases:
+            plan = _plan(conn, statement)
+            ms = _median_ms(conn, statement, repeat)
+            print(f"  {name:20} {ms:8.3f} ms   {' | '.join(plan)}")
+            if any(step.startswith("Seq Scan") for step in plan):
+                problems.append(f"{name}: plan has a Seq Scan")
+            elif any(step.split(" USING ")[0] == f"SCAN {table}" and "INDEX" not in step for step in plan):
+                problems.append(f"{name}: scans {table}")
+            elif not any(index in step for step in plan):
+                problems.append(f"{name}: does not use {index}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, default=20_000, help="agents; the other tables scale with it")
+    parser.add_argument("--adms", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50, help="runs per query for the median")
+    args = parser.parse_args()
+
+    _seed(args.agents, args.adms)
+    cases = _cases(args.adms)
+
+    with engine.begin() as conn:
+        for _, _, index, _ in cases:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        conn.exec_driver_sql("ANALYZE")
+    before = _run("before (indexes dropped)", cases, args.repeat)
+    print(f"  {len(before)} of {len(cases)} queries without their index")
+
+    ensure_indexes()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    after = _run("after ensure_indexes()", cases, args.repeat)
+    assert not after, after
+    print(f"  all {len(cases)} queries use their index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: precomputed recommendation table vs calling the domain functions.
+
+Draws N random agent states (every lifecycle state, taxonomy reasons plus
+free-text and missing ones, days and scores on both sides of every
+threshold, never-contacted agents) and checks that
+``recommendation_table.recommendation`` / ``summary`` return exactly what
+``get_recommendation_for_agent`` / ``compute_system_recommendation`` do,
+then times both. Finally builds a scratch SQLite database with one ADM
+portfolio of P agents and times ``for_portfolio``, the batch API behind
+GET /adms/{id}/recommendations.
+
+Run from backend/:
+  python -m benchmarks.recommendations [--samples 200000] [--portfolio 5000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+_SCRATCH = tempfile.mkdtemp(prefix="recommendations_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_SCRATCH}/bench.db"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import insert  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from domain.adm_intelligence import compute_system_recommendation, get_recommendation_for_agent  # noqa: E402
+from domain.dormancy_taxonomy import DORMANCY_TAXONOMY  # noqa: E402
+from domain.enums import AgentLifecycleState  # noqa: E402
+from models import ADM, Agent, AgentEngagement  # noqa: E402
+from services.recommendations import recommendation_table  # noqa: E402
+
+STATES = [state.value for state in AgentLifecycleState] + ["contacted", ""]
+REASONS = [reason["code"] for reason in DORMANCY_TAXONOMY] + [None, None, "moved to another city", "economic.unknown"]
+
+
+def _maybe(rng: random.Random, value, p_none: float = 0.2):
+    return None if rng.random() < p_none else value
+
+
+def _samples(n: int, seed: int) -> list[tuple]:
+    """(state, reason, days_in_state, engagement, last_contact_days, last_engaged_days)"""
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice(STATES), rng.choice(REASONS), rng.randint(-2, 90), round(rng.uniform(0, 100), 1),
+            _maybe(rng, rng.randint(-1, 60)), _maybe(rng, rng.randint(-1, 20)),
+        )
+        for _ in range(n)
+    ]
+
+
+def _bench_lookups(n: int, seed: int) -> None:
+    started = time.perf_counter()
+    built = recommendation_table.build()
+    print(f"table: {built:,} entries built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    samples = _samples(n, seed)
+    started = time.perf_counter()
+    direct = [
+        (get_recommendation_for_agent(s, r, d, e, c), compute_system_recommendation(s, d, a, r))
+        for s, r, d, e, c, a in samples
+    ]
+    direct_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    table = [
+        (recommendation_table.recommendation(s, r, d, e, c), recommendation_table.summary(s, d, a, r))
+        for s, r, d, e, c, a in samples
+    ]
+    table_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(direct, table) if a != b)
+    print(
+        f"recommendation + summary x{n:,}: direct {direct_seconds:.3f}s "
+        f"({direct_seconds / n * 1e6:.2f} us)   table {table_seconds:.3f}s "
+        f"({table_seconds / n * 1e6:.2f} us)   ({direct_seconds / table_seconds:.1f}x)   mismatches {mismatches}"
+    )
+    assert mismatches == 0
+
+
+def _seed_portfolio(n: int, seed: int) -> None:
+    rng = random.Random(seed)
+    today, now = date.today(), datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [{"id": 1, "name": "ADM 1", "phone": "8000000001", "region": "North"}])
+        db.execute(insert(Agent), [
+            {"id": i + 1, "name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune",
+             "lifecycle_state": rng.choice(STATES[:-2]), "dormancy_reason": rng.choice(REASONS),
+             "dormancy_duration_days": rng.randint(0, 90), "engagement_score": rng.uniform(0, 100),
+             "last_contact_date": _maybe(rng, today - timedelta(days=rng.randint(0, 60))),
+             "assigned_adm_id": 1}
+            for i in range(n)
+        ])
+        db.execute(insert(AgentEngagement), [
+            {"agent_id": i + 1, "as_of": now, "last_active_at": now - timedelta(days=rng.randint(0, 20))}
+            for i in range(n) if rng.random() < 0.6
+        ])
+        db.commit()
+
+
+def _bench_portfolio(n: int, seed: int) -> None:
+    _seed_portfolio(n, seed)
+    with SessionLocal() as db:
+        recommendation_table.for_portfolio(db, 1)
+        started = time.perf_counter()
+        report = recommendation_table.for_portfolio(db, 1)
+        seconds = time.perf_counter() - started
+    print(
+        f"for_portfolio: {report['total']:,} agents in {seconds * 1000:.1f} ms "
+        f"({seconds / max(report['total'], 1) * 1e6:.1f} us/agent, query included)   by action {report['by_action']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--portfolio", type=int, default=5_000, help="agents in the benchmark ADM's portfolio")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    _bench_lookups(args.samples, args.seed)
+    _bench_portfolio(args.portfolio, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Concurrency check: 1,000 parallel ticket submissions must get 1,000 distinct ticket IDs.
+
+Builds a scratch SQLite database with N agents and fires N submissions at
+POST /feedback-tickets/submit at once (one per agent, so none is folded
+into an open ticket as a follow-up), in-process over ASGI, twice:
+
+  - before: ticket IDs from the original read-the-latest-and-add-one
+    lookup (kept here as a baseline)
+  - after:  ``ticket_id_allocator`` (the per-year counter row on SQLite)
+
+and reports statuses, tickets written, duplicate IDs and throughput. The
+"after" run must write every ticket with no duplicates.
+
+SQLite admits one writer at a time, and a transaction that has already read
+cannot wait for the write lock: it fails at once with "database is locked"
+and the request answers 500 after rolling back. Like the bot's API client,
+the driver retries 5xx responses with backoff (--retries), and reports how
+many retries that took. In the "before" run concurrent submissions keep
+picking the same number; the unique constraint rejects the duplicates (so
+the table stays clean) and those submissions run out of retries.
+
+The PostgreSQL path (sequence blocks) is not exercised here; run the same
+script with DATABASE_URL pointing at a scratch PostgreSQL database for that.
+
+Run from backend/:
+  python -m benchmarks.ticket_ids [--submissions 1000] [--concurrency 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='ticket_ids_bench_')}/bench.db"
+os.environ["DEBUG"] = "false"
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import delete, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import routes.feedback_tickets as feedback_tickets  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import (  # noqa: E402
+    ADM, Agent, AgentEngagement, DepartmentQueue, FeedbackTicket, PatternCounter, TicketIdCounter, TicketMessage,
+)
+
+REASONS = ["UW-01", "FIN-01", "CON-01", "PRD-01"]
+
+
+def legacy_generate_ticket_id(db: Session) -> str:
+    """_generate_ticket_id as it was: the latest ticket_id for the year, plus one."""
+    year = datetime.utcnow().year
+    last = (
+        db.query(FeedbackTicket)
+        .filter(FeedbackTicket.ticket_id.like(f"FB-{year}-%"))
+        .order_by(FeedbackTicket.id.desc())
+        .first()
+    )
+    number = int(last.ticket_id.split("-")[-1]) + 1 if last else 1
+    return f"FB-{year}-{number:05d}"
+
+
+def _seed(n: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(ADM), [{"id": 1, "name": "ADM 1", "phone": "8000000001", "region": "North"}])
+        db.execute(insert(Agent), [
+            {"id": i + 1, "name": f"Agent {i}", "phone": f"9{i:09d}", "location": "Pune", "assigned_adm_id": 1}
+            for i in range(n)
+        ])
+        db.commit()
+
+
+def _reset() -> None:
+    with SessionLocal() as db:
+        for model in (TicketMessage, DepartmentQueue, FeedbackTicket, PatternCounter, TicketIdCounter, AgentEngagement):
+            db.execute(delete(model))
+        db.commit()
+
+
+async def _submit_all(app: FastAPI, n: int, concurrency: int, retries: int) -> tuple[Counter, int, float]:
+    """Final status per submission, failed attempts that were retried, and the elapsed time."""
+    statuses: Counter = Counter()
+    retried = 0
+    rng = random.Random(7)
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+        base_url="http://bench", limits=limits, timeout=None,
+    ) as client:
+        async def submit(i: int) -> None:
+            nonlocal retried
+            body = {"agent_id": i + 1, "adm_id": 1, "selected_reason_codes": [REASONS[i % len(REASONS)]]}
+            for attempt in range(retries + 1):
+                async with gate:
+                    response = await client.post("/feedback-tickets/submit", json=body)
+                if response.status_code < 500 or attempt == retries:
+                    break
+                retried += 1
+                await asyncio.sleep(0.2 * 2 ** attempt * (0.5 + rng.random()))
+            statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(submit(i) for i in range(n)))
+        return statuses, retried, time.perf_counter() - started
+
+
+def _report(label: str, n: int, statuses: Counter, retried: int, seconds: float) -> int:
+    with SessionLocal() as db:
+        ids = [row[0] for row in db.execute(select(FeedbackTicket.ticket_id))]
+    duplicates = sum(count - 1 for count in Counter(ids).values() if count > 1)
+    print(
+        f"{label:7} {n:,} submissions in {seconds:.2f}s ({n / seconds:,.0f}/s)   statuses {dict(statuses)} "
+        f"after {retried:,} retries   "
+        f"tickets written {len(ids):,}   distinct IDs {len(set(ids)):,}   duplicates {duplicates}"
+    )
+    return len(set(ids))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=1_000, help="submissions in flight at once")
+    parser.add_argument("--retries", type=int, default=8, help="retries of a submission answered with 5xx")
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    _seed(args.submissions)
+    app = FastAPI()
+    app.include_router(feedback_tickets.router)
+    allocator = feedback_tickets._generate_ticket_id
+
+    if not args.skip_baseline:
+        feedback_tickets._generate_ticket_id = legacy_generate_ticket_id
+        statuses, retried, seconds = asyncio.run(_submit_all(app, args.submissions, args.concurrency, args.retries))
+        _report("before", args.submissions, statuses, retried, seconds)
+        _reset()
+
+    feedback_tickets._generate_ticket_id = allocator
+    statuses, retried, seconds = asyncio.run(_submit_all(app, args.submissions, args.concurrency, args.retries))
+    distinct = _report("after", args.submissions, statuses, retried, seconds)
+    assert statuses == Counter({201: args.submissions}), statuses
+    assert distinct == args.submissions
+
+
+if __name__ == "__main__":
+    main()
@@ -31,11 +31,88 @@ class Settings(BaseSettings):
     # Telegram Bot
     TELEGRAM_BOT_TOKEN: str = ""
     TELEGRAM_WEBHOOK_URL: str = ""
+    TELEGRAM_API_URL: str = "https://api.telegram.org"  # Bot API base used for outbound sends
+
+    # Telegram file proxy (voice notes / attachments) — bounded on-disk cache
+    TELEGRAM_FILE_CACHE_DIR: str = "./telegram_file_cache"
+    TELEGRAM_FILE_CACHE_MAX_MB: int = 500
+
+    # Aggregation alerts — tickets in the rolling window that trigger an alert
+    PATTERN_WINDOW_DAYS: int = 30
+    PATTERN_THRESHOLD_REASON: int = 5
+    PATTERN_THRESHOLD_BUCKET: int = 25
+    PATTERN_THRESHOLD_DISTRICT: int = 10
+
+    # Feedback ticket IDs reserved per sequence call (PostgreSQL)
+    TICKET_ID_BLOCK_SIZE: int = 20
+
+    # SLA monitor — proactive warning/breach/escalation of department queues
+    SLA_MONITOR_ENABLED: bool = True
+    SLA_MONITOR_TICK_SECONDS: int = 60
+    SLA_MONITOR_RESYNC_MINUTES: int = 15
+    SLA_ALERT_WEBHOOK_URL: str = ""  # optional: POSTed {"events": [...]} on transitions
+
+    # Ticket analytics — ranges longer than this read the daily rollup table
+    ANALYTICS_ROLLUP_MIN_DAYS: int = 90
+    ANALYTICS_ROLLUP_JOB_ENABLED: bool = True  # Reads never build rollups; this job does
+    ANALYTICS_ROLLUP_HOUR_UTC: int = 0
+
+    # Bulk import of agents / ADMs — rows validated, deduped and committed per chunk
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+
+    # Streaming exports — rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Nightly lifecycle sweep — AT_RISK / DORMANT by inactivity and engagement
+    LIFECYCLE_SWEEP_ENABLED: bool = True
+    LIFECYCLE_SWEEP_HOUR_UTC: int = 20  # 01:30 IST
+    LIFECYCLE_SWEEP_CHUNK_SIZE: int = 10000
+    LIFECYCLE_SWEEP_WORKERS: int = 1  # >1 runs id ranges in parallel processes (PostgreSQL)
+    LIFECYCLE_AT_RISK_DAYS: int = 30
+    LIFECYCLE_DORMANT_DAYS: int = 90
+    LIFECYCLE_ENGAGEMENT_AT_RISK: float = 40.0
+
+    # Agent signal consumer — applies queued lifecycle signals in micro-batches
+    SIGNAL_CONSUMER_ENABLED: bool = True
+    SIGNAL_CONSUMER_POLL_SECONDS: float = 2.0
+    SIGNAL_CONSUMER_BATCH_SIZE: int = 500
+
+    # Priority engine — candidates kept per ADM in the cached ranking
+    PRIORITY_CACHE_TOP_K: int = 20
+
+    # Playbook runtime — executes due playbook steps in claimed batches
+    PLAYBOOK_RUNTIME_ENABLED: bool = True
+    PLAYBOOK_RUNTIME_POLL_SECONDS: float = 5.0
+    PLAYBOOK_RUNTIME_BATCH_SIZE: int = 1000
+    PLAYBOOK_RUNTIME_LEASE_SECONDS: int = 300  # claimed runs are retried after this
+    PLAYBOOK_MAX_ATTEMPTS: int = 3  # failed sends of one step before the run fails
+    CHANNEL_SEND_CONCURRENCY: int = 50  # in-flight WhatsApp / Telegram requests
+
+    # Campaigns — bulk template sends to agent segments
+    CAMPAIGN_RUNNER_ENABLED: bool = True
+    CAMPAIGN_POLL_SECONDS: float = 10.0
+    CAMPAIGN_BATCH_SIZE: int = 500  # recipients fetched, rendered and sent per round trip
+    CAMPAIGN_LEASE_SECONDS: int = 120  # a crashed worker's campaign is resumed after this
+    CAMPAIGN_SEND_RATE: float = 80.0  # messages per second per campaign (0 = unlimited)
+
+    # Engagement score — decayed activity counters (see domain.engagement)
+    ENGAGEMENT_HALF_LIFE_DAYS: float = 30.0  # weight of an interaction / quiz / ticket halves after this
+    ENGAGEMENT_RECENCY_HALF_LIFE_DAYS: float = 14.0  # recency component halves per this many idle days
+    ENGAGEMENT_CHUNK_SIZE: int = 50000  # rows per chunk in refresh / rebuild
+
+    # Inbound router — agent replies arriving on the WhatsApp webhook
+    INBOUND_ROUTER_ENABLED: bool = True
+    INBOUND_WORKERS: int = 4
+    INBOUND_QUEUE_SIZE: int = 20000  # webhook answers 503 (provider retries) when full
+    INBOUND_BATCH_SIZE: int = 200  # messages a worker classifies and writes per transaction
+    INBOUND_INDEX_REFRESH_SECONDS: float = 30.0  # phone -> agent index catch-up interval
 
     # WhatsApp Business API (placeholder)
     WHATSAPP_API_URL: str = ""
     WHATSAPP_API_TOKEN: str = ""
     WHATSAPP_PHONE_NUMBER_ID: str = ""
+    WHATSAPP_VERIFY_TOKEN: str = ""  # webhook subscription handshake
+    WHATSAPP_APP_SECRET: str = ""  # when set, webhook payload signatures are checked
 
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:5173,http://localhost:8080,https://adm-agent.vercel.app"
@@ -6,11 +6,21 @@ Supports two backends:
   - PostgreSQL / Neon DB  (production on Railway)
 
 The backend is chosen automatically based on the DATABASE_URL env var.
+
+Two session factories share the same schema:
+  - SessionLocal / get_db            — sync Session (psycopg2 / sqlite3), for
+                                       plain ``def`` route handlers
+  - AsyncSessionLocal / get_async_db — AsyncSession (asyncpg / aiosqlite), for
+                                       ``async def`` handlers so DB round trips
+                                       don't block the event loop
 """
 
 import logging
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.schema import CreateIndex
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -60,6 +70,53 @@ if not settings.is_postgres:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# ---------------------------------------------------------------------------
+# Async engine (asyncpg for PostgreSQL, aiosqlite for SQLite)
+# ---------------------------------------------------------------------------
+
+def _async_engine_args(database_url: str) -> tuple:
+    """Map DATABASE_URL onto its async driver, returning (url, connect_args).
+
+    asyncpg doesn't understand libpq's ``sslmode`` / ``channel_binding`` query
+    parameters (Neon URLs carry both), so they become an ``ssl`` connect arg.
+    """
+    url = make_url(database_url)
+    connect_args = {}
+    if settings.is_postgres:
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = "require"
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    else:
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url, connect_args
+
+
+_async_url, _async_connect_args = _async_engine_args(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url,
+    connect_args=_async_connect_args,
+    **_engine_kwargs,
+)
+
+if not settings.is_postgres:
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def set_async_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+# expire_on_commit=False: attribute access after commit would otherwise
+# trigger implicit (sync) IO, which AsyncSession does not allow
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
@@ -72,6 +129,16 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency that provides an AsyncSession for ``async def`` handlers.
+
+    Sync helpers that take a ``Session`` can still be reused on it via
+    ``await db.run_sync(helper, ...)``.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Create all tables (safe for both SQLite and PostgreSQL)."""
     from models import (
@@ -82,4 +149,72 @@ def init_db():
         TicketMessage,
     )
     Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    ensure_indexes()
     logger.info("Database tables created / verified.")
+
+
+def ensure_columns():
+    """Add nullable columns declared on the models but missing from existing tables.
+
+    ``create_all`` never alters a table that already exists, so a column
+    added to a model later is added here with ALTER TABLE ... ADD COLUMN.
+    Only nullable columns qualify; anything else needs a real migration.
+    """
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                continue
+            present = {c["name"] for c in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable or column.primary_key:
+                    logger.warning(f"Column {table.name}.{column.name} is missing and not nullable; migrate it")
+                    continue
+                preparer = engine.dialect.identifier_preparer
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                ))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
+def ensure_indexes():
+    """Create indexes declared on the models but missing from existing tables.
+
+    ``create_all`` skips tables that already exist, so indexes added to a
+    model later would otherwise never reach a deployed database. On
+    PostgreSQL they are built with CREATE INDEX CONCURRENTLY, outside a
+    transaction, so a large table stays writable while its index builds.
+    """
+    if not settings.is_postgres:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=engine, checkfirst=True)
+                except Exception as e:
+                    logger.warning(f"Could not create index {index.name}: {e}")
+        return
+
+    existing = inspect(engine)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.sorted_tables:
+            present = {ix["name"] for ix in existing.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in present:
+                    continue
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                ddl = ddl.replace(" INDEX IF NOT EXISTS ", " INDEX CONCURRENTLY IF NOT EXISTS ", 1)
+                try:
+                    conn.execute(text(ddl))
+                    logger.info(f"Created index {index.name}")
+                except Exception as e:
+                    # A failed concurrent build leaves an INVALID index behind,
+                    # which IF NOT EXISTS would then skip forever
+                    logger.warning(f"Could not create index {index.name}: {e}")
+                    try:
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    except Exception:
+                        pass
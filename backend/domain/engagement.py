@@ -0,0 +1,206 @@
+"""
+domain/engagement.py — Agent engagement score (0-100) from decayed activity counters.
+
+An agent's history is summarised by a handful of counters, each an
+exponentially decayed sum with one half-life (ENGAGEMENT_HALF_LIFE_DAYS):
+
+    contacts          interactions logged with the agent (any outcome)
+    connected         interactions where the agent actually engaged
+    sentiment_sum/n   sentiment of interactions that carry one (-1..1)
+    quiz_sum/n        quiz / training scores reported for the agent (0..100)
+    tickets           feedback tickets raised for the agent
+
+Counters are stored as their value at ``as_of``. Folding in an event at
+time t is O(1): decay the counters from ``as_of`` to t and add the event
+(an event older than ``as_of`` is decayed to ``as_of`` instead). The value
+of a counter at time T is therefore
+
+    sum over events of  weight * 0.5 ** ((T - t_event) / half_life)
+
+whatever the order the events arrived in, which is what a full recompute
+evaluates directly.
+
+The score blends five components, each in 0..1 and 0.5 (neutral) with no
+evidence:
+
+    recency     0.25   0.5 + 0.5 * 0.5 ** (days since the agent last engaged / recency half-life)
+    frequency   0.15   0.5 + 0.5 * (1 - exp(-connected / 4))
+    outcome     0.35   (connected + 1) / (contacts + 2)
+    sentiment   0.10   (1 + sentiment_sum / (sentiment_n + 1)) / 2
+    quiz        0.15   (quiz_sum + 50) / (quiz_n + 1) / 100
+
+and scales the blend down by up to 20% as recent ticket activity grows.
+An agent with no history scores 50. Recency and frequency only reward
+engagement and fade back to neutral; inactivity itself is the lifecycle
+sweep's days rule. Only negative evidence (unanswered contacts, negative
+sentiment, low quiz scores, tickets) takes the score below the sweep's
+AT_RISK threshold of 40, and the rates are smoothed towards neutral priors
+so that one event alone cannot (``benchmarks/engagement_calibration.py``
+checks this).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from domain.enums import SignalType
+
+SECONDS_PER_DAY = 86400.0
+
+# Interaction outcomes where the agent engaged (compared lowercased)
+CONNECTED_OUTCOMES = {"connected", "callback_requested", "follow_up_scheduled", "detailed_discussion"}
+
+# Signals that may report a quiz / training score in their payload
+QUIZ_SIGNALS = {SignalType.TRAINING_COMPLETED, SignalType.WHATSAPP_TRAINING_INTERACTION}
+
+WEIGHTS = {"recency": 0.25, "frequency": 0.15, "outcome": 0.35, "sentiment": 0.10, "quiz": 0.15}
+NEUTRAL = 0.5  # recency and frequency with no engagement; the floor they fade back to
+FREQUENCY_SCALE = 4.0  # decayed connected contacts that take frequency 1 - 1/e of the way from neutral to 1
+TICKET_PENALTY = 0.20  # largest fraction of the score ticket activity removes
+TICKET_SCALE = 2.0
+QUIZ_PRIOR = 50.0
+
+COUNTERS = ("contacts", "connected", "sentiment_sum", "sentiment_n", "quiz_sum", "quiz_n", "tickets")
+
+
+class EngagementEvent(NamedTuple):
+    """One scored event; weights are added to the counters of the same name."""
+    agent_id: int
+    occurred_at: datetime
+    contacts: float = 0.0
+    connected: float = 0.0
+    sentiment: Optional[float] = None
+    quiz: Optional[float] = None
+    tickets: float = 0.0
+    active: bool = False  # the agent engaged (moves last_active_at)
+
+
+@dataclass
+class EngagementCounters:
+    """Decayed counters valued at ``as_of`` (same fields as models.AgentEngagement)."""
+    as_of: datetime
+    contacts: float = 0.0
+    connected: float = 0.0
+    sentiment_sum: float = 0.0
+    sentiment_n: float = 0.0
+    quiz_sum: float = 0.0
+    quiz_n: float = 0.0
+    tickets: float = 0.0
+    last_active_at: Optional[datetime] = None
+
+
+# ---------------------------------------------------------------------------
+# Events
+# ---------------------------------------------------------------------------
+
+def interaction_event(agent_id: int, occurred_at: datetime, outcome: Optional[str],
+                      sentiment: Optional[float] = None) -> EngagementEvent:
+    """An ADM <-> agent interaction (call, visit, WhatsApp, Telegram)."""
+    connected = (outcome or "").lower() in CONNECTED_OUTCOMES
+    if sentiment is not None:
+        sentiment = min(1.0, max(-1.0, float(sentiment)))
+    return EngagementEvent(
+        agent_id, occurred_at, contacts=1.0, connected=1.0 if connected else 0.0,
+        sentiment=sentiment, active=connected,
+    )
+
+
+def quiz_event(agent_id: int, occurred_at: datetime, score: float) -> EngagementEvent:
+    """A quiz or training score (0-100) reported for the agent."""
+    return EngagementEvent(agent_id, occurred_at, quiz=min(100.0, max(0.0, float(score))), active=True)
+
+
+def ticket_event(agent_id: int, occurred_at: datetime) -> EngagementEvent:
+    """A feedback ticket raised for the agent."""
+    return EngagementEvent(agent_id, occurred_at, tickets=1.0)
+
+
+def quiz_score(signal_type: str, payload: dict) -> Optional[float]:
+    """The score a training signal reports (``quiz_score`` or ``score``), if any."""
+    if signal_type not in QUIZ_SIGNALS:
+        return None
+    value = payload.get("quiz_score", payload.get("score"))
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Counters
+# ---------------------------------------------------------------------------
+
+def decay_factor(elapsed_days: float, half_life_days: float) -> float:
+    return 0.5 ** (elapsed_days / half_life_days)
+
+
+def _days(later: datetime, earlier: datetime) -> float:
+    return (later - earlier).total_seconds() / SECONDS_PER_DAY
+
+
+def apply_event(counters, event: EngagementEvent, half_life_days: float) -> None:
+    """Fold one event into ``counters`` (EngagementCounters or an AgentEngagement row)."""
+    if counters.as_of is None or event.occurred_at >= counters.as_of:
+        if counters.as_of is not None:
+            keep = decay_factor(_days(event.occurred_at, counters.as_of), half_life_days)
+            for name in COUNTERS:
+                setattr(counters, name, (getattr(counters, name) or 0.0) * keep)
+        counters.as_of = event.occurred_at
+        weight = 1.0
+    else:
+        weight = decay_factor(_days(counters.as_of, event.occurred_at), half_life_days)
+
+    counters.contacts = (counters.contacts or 0.0) + event.contacts * weight
+    counters.connected = (counters.connected or 0.0) + event.connected * weight
+    counters.tickets = (counters.tickets or 0.0) + event.tickets * weight
+    if event.sentiment is not None:
+        counters.sentiment_sum = (counters.sentiment_sum or 0.0) + event.sentiment * weight
+        counters.sentiment_n = (counters.sentiment_n or 0.0) + weight
+    if event.quiz is not None:
+        counters.quiz_sum = (counters.quiz_sum or 0.0) + event.quiz * weight
+        counters.quiz_n = (counters.quiz_n or 0.0) + weight
+    if event.active and (counters.last_active_at is None or event.occurred_at > counters.last_active_at):
+        counters.last_active_at = event.occurred_at
+
+
+# ---------------------------------------------------------------------------
+# Score
+# ---------------------------------------------------------------------------
+
+def score_components(
+    counters,
+    now: datetime,
+    half_life_days: float = 30.0,
+    recency_half_life_days: float = 14.0,
+) -> dict:
+    """Each component (0..1) and the ticket multiplier, with counters decayed to ``now``."""
+    keep = decay_factor(max(0.0, _days(now, counters.as_of)), half_life_days) if counters.as_of else 0.0
+    contacts, connected, sentiment_sum, sentiment_n, quiz_sum, quiz_n, tickets = (
+        (getattr(counters, name) or 0.0) * keep for name in COUNTERS
+    )
+    if counters.last_active_at is not None:
+        recency = decay_factor(max(0.0, _days(now, counters.last_active_at)), recency_half_life_days)
+    else:
+        recency = 0.0
+    return {
+        "recency": NEUTRAL + (1.0 - NEUTRAL) * recency,
+        "frequency": NEUTRAL + (1.0 - NEUTRAL) * (1.0 - math.exp(-connected / FREQUENCY_SCALE)),
+        "outcome": (connected + 1.0) / (contacts + 2.0),
+        "sentiment": (1.0 + sentiment_sum / (sentiment_n + 1.0)) / 2.0,
+        "quiz": (quiz_sum + QUIZ_PRIOR) / (quiz_n + 1.0) / 100.0,
+        "ticket_multiplier": 1.0 - TICKET_PENALTY * (1.0 - math.exp(-tickets / TICKET_SCALE)),
+    }
+
+
+def engagement_score(
+    counters,
+    now: datetime,
+    half_life_days: float = 30.0,
+    recency_half_life_days: float = 14.0,
+) -> float:
+    """The 0-100 engagement score, rounded to one decimal."""
+    parts = score_components(counters, now, half_life_days, recency_half_life_days)
+    blend = sum(weight * parts[name] for name, weight in WEIGHTS.items())
+    return round(100.0 * blend * parts["ticket_multiplier"], 1)
@@ -15,7 +15,7 @@ import logging
 import re
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from domain.enums import PlaybookActionType
 
@@ -38,12 +38,24 @@ _OPS = {
     "contains": lambda a, b: b in a if isinstance(a, (list, tuple, set, str)) else False,
 }
 
-# Regex to parse condition strings: "field op value" with optional AND joins
-_CONDITION_PATTERN = re.compile(
-    r"(\w+(?:\.\w+)*)\s*(==|!=|>=|<=|>|<|in|contains)\s*(.+?)(?:\s+AND\s+|$)",
-    re.IGNORECASE,
+# One token of a string condition: parenthesis, AND/OR, or "field op value".
+# A bare value runs up to the next AND/OR, closing parenthesis or the end.
+_TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<joiner>(?:AND|OR)\b)
+      | (?P<field>\w+(?:\.\w+)*)\s*
+        (?P<op>==|!=|>=|<=|>|<|in\b|contains\b)\s*
+        (?P<value>"[^"]*"|'[^']*'|\[[^\]]*\]|.+?)(?=\s+(?:AND|OR)\b|\s*\)|\s*$)
+    )""",
+    re.IGNORECASE | re.VERBOSE,
 )
 
+# Compiled conditions, keyed by condition text (or a key built from a dict)
+_COMPILED: dict[Any, Callable[[dict], bool]] = {}
+_MAX_COMPILED = 4096
+
 
 def _to_num(val: Any) -> float:
     """Safely convert to number for comparison."""
@@ -89,62 +101,213 @@ def _get_nested(context: dict, key: str) -> Any:
     return current
 
 
-def evaluate_condition(condition: str | dict, context: dict) -> bool:
-    """Evaluate a condition against a context dict.
+def _getter(key: str) -> Callable[[dict], Any]:
+    """Compile a dot-notation field path into a getter (same rules as _get_nested)."""
+    parts = tuple(key.split("."))
+    if len(parts) == 1:
+        name = parts[0]
+        return lambda context: context.get(name) if isinstance(context, dict) else None
 
-    Supports two formats:
-    1. String: "outcome == answered AND sentiment == positive"
-    2. Dict: {"field": "quiz_score", "op": ">=", "value": 60}
+    def get(context: dict) -> Any:
+        current = context
+        for part in parts:
+            if not isinstance(current, dict):
+                return None
+            current = current.get(part)
+            if current is None:
+                return None
+        return current
 
-    Special string values:
-    - "default" -> always True
-    - empty string -> always True
+    return get
 
-    Returns True if ALL parts of the condition match.
-    NEVER uses eval(). All parsing is done with regex and explicit operators.
-    """
-    # Handle dict-format conditions
-    if isinstance(condition, dict):
-        field_name = condition.get("field", "")
-        op = condition.get("op", "==")
-        value = condition.get("value")
-        actual = _get_nested(context, field_name)
-        op_func = _OPS.get(op)
-        if op_func is None:
-            logger.warning("Unknown operator '%s' in condition dict", op)
-            return False
+
+def _always(result: bool) -> Callable[[dict], bool]:
+    return lambda context: result
+
+
+def _comparison(field_name: str, op: str, expected: Any) -> Callable[[dict], bool]:
+    op_func = _OPS.get(op)
+    if op_func is None:
+        logger.warning("Unknown operator '%s' in condition on '%s'", op, field_name)
+        return _always(False)
+
+    if "." not in field_name:
+        # Top-level field: skip the getter call on the hot path
+        def check(context: dict) -> bool:
+            try:
+                return op_func(context.get(field_name) if isinstance(context, dict) else None, expected)
+            except (TypeError, ValueError):
+                return False
+
+        return check
+
+    get = _getter(field_name)
+
+    def check_nested(context: dict) -> bool:
         try:
-            return op_func(actual, value)
+            return op_func(get(context), expected)
         except (TypeError, ValueError):
             return False
 
-    # Handle string-format conditions
-    condition = str(condition).strip()
-    if condition.lower() == "default" or not condition:
+    return check_nested
+
+
+def _all_of(parts: list) -> Callable[[dict], bool]:
+    if len(parts) == 1:
+        return parts[0]
+
+    def check(context: dict) -> bool:
+        for part in parts:
+            if not part(context):
+                return False
         return True
 
-    matches = _CONDITION_PATTERN.findall(condition)
-    if not matches:
-        logger.warning("Could not parse condition: %s", condition)
+    return check
+
+
+def _any_of(parts: list) -> Callable[[dict], bool]:
+    if len(parts) == 1:
+        return parts[0]
+
+    def check(context: dict) -> bool:
+        for part in parts:
+            if part(context):
+                return True
         return False
 
-    for field_name, op, raw_value in matches:
-        actual = _get_nested(context, field_name)
-        expected = _parse_value(raw_value)
-        op_func = _OPS.get(op.lower())
-        if op_func is None:
-            logger.warning("Unknown operator '%s' in condition: %s", op, condition)
-            return False
+    return check
+
+
+def _tokenize(text: str) -> list[tuple]:
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN_PATTERN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"unexpected input at position {pos}")
+        pos = match.end()
+        if match.group("lparen"):
+            tokens.append(("(", None))
+        elif match.group("rparen"):
+            tokens.append((")", None))
+        elif match.group("joiner"):
+            tokens.append((match.group("joiner").upper(), None))
+        elif match.group("field"):
+            tokens.append(("cmp", _comparison(
+                match.group("field"), match.group("op").lower(), _parse_value(match.group("value")),
+            )))
+        if text[pos:].strip() == "":
+            break
+    return tokens
+
+
+def _parse_or(tokens: list, pos: int) -> tuple:
+    """or_expr := and_expr ("OR" and_expr)*"""
+    part, pos = _parse_and(tokens, pos)
+    parts = [part]
+    while pos < len(tokens) and tokens[pos][0] == "OR":
+        part, pos = _parse_and(tokens, pos + 1)
+        parts.append(part)
+    return _any_of(parts), pos
+
+
+def _parse_and(tokens: list, pos: int) -> tuple:
+    """and_expr := operand ("AND" operand)*   (AND binds tighter than OR)"""
+    part, pos = _parse_operand(tokens, pos)
+    parts = [part]
+    while pos < len(tokens) and tokens[pos][0] == "AND":
+        part, pos = _parse_operand(tokens, pos + 1)
+        parts.append(part)
+    return _all_of(parts), pos
+
+
+def _parse_operand(tokens: list, pos: int) -> tuple:
+    """operand := "(" or_expr ")" | field op value"""
+    if pos >= len(tokens):
+        raise ValueError("condition ends early")
+    kind, node = tokens[pos]
+    if kind == "cmp":
+        return node, pos + 1
+    if kind == "(":
+        node, pos = _parse_or(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos][0] != ")":
+            raise ValueError("missing closing parenthesis")
+        return node, pos + 1
+    raise ValueError(f"unexpected '{kind}'")
+
+
+def _compile_text(text: str) -> Callable[[dict], bool]:
+    if text.lower() == "default" or not text:
+        return _always(True)
+    try:
+        tokens = _tokenize(text)
+        node, pos = _parse_or(tokens, 0)
+        if pos != len(tokens):
+            raise ValueError(f"unexpected '{tokens[pos][0]}'")
+    except ValueError as e:
+        logger.warning("Could not parse condition: %s (%s)", text, e)
+        return _always(False)
+    return node
+
+
+def compile_condition(condition: str | dict) -> Callable[[dict], bool]:
+    """Compile a condition once into a predicate over a context dict.
+
+    String conditions are tokenised and parsed into a tree of closures (field
+    path getter, operator, pre-parsed literal); dict conditions become a
+    single comparison. Results are memoized by condition text (or by field,
+    op and value for dicts), so repeated evaluations skip parsing entirely.
+    """
+    if isinstance(condition, dict):
+        value = condition.get("value")
+        # The value's type is part of the key: True == 1, but not for "in"
+        key = (condition.get("field", ""), condition.get("op", "=="), type(value), value)
         try:
-            if not op_func(actual, expected):
-                return False
-        except (TypeError, ValueError):
-            return False
+            compiled = _COMPILED.get(key)
+        except TypeError:  # unhashable value, e.g. a list
+            key = key[:3] + (repr(value),)
+            compiled = _COMPILED.get(key)
+        if compiled is None:
+            compiled = _comparison(key[0], key[1], value)
+        else:
+            return compiled
+    else:
+        compiled = _COMPILED.get(condition)
+        if compiled is not None:
+            return compiled
+        key = condition
+        compiled = _compile_text(str(condition).strip())
+    if len(_COMPILED) >= _MAX_COMPILED:
+        _COMPILED.clear()
+    _COMPILED[key] = compiled
+    return compiled
 
-    return True
 
+def evaluate_condition(condition: str | dict, context: dict) -> bool:
+    """Evaluate a condition against a context dict.
+
+    Supports two formats:
+    1. String: "outcome == answered AND (sentiment == positive OR quiz_score >= 60)"
+    2. Dict: {"field": "quiz_score", "op": ">=", "value": 60}
+
+    String conditions join comparisons with AND / OR (AND binds tighter) and
+    may group them with parentheses.
+
+    Special string values:
+    - "default" -> always True
+    - empty string -> always True
+
+    NEVER uses eval(). Conditions are parsed once by ``compile_condition``
+    and evaluated with explicit operators.
+    """
+    return compile_condition(condition)(context)
+
+
+def compile_rules(rules: list[dict]) -> list[tuple[Callable[[dict], bool], dict]]:
+    """Pair each branching rule with its compiled condition, for repeated resolution."""
+    return [(compile_condition(rule.get("condition", "default")), rule) for rule in rules]
 
-def resolve_next_step(rules: list[dict], context: dict) -> dict | None:
+
+def resolve_next_step(rules: list, context: dict) -> dict | None:
     """Evaluate branching rules and return the first matching rule.
 
     Each rule dict should have:
@@ -152,11 +315,17 @@ def resolve_next_step(rules: list[dict], context: dict) -> dict | None:
         - "go_to_step": int (optional, which step to jump to)
         - "action": str (optional, e.g., "route_to_playbook")
 
+    ``rules`` may also be the output of ``compile_rules``, which skips the
+    per-call condition lookup.
+
     Returns the first matching rule dict, or None if no rules match.
     """
     for rule in rules:
-        condition = rule.get("condition", "default")
-        if evaluate_condition(condition, context):
+        if isinstance(rule, tuple):
+            predicate, rule = rule
+        else:
+            predicate = compile_condition(rule.get("condition", "default"))
+        if predicate(context):
             return rule
     return None
 
@@ -181,6 +350,7 @@ class PlaybookStepResult:
 def execute_playbook_step(
     step: dict,
     context: dict,
+    compiled_rules: list | None = None,
 ) -> PlaybookStepResult:
     """Execute a single playbook step and determine the next action.
 
@@ -191,6 +361,7 @@ def execute_playbook_step(
     Args:
         step: The playbook step definition dict.
         context: Current execution context (agent data, previous results).
+        compiled_rules: The step's rules from ``compile_rules`` (optional).
 
     Returns:
         PlaybookStepResult with execution details and next-step info.
@@ -199,7 +370,7 @@ def execute_playbook_step(
     step_name = step.get("name", f"Step {step_number}")
     action_type = step.get("action_type", "")
     action_config = step.get("action_config", {})
-    next_step_rules = step.get("next_step_rules", [])
+    next_step_rules = compiled_rules if compiled_rules is not None else step.get("next_step_rules", [])
 
     # Generate the message from config, substituting variables from context
     message = action_config.get("message", "")
@@ -800,36 +971,112 @@ def select_playbook_for_agent(
     Returns:
         The best matching playbook dict, or None if no match.
     """
-    playbooks = get_default_playbooks()
-
     # Infer category from reason code if not provided
     if dormancy_reason and not dormancy_reason_category:
         if "." in dormancy_reason:
             dormancy_reason_category = dormancy_reason.split(".")[0]
 
-    # First pass: match on dormancy_reason_category
-    if dormancy_reason_category:
-        for pb in playbooks:
+    return PLAYBOOK_REGISTRY.select(lifecycle_state, dormancy_reason_category)
+
+
+# ===========================================================================
+# PART 5: Playbook Registry
+# ===========================================================================
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """A playbook step with its successor and branching rules resolved up front."""
+    step: dict
+    step_number: int
+    next_step_number: int | None  # sequential successor (None = last step)
+    delay_days: int
+    rules: list  # compile_rules(step["next_step_rules"])
+
+
+class PlaybookRegistry:
+    """Playbook definitions indexed once for selection and step execution.
+
+    Lookups by name, by (dormancy category, lifecycle state) and by step
+    number are dict hits, and every branching rule is compiled when the
+    registry is built, so a runtime advancing thousands of journeys never
+    re-scans or re-parses the definitions.
+    """
+
+    def __init__(self, playbooks: list[dict]):
+        self.playbooks = tuple(playbooks)
+        self._by_name: dict[str, dict] = {}
+        self._steps: dict[str, dict[int, CompiledStep]] = {}
+        self._first_step: dict[str, int | None] = {}
+        self._by_category: dict[str, list[tuple[str | None, dict]]] = {}
+        self._by_state: dict[str, dict] = {}
+        self._fallback: dict | None = None
+
+        for pb in self.playbooks:
+            key = pb["name"].lower()
+            self._by_name.setdefault(key, pb)
+            numbers = sorted(s.get("step_number", 0) for s in pb.get("steps", []))
+            successors = dict(zip(numbers, numbers[1:] + [None]))
+            self._steps[key] = {
+                s.get("step_number", 0): CompiledStep(
+                    step=s,
+                    step_number=s.get("step_number", 0),
+                    next_step_number=successors[s.get("step_number", 0)],
+                    delay_days=s.get("delay_days", 0),
+                    rules=compile_rules(s.get("next_step_rules", [])),
+                )
+                for s in pb.get("steps", [])
+            }
+            self._first_step[key] = numbers[0] if numbers else None
+
             trigger = pb.get("trigger_conditions", {})
-            if (
-                trigger.get("dormancy_reason_category") == dormancy_reason_category
-                and trigger.get("lifecycle_state", lifecycle_state) == lifecycle_state
-            ):
+            category = trigger.get("dormancy_reason_category")
+            if category:
+                self._by_category.setdefault(category, []).append((trigger.get("lifecycle_state"), pb))
+            elif trigger.get("lifecycle_state"):
+                self._by_state.setdefault(trigger["lifecycle_state"], pb)
+            if self._fallback is None and ("Re-engagement" in pb["name"] or "At-Risk" in pb["name"]):
+                self._fallback = pb
+
+    def get(self, name: str) -> dict | None:
+        """A playbook by name (case-insensitive)."""
+        return self._by_name.get(name.lower())
+
+    def select(self, lifecycle_state: str, dormancy_reason_category: str | None = None) -> dict | None:
+        """Same precedence as select_playbook_for_agent: category, then state, then fallback."""
+        for state, pb in self._by_category.get(dormancy_reason_category or "", ()):
+            if (state or lifecycle_state) == lifecycle_state:
                 return pb
-
-    # Second pass: match on lifecycle_state alone
-    for pb in playbooks:
-        trigger = pb.get("trigger_conditions", {})
-        if (
-            trigger.get("lifecycle_state") == lifecycle_state
-            and "dormancy_reason_category" not in trigger
-        ):
+        pb = self._by_state.get(lifecycle_state)
+        if pb is not None:
             return pb
+        if lifecycle_state in ("dormant", "at_risk"):
+            return self._fallback
+        return None
+
+    def first_step(self, name: str) -> CompiledStep | None:
+        number = self._first_step.get(name.lower())
+        return None if number is None else self._steps[name.lower()][number]
+
+    def step(self, name: str, step_number: int) -> CompiledStep | None:
+        return self._steps.get(name.lower(), {}).get(step_number)
+
+    def next_step(self, name: str, current_step: int, override_next: int | None = None) -> CompiledStep | None:
+        """The step after ``current_step`` (same rules as get_next_step_number)."""
+        steps = self._steps.get(name.lower(), {})
+        if override_next is not None and override_next in steps:
+            return steps[override_next]
+        current = steps.get(current_step)
+        if current is None or current.next_step_number is None:
+            return None
+        return steps[current.next_step_number]
 
-    # Fallback: Dormant Re-engagement
-    if lifecycle_state in ("dormant", "at_risk"):
-        for pb in playbooks:
-            if "Re-engagement" in pb["name"] or "At-Risk" in pb["name"]:
-                return pb
+    def execute(self, name: str, step_number: int, context: dict) -> PlaybookStepResult | None:
+        """execute_playbook_step for a registered step, using its compiled rules."""
+        compiled = self.step(name, step_number)
+        if compiled is None:
+            return None
+        return execute_playbook_step(compiled.step, context, compiled.rules)
 
-    return None
+
+# Built once at import; definitions are shared, so treat them as read-only
+PLAYBOOK_REGISTRY = PlaybookRegistry(get_default_playbooks())
@@ -7,12 +7,135 @@ Simplified for standalone use — works for both WhatsApp and Telegram delivery.
 All templates have Hindi (hi) and English (en) variants with {placeholder}
 variable substitution. Templates cover the full agent engagement lifecycle:
 welcome, follow-up, training, quiz, check-in, re-engagement, escalation.
+
+Each variant is compiled once, when its template is registered, into literal
+and placeholder segments; render_many() renders a whole campaign batch from
+the compiled body without re-parsing it per recipient.
 """
 from __future__ import annotations
 
 import re
 from dataclasses import dataclass, field
-from typing import Optional
+from operator import itemgetter
+from typing import Iterable, Mapping, Optional
+
+
+# ===========================================================================
+# Compiled Template Bodies
+# ===========================================================================
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
+LITERAL = "literal"
+PLACEHOLDER = "placeholder"
+
+
+class _Defaults(dict):
+    """Row copy that answers unfilled placeholders with a default value."""
+    __slots__ = ("default",)
+
+    def __init__(self, row: Mapping, default: str):
+        super().__init__(row)
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+
+def _build_renderer(segments: tuple[tuple[str, str], ...]):
+    """Build ``render(row) -> str`` for a segment list, without eval().
+
+    The literals become a ``%``-format pattern (their own ``%`` escaped)
+    with one ``%s`` per placeholder, and an itemgetter fetches the
+    placeholder values from the row in segment order, so rendering is two
+    C-level calls and the row's values can never be read as format syntax.
+    """
+    pattern = "".join("%s" if kind == PLACEHOLDER else text.replace("%", "%%") for kind, text in segments)
+    keys = [text for kind, text in segments if kind == PLACEHOLDER]
+    if not keys:
+        return lambda row: pattern
+    values = itemgetter(*keys)
+    if len(keys) == 1:
+        return lambda row: pattern % (values(row),)
+    return lambda row: pattern % values(row)
+
+
+class CompiledTemplate:
+    """A template body split once into literal and {placeholder} segments.
+
+    ``segments`` is the parsed body as (LITERAL, text) / (PLACEHOLDER, name)
+    pairs and ``required`` the placeholder names it needs. ``positional``
+    lists them in order of first use, which is how the approved WhatsApp
+    template numbers its parameters ({{1}}, {{2}}, ...). Rendering never
+    re-scans the body: it fills a pattern built once from the segments
+    (see _build_renderer) from the params mapping.
+    """
+    __slots__ = ("body", "segments", "required", "positional", "_render")
+
+    def __init__(self, body: str, source_name: str = "body"):
+        segments: list[tuple[str, str]] = []
+        pos = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(body):
+            if match.start() > pos:
+                segments.append((LITERAL, body[pos:match.start()]))
+            name = match.group(1)
+            if not name.isidentifier():
+                raise ValueError(f"Invalid placeholder '{{{name}}}' in {source_name}: names must be identifiers")
+            segments.append((PLACEHOLDER, name))
+            pos = match.end()
+        if pos < len(body):
+            segments.append((LITERAL, body[pos:]))
+
+        self.body = body
+        self.segments = tuple(segments)
+        self.required = frozenset(text for kind, text in segments if kind == PLACEHOLDER)
+        self.positional = tuple(dict.fromkeys(text for kind, text in segments if kind == PLACEHOLDER))
+        self._render = _build_renderer(self.segments)
+
+    def render(self, params: Optional[Mapping] = None, default: Optional[str] = None) -> str:
+        """Fill placeholders from ``params``.
+
+        Missing params are replaced by ``default``, or left as {name} when
+        ``default`` is None.
+        """
+        if not self.required:
+            return self.body
+        params = params or {}
+        if params.keys() >= self.required:
+            return self._render(params)
+        missing = self.required - params.keys()
+        filler = dict.fromkeys(missing, default) if default is not None else {k: f"{{{k}}}" for k in missing}
+        return self._render({**params, **filler})
+
+    def render_many(self, rows: Iterable[Mapping], default: Optional[str] = None) -> list[str]:
+        """Render one message per row.
+
+        With ``default`` None every row must supply all required params
+        (ValueError names the first row that does not); otherwise missing
+        params are replaced by ``default``.
+        """
+        if not isinstance(rows, (list, tuple)):
+            rows = list(rows)
+        if not self.required:
+            return [self.body] * len(rows)
+        render = self._render
+        try:
+            return [render(row) for row in rows]
+        except KeyError:
+            pass  # some row lacks a param: redo the batch row by row
+
+        required = self.required
+        out: list[str] = []
+        append = out.append
+        for i, row in enumerate(rows):
+            if row.keys() >= required:
+                append(render(row))
+            elif default is None:
+                missing = ", ".join(sorted(required - row.keys()))
+                raise ValueError(f"Row {i} is missing template params: {missing}")
+            else:
+                append(render(_Defaults(row, default)))
+        return out
 
 
 # ===========================================================================
@@ -21,12 +144,32 @@ from typing import Optional
 
 @dataclass
 class TemplateDefinition:
-    """A single message template with language variants."""
+    """A single message template with language variants.
+
+    Variants are compiled when the definition is created; every variant
+    must use the same placeholders, so a row valid for one language is
+    valid for all of them.
+    """
     name: str
     category: str  # UTILITY | MARKETING | NOTIFICATION
     variants: dict[str, str]  # lang_code -> template body with {placeholders}
     buttons: list[str] = field(default_factory=list)
     description: str = ""
+    compiled: dict[str, CompiledTemplate] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.compiled = {
+            lang: CompiledTemplate(body, f"{self.name}/{lang}") for lang, body in self.variants.items()
+        }
+        param_sets = {c.required for c in self.compiled.values()}
+        if len(param_sets) > 1:
+            by_lang = {lang: sorted(c.required) for lang, c in self.compiled.items()}
+            raise ValueError(f"Template '{self.name}' variants use different placeholders: {by_lang}")
+
+    @property
+    def params(self) -> frozenset[str]:
+        """Placeholder names every render of this template needs."""
+        return next(iter(self.compiled.values())).required if self.compiled else frozenset()
 
 
 # Global template registry
@@ -460,6 +603,26 @@ _register(TemplateDefinition(
 # Template Rendering
 # ===========================================================================
 
+def language_code(language: str | None) -> str:
+    """Map an agent's preferred language ("Hindi", "English", "en", ...) to a variant code."""
+    return "en" if (language or "").lower().startswith("en") else "hi"
+
+
+def get_compiled_template(template_name: str, language: str = "hi") -> CompiledTemplate | None:
+    """Return the compiled body for a template and language.
+
+    Falls back to Hindi if the requested language is unavailable; returns
+    None if the template (or a Hindi fallback) does not exist.
+    """
+    template = TEMPLATES.get(template_name)
+    if not template:
+        return None
+    compiled = template.compiled.get(language)
+    if compiled is None:
+        compiled = template.compiled.get("hi")
+    return compiled
+
+
 def render_template(
     template_name: str,
     language: str = "hi",
@@ -476,22 +639,10 @@ def render_template(
         Rendered message string, or None if template not found.
         Unknown placeholders are left as-is.
     """
-    template = TEMPLATES.get(template_name)
-    if not template:
-        return None
-
-    body = template.variants.get(language)
-    if body is None:
-        # Fall back to Hindi if requested language unavailable
-        body = template.variants.get("hi")
-    if body is None:
+    compiled = get_compiled_template(template_name, language)
+    if compiled is None:
         return None
-
-    if params:
-        for key, value in params.items():
-            body = body.replace(f"{{{key}}}", str(value))
-
-    return body
+    return compiled.render(params)
 
 
 def render_template_safe(
@@ -514,13 +665,48 @@ def render_template_safe(
     Returns:
         Rendered string (never None).
     """
-    result = render_template(template_name, language, params)
-    if result is None:
+    compiled = get_compiled_template(template_name, language)
+    if compiled is None:
         return f"[Template '{template_name}' not found]"
+    return compiled.render(params, default_value or "___")
 
-    # Replace any remaining {placeholders} with default
-    result = re.sub(r"\{(\w+)\}", default_value or "___", result)
-    return result
+
+def render_many(
+    template_name: str,
+    language: str,
+    rows: Iterable[Mapping],
+    default_value: str | None = None,
+) -> list[str]:
+    """Render one template for a whole batch of recipients.
+
+    The template is looked up and its params checked once per batch, then
+    each row fills the precompiled body in one step — no per-row
+    parsing or intermediate strings. Rows are any mappings holding the
+    placeholder values (e.g. SQLAlchemy ``row._mapping``).
+
+    Args:
+        template_name: Name of the template.
+        language: Language code (falls back to Hindi).
+        rows: One params mapping per message.
+        default_value: Replacement for params a row does not supply. When
+            None (the default), such a row raises ValueError instead.
+
+    Returns:
+        Rendered messages, in the same order as ``rows``.
+
+    Raises:
+        ValueError: Unknown template, or a row missing required params.
+    """
+    compiled = get_compiled_template(template_name, language)
+    if compiled is None:
+        raise ValueError(f"Template '{template_name}' not found")
+    return compiled.render_many(rows, default_value)
+
+
+def required_params(template_name: str) -> frozenset[str]:
+    """Placeholder names a template needs (empty if it does not exist)."""
+    template = TEMPLATES.get(template_name)
+    return template.params if template else frozenset()
 
 
 def get_template_buttons(template_name: str) -> list[str]:
@@ -619,11 +805,75 @@ _INTENT_PATTERNS = {
 }
 
 
+# Checked in this order — STOP first; the first intent that matches wins
+_INTENT_PRIORITY = (
+    Intent.STOP,
+    Intent.COMMISSION_QUESTION,
+    Intent.COMPLAINT,
+    Intent.PRODUCT_QUESTION,
+    Intent.TRAINING_REQUEST,
+    Intent.ADM_REQUEST,
+    Intent.POSITIVE_CONFIRMATION,
+    Intent.NEGATIVE_CONFIRMATION,
+    Intent.GREETING,
+)
+
+_WORD_PATTERN = re.compile(r"\w+")
+# ASCII text is lowercased and split on non-word bytes with one translate
+_ASCII_FOLD = bytes(
+    c if c >= 128 else ord(chr(c).lower()) if chr(c).isalnum() or chr(c) == "_" else ord(" ")
+    for c in range(256)
+)
+
+
+def _compile_intent_matcher() -> tuple[dict, dict, list]:
+    """Split the intent patterns into word and phrase lookup tables.
+
+    Every pattern is a word-bounded alternation, ``\\b(a|b c|...)\\b``. Single
+    words go into one dict and two-word phrases into another, each mapped
+    to the rank of the highest-priority intent using it (keys are lowercase
+    bytes, as produced by ``_fold_words``). A phrase is confirmed with its
+    own regex, since only whitespace may separate the words. Alternatives
+    that are not plain words (``opt.?out``) are kept as regexes.
+    """
+    words: dict[bytes, int] = {}
+    phrases: dict[tuple[bytes, bytes], tuple[int, re.Pattern]] = {}
+    irregular: list[tuple[int, bytes, re.Pattern]] = []
+    for rank, intent in enumerate(_INTENT_PRIORITY):
+        source = _INTENT_PATTERNS[intent].pattern
+        if not (source.startswith(r"\b(") and source.endswith(r")\b")):
+            raise ValueError(f"Intent pattern for {intent} must be a word-bounded alternation")
+        for alternative in source[3:-3].split("|"):
+            parts = [part.lower().encode() for part in alternative.split(r"\s+")]
+            exact = re.compile(rf"\b(?:{alternative})\b", re.IGNORECASE)
+            if not all(_WORD_PATTERN.fullmatch(part.decode()) for part in parts) or len(parts) > 2:
+                prefix = _WORD_PATTERN.match(alternative)
+                irregular.append((rank, prefix.group().lower().encode() if prefix else b"", exact))
+            elif len(parts) == 1:
+                words.setdefault(parts[0], rank)
+            elif tuple(parts) not in phrases:
+                phrases[tuple(parts)] = (rank, exact)
+    return words, phrases, irregular
+
+
+_INTENT_WORDS, _INTENT_PHRASES, _INTENT_IRREGULAR = _compile_intent_matcher()
+_INTENT_WORD_SET = frozenset(_INTENT_WORDS)
+
+
+def _fold_words(text: str) -> bytes:
+    """The words of ``text``, lowercased and space-separated, as bytes."""
+    if text.isascii():
+        return text.encode().translate(_ASCII_FOLD)
+    return " ".join(_WORD_PATTERN.findall(text.lower())).encode()
+
+
 def classify_intent(text: str) -> str:
     """Classify the intent of an incoming text message.
 
-    Checks patterns in priority order (STOP highest).
-    Works for both WhatsApp and Telegram messages.
+    Checks patterns in priority order (STOP highest). The text is
+    tokenised once and its words intersected with the compiled tables,
+    instead of running one regex per intent. Works for both WhatsApp and Telegram
+    messages.
 
     Args:
         text: The message text to classify.
@@ -635,25 +885,19 @@ def classify_intent(text: str) -> str:
     if not text:
         return Intent.UNKNOWN
 
-    # Priority order — STOP first
-    priority_order = [
-        Intent.STOP,
-        Intent.COMMISSION_QUESTION,
-        Intent.COMPLAINT,
-        Intent.PRODUCT_QUESTION,
-        Intent.TRAINING_REQUEST,
-        Intent.ADM_REQUEST,
-        Intent.POSITIVE_CONFIRMATION,
-        Intent.NEGATIVE_CONFIRMATION,
-        Intent.GREETING,
-    ]
-
-    for intent_key in priority_order:
-        pattern = _INTENT_PATTERNS.get(intent_key)
-        if pattern and pattern.search(text):
-            return intent_key
+    folded = _fold_words(text)
+    words = set(folded.split())
+    best = min([_INTENT_WORDS[w] for w in words & _INTENT_WORD_SET], default=len(_INTENT_PRIORITY))
+    if best == 0:
+        return Intent.STOP
 
-    return Intent.UNKNOWN
+    for (first, second), (rank, exact) in _INTENT_PHRASES.items():
+        if rank < best and first in words and second in words and exact.search(text):
+            best = rank
+    for rank, prefix, exact in _INTENT_IRREGULAR:
+        if rank < best and prefix in folded and exact.search(text):
+            best = rank
+    return _INTENT_PRIORITY[best] if best < len(_INTENT_PRIORITY) else Intent.UNKNOWN
 
 
 def get_bot_response(
@@ -661,6 +905,7 @@ def get_bot_response(
     agent_name: str = "",
     adm_name: str = "",
     language: str = "hi",
+    intent: str | None = None,
 ) -> dict:
     """Get a bot response for an incoming message.
 
@@ -672,11 +917,13 @@ def get_bot_response(
         agent_name: Agent's name for personalization.
         adm_name: ADM's name for referrals.
         language: Preferred language for response.
+        intent: The message's intent, if the caller already classified it.
 
     Returns:
         Dict with response details.
     """
-    intent = classify_intent(text)
+    if intent is None:
+        intent = classify_intent(text)
 
     if intent == Intent.STOP:
         return {
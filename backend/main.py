@@ -6,10 +6,12 @@ Provides REST APIs for managing dormant agent activation through
 ADMs (Agency Development Managers).
 """
 
+import asyncio
 import logging
 import sys
 import threading
 from contextlib import asynccontextmanager
+from typing import Callable, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -147,6 +149,60 @@ def _ensure_key_users(db):
         logger.info("Created missing ADM user: Rohit Sadhu (rohit/rohit123)")
 
 
+def _init_pattern_counters():
+    """Backfill aggregation-pattern counters on first run and drop expired days."""
+    from services.pattern_detector import pattern_detector
+
+    db = SessionLocal()
+    try:
+        pattern_detector.backfill_if_empty(db)
+        pattern_detector.prune(db)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Pattern counter init skipped: {e}")
+    finally:
+        db.close()
+
+
+def _init_ticket_ids():
+    """Create the ticket number sequences up front (PostgreSQL), off the request path."""
+    from services.ticket_ids import ticket_id_allocator
+
+    db = SessionLocal()
+    try:
+        ticket_id_allocator.prepare(db)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Ticket ID sequence setup skipped: {e}")
+    finally:
+        db.close()
+
+
+def _init_ticket_rollups():
+    """Catch the ticket analytics rollups up to yesterday before the daily job takes over."""
+    from services.ticket_analytics import refresh_rollups
+
+    try:
+        refresh_rollups()
+    except Exception as e:
+        logger.warning(f"Ticket rollup catch-up skipped: {e}")
+
+
+def _init_engagement():
+    """Backfill engagement counters from existing activity on first run."""
+    from services.engagement import engagement_engine
+
+    db = SessionLocal()
+    try:
+        stats = engagement_engine.rebuild_if_empty(db)
+        if stats:
+            logger.info(f"Engagement counters backfilled: {stats}")
+    except Exception as e:
+        logger.warning(f"Engagement backfill skipped: {e}")
+    finally:
+        db.close()
+
+
 def _background_db_init():
     """Run DB initialization and seeding in a background thread.
 
@@ -161,6 +217,11 @@ def _background_db_init():
         logger.info("Background DB init: checking seed data...")
         run_seed_if_empty()
 
+        _init_pattern_counters()
+        _init_ticket_ids()
+        _init_ticket_rollups()
+        _init_engagement()
+
         logger.info("Background DB init: complete!")
     except Exception as e:
         logger.error(f"Background DB init failed: {e}")
@@ -168,6 +229,41 @@ def _background_db_init():
         _db_ready.set()
 
 
+def _background_services() -> list[tuple[Callable, Optional[Callable]]]:
+    """(start, stop) for each enabled background service.
+
+    ``start`` may be a coroutine function (a job that runs until cancelled);
+    ``stop`` is awaited on shutdown, when the service has one.
+    """
+    from services.agent_signals import agent_signals
+    from services.campaigns import campaign_engine
+    from services.inbound_router import inbound_router
+    from services.lifecycle_sweep import run_nightly
+    from services.playbook_runtime import playbook_runtime
+    from services.sla_monitor import sla_monitor
+    from services.ticket_analytics import run_daily
+
+    services = [
+        (settings.SLA_MONITOR_ENABLED, sla_monitor.start, sla_monitor.stop),
+        (settings.SIGNAL_CONSUMER_ENABLED, agent_signals.start, agent_signals.stop),
+        (settings.PLAYBOOK_RUNTIME_ENABLED, playbook_runtime.start, playbook_runtime.stop),
+        (settings.CAMPAIGN_RUNNER_ENABLED, campaign_engine.start, campaign_engine.stop),
+        (settings.INBOUND_ROUTER_ENABLED, inbound_router.start, inbound_router.stop),
+        (settings.LIFECYCLE_SWEEP_ENABLED, run_nightly, None),  # nightly AT_RISK / DORMANT sweep
+        (settings.ANALYTICS_ROLLUP_JOB_ENABLED, run_daily, None),  # daily ticket analytics rollup
+    ]
+    return [(start, stop) for enabled, start, stop in services if enabled]
+
+
+async def _after_db_ready(start_fn: Callable) -> None:
+    """Start a background service once the background DB init has finished."""
+    await asyncio.get_running_loop().run_in_executor(None, _db_ready.wait)
+    if asyncio.iscoroutinefunction(start_fn):
+        await start_fn()
+    else:
+        start_fn()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application startup and shutdown lifecycle."""
@@ -178,10 +274,17 @@ async def lifespan(app: FastAPI):
     logger.info(f"  Database: {db_type}")
     logger.info("=" * 60)
 
+    # Recommendations depend only on domain rules, not on the database
+    from services.recommendations import recommendation_table
+    recommendation_table.build()
+
     # Run DB init in background so healthcheck responds immediately
     db_thread = threading.Thread(target=_background_db_init, daemon=True)
     db_thread.start()
 
+    services = _background_services()
+    tasks = [asyncio.create_task(_after_db_ready(start)) for start, _ in services]
+
     logger.info("Application accepting requests (DB init running in background).")
     logger.info(f"API docs available at: http://localhost:8000/docs")
     logger.info("=" * 60)
@@ -190,6 +293,10 @@ async def lifespan(app: FastAPI):
 
     # --- Shutdown ---
     logger.info("Application shutting down...")
+    for task, (_, stop) in zip(tasks, services):
+        task.cancel()
+        if stop:
+            await stop()
 
 
 # ---------------------------------------------------------------------------
@@ -238,6 +345,11 @@ from routes import (
     playbooks_router,
     communication_router,
     feedback_tickets_router,
+    exports_router,
+    signals_router,
+    campaigns_router,
+    webhooks_router,
+    engagement_router,
 )
 
 API_PREFIX = "/api/v1"
@@ -259,6 +371,11 @@ all_routers = [
     playbooks_router,
     communication_router,
     feedback_tickets_router,
+    exports_router,
+    signals_router,
+    campaigns_router,
+    webhooks_router,
+    engagement_router,
 ]
 
 # Mount all routers under /api/v1 (primary)
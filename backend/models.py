@@ -6,7 +6,7 @@ import json
 from datetime import datetime, date, time
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, Text, Date, Time,
-    DateTime, ForeignKey, Enum as SAEnum, JSON,
+    DateTime, ForeignKey, Enum as SAEnum, JSON, LargeBinary, UniqueConstraint, Index, text,
 )
 from sqlalchemy.orm import relationship
 from database import Base
@@ -17,6 +17,10 @@ from database import Base
 # ---------------------------------------------------------------------------
 class Agent(Base):
     __tablename__ = "agents"
+    __table_args__ = (
+        # ADM portfolio filtered by lifecycle state (leaderboard, priority lists, briefings)
+        Index("ix_agents_adm_lifecycle", "assigned_adm_id", "lifecycle_state"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(200), nullable=False)
@@ -39,6 +43,7 @@ class Agent(Base):
 
     assigned_adm_id = Column(Integer, ForeignKey("adms.id"), nullable=True, index=True)
     engagement_score = Column(Float, default=0.0)  # 0-100
+    whatsapp_opted_out_at = Column(DateTime, nullable=True)  # replied STOP; no business-initiated WhatsApp
 
     license_number = Column(String(50), nullable=True)
     date_of_joining = Column(Date, nullable=True)
@@ -58,6 +63,139 @@ class Agent(Base):
     diary_entries = relationship("DiaryEntry", back_populates="agent")
 
 
+# ---------------------------------------------------------------------------
+# Agent Lifecycle Transition (audit log of automatic state changes)
+# ---------------------------------------------------------------------------
+class AgentLifecycleTransition(Base):
+    __tablename__ = "agent_lifecycle_transitions"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False, index=True)
+    from_state = Column(String(30), nullable=True)
+    to_state = Column(String(30), nullable=False)
+    source = Column(String(30), nullable=False)  # sweep | signal | manual
+    reason = Column(String(300), nullable=True)  # e.g. "inactive 94 days"
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# ---------------------------------------------------------------------------
+# Agent Signal (append-only lifecycle event log; agent state is its projection)
+# ---------------------------------------------------------------------------
+class AgentSignal(Base):
+    __tablename__ = "agent_signals"
+    __table_args__ = (
+        # Per-agent replay in log order
+        Index("ix_agent_signals_agent_id_id", "agent_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    signal_type = Column(String(50), nullable=False)  # domain.enums.SignalType
+    source = Column(String(30), nullable=False)  # interaction | quiz | policy_sale | onboarding | whatsapp | manual | sweep | baseline | api
+    payload = Column(Text, nullable=True)  # JSON
+    idempotency_key = Column(String(120), nullable=True, unique=True)
+    occurred_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True, index=True)  # NULL = waiting for the consumer
+
+
+# ---------------------------------------------------------------------------
+# Agent Engagement (decayed activity counters behind Agent.engagement_score)
+# ---------------------------------------------------------------------------
+class AgentEngagement(Base):
+    __tablename__ = "agent_engagement"
+
+    agent_id = Column(Integer, ForeignKey("agents.id"), primary_key=True)
+
+    # Exponentially decayed sums, valued at as_of (see domain.engagement)
+    contacts = Column(Float, nullable=False, default=0.0)
+    connected = Column(Float, nullable=False, default=0.0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_n = Column(Float, nullable=False, default=0.0)
+    quiz_sum = Column(Float, nullable=False, default=0.0)
+    quiz_n = Column(Float, nullable=False, default=0.0)
+    tickets = Column(Float, nullable=False, default=0.0)
+    as_of = Column(DateTime, nullable=False)
+
+    last_active_at = Column(DateTime, nullable=True)  # last event where the agent engaged
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Playbook Run (one agent's journey through a playbook)
+# ---------------------------------------------------------------------------
+class PlaybookRun(Base):
+    __tablename__ = "playbook_runs"
+    __table_args__ = (
+        # Scheduler: active runs whose next step is due
+        Index("ix_playbook_runs_status_due", "status", "next_due_at"),
+        # At most one active run per agent, whatever start_run / enroll race
+        Index(
+            "uq_playbook_runs_agent_active", "agent_id", unique=True,
+            postgresql_where=text("status = 'active'"), sqlite_where=text("status = 'active'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False, index=True)
+    playbook_name = Column(String(100), nullable=False)
+    current_step = Column(Integer, nullable=False)  # step to execute when due
+    status = Column(String(20), default="active")  # active | completed | succeeded | expired | failed | cancelled
+    next_due_at = Column(DateTime, nullable=True)
+    context = Column(Text, nullable=True)  # JSON: agent responses used by branching rules
+    attempts = Column(Integer, default=0)  # failed sends of the current step
+    last_error = Column(String(300), nullable=True)
+    claimed_until = Column(DateTime, nullable=True)  # scheduler lease
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+
+# ---------------------------------------------------------------------------
+# Campaign (one template sent to a segment of agents)
+# ---------------------------------------------------------------------------
+class Campaign(Base):
+    __tablename__ = "campaigns"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    name = Column(String(200), nullable=False)
+    template_name = Column(String(100), nullable=False)
+    channel = Column(String(20), default="whatsapp")  # whatsapp (agent phone) | telegram (ADM chat)
+    language = Column(String(10), nullable=True)  # hi | en; NULL = each agent's preferred language
+    segment = Column(Text, nullable=True)  # JSON filter, see services.campaigns.segment_filters
+    params = Column(Text, nullable=True)  # JSON: fixed template params shared by all recipients
+    status = Column(String(20), default="draft", index=True)  # draft | running | paused | completed | cancelled
+    total_recipients = Column(Integer, default=0)
+    sent_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    skipped_count = Column(Integer, default=0)
+    send_seconds = Column(Float, default=0.0)  # time spent waiting on the channel APIs
+    overhead_seconds = Column(Float, default=0.0)  # time spent querying, rendering and writing state
+    last_error = Column(String(300), nullable=True)
+    claimed_until = Column(DateTime, nullable=True)  # runner lease
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class CampaignRecipient(Base):
+    __tablename__ = "campaign_recipients"
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "agent_id", name="uq_campaign_recipient"),
+        # Runner: a campaign's pending recipients in id order
+        Index("ix_campaign_recipients_campaign_status_id", "campaign_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    status = Column(String(20), default="pending")  # pending | sent | failed | skipped
+    attempts = Column(Integer, default=0)
+    error = Column(String(300), nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+
 # ---------------------------------------------------------------------------
 # ADM (Agency Development Manager)
 # ---------------------------------------------------------------------------
@@ -75,7 +213,7 @@ class ADM(Base):
     max_capacity = Column(Integer, default=50)
     performance_score = Column(Float, default=0.0)  # 0-100
 
-    telegram_chat_id = Column(String(50), nullable=True)
+    telegram_chat_id = Column(String(50), nullable=True, index=True)
     whatsapp_number = Column(String(20), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -95,6 +233,10 @@ class ADM(Base):
 # ---------------------------------------------------------------------------
 class Interaction(Base):
     __tablename__ = "interactions"
+    __table_args__ = (
+        # Pending / overdue follow-ups per ADM (briefings, stats, priority agents)
+        Index("ix_interactions_adm_followup", "adm_id", "follow_up_status", "follow_up_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False, index=True)
@@ -253,6 +395,36 @@ class User(Base):
     adm = relationship("ADM")
 
 
+# ---------------------------------------------------------------------------
+# Ticket Daily Rollup (resolution stats per resolution day × bucket × priority)
+# ---------------------------------------------------------------------------
+class TicketDailyRollup(Base):
+    __tablename__ = "ticket_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "bucket", "priority", name="uq_ticket_rollup_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)  # date of department response
+    bucket = Column(String(30), nullable=False)
+    priority = Column(String(20), nullable=False)
+    responded_count = Column(Integer, default=0)
+    sla_met_count = Column(Integer, default=0)
+    resolution_hours_sum = Column(Float, default=0.0)
+    resolution_histogram = Column(Text, nullable=True)  # JSON counts per HOUR_BINS bin
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Ticket ID Counter (per-year feedback ticket numbers where sequences aren't available)
+# ---------------------------------------------------------------------------
+class TicketIdCounter(Base):
+    __tablename__ = "ticket_id_counters"
+
+    scope = Column(String(50), primary_key=True)  # e.g. "feedback_ticket:2026"
+    next_value = Column(Integer, nullable=False, default=1)
+
+
 # ---------------------------------------------------------------------------
 # Product
 # ---------------------------------------------------------------------------
@@ -281,6 +453,15 @@ class ReasonTaxonomy(Base):
 # ---------------------------------------------------------------------------
 class FeedbackTicket(Base):
     __tablename__ = "feedback_tickets"
+    __table_args__ = (
+        # SLA monitor: open tickets by deadline
+        Index("ix_feedback_tickets_status_sla_deadline", "status", "sla_deadline"),
+        # Duplicate-ticket check on submit: open ticket for agent + ADM + bucket
+        Index(
+            "ix_feedback_tickets_dedup",
+            "agent_id", "adm_id", "bucket", "status", "created_at",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     ticket_id = Column(String(20), nullable=False, unique=True, index=True)  # FB-YYYY-NNNNN
@@ -320,7 +501,7 @@ class FeedbackTicket(Base):
     # Department response
     department_response_text = Column(Text, nullable=True)
     department_responded_by = Column(String(200), nullable=True)
-    department_responded_at = Column(DateTime, nullable=True)
+    department_responded_at = Column(DateTime, nullable=True, index=True)
 
     # AI-generated script
     generated_script = Column(Text, nullable=True)
@@ -353,6 +534,10 @@ class FeedbackTicket(Base):
 # ---------------------------------------------------------------------------
 class TicketMessage(Base):
     __tablename__ = "ticket_messages"
+    __table_args__ = (
+        # Conversation thread in order
+        Index("ix_ticket_messages_ticket_created", "ticket_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     ticket_id = Column(Integer, ForeignKey("feedback_tickets.id"), nullable=False, index=True)
@@ -378,6 +563,10 @@ class TicketMessage(Base):
 # ---------------------------------------------------------------------------
 class DepartmentQueue(Base):
     __tablename__ = "department_queue"
+    __table_args__ = (
+        # Department queue listing: filter by department/status, newest first
+        Index("ix_department_queue_dept_status_created", "department", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     department = Column(String(30), nullable=False, index=True)  # underwriting | finance | contest | operations | product
@@ -415,6 +604,25 @@ class AggregationAlert(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# ---------------------------------------------------------------------------
+# Pattern Counter (daily feedback-ticket counters for aggregation alerts)
+# ---------------------------------------------------------------------------
+class PatternCounter(Base):
+    __tablename__ = "pattern_counters"
+    __table_args__ = (
+        UniqueConstraint("pattern_type", "pattern_key", "day", name="uq_pattern_counter_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    pattern_type = Column(String(30), nullable=False)  # reason | bucket | district
+    pattern_key = Column(String(200), nullable=False)  # reason code | bucket | ADM region
+    day = Column(Date, nullable=False)
+    ticket_count = Column(Integer, default=0)
+    agents_hll = Column(LargeBinary, nullable=True)  # HyperLogLog registers of agent ids
+    adms_hll = Column(LargeBinary, nullable=True)  # HyperLogLog registers of ADM ids
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # ---------------------------------------------------------------------------
 # Product
 # ---------------------------------------------------------------------------
@@ -19,6 +19,11 @@ from routes.onboarding import router as onboarding_router
 from routes.playbooks import router as playbooks_router
 from routes.communication import router as communication_router
 from routes.feedback_tickets import router as feedback_tickets_router
+from routes.exports import router as exports_router
+from routes.signals import router as signals_router
+from routes.campaigns import router as campaigns_router
+from routes.inbound import router as webhooks_router
+from routes.engagement import router as engagement_router
 
 __all__ = [
     "agents_router",
@@ -37,4 +42,9 @@ __all__ = [
     "playbooks_router",
     "communication_router",
     "feedback_tickets_router",
+    "exports_router",
+    "signals_router",
+    "campaigns_router",
+    "webhooks_router",
+    "engagement_router",
 ]
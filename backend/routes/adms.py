@@ -4,12 +4,14 @@ ADM (Agency Development Manager) CRUD routes.
 
 from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from database import get_db
 from models import ADM, Agent, Interaction, Feedback
+from services.bulk_import import adm_importer, detect_format
+from services.recommendations import recommendation_table
 from schemas import ADMCreate, ADMUpdate, ADMResponse, ADMPerformance, ADMBulkImport, AgentResponse
 
 router = APIRouter(prefix="/adms", tags=["ADMs"])
@@ -38,35 +40,30 @@ def list_adms(
 
 @router.post("/bulk-import")
 def bulk_import_adms(data: ADMBulkImport, db: Session = Depends(get_db)):
-    """Bulk import ADMs."""
-    created = []
-    errors = []
-
-    for i, adm_data in enumerate(data.adms):
-        try:
-            existing = db.query(ADM).filter(ADM.phone == adm_data.phone).first()
-            if existing:
-                errors.append({"index": i, "phone": adm_data.phone, "error": "Duplicate phone"})
-                continue
-
-            adm = ADM(**adm_data.model_dump())
-            db.add(adm)
-            db.flush()
-            created.append({"index": i, "id": adm.id, "name": adm.name})
-        except Exception as e:
-            errors.append({"index": i, "error": str(e)})
-
-    db.commit()
-
+    """Bulk import ADMs (JSON). Dedupes with one query per chunk and inserts in batches."""
+    created, report = adm_importer.import_models(db, data.adms)
     return {
         "total_submitted": len(data.adms),
         "created": len(created),
-        "errors_count": len(errors),
+        "errors_count": report["errors_count"],
         "created_adms": created,
-        "errors": errors,
+        "errors": report["errors"],
     }
 
 
+@router.post("/bulk-import/stream")
+async def bulk_import_adms_stream(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv | ndjson (default: from Content-Type, else csv)"),
+):
+    """Stream-import ADMs from a CSV (header row) or NDJSON request body.
+
+    Rows are validated, deduped against existing phones and committed in
+    chunks; the response reports per-row errors (first 1000) and totals.
+    """
+    return await adm_importer.import_stream(request, detect_format(request, format))
+
+
 @router.get("/{adm_id}", response_model=ADMResponse)
 def get_adm(adm_id: int, db: Session = Depends(get_db)):
     """Get a single ADM by ID."""
@@ -206,3 +203,16 @@ def get_adm_agents(
         query = query.filter(Agent.lifecycle_state == lifecycle_state)
 
     return query.order_by(Agent.engagement_score.desc()).all()
+
+
+@router.get("/{adm_id}/recommendations")
+def get_adm_recommendations(
+    adm_id: int,
+    lifecycle_state: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Recommended next action for every agent in an ADM's portfolio, in one call."""
+    adm = db.query(ADM).filter(ADM.id == adm_id).first()
+    if not adm:
+        raise HTTPException(status_code=404, detail="ADM not found")
+    return recommendation_table.for_portfolio(db, adm_id, lifecycle_state)
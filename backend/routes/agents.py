@@ -4,12 +4,16 @@ Agent CRUD routes.
 
 from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from database import get_db
 from models import Agent, ADM
+from services.agent_signals import agent_signals, state_change_signal
+from services.bulk_import import agent_importer, detect_format
+from services.pagination import count_total, keyset_page, set_page_headers
+from services.recommendations import recommendation_table
 from schemas import AgentCreate, AgentUpdate, AgentResponse, AgentBulkImport
 
 router = APIRouter(prefix="/agents", tags=["Agents"])
@@ -17,16 +21,23 @@ router = APIRouter(prefix="/agents", tags=["Agents"])
 
 @router.get("/", response_model=List[AgentResponse])
 def list_agents(
+    response: Response,
     lifecycle_state: Optional[str] = Query(None, description="Filter by lifecycle state"),
     location: Optional[str] = Query(None, description="Filter by location (city)"),
     assigned_adm_id: Optional[int] = Query(None, description="Filter by assigned ADM"),
     unassigned: Optional[bool] = Query(None, description="Show only unassigned agents"),
     search: Optional[str] = Query(None, description="Search by name or phone"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    include_total: bool = Query(False, description="Return X-Total-Count"),
+    estimate_total: bool = Query(False, description="Estimated X-Total-Count (PostgreSQL)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
 ):
-    """List agents with optional filters."""
+    """List agents with optional filters.
+
+    Pass the X-Next-Cursor response header back as ``cursor`` for the next page.
+    """
     query = db.query(Agent)
 
     if lifecycle_state:
@@ -42,10 +53,12 @@ def list_agents(
             (Agent.name.ilike(f"%{search}%")) | (Agent.phone.ilike(f"%{search}%"))
         )
 
-    total = query.count()
-    agents = query.order_by(Agent.dormancy_duration_days.desc()).offset(skip).limit(limit).all()
-
-    return agents
+    total = count_total(query, include_total, estimate_total)
+    page = keyset_page(
+        query, func.coalesce(Agent.dormancy_duration_days, 0), Agent.id, limit, cursor, skip
+    )
+    set_page_headers(response, page, total)
+    return page.items
 
 
 @router.get("/count")
@@ -80,6 +93,15 @@ def get_agent(agent_id: int, db: Session = Depends(get_db)):
     return agent
 
 
+@router.get("/{agent_id}/recommendation")
+def get_agent_recommendation(agent_id: int, db: Session = Depends(get_db)):
+    """Recommended next action for an agent, with the one-line system recommendation."""
+    recommendation = recommendation_table.for_agent(db, agent_id)
+    if recommendation is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return recommendation
+
+
 @router.post("/", response_model=AgentResponse, status_code=201)
 def create_agent(agent_data: AgentCreate, db: Session = Depends(get_db)):
     """Create a new agent."""
@@ -109,8 +131,11 @@ def update_agent(agent_id: int, agent_data: AgentUpdate, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="Agent not found")
 
     update_dict = agent_data.model_dump(exclude_unset=True)
+    new_state = update_dict.pop("lifecycle_state", None)
     for key, value in update_dict.items():
         setattr(agent, key, value)
+    if new_state and new_state != agent.lifecycle_state:
+        agent_signals.append(db, [state_change_signal(agent.id, new_state, "manual")], process=True)
 
     agent.updated_at = datetime.utcnow()
     db.commit()
@@ -185,7 +210,7 @@ def transition_state(
         raise HTTPException(status_code=404, detail="Agent not found")
 
     old_state = agent.lifecycle_state
-    agent.lifecycle_state = new_state
+    agent_signals.append(db, [state_change_signal(agent.id, new_state, "manual")], process=True)
     agent.updated_at = datetime.utcnow()
 
     if new_state == "contacted":
@@ -204,30 +229,25 @@ def transition_state(
 
 @router.post("/bulk-import")
 def bulk_import_agents(data: AgentBulkImport, db: Session = Depends(get_db)):
-    """Bulk import agents."""
-    created = []
-    errors = []
-
-    for i, agent_data in enumerate(data.agents):
-        try:
-            existing = db.query(Agent).filter(Agent.phone == agent_data.phone).first()
-            if existing:
-                errors.append({"index": i, "phone": agent_data.phone, "error": "Duplicate phone"})
-                continue
-
-            agent = Agent(**agent_data.model_dump())
-            db.add(agent)
-            db.flush()
-            created.append({"index": i, "id": agent.id, "name": agent.name})
-        except Exception as e:
-            errors.append({"index": i, "error": str(e)})
-
-    db.commit()
-
+    """Bulk import agents (JSON). Dedupes with one query per chunk and inserts in batches."""
+    created, report = agent_importer.import_models(db, data.agents)
     return {
         "total_submitted": len(data.agents),
         "created": len(created),
-        "errors_count": len(errors),
+        "errors_count": report["errors_count"],
         "created_agents": created,
-        "errors": errors,
+        "errors": report["errors"],
     }
+
+
+@router.post("/bulk-import/stream")
+async def bulk_import_agents_stream(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv | ndjson (default: from Content-Type, else csv)"),
+):
+    """Stream-import agents from a CSV (header row) or NDJSON request body.
+
+    Rows are validated, deduped against existing phones and committed in
+    chunks; the response reports per-row errors (first 1000) and totals.
+    """
+    return await agent_importer.import_stream(request, detect_format(request, format))
@@ -3,6 +3,7 @@ Analytics dashboard endpoints.
 Provides KPIs, funnel data, dormancy analysis, regional stats, and performance metrics.
 """
 
+from dataclasses import asdict
 from typing import Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
@@ -11,6 +12,7 @@ from sqlalchemy import func, case
 from database import get_db
 from models import Agent, ADM, Interaction, Feedback, DiaryEntry
 from schemas import DashboardKPIs, ActivationFunnel, DormancyBreakdown
+from services.priority_engine import priority_engine
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -328,6 +330,29 @@ def get_adm_performance(db: Session = Depends(get_db)):
     return leaderboard
 
 
+@router.get("/priority-agents")
+def get_priority_agents(
+    adm_id: Optional[int] = Query(None, description="One ADM (default: every ADM)"),
+    limit: int = Query(5, ge=1, le=20),
+    db: Session = Depends(get_db),
+):
+    """
+    Agents each ADM should reach out to first, ranked by lifecycle state,
+    contact gap and engagement. Served from the priority engine's cache.
+    """
+    ranked = priority_engine.top_many(db, [adm_id] if adm_id else None)
+    names = dict(db.query(ADM.id, ADM.name).filter(ADM.id.in_(list(ranked))).all()) if ranked else {}
+
+    return [
+        {
+            "adm_id": adm,
+            "adm_name": names.get(adm, "Unknown"),
+            "agents": [asdict(p) for p in agents[:limit]],
+        }
+        for adm, agents in sorted(ranked.items())
+    ]
+
+
 @router.get("/feedback-trends")
 def get_feedback_trends(
     period: str = Query("weekly", description="daily|weekly|monthly"),
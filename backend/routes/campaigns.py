@@ -0,0 +1,144 @@
+"""
+Campaign routes — bulk template sends to agent segments, and their delivery state.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Campaign, CampaignRecipient
+from schemas import CampaignCreate, CampaignRecipientResponse, CampaignResponse, CampaignSegment
+from services.campaigns import campaign_engine, campaign_metrics
+
+router = APIRouter(prefix="/campaigns", tags=["Campaigns"])
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _get_campaign(db: Session, campaign_id: int) -> Campaign:
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+    return campaign
+
+
+def _serialize(campaign: Campaign) -> CampaignResponse:
+    return CampaignResponse.model_validate(campaign).model_copy(update=campaign_metrics(campaign))
+
+
+def _segment(segment: CampaignSegment) -> dict:
+    return segment.model_dump(exclude_defaults=True)
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+@router.post("/", response_model=CampaignResponse, status_code=201)
+def create_campaign(data: CampaignCreate, db: Session = Depends(get_db)):
+    """Create a draft campaign.
+
+    The template and segment are validated now; every template param that
+    is not filled from the agent (agent_name, adm_name, ...) must be given
+    in ``params``.
+    """
+    try:
+        campaign = campaign_engine.create(
+            db, data.name, data.template_name, data.channel, data.language,
+            _segment(data.segment), data.params,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    db.commit()
+    db.refresh(campaign)
+    return _serialize(campaign)
+
+
+@router.post("/audience")
+def preview_audience(segment: CampaignSegment, db: Session = Depends(get_db)):
+    """How many agents a segment matches right now."""
+    try:
+        return {"recipients": campaign_engine.audience_size(db, _segment(segment))}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/", response_model=List[CampaignResponse])
+def list_campaigns(
+    status: Optional[str] = Query(None, description="draft | running | paused | completed | cancelled"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Campaigns, newest first."""
+    query = db.query(Campaign)
+    if status:
+        query = query.filter(Campaign.status == status)
+    return [_serialize(c) for c in query.order_by(Campaign.id.desc()).limit(limit).all()]
+
+
+@router.get("/{campaign_id}", response_model=CampaignResponse)
+def get_campaign(campaign_id: int, db: Session = Depends(get_db)):
+    """A campaign with its delivery counters, throughput and per-message overhead."""
+    return _serialize(_get_campaign(db, campaign_id))
+
+
+@router.get("/{campaign_id}/recipients", response_model=List[CampaignRecipientResponse])
+def list_recipients(
+    campaign_id: int,
+    status: Optional[str] = Query(None, description="pending | sent | failed | skipped"),
+    after_id: int = Query(0, ge=0, description="Return recipients with a larger id (paging)"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """Per-recipient delivery state, in id order."""
+    _get_campaign(db, campaign_id)
+    query = db.query(CampaignRecipient).filter(
+        CampaignRecipient.campaign_id == campaign_id, CampaignRecipient.id > after_id,
+    )
+    if status:
+        query = query.filter(CampaignRecipient.status == status)
+    return query.order_by(CampaignRecipient.id).limit(limit).all()
+
+
+def _transition(db: Session, campaign_id: int, action) -> CampaignResponse:
+    campaign = _get_campaign(db, campaign_id)
+    try:
+        action(campaign)
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    db.commit()
+    db.refresh(campaign)
+    return _serialize(campaign)
+
+
+@router.post("/{campaign_id}/launch", response_model=CampaignResponse)
+def launch_campaign(campaign_id: int, db: Session = Depends(get_db)):
+    """Snapshot the segment into recipients and start sending."""
+    return _transition(db, campaign_id, lambda c: campaign_engine.launch(db, c))
+
+
+@router.post("/{campaign_id}/pause", response_model=CampaignResponse)
+def pause_campaign(campaign_id: int, db: Session = Depends(get_db)):
+    """Stop sending after the batch in flight; resume picks up where it left off."""
+    return _transition(db, campaign_id, campaign_engine.pause)
+
+
+@router.post("/{campaign_id}/resume", response_model=CampaignResponse)
+def resume_campaign(campaign_id: int, db: Session = Depends(get_db)):
+    """Continue a paused campaign."""
+    return _transition(db, campaign_id, campaign_engine.resume)
+
+
+@router.post("/{campaign_id}/cancel", response_model=CampaignResponse)
+def cancel_campaign(campaign_id: int, db: Session = Depends(get_db)):
+    """Stop a campaign for good; pending recipients are never messaged."""
+    return _transition(db, campaign_id, campaign_engine.cancel)
+
+
+@router.post("/{campaign_id}/retry-failed", response_model=CampaignResponse)
+def retry_failed_recipients(campaign_id: int, db: Session = Depends(get_db)):
+    """Queue the campaign's failed recipients for another attempt."""
+    return _transition(db, campaign_id, lambda c: campaign_engine.retry_failed(db, c))
@@ -21,6 +21,7 @@ def _serialize_template(t: TemplateDefinition) -> dict:
         "description": t.description,
         "variants": dict(t.variants),
         "buttons": list(t.buttons),
+        "params": sorted(t.params),
     }
 
 
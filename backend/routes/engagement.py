@@ -0,0 +1,40 @@
+"""
+Engagement routes — how an agent's engagement score is made up, and bulk recomputes.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Agent
+from services.engagement import engagement_engine
+
+router = APIRouter(prefix="/engagement", tags=["Engagement"])
+
+
+@router.get("/agents/{agent_id}")
+def get_agent_engagement(agent_id: int, db: Session = Depends(get_db)):
+    """An agent's engagement score with its components (0-1) and decayed counters.
+
+    ``derived`` is false for agents with no scored activity yet, whose
+    score is still the seeded or manually set value.
+    """
+    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    breakdown = engagement_engine.breakdown(db, agent_id)
+    if breakdown is None:
+        return {"agent_id": agent_id, "engagement_score": agent.engagement_score, "derived": False}
+    return {**breakdown, "derived": True}
+
+
+@router.post("/refresh")
+def refresh_engagement():
+    """Decay every agent's counters to now and rewrite the scores that moved."""
+    return engagement_engine.refresh()
+
+
+@router.post("/rebuild")
+def rebuild_engagement():
+    """Recompute all counters from interactions, training signals and tickets (backfill)."""
+    return engagement_engine.rebuild()
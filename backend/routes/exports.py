@@ -0,0 +1,101 @@
+"""
+Export routes — stream agents, interactions and feedback tickets as files.
+
+Filters match the corresponding list endpoints. Rows are returned in
+primary-key order so the cursor can follow the index.
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Query
+from sqlalchemy import select
+
+from models import Agent, Interaction, FeedbackTicket, DepartmentQueue
+from services.exporter import export_columns, export_response
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+FORMAT_QUERY = Query("csv", description="csv | ndjson | parquet")
+
+
+@router.get("/agents")
+def export_agents(
+    lifecycle_state: Optional[str] = Query(None, description="Filter by lifecycle state"),
+    location: Optional[str] = Query(None, description="Filter by location (city)"),
+    assigned_adm_id: Optional[int] = Query(None, description="Filter by assigned ADM"),
+    unassigned: Optional[bool] = Query(None, description="Show only unassigned agents"),
+    search: Optional[str] = Query(None, description="Search by name or phone"),
+    format: str = FORMAT_QUERY,
+):
+    """Stream all agents matching the filters."""
+    filters = []
+    if lifecycle_state:
+        filters.append(Agent.lifecycle_state == lifecycle_state)
+    if location:
+        filters.append(Agent.location.ilike(f"%{location}%"))
+    if assigned_adm_id:
+        filters.append(Agent.assigned_adm_id == assigned_adm_id)
+    if unassigned:
+        filters.append(Agent.assigned_adm_id.is_(None))
+    if search:
+        filters.append((Agent.name.ilike(f"%{search}%")) | (Agent.phone.ilike(f"%{search}%")))
+
+    return export_response("agents", export_columns(Agent), filters, Agent.id, format)
+
+
+@router.get("/interactions")
+def export_interactions(
+    agent_id: Optional[int] = Query(None),
+    adm_id: Optional[int] = Query(None),
+    type: Optional[str] = Query(None, description="call|whatsapp|visit|telegram"),
+    outcome: Optional[str] = Query(None),
+    follow_up_status: Optional[str] = Query(None),
+    format: str = FORMAT_QUERY,
+):
+    """Stream all interactions matching the filters."""
+    filters = []
+    if agent_id:
+        filters.append(Interaction.agent_id == agent_id)
+    if adm_id:
+        filters.append(Interaction.adm_id == adm_id)
+    if type:
+        filters.append(Interaction.type == type)
+    if outcome:
+        filters.append(Interaction.outcome == outcome)
+    if follow_up_status:
+        filters.append(Interaction.follow_up_status == follow_up_status)
+
+    return export_response(
+        "interactions", export_columns(Interaction), filters, Interaction.id, format
+    )
+
+
+@router.get("/tickets")
+def export_tickets(
+    adm_id: Optional[int] = Query(None),
+    agent_id: Optional[int] = Query(None),
+    bucket: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    priority: Optional[str] = Query(None),
+    department: Optional[str] = Query(None, description="Filter by department queue"),
+    format: str = FORMAT_QUERY,
+):
+    """Stream all feedback tickets matching the filters."""
+    filters = []
+    if adm_id:
+        filters.append(FeedbackTicket.adm_id == adm_id)
+    if agent_id:
+        filters.append(FeedbackTicket.agent_id == agent_id)
+    if bucket:
+        filters.append(FeedbackTicket.bucket == bucket)
+    if status:
+        filters.append(FeedbackTicket.status == status)
+    if priority:
+        filters.append(FeedbackTicket.priority == priority)
+    if department:
+        filters.append(FeedbackTicket.id.in_(
+            select(DepartmentQueue.ticket_id).where(DepartmentQueue.department == department)
+        ))
+
+    return export_response(
+        "tickets", export_columns(FeedbackTicket), filters, FeedbackTicket.id, format
+    )
@@ -5,10 +5,11 @@ Feedback submission and analytics routes.
 from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Feedback, Agent, ADM
 from schemas import FeedbackCreate, FeedbackUpdate, FeedbackResponse, FeedbackAnalytics
 from services.ai_service import ai_service
@@ -171,14 +172,14 @@ def get_feedback(feedback_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=FeedbackResponse, status_code=201)
-async def submit_feedback(data: FeedbackCreate, db: Session = Depends(get_db)):
+async def submit_feedback(data: FeedbackCreate, db: AsyncSession = Depends(get_async_db)):
     """Submit new feedback. AI will automatically analyze if raw_text is provided."""
     # Validate references
-    agent = db.query(Agent).filter(Agent.id == data.agent_id).first()
+    agent = await db.get(Agent, data.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    adm = db.query(ADM).filter(ADM.id == data.adm_id).first()
+    adm = await db.get(ADM, data.adm_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
 
@@ -212,8 +213,8 @@ async def submit_feedback(data: FeedbackCreate, db: Session = Depends(get_db)):
             feedback.sentiment = "neutral"
 
     db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
+    await db.commit()
+    await db.refresh(feedback)
     return feedback
 
 
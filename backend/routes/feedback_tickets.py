@@ -8,19 +8,20 @@ script generation, and delivery.
 import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional, List
 
-import io
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
 
 from config import settings
-from database import get_db, SessionLocal
+from database import get_db, get_async_db, SessionLocal
+from domain.engagement import ticket_event
 from models import (
-    FeedbackTicket, DepartmentQueue, ReasonTaxonomy,
+    FeedbackTicket, DepartmentQueue,
     AggregationAlert, Agent, ADM, TicketMessage,
 )
 from schemas import (
@@ -29,7 +30,15 @@ from schemas import (
     ReasonTaxonomyResponse, DepartmentQueueResponse,
     AggregationAlertResponse, TicketMessageCreate,
 )
+from services.engagement import engagement_engine
 from services.feedback_classifier import feedback_classifier, BUCKET_DISPLAY_NAMES
+from services.pagination import count_total, keyset_page
+from services.pattern_detector import pattern_detector
+from services.reference_data import reference_data, etag_response
+from services.sla_monitor import sla_monitor
+from services.telegram_files import telegram_files
+from services.ticket_analytics import ticket_analytics
+from services.ticket_ids import ticket_id_allocator
 
 logger = logging.getLogger(__name__)
 
@@ -91,50 +100,16 @@ router = APIRouter(prefix="/feedback-tickets", tags=["Feedback Tickets"])
 
 def _generate_ticket_id(db: Session) -> str:
     """Generate next ticket ID: FB-YYYY-NNNNN."""
-    year = datetime.utcnow().year
-    prefix = f"FB-{year}-"
-    last = (
-        db.query(FeedbackTicket)
-        .filter(FeedbackTicket.ticket_id.like(f"{prefix}%"))
-        .order_by(desc(FeedbackTicket.id))
-        .first()
-    )
-    if last:
-        last_num = int(last.ticket_id.split("-")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-    return f"{prefix}{next_num:05d}"
+    return ticket_id_allocator.next_ticket_id(db)
 
 
 def _reason_name(db: Session, code: str) -> str:
     """Look up human-readable reason name for a code. Returns the code itself as fallback."""
-    try:
-        r = db.query(ReasonTaxonomy).filter(ReasonTaxonomy.code == code).first()
-        return r.reason_name if r else code
-    except Exception:
-        return code
+    return reference_data.reasons(db).name(code)
 
 
-def _enrich_ticket(ticket: FeedbackTicket, db: Session) -> dict:
-    """Add display names and computed fields to a ticket."""
-    agent = db.query(Agent).filter(Agent.id == ticket.agent_id).first()
-    adm = db.query(ADM).filter(ADM.id == ticket.adm_id).first()
-
-    # Build a lookup of all reason codes → display names (single query)
-    _reason_lookup: dict = {}
-    try:
-        all_reasons = db.query(ReasonTaxonomy).all()
-        _reason_lookup = {r.code: r.reason_name for r in all_reasons}
-    except Exception:
-        pass  # Table may not exist yet
-
-    # Reason display name
-    reason_display = None
-    if ticket.reason_code:
-        reason_display = _reason_lookup.get(ticket.reason_code, ticket.reason_code)
-
-    # SLA status
+def _sla_status(ticket: FeedbackTicket) -> str:
+    """Compute a ticket's SLA status from its deadline."""
     sla_status = "on_track"
     if ticket.sla_deadline:
         now = datetime.utcnow()
@@ -144,61 +119,91 @@ def _enrich_ticket(ticket: FeedbackTicket, db: Session) -> dict:
             sla_status = "breached"
         elif now > ticket.sla_deadline - (ticket.sla_deadline - ticket.created_at) * 0.25:
             sla_status = "warning"
+    return sla_status
+
+
+def _enrich_ticket(ticket: FeedbackTicket, db: Session) -> dict:
+    """Add display names and computed fields to a ticket."""
+    return _enrich_tickets([ticket], db)[0]
 
-    # Build response dict from ORM object
-    data = {
-        "id": ticket.id,
-        "ticket_id": ticket.ticket_id,
-        "agent_id": ticket.agent_id,
-        "adm_id": ticket.adm_id,
-        "interaction_id": ticket.interaction_id,
-        "channel": ticket.channel,
-        "selected_reasons": [
-            {"code": c, "name": _reason_lookup.get(c, c)}
-            for c in (json.loads(ticket.selected_reasons) if ticket.selected_reasons else [])
-        ],
-        "raw_feedback_text": ticket.raw_feedback_text,
-        "parsed_summary": ticket.parsed_summary,
-        "bucket": ticket.bucket,
-        "reason_code": ticket.reason_code,
-        "secondary_reason_codes": [
-            {"code": c, "name": _reason_lookup.get(c, c)}
-            for c in (json.loads(ticket.secondary_reason_codes) if ticket.secondary_reason_codes else [])
-        ],
-        "ai_confidence": ticket.ai_confidence,
-        "priority": ticket.priority,
-        "urgency_score": ticket.urgency_score,
-        "churn_risk": ticket.churn_risk,
-        "sentiment": ticket.sentiment,
-        "sla_hours": ticket.sla_hours,
-        "sla_deadline": ticket.sla_deadline,
-        "status": ticket.status,
-        "department_response_text": ticket.department_response_text,
-        "department_responded_by": ticket.department_responded_by,
-        "department_responded_at": ticket.department_responded_at,
-        "generated_script": ticket.generated_script,
-        "script_sent_at": ticket.script_sent_at,
-        "adm_script_rating": ticket.adm_script_rating,
-        "voice_file_id": ticket.voice_file_id,
-        "parent_ticket_id": ticket.parent_ticket_id,
-        "created_at": ticket.created_at,
-        "updated_at": ticket.updated_at,
-        # Enriched
-        "agent_name": agent.name if agent else None,
-        "adm_name": adm.name if adm else None,
-        "bucket_display": BUCKET_DISPLAY_NAMES.get(ticket.bucket, ticket.bucket),
-        "reason_display": reason_display,
-        "sla_status": sla_status,
-    }
+
+def _enrich_tickets(tickets: List[FeedbackTicket], db: Session) -> List[dict]:
+    """Enrich a page of tickets with a constant number of queries.
+
+    Agent names, ADM names and message counts are each resolved with one
+    IN / GROUP BY query for the whole page; reason names come from the
+    process-wide taxonomy cache.
+    """
+    if not tickets:
+        return []
+
+    agent_ids = {t.agent_id for t in tickets}
+    adm_ids = {t.adm_id for t in tickets}
+    agent_names = dict(db.query(Agent.id, Agent.name).filter(Agent.id.in_(agent_ids)).all())
+    adm_names = dict(db.query(ADM.id, ADM.name).filter(ADM.id.in_(adm_ids)).all())
 
     # Message count for conversation indicator (safe — table may not exist on first deploy)
     try:
-        message_count = db.query(TicketMessage).filter(TicketMessage.ticket_id == ticket.id).count()
-        data["message_count"] = message_count
+        message_counts = dict(
+            db.query(TicketMessage.ticket_id, func.count(TicketMessage.id))
+            .filter(TicketMessage.ticket_id.in_([t.id for t in tickets]))
+            .group_by(TicketMessage.ticket_id)
+            .all()
+        )
     except Exception:
-        data["message_count"] = 0
+        message_counts = {}
 
-    return data
+    reasons = reference_data.reasons(db)
+
+    result = []
+    for ticket in tickets:
+        # Build response dict from ORM object
+        result.append({
+            "id": ticket.id,
+            "ticket_id": ticket.ticket_id,
+            "agent_id": ticket.agent_id,
+            "adm_id": ticket.adm_id,
+            "interaction_id": ticket.interaction_id,
+            "channel": ticket.channel,
+            "selected_reasons": [
+                {"code": c, "name": reasons.name(c)}
+                for c in (json.loads(ticket.selected_reasons) if ticket.selected_reasons else [])
+            ],
+            "raw_feedback_text": ticket.raw_feedback_text,
+            "parsed_summary": ticket.parsed_summary,
+            "bucket": ticket.bucket,
+            "reason_code": ticket.reason_code,
+            "secondary_reason_codes": [
+                {"code": c, "name": reasons.name(c)}
+                for c in (json.loads(ticket.secondary_reason_codes) if ticket.secondary_reason_codes else [])
+            ],
+            "ai_confidence": ticket.ai_confidence,
+            "priority": ticket.priority,
+            "urgency_score": ticket.urgency_score,
+            "churn_risk": ticket.churn_risk,
+            "sentiment": ticket.sentiment,
+            "sla_hours": ticket.sla_hours,
+            "sla_deadline": ticket.sla_deadline,
+            "status": ticket.status,
+            "department_response_text": ticket.department_response_text,
+            "department_responded_by": ticket.department_responded_by,
+            "department_responded_at": ticket.department_responded_at,
+            "generated_script": ticket.generated_script,
+            "script_sent_at": ticket.script_sent_at,
+            "adm_script_rating": ticket.adm_script_rating,
+            "voice_file_id": ticket.voice_file_id,
+            "parent_ticket_id": ticket.parent_ticket_id,
+            "created_at": ticket.created_at,
+            "updated_at": ticket.updated_at,
+            # Enriched
+            "agent_name": agent_names.get(ticket.agent_id),
+            "adm_name": adm_names.get(ticket.adm_id),
+            "bucket_display": BUCKET_DISPLAY_NAMES.get(ticket.bucket, ticket.bucket),
+            "reason_display": reasons.name(ticket.reason_code) if ticket.reason_code else None,
+            "sla_status": _sla_status(ticket),
+            "message_count": message_counts.get(ticket.id, 0),
+        })
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -207,41 +212,45 @@ def _enrich_ticket(ticket: FeedbackTicket, db: Session) -> dict:
 
 @router.get("/reasons", response_model=List[ReasonTaxonomyResponse])
 def list_reasons(
+    request: Request,
     bucket: Optional[str] = Query(None, description="Filter by bucket"),
     db: Session = Depends(get_db),
 ):
-    """List all active feedback reasons, grouped by bucket. Used by ADM UI for pick-and-choose."""
-    query = db.query(ReasonTaxonomy).filter(ReasonTaxonomy.active == True)
-    if bucket:
-        query = query.filter(ReasonTaxonomy.bucket == bucket)
-    return query.order_by(ReasonTaxonomy.bucket, ReasonTaxonomy.display_order).all()
+    """List all active feedback reasons, grouped by bucket. Used by ADM UI for pick-and-choose.
+
+    Served from the reference data cache with an ETag (304 on If-None-Match).
+    """
+    reasons = reference_data.reasons(db)
+    return etag_response(request, reasons.version, lambda: [
+        ReasonTaxonomyResponse.model_validate(r._asdict()).model_dump(mode="json")
+        for r in reasons.active(bucket)
+    ])
 
 
 @router.get("/reasons/by-bucket")
-def reasons_by_bucket(db: Session = Depends(get_db)):
+def reasons_by_bucket(request: Request, db: Session = Depends(get_db)):
     """Get reasons organized by bucket for UI rendering."""
-    reasons = (
-        db.query(ReasonTaxonomy)
-        .filter(ReasonTaxonomy.active == True)
-        .order_by(ReasonTaxonomy.bucket, ReasonTaxonomy.display_order)
-        .all()
-    )
-    result = {}
-    for r in reasons:
-        bucket = r.bucket
-        if bucket not in result:
-            result[bucket] = {
+    reasons = reference_data.reasons(db)
+
+    def _build():
+        return [
+            {
                 "bucket": bucket,
                 "display_name": BUCKET_DISPLAY_NAMES.get(bucket, bucket),
-                "reasons": [],
+                "reasons": [
+                    {
+                        "code": r.code,
+                        "reason_name": r.reason_name,
+                        "description": r.description,
+                        "sub_reasons": json.loads(r.sub_reasons) if r.sub_reasons else [],
+                    }
+                    for r in rows
+                ],
             }
-        result[bucket]["reasons"].append({
-            "code": r.code,
-            "reason_name": r.reason_name,
-            "description": r.description,
-            "sub_reasons": json.loads(r.sub_reasons) if r.sub_reasons else [],
-        })
-    return list(result.values())
+            for bucket, rows in reasons.active_by_bucket.items()
+        ]
+
+    return etag_response(request, reasons.version, _build)
 
 
 # ---------------------------------------------------------------------------
@@ -251,7 +260,7 @@ def reasons_by_bucket(db: Session = Depends(get_db)):
 @router.post("/submit", status_code=201)
 async def submit_feedback_ticket(
     data: FeedbackTicketSubmit,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     ADM submits agent feedback. AI classifies it and routes to department.
@@ -262,10 +271,10 @@ async def submit_feedback_ticket(
     3. Both — reasons + additional context
     """
     # Validate agent and ADM
-    agent = db.query(Agent).filter(Agent.id == data.agent_id).first()
+    agent = await db.get(Agent, data.agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
-    adm = db.query(ADM).filter(ADM.id == data.adm_id).first()
+    adm = await db.get(ADM, data.adm_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
 
@@ -291,11 +300,11 @@ async def submit_feedback_ticket(
     # (from reason codes). If not, we'll check after classification.
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
 
-    def _find_open_ticket(bucket_to_check: str) -> Optional[FeedbackTicket]:
+    async def _find_open_ticket(bucket_to_check: str) -> Optional[FeedbackTicket]:
         """Find an existing open ticket for this agent+adm+bucket within 30 days."""
-        return (
-            db.query(FeedbackTicket)
-            .filter(
+        return await db.scalar(
+            select(FeedbackTicket)
+            .where(
                 FeedbackTicket.agent_id == data.agent_id,
                 FeedbackTicket.adm_id == data.adm_id,
                 FeedbackTicket.bucket == bucket_to_check,
@@ -303,10 +312,10 @@ async def submit_feedback_ticket(
                 FeedbackTicket.created_at >= thirty_days_ago,
             )
             .order_by(desc(FeedbackTicket.created_at))
-            .first()
+            .limit(1)
         )
 
-    def _add_followup_to_ticket(existing: FeedbackTicket) -> dict:
+    async def _add_followup_to_ticket(existing: FeedbackTicket) -> dict:
         """Append follow-up feedback to an existing open ticket."""
         timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
         new_text = data.raw_feedback_text or ""
@@ -343,12 +352,13 @@ async def submit_feedback_ticket(
         existing.sla_deadline = datetime.utcnow() + timedelta(hours=sla_hours)
 
         # Update the queue entry status back to open
-        queue = db.query(DepartmentQueue).filter(
-            DepartmentQueue.ticket_id == existing.id
-        ).first()
+        queue = await db.scalar(
+            select(DepartmentQueue).where(DepartmentQueue.ticket_id == existing.id).limit(1)
+        )
         if queue:
             queue.status = "open"
             queue.sla_status = "on_track"
+            queue.escalation_level = 0
 
         # Create follow-up message in the conversation thread (non-critical)
         try:
@@ -365,11 +375,14 @@ async def submit_feedback_ticket(
             logger.warning(f"Could not create follow-up TicketMessage: {e}")
 
         existing.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await db.refresh(existing)
+        if queue:
+            sla_monitor.track(queue.id, existing.ticket_id, queue.department,
+                              existing.sla_deadline, sla_hours)
 
         return {
-            "tickets": [_enrich_ticket(existing, db)],
+            "tickets": [await db.run_sync(lambda s: _enrich_ticket(existing, s))],
             "message": f"Follow-up added to existing ticket {existing.ticket_id}",
             "is_followup": True,
             "original_ticket_id": existing.ticket_id,
@@ -377,9 +390,9 @@ async def submit_feedback_ticket(
 
     # If we already know the bucket from reason codes, check now
     if candidate_bucket:
-        existing_ticket = _find_open_ticket(candidate_bucket)
+        existing_ticket = await _find_open_ticket(candidate_bucket)
         if existing_ticket:
-            return _add_followup_to_ticket(existing_ticket)
+            return await _add_followup_to_ticket(existing_ticket)
 
     # Classify
     classification = await feedback_classifier.classify_feedback(
@@ -393,9 +406,9 @@ async def submit_feedback_ticket(
     # If we didn't have reason codes, check for duplicate now using
     # the AI-classified bucket
     if not candidate_bucket:
-        existing_ticket = _find_open_ticket(classification["bucket"])
+        existing_ticket = await _find_open_ticket(classification["bucket"])
         if existing_ticket:
-            return _add_followup_to_ticket(existing_ticket)
+            return await _add_followup_to_ticket(existing_ticket)
 
     # Check for multi-bucket — split into separate tickets
     tickets_created = []
@@ -404,9 +417,10 @@ async def submit_feedback_ticket(
         buckets_to_process.extend(classification["additional_buckets"])
 
     parent_ticket_id = None
+    queue_entries = []
 
     for idx, bucket in enumerate(buckets_to_process):
-        ticket_id = _generate_ticket_id(db)
+        ticket_id = await db.run_sync(_generate_ticket_id)
         sla_hours = feedback_classifier.get_sla_hours(bucket, classification["priority"])
         sla_deadline = feedback_classifier.compute_sla_deadline(bucket, classification["priority"])
 
@@ -445,7 +459,7 @@ async def submit_feedback_ticket(
             voice_file_id=data.voice_file_id,
         )
         db.add(ticket)
-        db.flush()
+        await db.flush()
 
         # Create initial ADM message in the conversation thread (non-critical — don't fail ticket creation)
         try:
@@ -472,6 +486,7 @@ async def submit_feedback_ticket(
             sla_status="on_track",
         )
         db.add(queue_entry)
+        queue_entries.append((queue_entry, sla_hours))
 
         tickets_created.append(ticket)
 
@@ -481,16 +496,26 @@ async def submit_feedback_ticket(
         for t in tickets_created:
             t.related_ticket_ids = json.dumps([tid for tid in all_ids if tid != t.ticket_id])
 
-    db.commit()
+    # One submission is one ticket event for the agent's engagement score, however it was split
+    root = tickets_created[0]
+    await db.run_sync(lambda s: engagement_engine.observe(
+        s, [ticket_event(root.agent_id, root.created_at or datetime.utcnow())]
+    ))
+    # Pattern counters commit with the tickets, so none is counted twice or lost
+    patterns = await db.run_sync(_count_patterns, tickets_created)
+
+    await db.commit()
+
+    for t, (entry, hours) in zip(tickets_created, queue_entries):
+        sla_monitor.track(entry.id, t.ticket_id, entry.department, t.sla_deadline, hours)
 
     # Return enriched responses
-    result = []
     for t in tickets_created:
-        db.refresh(t)
-        result.append(_enrich_ticket(t, db))
+        await db.refresh(t)
+    result = await db.run_sync(lambda s: _enrich_tickets(tickets_created, s))
 
-    # Check for aggregation patterns (async-safe, runs after commit)
-    _check_aggregation_patterns(db, tickets_created[0])
+    # Check for aggregation patterns (runs after commit)
+    await db.run_sync(_check_aggregation_patterns, tickets_created, patterns)
 
     return {
         "tickets": result,
@@ -512,11 +537,18 @@ def list_tickets(
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     department: Optional[str] = Query(None, description="Filter by department queue"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor"),
+    include_total: bool = Query(False),
+    estimate_total: bool = Query(False, description="Estimated total (PostgreSQL)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
 ):
-    """List feedback tickets with filters. Used by ADM view and department dashboard."""
+    """List feedback tickets with filters. Used by ADM view and department dashboard.
+
+    Pass ``next_cursor`` back as ``cursor`` for the next page; ``total`` is
+    only computed when requested.
+    """
     query = db.query(FeedbackTicket)
 
     if adm_id:
@@ -532,14 +564,15 @@ def list_tickets(
     if department:
         query = query.join(DepartmentQueue).filter(DepartmentQueue.department == department)
 
-    total = query.count()
-    tickets = query.order_by(desc(FeedbackTicket.created_at)).offset(skip).limit(limit).all()
+    total = count_total(query, include_total, estimate_total)
+    page = keyset_page(query, FeedbackTicket.created_at, FeedbackTicket.id, limit, cursor, skip)
 
     return {
-        "tickets": [_enrich_ticket(t, db) for t in tickets],
+        "tickets": _enrich_tickets(page.items, db),
         "total": total,
         "skip": skip,
         "limit": limit,
+        "next_cursor": page.next_cursor,
     }
 
 
@@ -551,30 +584,34 @@ def list_tickets(
 def department_queue(
     department: str,
     status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor"),
+    include_total: bool = Query(False),
+    estimate_total: bool = Query(False, description="Estimated total (PostgreSQL)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
 ):
-    """Get department's ticket queue with SLA status."""
+    """Get department's ticket queue with SLA status, newest first."""
     query = db.query(DepartmentQueue).filter(DepartmentQueue.department == department)
     if status:
         query = query.filter(DepartmentQueue.status == status)
 
-    total = query.count()
-    entries = query.order_by(DepartmentQueue.created_at.desc()).offset(skip).limit(limit).all()
+    total = count_total(query, include_total, estimate_total)
+    page = keyset_page(
+        query.join(FeedbackTicket, FeedbackTicket.id == DepartmentQueue.ticket_id)
+        .add_entity(FeedbackTicket),
+        DepartmentQueue.created_at, DepartmentQueue.id, limit, cursor, skip,
+    )
+    rows = page.items
 
-    result = []
-    for entry in entries:
-        ticket = db.query(FeedbackTicket).filter(FeedbackTicket.id == entry.ticket_id).first()
-        if ticket:
-            enriched = _enrich_ticket(ticket, db)
-            enriched["queue_status"] = entry.status
-            enriched["queue_sla_status"] = entry.sla_status
-            enriched["escalation_level"] = entry.escalation_level
-            enriched["assigned_to"] = entry.assigned_to
-            result.append(enriched)
+    result = _enrich_tickets([ticket for _, ticket in rows], db)
+    for enriched, (entry, _) in zip(result, rows):
+        enriched["queue_status"] = entry.status
+        enriched["queue_sla_status"] = entry.sla_status
+        enriched["escalation_level"] = entry.escalation_level
+        enriched["assigned_to"] = entry.assigned_to
 
-    return {"tickets": result, "total": total, "department": department}
+    return {"tickets": result, "total": total, "department": department, "next_cursor": page.next_cursor}
 
 
 # ---------------------------------------------------------------------------
@@ -582,14 +619,28 @@ def department_queue(
 # ---------------------------------------------------------------------------
 
 @router.get("/analytics/summary")
-def ticket_analytics(
+def ticket_analytics_summary(
     adm_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, description="Start date (inclusive)"),
+    date_to: Optional[date] = Query(None, description="End date (inclusive)"),
+    department: Optional[str] = Query(None, description="Filter by bucket/department"),
+    rollup: Optional[bool] = Query(None, description="Force (true) or skip (false) daily rollups"),
     db: Session = Depends(get_db),
 ):
-    """Get feedback ticket analytics."""
+    """Get feedback ticket analytics.
+
+    Counts cover tickets created in the date range; SLA and resolution-time
+    stats cover tickets resolved in it (see services/ticket_analytics.py).
+    """
     base = db.query(FeedbackTicket)
     if adm_id:
         base = base.filter(FeedbackTicket.adm_id == adm_id)
+    if department:
+        base = base.filter(FeedbackTicket.bucket == department)
+    if date_from:
+        base = base.filter(FeedbackTicket.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        base = base.filter(FeedbackTicket.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
 
     total = base.count()
 
@@ -606,22 +657,12 @@ def ticket_analytics(
         .group_by(FeedbackTicket.status).all()
     )
 
-    # SLA compliance
-    resolved = base.filter(FeedbackTicket.department_responded_at.isnot(None)).all()
-    sla_met = sum(
-        1 for t in resolved
-        if t.sla_deadline and t.department_responded_at and t.department_responded_at <= t.sla_deadline
+    # SLA compliance and resolution time, aggregated in SQL
+    resolution = ticket_analytics.resolution_stats(
+        db, date_from=date_from, date_to=date_to, department=department,
+        adm_id=adm_id, use_rollup=rollup,
     )
-    sla_compliance = round(sla_met / len(resolved) * 100, 1) if resolved else 0.0
-
-    # Avg resolution time
-    avg_hours = None
-    if resolved:
-        total_hours = sum(
-            (t.department_responded_at - t.created_at).total_seconds() / 3600
-            for t in resolved if t.department_responded_at and t.created_at
-        )
-        avg_hours = round(total_hours / len(resolved), 1)
+    overall = resolution["overall"]
 
     # Top reason codes
     top_reasons = (
@@ -631,16 +672,18 @@ def ticket_analytics(
         .order_by(func.count(FeedbackTicket.id).desc())
         .limit(10).all()
     )
+    reasons = reference_data.reasons(db)
 
     return {
         "total_tickets": total,
         "by_bucket": {k: {"count": v, "display": BUCKET_DISPLAY_NAMES.get(k, k)} for k, v in by_bucket.items()},
         "by_priority": by_priority,
         "by_status": by_status,
-        "sla_compliance_pct": sla_compliance,
-        "avg_resolution_hours": avg_hours,
+        "sla_compliance_pct": overall["sla_compliance_pct"],
+        "avg_resolution_hours": overall["mean_hours"],
+        "resolution": resolution,
         "top_reason_codes": [
-            {"code": code, "name": _reason_name(db, code), "count": cnt}
+            {"code": code, "name": reasons.name(code), "count": cnt}
             for code, cnt in top_reasons
         ],
     }
@@ -676,38 +719,19 @@ def list_alerts(
 # ---------------------------------------------------------------------------
 
 @router.get("/{ticket_id}/voice")
-async def get_voice_note(ticket_id: str, db: Session = Depends(get_db)):
-    """Proxy Telegram voice note for browser playback."""
-    from fastapi.responses import StreamingResponse
-
-    ticket = db.query(FeedbackTicket).filter(
-        FeedbackTicket.ticket_id == ticket_id
-    ).first()
+async def get_voice_note(ticket_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Proxy Telegram voice note for browser playback (streamed, Range-aware, cached)."""
+    ticket = await db.scalar(
+        select(FeedbackTicket).where(FeedbackTicket.ticket_id == ticket_id).limit(1)
+    )
     if not ticket or not ticket.voice_file_id:
         raise HTTPException(status_code=404, detail="Voice note not found")
 
-    token = settings.TELEGRAM_BOT_TOKEN
-    if not token:
-        raise HTTPException(status_code=503, detail="Telegram not configured")
-
-    async with httpx.AsyncClient(timeout=15) as client:
-        file_resp = await client.get(
-            f"https://api.telegram.org/bot{token}/getFile",
-            params={"file_id": ticket.voice_file_id},
-        )
-        file_data = file_resp.json()
-        if not file_data.get("ok"):
-            raise HTTPException(status_code=404, detail="Voice file expired or not found on Telegram")
-
-        file_path = file_data["result"]["file_path"]
-        audio_resp = await client.get(
-            f"https://api.telegram.org/file/bot{token}/{file_path}"
-        )
-
-    return StreamingResponse(
-        io.BytesIO(audio_resp.content),
+    return await telegram_files.stream(
+        ticket.voice_file_id,
+        range_header=request.headers.get("range"),
+        filename=f"{ticket_id}-voice.ogg",
         media_type="audio/ogg",
-        headers={"Content-Disposition": f"inline; filename={ticket_id}-voice.ogg"},
     )
 
 
@@ -734,6 +758,7 @@ def close_ticket(ticket_id: str, db: Session = Depends(get_db)):
     ).first()
     if queue:
         queue.status = "closed"
+        sla_monitor.untrack(queue.id)
 
     db.commit()
     return {"status": "ok", "ticket_id": ticket_id, "message": "Ticket closed"}
@@ -763,8 +788,12 @@ def reopen_ticket(ticket_id: str, db: Session = Depends(get_db)):
     # Reset SLA
     sla_hours = feedback_classifier.get_sla_hours(ticket.bucket, ticket.priority or "medium")
     ticket.sla_deadline = datetime.utcnow() + timedelta(hours=sla_hours)
+    if queue:
+        queue.escalation_level = 0
 
     db.commit()
+    if queue:
+        sla_monitor.track(queue.id, ticket.ticket_id, queue.department, ticket.sla_deadline, sla_hours)
     return {"status": "ok", "ticket_id": ticket_id, "message": "Ticket reopened"}
 
 
@@ -814,12 +843,12 @@ def get_ticket_messages(ticket_id: str, db: Session = Depends(get_db)):
 async def add_ticket_message(
     ticket_id: str,
     data: TicketMessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a message to the ticket thread (department follow-up or clarification)."""
-    ticket = db.query(FeedbackTicket).filter(
-        FeedbackTicket.ticket_id == ticket_id
-    ).first()
+    ticket = await db.scalar(
+        select(FeedbackTicket).where(FeedbackTicket.ticket_id == ticket_id).limit(1)
+    )
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
@@ -853,17 +882,26 @@ async def add_ticket_message(
         )
 
     # ADM sends message via web (rare but possible) → notify department
-    elif data.sender_type == "adm":
+    reopened = None
+    if data.sender_type == "adm":
         if ticket.status not in ("closed",):
             ticket.status = "received"  # Reset so department sees it again
         # Update queue entry
-        queue = db.query(DepartmentQueue).filter(
-            DepartmentQueue.ticket_id == ticket.id
-        ).first()
+        queue = await db.scalar(
+            select(DepartmentQueue).where(DepartmentQueue.ticket_id == ticket.id).limit(1)
+        )
         if queue:
             queue.status = "open"
+            # department_respond untracked the entry; the SLA monitor must see it again
+            reopened = (
+                queue.id, ticket.ticket_id, queue.department, ticket.sla_deadline,
+                feedback_classifier.get_sla_hours(ticket.bucket, ticket.priority or "medium"),
+                queue.sla_status or "on_track", queue.escalation_level or 0,
+            )
 
-    db.commit()
+    await db.commit()
+    if reopened:
+        sla_monitor.track(*reopened)
     return {"status": "ok", "message_id": msg.id}
 
 
@@ -890,12 +928,12 @@ def get_ticket(ticket_id: str, db: Session = Depends(get_db)):
 async def department_respond(
     ticket_id: str,
     data: DepartmentResponseSubmit,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Department responds to a feedback ticket. Triggers AI script generation in background."""
-    ticket = db.query(FeedbackTicket).filter(
-        FeedbackTicket.ticket_id == ticket_id
-    ).first()
+    ticket = await db.scalar(
+        select(FeedbackTicket).where(FeedbackTicket.ticket_id == ticket_id).limit(1)
+    )
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
@@ -909,11 +947,12 @@ async def department_respond(
     ticket.status = "responded"
 
     # Update queue entry immediately
-    queue = db.query(DepartmentQueue).filter(
-        DepartmentQueue.ticket_id == ticket.id
-    ).first()
+    queue = await db.scalar(
+        select(DepartmentQueue).where(DepartmentQueue.ticket_id == ticket.id).limit(1)
+    )
     if queue:
         queue.status = "responded"
+        sla_monitor.untrack(queue.id)
         now = datetime.utcnow()
         if ticket.sla_deadline and now > ticket.sla_deadline:
             queue.sla_status = "breached"
@@ -933,8 +972,8 @@ async def department_respond(
     except Exception as e:
         logger.warning(f"Could not create dept TicketMessage: {e}")
 
-    db.commit()
-    db.refresh(ticket)
+    await db.commit()
+    await db.refresh(ticket)
 
     # Fire off script generation + Telegram push in the background
     asyncio.create_task(
@@ -945,7 +984,7 @@ async def department_respond(
     )
 
     return {
-        "ticket": _enrich_ticket(ticket, db),
+        "ticket": await db.run_sync(lambda s: _enrich_ticket(ticket, s)),
         "script_status": "generating",
         "message": "Response recorded. Script generation in progress.",
     }
@@ -1139,81 +1178,17 @@ def rate_script(
 # Telegram file proxy — allows frontend to download attachments
 # ---------------------------------------------------------------------------
 
-from fastapi.responses import StreamingResponse
-
 @router.get("/telegram-file/{file_id}")
-async def get_telegram_file(file_id: str):
+async def get_telegram_file(file_id: str, request: Request):
     """Proxy a Telegram file download for the web frontend.
 
-    The frontend cannot directly use Telegram file_ids. This endpoint:
-    1. Calls Telegram's getFile API to get the file_path
-    2. Streams the actual file back to the browser
+    The frontend cannot directly use Telegram file_ids. This endpoint
+    resolves the file_path (cached getFile lookup) and streams the file in
+    chunks, honouring Range requests. Repeat downloads come from the
+    on-disk cache in services/telegram_files.py.
     """
-    token = settings.TELEGRAM_BOT_TOKEN
-    if not token:
-        raise HTTPException(status_code=503, detail="Telegram integration not configured")
-
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            # Step 1: Get file path from Telegram
-            get_file_url = f"https://api.telegram.org/bot{token}/getFile"
-            resp = await client.get(get_file_url, params={"file_id": file_id})
-
-            if resp.status_code != 200:
-                raise HTTPException(status_code=404, detail="File not found on Telegram")
-
-            data = resp.json()
-            if not data.get("ok"):
-                raise HTTPException(status_code=404, detail="Telegram file lookup failed")
-
-            file_path = data["result"].get("file_path", "")
-            file_size = data["result"].get("file_size", 0)
-
-            if not file_path:
-                raise HTTPException(status_code=404, detail="No file path returned")
-
-            # Step 2: Download the actual file from Telegram
-            download_url = f"https://api.telegram.org/file/bot{token}/{file_path}"
-            file_resp = await client.get(download_url)
-
-            if file_resp.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to download file from Telegram")
-
-            # Determine content type from file extension
-            ext = file_path.rsplit(".", 1)[-1].lower() if "." in file_path else ""
-            content_type_map = {
-                "pdf": "application/pdf",
-                "png": "image/png",
-                "jpg": "image/jpeg",
-                "jpeg": "image/jpeg",
-                "gif": "image/gif",
-                "webp": "image/webp",
-                "mp3": "audio/mpeg",
-                "ogg": "audio/ogg",
-                "oga": "audio/ogg",
-                "mp4": "video/mp4",
-                "doc": "application/msword",
-                "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                "xls": "application/vnd.ms-excel",
-                "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                "csv": "text/csv",
-                "txt": "text/plain",
-                "zip": "application/zip",
-            }
-            content_type = content_type_map.get(ext, "application/octet-stream")
-
-            # Extract filename from path
-            filename = file_path.rsplit("/", 1)[-1] if "/" in file_path else file_path
-
-            return StreamingResponse(
-                iter([file_resp.content]),
-                media_type=content_type,
-                headers={
-                    "Content-Disposition": f'inline; filename="{filename}"',
-                    "Content-Length": str(len(file_resp.content)),
-                },
-            )
-
+        return await telegram_files.stream(file_id, range_header=request.headers.get("range"))
     except HTTPException:
         raise
     except Exception as e:
@@ -1225,50 +1200,20 @@ async def get_telegram_file(file_id: str):
 # Pattern detection (internal helper)
 # ---------------------------------------------------------------------------
 
-def _check_aggregation_patterns(db: Session, ticket: FeedbackTicket):
-    """Check if this ticket creates a pattern worth alerting on."""
+def _count_patterns(db: Session, tickets: List[FeedbackTicket]) -> list:
+    """Bump the pattern counters inside the ticket transaction (a failure only skips the counters)."""
     try:
-        # Count similar tickets in last 30 days
-        from datetime import timedelta
-        cutoff = datetime.utcnow() - timedelta(days=30)
-
-        # Same reason code pattern
-        if ticket.reason_code:
-            similar = (
-                db.query(FeedbackTicket)
-                .filter(
-                    FeedbackTicket.reason_code == ticket.reason_code,
-                    FeedbackTicket.created_at >= cutoff,
-                )
-                .all()
-            )
-            if len(similar) >= 5:
-                # Check if alert already exists
-                existing = (
-                    db.query(AggregationAlert)
-                    .filter(
-                        AggregationAlert.reason_code == ticket.reason_code,
-                        AggregationAlert.status == "active",
-                    )
-                    .first()
-                )
-                if not existing:
-                    unique_agents = len({t.agent_id for t in similar})
-                    unique_adms = len({t.adm_id for t in similar})
-                    alert = AggregationAlert(
-                        pattern_type="reason",
-                        description=(
-                            f"Pattern detected: {len(similar)} tickets with reason {ticket.reason_code} "
-                            f"in last 30 days from {unique_agents} agents across {unique_adms} ADMs"
-                        ),
-                        affected_agents_count=unique_agents,
-                        affected_adms_count=unique_adms,
-                        bucket=ticket.bucket,
-                        reason_code=ticket.reason_code,
-                        ticket_ids=json.dumps([t.ticket_id for t in similar]),
-                    )
-                    db.add(alert)
-                    db.commit()
-                    logger.info(f"Aggregation alert created for {ticket.reason_code}")
+        with db.begin_nested():
+            return pattern_detector.count(db, tickets)
+    except Exception as e:
+        logger.error(f"Error counting aggregation patterns: {e}")
+        return []
+
+
+def _check_aggregation_patterns(db: Session, tickets: List[FeedbackTicket], patterns: list):
+    """Let the pattern detector raise alerts for the patterns the new tickets touched."""
+    try:
+        pattern_detector.check(db, patterns, tickets[0])
     except Exception as e:
+        db.rollback()
         logger.error(f"Error checking aggregation patterns: {e}")
@@ -0,0 +1,64 @@
+"""
+Inbound webhook routes — agent replies from the WhatsApp Business API.
+
+The POST handler only verifies, parses and queues; classification, the
+Interaction/signal writes and the bot reply happen in services.inbound_router.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from config import settings
+from services.inbound_router import inbound_router, parse_whatsapp_webhook
+
+router = APIRouter(prefix="/webhooks", tags=["Inbound Webhooks"])
+
+
+@router.get("/whatsapp", response_class=PlainTextResponse)
+def verify_whatsapp_webhook(
+    mode: str = Query("", alias="hub.mode"),
+    token: str = Query("", alias="hub.verify_token"),
+    challenge: str = Query("", alias="hub.challenge"),
+):
+    """Subscription handshake: echo the challenge when the verify token matches."""
+    if mode != "subscribe" or not settings.WHATSAPP_VERIFY_TOKEN or not hmac.compare_digest(
+        token, settings.WHATSAPP_VERIFY_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Webhook verification failed")
+    return challenge
+
+
+@router.post("/whatsapp")
+async def receive_whatsapp_webhook(request: Request):
+    """Queue the agent messages in a webhook delivery and acknowledge at once.
+
+    Redelivered messages (same WhatsApp message id) are dropped. Answers
+    503 while the router is not running or its queue is full, so the
+    provider retries the delivery later.
+    """
+    body = await request.body()
+    if settings.WHATSAPP_APP_SECRET:
+        expected = "sha256=" + hmac.new(settings.WHATSAPP_APP_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(request.headers.get("x-hub-signature-256", ""), expected):
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    try:
+        messages = parse_whatsapp_webhook(json.loads(body or b"{}"))
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
+
+    try:
+        queued = inbound_router.enqueue(messages)
+    except (RuntimeError, asyncio.QueueFull) as e:
+        raise HTTPException(status_code=503, detail=str(e) or "Inbound queue is full")
+    return {"received": len(messages), "queued": queued}
+
+
+@router.get("/stats")
+def inbound_stats():
+    """Inbound router counters: received, duplicates, processed, replies, intents."""
+    return inbound_router.stats()
@@ -4,12 +4,15 @@ Interaction logging and management routes.
 
 from datetime import datetime, date as date_type
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from database import get_db
 from models import Interaction, Agent, ADM
+from services.agent_signals import agent_signals, interaction_signal
+from services.engagement import engagement_engine
+from services.pagination import count_total, keyset_page, set_page_headers
 from schemas import InteractionCreate, InteractionUpdate, InteractionResponse
 
 router = APIRouter(prefix="/interactions", tags=["Interactions"])
@@ -17,16 +20,23 @@ router = APIRouter(prefix="/interactions", tags=["Interactions"])
 
 @router.get("/", response_model=List[InteractionResponse])
 def list_interactions(
+    response: Response,
     agent_id: Optional[int] = Query(None),
     adm_id: Optional[int] = Query(None),
     type: Optional[str] = Query(None, description="call|whatsapp|visit|telegram"),
     outcome: Optional[str] = Query(None),
     follow_up_status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    include_total: bool = Query(False, description="Return X-Total-Count"),
+    estimate_total: bool = Query(False, description="Estimated X-Total-Count (PostgreSQL)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
 ):
-    """List interactions with optional filters."""
+    """List interactions with optional filters, newest first.
+
+    Pass the X-Next-Cursor response header back as ``cursor`` for the next page.
+    """
     query = db.query(Interaction)
 
     if agent_id:
@@ -40,7 +50,10 @@ def list_interactions(
     if follow_up_status:
         query = query.filter(Interaction.follow_up_status == follow_up_status)
 
-    return query.order_by(Interaction.created_at.desc()).offset(skip).limit(limit).all()
+    total = count_total(query, include_total, estimate_total)
+    page = keyset_page(query, Interaction.created_at, Interaction.id, limit, cursor, skip)
+    set_page_headers(response, page, total)
+    return page.items
 
 
 @router.get("/overdue")
@@ -106,18 +119,14 @@ def create_interaction(data: InteractionCreate, db: Session = Depends(get_db)):
         interaction.follow_up_status = "pending"
 
     db.add(interaction)
+    db.flush()
 
-    # Update agent state if connected
-    if data.outcome == "connected":
-        if agent.lifecycle_state == "dormant":
-            agent.lifecycle_state = "contacted"
-        agent.last_contact_date = datetime.utcnow().date()
-        # Bump engagement score slightly
-        agent.engagement_score = min(100, agent.engagement_score + 5)
+    # Lifecycle state follows from the signal (dormant -> contacted when connected)
+    agent_signals.append(db, [interaction_signal(interaction)], process=True)
 
-    elif data.outcome == "callback_requested":
+    if data.outcome in ("connected", "callback_requested"):
         agent.last_contact_date = datetime.utcnow().date()
-        agent.engagement_score = min(100, agent.engagement_score + 2)
+    engagement_engine.observe_interactions(db, [interaction])
 
     agent.updated_at = datetime.utcnow()
 
@@ -12,6 +12,7 @@ from sqlalchemy import func
 from database import get_db
 from models import Agent, ADM
 from schemas import OnboardingStart, OnboardingAdvance
+from services.agent_signals import agent_signals, state_change_signal
 
 router = APIRouter(prefix="/onboarding", tags=["Onboarding"])
 
@@ -109,7 +110,10 @@ def advance_onboarding(agent_id: int, data: OnboardingAdvance, db: Session = Dep
 
     if data.new_status == "active":
         agent.onboarding_completed_at = datetime.utcnow()
-        agent.lifecycle_state = "contacted"  # Move to contacted lifecycle state
+        # Move to contacted lifecycle state
+        agent_signals.append(db, [
+            state_change_signal(agent.id, "contacted", "onboarding", "onboarding completed")
+        ], process=True)
 
     db.commit()
     db.refresh(agent)
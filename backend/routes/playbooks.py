@@ -1,15 +1,18 @@
 """
-Playbook routes — expose default playbook definitions and playbook recommendation.
+Playbook routes — expose default playbook definitions, playbook recommendation
+and the playbook runs that execute them.
 """
 
-from typing import Optional
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import Agent
+from models import Agent, PlaybookRun
 from domain.enums import PlaybookActionType
-from domain.playbook_engine import get_default_playbooks, select_playbook_for_agent
+from domain.playbook_engine import PLAYBOOK_REGISTRY, select_playbook_for_agent
+from schemas import PlaybookEnroll, PlaybookRunContextUpdate, PlaybookRunCreate, PlaybookRunResponse
+from services.playbook_runtime import playbook_runtime
 
 router = APIRouter(prefix="/playbooks", tags=["Playbooks"])
 
@@ -59,8 +62,7 @@ def _serialize_playbook(pb: dict) -> dict:
 @router.get("/")
 def list_playbooks():
     """Return all default playbook definitions."""
-    playbooks = get_default_playbooks()
-    return [_serialize_playbook(pb) for pb in playbooks]
+    return [_serialize_playbook(pb) for pb in PLAYBOOK_REGISTRY.playbooks]
 
 
 @router.get("/recommend/{agent_id}")
@@ -108,12 +110,85 @@ def recommend_playbook(
     }
 
 
+# ---------------------------------------------------------------------------
+# Playbook runs
+# ---------------------------------------------------------------------------
+
+def _get_run(db: Session, run_id: int) -> PlaybookRun:
+    run = db.query(PlaybookRun).filter(PlaybookRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail=f"Playbook run {run_id} not found")
+    return run
+
+
+@router.post("/runs", response_model=PlaybookRunResponse, status_code=201)
+def start_playbook_run(data: PlaybookRunCreate, db: Session = Depends(get_db)):
+    """Start an agent on a playbook (the recommended one when no name is given).
+
+    The runtime executes the first step once it falls due.
+    """
+    try:
+        run = playbook_runtime.start_run(db, data.agent_id, data.playbook_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+@router.post("/runs/enroll")
+def enroll_agents(data: PlaybookEnroll, db: Session = Depends(get_db)):
+    """Start many agents on their recommended playbooks in one call.
+
+    Agents that already have an active run are left alone.
+    """
+    report = playbook_runtime.enroll(db, data.agent_ids)
+    db.commit()
+    return {"total_submitted": len(data.agent_ids), **report}
+
+
+@router.get("/runs/agent/{agent_id}", response_model=List[PlaybookRunResponse])
+def list_agent_runs(agent_id: int, db: Session = Depends(get_db)):
+    """An agent's playbook runs, newest first."""
+    return (
+        db.query(PlaybookRun)
+        .filter(PlaybookRun.agent_id == agent_id)
+        .order_by(PlaybookRun.id.desc())
+        .all()
+    )
+
+
+@router.get("/runs/{run_id}", response_model=PlaybookRunResponse)
+def get_playbook_run(run_id: int, db: Session = Depends(get_db)):
+    """A single playbook run."""
+    return _get_run(db, run_id)
+
+
+@router.post("/runs/{run_id}/context", response_model=PlaybookRunResponse)
+def update_run_context(run_id: int, data: PlaybookRunContextUpdate, db: Session = Depends(get_db)):
+    """Record agent responses (agent_replied, quiz_score, ...) for the run's branching rules."""
+    run = playbook_runtime.update_context(db, _get_run(db, run_id), data.updates)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+@router.post("/runs/{run_id}/cancel", response_model=PlaybookRunResponse)
+def cancel_playbook_run(run_id: int, db: Session = Depends(get_db)):
+    """Stop an active run; no further steps are executed."""
+    run = playbook_runtime.cancel(_get_run(db, run_id))
+    db.commit()
+    db.refresh(run)
+    return run
+
+
 @router.get("/{name}")
 def get_playbook(name: str):
     """Return a single playbook by name (case-insensitive match)."""
-    playbooks = get_default_playbooks()
-    for pb in playbooks:
-        if pb["name"].lower() == name.lower():
-            return _serialize_playbook(pb)
+    playbook = PLAYBOOK_REGISTRY.get(name)
+    if playbook:
+        return _serialize_playbook(playbook)
 
     raise HTTPException(status_code=404, detail=f"Playbook '{name}' not found")
@@ -4,42 +4,44 @@ CRUD for insurance products that agents sell.
 """
 
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from database import get_db
 from models import Product
 from schemas import ProductCreate, ProductUpdate, ProductResponse
+from services.reference_data import reference_data, etag_response
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
 @router.get("/", response_model=List[ProductResponse])
 def list_products(
+    request: Request,
     category: Optional[str] = None,
     active_only: bool = True,
     db: Session = Depends(get_db),
 ):
     """List all products, optionally filtered by category."""
-    query = db.query(Product)
-    if category:
-        query = query.filter(Product.category == category)
-    if active_only:
-        query = query.filter(Product.active == True)
-    return query.order_by(Product.category, Product.name).all()
+    products = reference_data.products(db)
+
+    def _build():
+        if active_only:
+            rows = products.active(category)
+        else:
+            rows = [p for p in products.by_id.values() if not category or p.category == category]
+        return [ProductResponse.model_validate(p._asdict()).model_dump(mode="json") for p in rows]
+
+    return etag_response(request, products.version, _build)
 
 
 @router.get("/categories")
-def get_product_categories(db: Session = Depends(get_db)):
+def get_product_categories(request: Request, db: Session = Depends(get_db)):
     """Get product counts by category."""
-    results = (
-        db.query(Product.category, func.count(Product.id))
-        .filter(Product.active == True)
-        .group_by(Product.category)
-        .all()
-    )
-    return {cat: count for cat, count in results}
+    products = reference_data.products(db)
+    return etag_response(request, products.version, lambda: {
+        cat: len(rows) for cat, rows in products.active_by_category.items()
+    })
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
@@ -58,6 +60,7 @@ def create_product(data: ProductCreate, db: Session = Depends(get_db)):
     db.add(product)
     db.commit()
     db.refresh(product)
+    reference_data.invalidate("products")
     return product
 
 
@@ -74,6 +77,7 @@ def update_product(product_id: int, data: ProductUpdate, db: Session = Depends(g
 
     db.commit()
     db.refresh(product)
+    reference_data.invalidate("products")
     return product
 
 
@@ -85,4 +89,5 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     product.active = False
     db.commit()
+    reference_data.invalidate("products")
     return {"message": "Product deactivated"}
@@ -0,0 +1,52 @@
+"""
+Agent signal routes — ingestion of lifecycle events and projection rebuilds.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import AgentSignal
+from schemas import AgentSignalBatch, AgentSignalResponse
+from services.agent_signals import agent_signals
+
+router = APIRouter(prefix="/signals", tags=["Agent Signals"])
+
+
+@router.post("/", status_code=202)
+def ingest_signals(data: AgentSignalBatch, db: Session = Depends(get_db)):
+    """Append a batch of signals (interactions, quiz results, policy sales, onboarding).
+
+    Signals are applied to agent lifecycle state by the background consumer,
+    in order per agent. Re-sending a signal with the same idempotency_key is
+    a no-op, so batches can be retried safely.
+    """
+    report = agent_signals.append(db, [s.model_dump() for s in data.signals])
+    db.commit()
+    return {"total_submitted": len(data.signals), **report}
+
+
+@router.get("/agent/{agent_id}", response_model=List[AgentSignalResponse])
+def list_agent_signals(
+    agent_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """An agent's signal log, newest first."""
+    return (
+        db.query(AgentSignal)
+        .filter(AgentSignal.agent_id == agent_id)
+        .order_by(AgentSignal.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+@router.post("/rebuild")
+def rebuild_projection(
+    agent_id: Optional[int] = Query(None, description="Rebuild one agent (default: all)"),
+    db: Session = Depends(get_db),
+):
+    """Recompute agent lifecycle state by replaying the signal log."""
+    return agent_signals.rebuild(db, [agent_id] if agent_id else None)
@@ -6,20 +6,31 @@ They accept telegram_id (the Telegram user ID) instead of the internal DB adm_id
 and return data in the exact format the bot handlers expect.
 """
 
+import asyncio
 import json
 import logging
 from datetime import date, datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 import hashlib
 
-from database import get_db
-from models import ADM, Agent, User, Interaction, Feedback, DiaryEntry, DailyBriefing, TrainingProgress
+from database import get_db, get_async_db, SessionLocal
+from models import (
+    ADM, Agent, User, Interaction, Feedback, DiaryEntry, DailyBriefing, TrainingProgress,
+    FeedbackTicket,
+)
+from services.agent_signals import agent_signals, interaction_signal
 from services.ai_service import ai_service
+from services.engagement import engagement_engine
+from services.pagination import count_total, keyset_page
+from services.priority_engine import priority_engine
+from services.reference_data import reference_data, etag_response
 
 logger = logging.getLogger(__name__)
 
@@ -184,7 +195,10 @@ def get_adm_profile(telegram_id: int, db: Session = Depends(get_db)):
     adm = _get_adm_by_telegram_id(db, telegram_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
+    return _build_profile(db, adm)
 
+
+def _build_profile(db: Session, adm: ADM) -> dict:
     # Count agents
     total_agents = db.query(func.count(Agent.id)).filter(
         Agent.assigned_adm_id == adm.id
@@ -212,9 +226,15 @@ def get_adm_agents_by_telegram(
     telegram_id: int,
     page: int = Query(1, ge=1),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(False),
     db: Session = Depends(get_db),
 ):
-    """Get agents assigned to this ADM (by telegram_id)."""
+    """Get agents assigned to this ADM (by telegram_id).
+
+    ``page`` is used for display and, without a cursor, as an offset.
+    Without ``include_total``, total_pages only tells whether a next page exists.
+    """
     adm = _get_adm_by_telegram_id(db, telegram_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
@@ -228,17 +248,22 @@ def get_adm_agents_by_telegram(
             (Agent.phone.ilike(f"%{search}%"))
         )
 
-    total = query.count()
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    offset = (page - 1) * per_page
-
-    agents = query.order_by(Agent.engagement_score.desc()).offset(offset).limit(per_page).all()
+    total = count_total(query, include_total)
+    result = keyset_page(
+        query, func.coalesce(Agent.engagement_score, 0.0), Agent.id, per_page,
+        cursor, skip=(page - 1) * per_page,
+    )
+    if total is not None:
+        total_pages = max(1, (total + per_page - 1) // per_page)
+    else:
+        total_pages = page + 1 if result.next_cursor else page
 
     return {
-        "agents": [_agent_to_bot_dict(a) for a in agents],
+        "agents": [_agent_to_bot_dict(a) for a in result.items],
         "page": page,
         "total_pages": total_pages,
         "total": total,
+        "next_cursor": result.next_cursor,
     }
 
 
@@ -256,64 +281,50 @@ def get_priority_agents(
     adm = _get_adm_by_telegram_id(db, telegram_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
+    return _build_priority_agents(db, adm, limit)
+
 
+def _build_priority_agents(db: Session, adm: ADM, limit: int = 5) -> dict:
     today = date.today()
     priority_agents = []
 
-    # 1. Agents with overdue follow-ups
-    overdue_interactions = db.query(Interaction).filter(
-        Interaction.adm_id == adm.id,
-        Interaction.follow_up_date < today,
-        Interaction.follow_up_status == "pending",
-    ).all()
-
+    # 1. Agents with overdue follow-ups (oldest due date first)
+    overdue = (
+        db.query(Agent, func.min(Interaction.follow_up_date))
+        .join(Interaction, Interaction.agent_id == Agent.id)
+        .filter(
+            Interaction.adm_id == adm.id,
+            Interaction.follow_up_date < today,
+            Interaction.follow_up_status == "pending",
+        )
+        .group_by(Agent.id)
+        .order_by(func.min(Interaction.follow_up_date), Agent.id)
+        .limit(limit)
+        .all()
+    )
     seen_ids = set()
-    for ix in overdue_interactions:
-        if ix.agent_id not in seen_ids:
-            agent = db.query(Agent).filter(Agent.id == ix.agent_id).first()
-            if agent:
-                priority_agents.append({
-                    "name": agent.name,
-                    "phone": agent.phone,
-                    "reason": f"Overdue follow-up (due {ix.follow_up_date})",
-                    "agent_code": f"AGT{agent.id:03d}",
-                })
-                seen_ids.add(ix.agent_id)
-
-    # 2. Dormant agents never contacted
-    if len(priority_agents) < limit:
-        dormant = db.query(Agent).filter(
-            Agent.assigned_adm_id == adm.id,
-            Agent.lifecycle_state == "dormant",
-            Agent.last_contact_date.is_(None),
-        ).limit(limit - len(priority_agents)).all()
-
-        for agent in dormant:
-            if agent.id not in seen_ids:
-                priority_agents.append({
-                    "name": agent.name,
-                    "phone": agent.phone,
-                    "reason": f"Dormant {agent.dormancy_duration_days} days - never contacted",
-                    "agent_code": f"AGT{agent.id:03d}",
-                })
-                seen_ids.add(agent.id)
-
-    # 3. At-risk agents
+    for agent, due in overdue:
+        priority_agents.append({
+            "name": agent.name,
+            "phone": agent.phone,
+            "reason": f"Overdue follow-up (due {due})",
+            "agent_code": f"AGT{agent.id:03d}",
+        })
+        seen_ids.add(agent.id)
+
+    # 2. Rest of the list from the ranked portfolio
     if len(priority_agents) < limit:
-        at_risk = db.query(Agent).filter(
-            Agent.assigned_adm_id == adm.id,
-            Agent.lifecycle_state == "at_risk",
-        ).limit(limit - len(priority_agents)).all()
-
-        for agent in at_risk:
-            if agent.id not in seen_ids:
-                priority_agents.append({
-                    "name": agent.name,
-                    "phone": agent.phone,
-                    "reason": f"At risk - {agent.dormancy_reason or 'needs attention'}",
-                    "agent_code": f"AGT{agent.id:03d}",
-                })
-                seen_ids.add(agent.id)
+        ranked = priority_engine.top(db, adm.id, limit - len(priority_agents), exclude=seen_ids)
+        phones = dict(
+            db.query(Agent.id, Agent.phone).filter(Agent.id.in_([p.agent_id for p in ranked])).all()
+        ) if ranked else {}
+        for p in ranked:
+            priority_agents.append({
+                "name": p.agent_name,
+                "phone": phones.get(p.agent_id, "N/A"),
+                "reason": p.one_line_context,
+                "agent_code": f"AGT{p.agent_id:03d}",
+            })
 
     return {"agents": priority_agents[:limit]}
 
@@ -328,42 +339,24 @@ def get_adm_briefing(telegram_id: int, db: Session = Depends(get_db)):
     adm = _get_adm_by_telegram_id(db, telegram_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
+    return _build_briefing(db, adm)
+
 
+def _build_briefing(db: Session, adm: ADM) -> dict:
     today = date.today()
 
     # Priority agents
+    status_icons = {"inactive": "\U0001F534", "at_risk": "\U0001F7E1", "active": "\U0001F7E2"}
     priority_agents = []
-    agents = db.query(Agent).filter(Agent.assigned_adm_id == adm.id).all()
-
-    for agent in agents:
-        status = _lifecycle_to_bot_status(agent.lifecycle_state)
-        reason = ""
-        if agent.lifecycle_state == "dormant":
-            days = agent.dormancy_duration_days or 0
-            sub_reason = (agent.dormancy_reason or "").split(":")[-1].strip() if agent.dormancy_reason else "No recent activity"
-            reason = f"\U0001F534 Dormant {days} days - {sub_reason}"
-        elif agent.lifecycle_state == "at_risk":
-            sub_reason = (agent.dormancy_reason or "").split(":")[-1].strip() if agent.dormancy_reason else "Needs attention"
-            reason = f"\U0001F7E1 At Risk - {sub_reason}"
-        elif agent.lifecycle_state in ("contacted", "engaged"):
-            reason = f"\U0001F7E2 {agent.lifecycle_state.title()} - Active engagement"
-        elif agent.lifecycle_state == "active":
-            reason = f"\U0001F7E2 Active - Keep supporting"
-        else:
-            reason = f"Status: {agent.lifecycle_state}"
-
+    for p in priority_engine.top(db, adm.id, 5):
+        status = _lifecycle_to_bot_status(p.lifecycle_state)
         priority_agents.append({
-            "name": agent.name,
-            "agent_code": f"AGT{agent.id:03d}",
-            "reason": reason,
+            "name": p.agent_name,
+            "agent_code": f"AGT{p.agent_id:03d}",
+            "reason": f"{status_icons[status]} {p.one_line_context}",
             "status": status,
         })
 
-    # Sort: inactive first, then at_risk, then active
-    status_order = {"inactive": 0, "at_risk": 1, "active": 2}
-    priority_agents.sort(key=lambda a: status_order.get(a["status"], 3))
-    priority_agents = priority_agents[:5]
-
     # Overdue follow-ups
     overdue_interactions = db.query(Interaction).filter(
         Interaction.adm_id == adm.id,
@@ -448,7 +441,10 @@ def get_adm_stats(telegram_id: int, db: Session = Depends(get_db)):
     adm = _get_adm_by_telegram_id(db, telegram_id)
     if not adm:
         raise HTTPException(status_code=404, detail="ADM not found")
+    return _build_stats(db, adm)
+
 
+def _build_stats(db: Session, adm: ADM) -> dict:
     today = date.today()
 
     # Agent portfolio
@@ -544,6 +540,84 @@ def get_adm_stats(telegram_id: int, db: Session = Depends(get_db)):
     }
 
 
+# =====================================================================
+# GET /adm/{telegram_id}/home  -  Composite "bot home" payload
+# =====================================================================
+
+_OPEN_TICKET_STATUSES = (
+    "received", "classified", "routed", "pending_dept",
+    "responded", "script_generated", "script_sent",
+)
+
+
+def _build_open_tickets(db: Session, adm: ADM) -> dict:
+    """Open feedback-ticket counts for an ADM, by status."""
+    rows = db.query(FeedbackTicket.status, func.count(FeedbackTicket.id)).filter(
+        FeedbackTicket.adm_id == adm.id,
+        FeedbackTicket.status.in_(_OPEN_TICKET_STATUSES),
+    ).group_by(FeedbackTicket.status).all()
+    by_status = {status: count for status, count in rows}
+    return {
+        "total": sum(by_status.values()),
+        "awaiting_department": sum(
+            by_status.get(s, 0) for s in ("received", "classified", "routed", "pending_dept")
+        ),
+        "awaiting_adm": sum(
+            by_status.get(s, 0) for s in ("responded", "script_generated", "script_sent")
+        ),
+        "by_status": by_status,
+    }
+
+
+_HOME_SECTIONS = {
+    "profile": _build_profile,
+    "stats": _build_stats,
+    "priority_agents": _build_priority_agents,
+    "open_tickets": _build_open_tickets,
+    "briefing": _build_briefing,
+}
+_DEFAULT_HOME_SECTIONS = "profile,stats,priority_agents,open_tickets"
+
+
+def _build_section(builder, adm: ADM) -> dict:
+    """Run one section builder on its own session (sessions aren't thread-safe)."""
+    db = SessionLocal()
+    try:
+        return builder(db, adm)
+    finally:
+        db.close()
+
+
+@router.get("/adm/{telegram_id}/home")
+async def get_adm_home(
+    telegram_id: int,
+    sections: str = Query(_DEFAULT_HOME_SECTIONS, description="Comma-separated: " + ", ".join(_HOME_SECTIONS)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Composite bot payload: several sections for one ADM in a single round trip.
+
+    The ADM is resolved once; each requested section is then computed
+    concurrently in the threadpool. Replaces the profile -> stats (or
+    profile -> briefing) call chains in the bot handlers.
+    """
+    requested = [name.strip() for name in sections.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in _HOME_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+
+    adm = await db.run_sync(_get_adm_by_telegram_id, telegram_id)
+    if not adm:
+        raise HTTPException(status_code=404, detail="ADM not found")
+    # Section builders only read column attributes, so a detached copy is safe
+    db.expunge(adm)
+
+    results = await asyncio.gather(*(
+        run_in_threadpool(_build_section, _HOME_SECTIONS[name], adm)
+        for name in requested
+    ))
+    return {"sections": requested, **dict(zip(requested, results))}
+
+
 # =====================================================================
 # GET /adm/{telegram_id}/diary  -  Diary entries
 # =====================================================================
@@ -793,11 +867,11 @@ def submit_feedback_telegram(data: dict, db: Session = Depends(get_db)):
         )
         db.add(feedback)
 
-    # Update agent contact date
+    # Update agent contact date; lifecycle state follows from the signal
+    db.flush()
+    agent_signals.append(db, [interaction_signal(interaction)], process=True)
     agent.last_contact_date = date.today()
-    if agent.lifecycle_state == "dormant":
-        agent.lifecycle_state = "contacted"
-    agent.engagement_score = min(100, agent.engagement_score + 5)
+    engagement_engine.observe_interactions(db, [interaction])
 
     db.commit()
 
@@ -853,8 +927,10 @@ def log_interaction_telegram(data: dict, db: Session = Depends(get_db)):
     # Update agent
     agent = db.query(Agent).filter(Agent.id == agent_id).first()
     if agent:
+        db.flush()
+        agent_signals.append(db, [interaction_signal(interaction)], process=True)
         agent.last_contact_date = date.today()
-        agent.engagement_score = min(100, agent.engagement_score + 3)
+        engagement_engine.observe_interactions(db, [interaction])
 
     db.commit()
 
@@ -939,10 +1015,8 @@ def get_adm_interactions(
 # =====================================================================
 
 @router.get("/training/categories")
-def get_training_categories(db: Session = Depends(get_db)):
-    """Get training categories from DB products."""
-    from models import Product
-
+def get_training_categories(request: Request, db: Session = Depends(get_db)):
+    """Get training categories from DB products (reference data cache, ETag-aware)."""
     category_labels = {
         "term": "Term Insurance",
         "savings": "Savings Plans",
@@ -953,26 +1027,19 @@ def get_training_categories(db: Session = Depends(get_db)):
         "health": "Health Insurance",
     }
 
-    # Get distinct categories from actual products in DB
-    categories_in_db = db.query(Product.category).filter(
-        Product.active == True
-    ).distinct().all()
-
-    categories = []
-    for (cat,) in categories_in_db:
-        categories.append({
-            "id": cat,
-            "name": category_labels.get(cat, cat.title()),
-        })
-
-    return {"categories": categories}
+    # Categories that have at least one active product
+    products = reference_data.products(db)
+    return etag_response(request, products.version, lambda: {
+        "categories": [
+            {"id": cat, "name": category_labels.get(cat, cat.title())}
+            for cat in products.active_by_category
+        ]
+    })
 
 
 @router.get("/training/categories/{category}/products")
-def get_training_products(category: str, db: Session = Depends(get_db)):
-    """Get products in a training category from DB."""
-    from models import Product
-
+def get_training_products(category: str, request: Request, db: Session = Depends(get_db)):
+    """Get products in a training category (reference data cache, ETag-aware)."""
     category_labels = {
         "term": "Term Insurance",
         "savings": "Savings Plans",
@@ -983,21 +1050,17 @@ def get_training_products(category: str, db: Session = Depends(get_db)):
         "health": "Health Insurance",
     }
 
-    products = db.query(Product).filter(
-        Product.category == category,
-        Product.active == True,
-    ).all()
-
-    return {
+    products = reference_data.products(db)
+    return etag_response(request, products.version, lambda: {
         "products": [
             {
                 "id": str(p.id),
                 "name": p.name,
                 "category": category_labels.get(p.category, p.category.title()),
             }
-            for p in products
+            for p in products.active(category)
         ]
-    }
+    })
 
 
 @router.get("/training/products/{product_id}/summary")
@@ -1112,7 +1175,7 @@ def submit_quiz_telegram(data: dict, db: Session = Depends(get_db)):
 # =====================================================================
 
 @router.post("/ai/ask")
-async def ask_product_question(data: dict, db: Session = Depends(get_db)):
+async def ask_product_question(data: dict):
     """AI-powered product question answering for the bot."""
     question = data.get("question", "")
     telegram_id = data.get("telegram_id")
@@ -44,6 +44,7 @@ class AgentUpdate(BaseModel):
     engagement_score: Optional[float] = None
     license_number: Optional[str] = None
     specialization: Optional[str] = None
+    whatsapp_opted_out_at: Optional[datetime] = None  # null opts the agent back in
 
 
 class AgentResponse(BaseModel):
@@ -61,6 +62,7 @@ class AgentResponse(BaseModel):
     last_policy_sold_date: Optional[date] = None
     assigned_adm_id: Optional[int] = None
     engagement_score: float
+    whatsapp_opted_out_at: Optional[datetime] = None
     license_number: Optional[str] = None
     date_of_joining: Optional[date] = None
     specialization: Optional[str] = None
@@ -626,3 +628,125 @@ class TicketMessageCreate(BaseModel):
     message_type: Optional[str] = "text"  # "text" | "clarification_request" | "photo" | "document" | "voice"
     voice_file_id: Optional[str] = None  # Telegram file_id for voice/photo/document
     metadata_json: Optional[str] = None  # JSON string for extra data (file name, mime type, etc.)
+
+
+# ==================== Agent Signal Schemas ====================
+
+class AgentSignalIn(BaseModel):
+    """One lifecycle signal (see domain.enums.SignalType)."""
+    agent_id: int
+    signal_type: str
+    source: str = "api"  # interaction | quiz | policy_sale | onboarding | api
+    payload: dict = Field(default_factory=dict)
+    idempotency_key: Optional[str] = Field(None, max_length=120)
+    occurred_at: Optional[datetime] = None
+
+
+class AgentSignalBatch(BaseModel):
+    signals: List[AgentSignalIn]
+
+
+class AgentSignalResponse(BaseModel):
+    id: int
+    agent_id: int
+    signal_type: str
+    source: str
+    payload: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    occurred_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+# ==================== Playbook Run Schemas ====================
+
+class PlaybookRunCreate(BaseModel):
+    agent_id: int
+    playbook_name: Optional[str] = None  # default: the agent's recommended playbook
+
+
+class PlaybookEnroll(BaseModel):
+    agent_ids: List[int] = Field(..., max_length=100000)
+
+
+class PlaybookRunContextUpdate(BaseModel):
+    """Agent responses used by branching rules, e.g. {"agent_replied": true, "quiz_score": 80}."""
+    updates: dict
+
+
+class PlaybookRunResponse(BaseModel):
+    id: int
+    agent_id: int
+    playbook_name: str
+    current_step: int
+    status: str
+    next_due_at: Optional[datetime] = None
+    context: Optional[str] = None
+    attempts: int = 0
+    last_error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+# ==================== Campaign Schemas ====================
+
+class CampaignSegment(BaseModel):
+    """Agents a campaign targets; every given field must match."""
+    lifecycle_states: List[str] = []
+    dormancy_reason_category: Optional[str] = None  # e.g. "economic"
+    dormancy_reasons: List[str] = []  # full codes, e.g. "economic.commission_too_low"
+    region: Optional[str] = None  # ADM region prefix, e.g. "West"
+    state: Optional[str] = None
+    location: Optional[str] = None
+    adm_ids: List[int] = []
+    languages: List[str] = []
+    min_engagement: Optional[float] = None
+    max_engagement: Optional[float] = None
+    min_dormancy_days: Optional[int] = None
+
+
+class CampaignCreate(BaseModel):
+    name: str = Field(..., min_length=2, max_length=200)
+    template_name: str
+    channel: str = Field("whatsapp", pattern="^(whatsapp|telegram)$")
+    language: Optional[str] = Field(None, pattern="^(hi|en)$")  # default: each agent's language
+    segment: CampaignSegment = CampaignSegment()
+    params: dict = {}  # template params not taken from the agent, e.g. {"contextual_message": "..."}
+
+
+class CampaignResponse(BaseModel):
+    id: int
+    name: str
+    template_name: str
+    channel: str
+    language: Optional[str] = None
+    segment: Optional[str] = None
+    params: Optional[str] = None
+    status: str
+    total_recipients: int = 0
+    sent_count: int = 0
+    failed_count: int = 0
+    skipped_count: int = 0
+    pending: Optional[int] = None
+    messages_per_second: Optional[float] = None
+    overhead_ms_per_message: Optional[float] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class CampaignRecipientResponse(BaseModel):
+    id: int
+    agent_id: int
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    sent_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
@@ -0,0 +1,406 @@
+"""
+Agent Signals — event-sourced agent lifecycle state.
+
+Every lifecycle-relevant event is appended to ``agent_signals``: an ADM call
+or visit, a quiz result, a policy sale, onboarding, or a manual or sweep
+transition. Agent.lifecycle_state is the projection of that log, i.e. each
+agent's signals folded through ``next_state`` in log (id) order.
+
+  - ``append`` validates a batch and dedupes it on idempotency_key, then
+    inserts it in the caller's transaction. Signals raised by a route are
+    processed immediately (``process=True``) so the response shows the new
+    state. Batches from the ingestion API are left to the consumer.
+  - The consumer polls for unprocessed signals in micro-batches of
+    SIGNAL_CONSUMER_BATCH_SIZE and processes every pending signal of those
+    agents in one transaction:
+      * agent rows are locked (FOR UPDATE on PostgreSQL)
+      * each signal is applied in order
+      * changed agents are updated and their transitions audited
+      * the signals are marked processed with a guarded UPDATE, so a
+        signal is never applied twice
+  - ``rebuild`` recomputes lifecycle_state from the log alone.
+
+The first signal appended for an agent is preceded by a "baseline" signal
+recording its state at that moment, so a replay starts from there.
+Replays use the agent's current engagement_score, because the score is not
+event-sourced.
+
+``next_state`` is ``domain.lifecycle.compute_transition`` adapted to the
+platform's states:
+
+  - LIFECYCLE_STATE_CHANGED sets the state explicitly. Manual, onboarding
+    and sweep changes use it.
+  - The platform's re-engagement states (contacted / engaged / trained)
+    are evaluated as LICENSED, i.e. re-engaged but no sale yet.
+  - A dormant agent re-engaging (FSM: DORMANT -> LICENSED) becomes
+    "contacted", as before.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from itertools import groupby
+from typing import Iterable, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from domain.engagement import quiz_event, quiz_score
+from domain.enums import AgentLifecycleState, SignalType
+from domain.lifecycle import AgentContext, compute_transition
+from models import Agent, AgentLifecycleTransition, AgentSignal, Interaction
+from services.engagement import engagement_engine
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_TYPES = {s.value for s in SignalType}
+
+# Platform states outside the FSM vocabulary, evaluated as LICENSED
+REENGAGED_STATES = {"contacted", "engaged", "trained"}
+
+# Agent.lifecycle_state default, for logs that predate baselines
+INITIAL_STATE = "dormant"
+
+
+class StaleSignalBatch(Exception):
+    """Another transaction processed some of the same signals first."""
+
+
+def next_state(
+    state: str,
+    signal_type: str,
+    payload: dict,
+    total_policies_sold: int = 0,
+    engagement_score: float = 0.0,
+) -> Optional[str]:
+    """New lifecycle state after one signal, or None if it doesn't change."""
+    if signal_type == SignalType.LIFECYCLE_STATE_CHANGED:
+        new = payload.get("new_state")
+        return new if new and new != state else None
+
+    fsm_state = AgentLifecycleState.LICENSED if state in REENGAGED_STATES else state
+    new = compute_transition(fsm_state, signal_type, payload, AgentContext(
+        lifecycle_state=fsm_state,
+        total_policies_sold=total_policies_sold,
+        engagement_score=engagement_score,
+    ))
+    if new == AgentLifecycleState.LICENSED and state == AgentLifecycleState.DORMANT:
+        new = "contacted"
+    new = getattr(new, "value", new)
+    return new if new and new != state else None
+
+
+def interaction_signal(interaction: Interaction) -> dict:
+    """Signal for a logged ADM -> agent interaction (interaction.id must be set)."""
+    outcome = (interaction.outcome or "").upper()
+    if interaction.type == "visit" and outcome == "CONNECTED":
+        signal_type = SignalType.ADM_AGENT_VISIT_LOGGED
+    else:
+        signal_type = SignalType.ADM_AGENT_CALL_LOGGED
+    return {
+        "agent_id": interaction.agent_id,
+        "signal_type": signal_type.value,
+        "source": "interaction",
+        "payload": {"outcome": outcome, "interaction_type": interaction.type},
+        "idempotency_key": f"interaction:{interaction.id}",
+        "occurred_at": interaction.created_at,
+    }
+
+
+def state_change_signal(agent_id: int, new_state: str, source: str, reason: str = "") -> dict:
+    """Explicit state change (manual, onboarding, sweep)."""
+    return {
+        "agent_id": agent_id,
+        "signal_type": SignalType.LIFECYCLE_STATE_CHANGED.value,
+        "source": source,
+        "payload": {"new_state": new_state, "reason": reason} if reason else {"new_state": new_state},
+    }
+
+
+def _payload(signal: AgentSignal) -> dict:
+    try:
+        return json.loads(signal.payload) if signal.payload else {}
+    except ValueError:
+        return {}
+
+
+class AgentSignalLog:
+    """Append-only signal log with a micro-batching consumer."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def _insert_ignoring_duplicates(self, db: Session, rows: list[dict]) -> list[dict]:
+        """Insert rows, skipping keys taken meanwhile; returns the rows that were not inserted."""
+        try:
+            with db.begin_nested():
+                db.execute(insert(AgentSignal), rows)
+            return []
+        except IntegrityError:
+            # A concurrent writer used one of the keys first — isolate it
+            rejected = []
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(AgentSignal), [row])
+                except IntegrityError:
+                    rejected.append(row)
+            return rejected
+
+    def _ensure_baselines(self, db: Session, agent_ids: set, now: datetime) -> None:
+        have = {
+            i for (i,) in db.query(AgentSignal.agent_id)
+            .filter(AgentSignal.agent_id.in_(agent_ids), AgentSignal.source == "baseline")
+        }
+        missing = sorted(agent_ids - have)
+        if not missing:
+            return
+        rows = [
+            {
+                "agent_id": agent_id, "signal_type": SignalType.LIFECYCLE_STATE_CHANGED.value,
+                "source": "baseline", "payload": json.dumps({"new_state": state}),
+                "idempotency_key": f"baseline:{agent_id}",
+                "occurred_at": now, "created_at": now, "processed_at": now,
+            }
+            for agent_id, state in db.query(Agent.id, Agent.lifecycle_state).filter(Agent.id.in_(missing))
+        ]
+        if rows:
+            self._insert_ignoring_duplicates(db, rows)
+
+    def append(self, db: Session, signals: Iterable[dict], process: bool = False,
+               applied: bool = False) -> dict:
+        """Append a batch of signals in the caller's transaction (caller commits).
+
+        ``process`` applies the agents' pending signals right away.
+        ``applied`` records signals whose effect was already written, e.g. by
+        the sweep, so they are logged for replay but not applied again.
+        The report's ``duplicate_keys`` lists the idempotency keys that were
+        already logged, so callers can skip their own side effects too.
+        """
+        signals = list(signals)
+        report = {"accepted": 0, "duplicates": 0, "duplicate_keys": [], "errors": []}
+        keys = [s["idempotency_key"] for s in signals if s.get("idempotency_key")]
+        existing = {
+            k for (k,) in db.query(AgentSignal.idempotency_key).filter(AgentSignal.idempotency_key.in_(keys))
+        } if keys else set()
+        agent_ids = {s["agent_id"] for s in signals}
+        known = {i for (i,) in db.query(Agent.id).filter(Agent.id.in_(agent_ids))} if agent_ids else set()
+
+        now = datetime.utcnow()
+        rows = []
+        for index, s in enumerate(signals):
+            key = s.get("idempotency_key")
+            if s["signal_type"] not in SIGNAL_TYPES:
+                report["errors"].append({"index": index, "error": f"Unknown signal_type '{s['signal_type']}'"})
+                continue
+            if s["agent_id"] not in known:
+                report["errors"].append({"index": index, "error": f"Unknown agent_id {s['agent_id']}"})
+                continue
+            if key and key in existing:
+                report["duplicates"] += 1
+                report["duplicate_keys"].append(key)
+                continue
+            if key:
+                existing.add(key)
+            rows.append({
+                "agent_id": s["agent_id"],
+                "signal_type": s["signal_type"],
+                "source": s.get("source") or "api",
+                "payload": json.dumps(s.get("payload") or {}, default=str),
+                "idempotency_key": key,
+                "occurred_at": s.get("occurred_at") or now,
+                "created_at": now,
+                "processed_at": now if applied else None,
+            })
+
+        if rows:
+            self._ensure_baselines(db, {r["agent_id"] for r in rows}, now)
+            rejected = self._insert_ignoring_duplicates(db, rows)
+            report["accepted"] = len(rows) - len(rejected)
+            report["duplicates"] += len(rejected)
+            report["duplicate_keys"].extend(r["idempotency_key"] for r in rejected)
+            if process and not applied:
+                self.process_agents(db, {r["agent_id"] for r in rows})
+        return report
+
+    # ------------------------------------------------------------------
+    # Projection
+    # ------------------------------------------------------------------
+
+    def process_agents(self, db: Session, agent_ids: Iterable[int]) -> list[dict]:
+        """Apply every pending signal of these agents in log order (caller commits)."""
+        agent_ids = sorted(set(agent_ids))
+        if not agent_ids:
+            return []
+        agents = {
+            a.id: a for a in db.query(Agent).filter(Agent.id.in_(agent_ids))
+            .order_by(Agent.id).with_for_update()
+        }
+        pending = (
+            db.query(AgentSignal)
+            .filter(AgentSignal.agent_id.in_(agent_ids), AgentSignal.processed_at.is_(None))
+            .order_by(AgentSignal.id)
+            .all()
+        )
+        if not pending:
+            return []
+
+        sold = dict(
+            db.query(AgentSignal.agent_id, func.count(AgentSignal.id))
+            .filter(
+                AgentSignal.agent_id.in_(agent_ids),
+                AgentSignal.signal_type == SignalType.POLICY_SOLD.value,
+                AgentSignal.processed_at.isnot(None),
+            )
+            .group_by(AgentSignal.agent_id)
+            .all()
+        )
+        now = datetime.utcnow()
+        transitions = []
+        quizzes = []
+        for signal in pending:
+            agent = agents.get(signal.agent_id)
+            if agent is None:
+                continue
+            payload = _payload(signal)
+            score = quiz_score(signal.signal_type, payload)
+            if score is not None:
+                quizzes.append(quiz_event(agent.id, signal.occurred_at or now, score))
+            new = next_state(
+                agent.lifecycle_state, signal.signal_type, payload,
+                sold.get(agent.id, 0), agent.engagement_score or 0.0,
+            )
+            if signal.signal_type == SignalType.POLICY_SOLD:
+                sold[agent.id] = sold.get(agent.id, 0) + 1
+                sold_on = (signal.occurred_at or now).date()
+                if agent.last_policy_sold_date is None or agent.last_policy_sold_date < sold_on:
+                    agent.last_policy_sold_date = sold_on
+            if new:
+                transitions.append({
+                    "agent_id": agent.id, "from_state": agent.lifecycle_state, "to_state": new,
+                    "source": "signal", "reason": f"{signal.source}:{signal.signal_type}",
+                    "created_at": now,
+                })
+                agent.lifecycle_state = new
+                agent.updated_at = now
+
+        ids = [s.id for s in pending]
+        claimed = db.execute(
+            update(AgentSignal)
+            .where(AgentSignal.id.in_(ids), AgentSignal.processed_at.is_(None))
+            .values(processed_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(ids):
+            raise StaleSignalBatch(f"{len(ids) - claimed} signals already processed")
+        if transitions:
+            db.execute(insert(AgentLifecycleTransition), transitions)
+        # Quiz / training scores feed the engagement score, once per signal like the state
+        engagement_engine.observe(db, quizzes)
+        return transitions
+
+    def rebuild(self, db: Session, agent_ids: Optional[list[int]] = None, chunk_size: int = 500) -> dict:
+        """Recompute lifecycle_state (and last sale date) from processed signals."""
+        stats = {"agents": 0, "changed": 0}
+        last_id = 0
+        while True:
+            query = db.query(Agent).filter(Agent.id > last_id)
+            if agent_ids:
+                query = query.filter(Agent.id.in_(agent_ids))
+            agents = query.order_by(Agent.id).limit(chunk_size).all()
+            if not agents:
+                break
+            last_id = agents[-1].id
+            by_id = {a.id: a for a in agents}
+            signals = (
+                db.query(AgentSignal)
+                .filter(AgentSignal.agent_id.in_(by_id), AgentSignal.processed_at.isnot(None))
+                .order_by(AgentSignal.agent_id, AgentSignal.id)
+                .all()
+            )
+            for agent_id, group in groupby(signals, key=lambda s: s.agent_id):
+                agent = by_id[agent_id]
+                state, sold, last_sold = INITIAL_STATE, 0, None
+                for signal in group:
+                    new = next_state(
+                        state, signal.signal_type, _payload(signal), sold, agent.engagement_score or 0.0
+                    )
+                    if signal.signal_type == SignalType.POLICY_SOLD:
+                        sold += 1
+                        sold_on = signal.occurred_at.date() if signal.occurred_at else None
+                        last_sold = max(filter(None, (last_sold, sold_on)), default=None)
+                    state = new or state
+                stats["agents"] += 1
+                if agent.lifecycle_state != state:
+                    agent.lifecycle_state = state
+                    stats["changed"] += 1
+                if last_sold and agent.last_policy_sold_date != last_sold:
+                    agent.last_policy_sold_date = last_sold
+            db.commit()
+        logger.info(f"Agent projection rebuilt: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # Consumer
+    # ------------------------------------------------------------------
+
+    def process_pending(self) -> int:
+        """Process one micro-batch; returns the number of signals it covered."""
+        db = SessionLocal()
+        try:
+            agent_ids = [
+                i for (i,) in db.query(AgentSignal.agent_id)
+                .filter(AgentSignal.processed_at.is_(None))
+                .order_by(AgentSignal.id)
+                .limit(settings.SIGNAL_CONSUMER_BATCH_SIZE)
+            ]
+            if not agent_ids:
+                return 0
+            transitions = self.process_agents(db, agent_ids)
+            db.commit()
+            if transitions:
+                logger.info(f"Signal consumer: {len(transitions)} lifecycle transitions")
+            return len(agent_ids)
+        except StaleSignalBatch as e:
+            db.rollback()
+            logger.info(f"Signal batch skipped, will retry: {e}")
+            return 0
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Signal consumer step failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            covered = await loop.run_in_executor(None, self.process_pending)
+            # A full batch means there is more waiting — go again immediately
+            if covered < settings.SIGNAL_CONSUMER_BATCH_SIZE:
+                await asyncio.sleep(settings.SIGNAL_CONSUMER_POLL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+agent_signals = AgentSignalLog()
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 
 from models import Agent, ADM, Interaction, DiaryEntry, DailyBriefing, Feedback
+from services.priority_engine import priority_engine
 
 logger = logging.getLogger(__name__)
 
@@ -34,46 +35,43 @@ def generate_daily_briefing(db: Session, adm_id: int, target_date: Optional[date
         raise ValueError(f"ADM with id {adm_id} not found")
 
     # ---- Priority Agents ----
-    # Agents with overdue follow-ups or high engagement drop
+    # Agents with overdue follow-ups, then the ranked portfolio
     priority_agents = []
 
     # Overdue follow-up agents
-    overdue_interactions = db.query(Interaction).filter(
-        Interaction.adm_id == adm_id,
-        Interaction.follow_up_date < today,
-        Interaction.follow_up_status == "pending",
-    ).all()
+    overdue = (
+        db.query(Agent.id, Agent.name, func.min(Interaction.follow_up_date))
+        .join(Interaction, Interaction.agent_id == Agent.id)
+        .filter(
+            Interaction.adm_id == adm_id,
+            Interaction.follow_up_date < today,
+            Interaction.follow_up_status == "pending",
+        )
+        .group_by(Agent.id, Agent.name)
+        .order_by(func.min(Interaction.follow_up_date), Agent.id)
+        .all()
+    )
 
     overdue_agent_ids = set()
-    for interaction in overdue_interactions:
-        if interaction.agent_id not in overdue_agent_ids:
-            agent = db.query(Agent).filter(Agent.id == interaction.agent_id).first()
-            if agent:
-                priority_agents.append({
-                    "agent_id": agent.id,
-                    "agent_name": agent.name,
-                    "reason": "Overdue follow-up",
-                    "details": f"Follow-up was due on {interaction.follow_up_date}",
-                    "priority": "high",
-                })
-                overdue_agent_ids.add(agent.id)
-
-    # Dormant agents assigned but never contacted
-    uncontacted = db.query(Agent).filter(
-        Agent.assigned_adm_id == adm_id,
-        Agent.lifecycle_state == "dormant",
-        Agent.last_contact_date.is_(None),
-    ).limit(5).all()
-
-    for agent in uncontacted:
-        if agent.id not in overdue_agent_ids:
-            priority_agents.append({
-                "agent_id": agent.id,
-                "agent_name": agent.name,
-                "reason": "Never contacted",
-                "details": f"Dormant for {agent.dormancy_duration_days} days, assigned but not yet contacted",
-                "priority": "medium",
-            })
+    for agent_id, agent_name, due in overdue:
+        priority_agents.append({
+            "agent_id": agent_id,
+            "agent_name": agent_name,
+            "reason": "Overdue follow-up",
+            "details": f"Follow-up was due on {due}",
+            "priority": "high",
+        })
+        overdue_agent_ids.add(agent_id)
+
+    # Highest-ranked agents by lifecycle state, contact gap and engagement
+    for p in priority_engine.top(db, adm_id, 5, exclude=overdue_agent_ids):
+        priority_agents.append({
+            "agent_id": p.agent_id,
+            "agent_name": p.agent_name,
+            "reason": p.one_line_context,
+            "details": p.suggested_action,
+            "priority": p.urgency.lower(),
+        })
 
     # Critical feedback agents
     critical_feedbacks = db.query(Feedback).filter(
@@ -0,0 +1,288 @@
+"""
+Bulk Import — set-based ingest of agents and ADMs.
+
+Rows are processed in chunks (BULK_IMPORT_CHUNK_SIZE). For each chunk:
+
+  1. validate every row against the Create schema (AgentCreate / ADMCreate)
+  2. drop phones repeated earlier in the same upload
+  3. drop phones already in the database — one ``IN`` query per chunk
+  4. check foreign keys (an agent's assigned_adm_id) — one ``IN`` query
+  5. insert the survivors with a single executemany, which SQLAlchemy
+     sends as batched multi-row INSERTs on both PostgreSQL and SQLite
+  6. commit, so a large roster never sits in one giant transaction
+
+If the chunk insert still hits a constraint (e.g. a concurrent import of the
+same phone), that chunk is retried row by row inside savepoints so only the
+offending rows are reported.
+
+``stream_rows`` parses a CSV or NDJSON request body incrementally, so an
+upload of any size is processed with bounded memory.
+"""
+
+import codecs
+import csv
+import json
+import logging
+from typing import AsyncIterator, Callable, Iterable, Optional, Type
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import ADM, Agent
+from schemas import ADMCreate, AgentCreate
+
+logger = logging.getLogger(__name__)
+
+# Per-row errors returned to the caller; the total is always reported
+MAX_REPORTED_ERRORS = 1000
+
+
+# ---------------------------------------------------------------------------
+# Streaming parsers
+# ---------------------------------------------------------------------------
+
+def detect_format(request: Request, fmt: Optional[str]) -> str:
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if ("ndjson" in content_type or "jsonl" in content_type) else "csv"
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    return fmt
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    """Decode the request body incrementally and yield complete lines."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def stream_rows(request: Request, fmt: str, chunk_size: int) -> AsyncIterator[list[dict]]:
+    """Yield the body as lists of raw row dicts, ``chunk_size`` rows at a time."""
+    lines = _lines(request)
+    if fmt == "ndjson":
+        batch: list = []
+        async for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                batch.append(json.loads(line))
+            except ValueError as e:
+                batch.append(e)  # reported as a row error
+            if len(batch) >= chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+
+    header: Optional[list[str]] = None
+    buffered: list[str] = []
+    in_quotes = False
+    async for line in lines:
+        buffered.append(line)
+        # A quoted field may contain newlines — only cut between records
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if in_quotes or (len(buffered) < chunk_size and header is not None):
+            continue
+        records = list(csv.reader(buffered))
+        buffered = []
+        if header is None:
+            if not records:
+                continue
+            header = [h.strip() for h in records.pop(0)]
+        rows = [dict(zip(header, r)) for r in records if any(c.strip() for c in r)]
+        if rows:
+            yield rows
+    if buffered and header is not None:
+        rows = [dict(zip(header, r)) for r in csv.reader(buffered) if any(c.strip() for c in r)]
+        if rows:
+            yield rows
+
+
+# ---------------------------------------------------------------------------
+# Importer
+# ---------------------------------------------------------------------------
+
+def _clean(raw: dict) -> dict:
+    """CSV cells are strings: blank means 'not provided' so schema defaults apply."""
+    return {
+        k.strip(): (v.strip() if isinstance(v, str) else v)
+        for k, v in raw.items()
+        if k and not (v is None or (isinstance(v, str) and not v.strip()))
+    }
+
+
+class BulkImporter:
+    """Chunked, set-based importer for one model keyed by phone."""
+
+    def __init__(self, model, schema: Type[BaseModel],
+                 check_refs: Optional[Callable[[Session, list], dict]] = None):
+        self.model = model
+        self.schema = schema
+        self.check_refs = check_refs
+
+    def new_report(self) -> dict:
+        return {"total_submitted": 0, "created": 0, "errors_count": 0, "errors": [], "_seen": set()}
+
+    @staticmethod
+    def _error(report: dict, row: int, error: str, phone: Optional[str] = None) -> None:
+        report["errors_count"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            entry = {"index": row, "error": error}
+            if phone:
+                entry["phone"] = phone
+            report["errors"].append(entry)
+
+    def validate(self, raw_rows: Iterable, start: int, report: dict) -> list[tuple[int, dict]]:
+        """Schema-validate and dedupe within the upload; returns (row, values) pairs."""
+        valid = []
+        for offset, raw in enumerate(raw_rows):
+            row = start + offset
+            report["total_submitted"] += 1
+            if isinstance(raw, Exception):
+                self._error(report, row, f"Invalid JSON: {raw}")
+                continue
+            try:
+                item = raw if isinstance(raw, BaseModel) else self.schema.model_validate(
+                    _clean(raw) if isinstance(raw, dict) else raw
+                )
+            except ValidationError as e:
+                self._error(report, row, "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                ), raw.get("phone") if isinstance(raw, dict) else None)
+                continue
+            values = item.model_dump()
+            if values["phone"] in report["_seen"]:
+                self._error(report, row, "Duplicate phone in upload", values["phone"])
+                continue
+            report["_seen"].add(values["phone"])
+            valid.append((row, values))
+        return valid
+
+    def _filter_existing(self, db: Session, valid: list, report: dict) -> list:
+        phones = [v["phone"] for _, v in valid]
+        existing = {
+            p for (p,) in db.query(self.model.phone).filter(self.model.phone.in_(phones)).all()
+        } if phones else set()
+        kept = []
+        for row, values in valid:
+            if values["phone"] in existing:
+                self._error(report, row, "Duplicate phone", values["phone"])
+            else:
+                kept.append((row, values))
+        if self.check_refs and kept:
+            problems = self.check_refs(db, [v for _, v in kept])
+            for i, (row, values) in enumerate(kept):
+                if i in problems:
+                    self._error(report, row, problems[i], values["phone"])
+            kept = [rv for i, rv in enumerate(kept) if i not in problems]
+        return kept
+
+    def import_chunk(self, db: Session, raw_rows: Iterable, start: int, report: dict) -> None:
+        """Validate, dedupe, insert and commit one chunk."""
+        rows = self._filter_existing(db, self.validate(raw_rows, start, report), report)
+        if not rows:
+            return
+        try:
+            db.execute(insert(self.model), [values for _, values in rows])
+            db.commit()
+            report["created"] += len(rows)
+        except IntegrityError:
+            db.rollback()
+            # Isolate the offending rows
+            for row, values in rows:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(self.model), [values])
+                    report["created"] += 1
+                except IntegrityError as e:
+                    self._error(report, row, f"Constraint violation: {e.orig}", values["phone"])
+            db.commit()
+
+    def import_models(self, db: Session, items: list[BaseModel]) -> tuple[list[dict], dict]:
+        """Import already-validated rows as ORM objects, returning what was created.
+
+        Used by the JSON bulk-import endpoints, which report created IDs.
+        Flushing a batch of same-class objects is itself a multi-row INSERT.
+        """
+        report = self.new_report()
+        created = []
+        chunk_size = settings.BULK_IMPORT_CHUNK_SIZE
+        for start in range(0, len(items), chunk_size):
+            valid = self.validate(items[start:start + chunk_size], start, report)
+            rows = self._filter_existing(db, valid, report)
+            objs = [(row, self.model(**values)) for row, values in rows]
+            try:
+                db.add_all(obj for _, obj in objs)
+                db.flush()
+            except IntegrityError:
+                db.rollback()
+                # Isolate the offending rows, as import_chunk does
+                objs = []
+                for row, values in rows:
+                    obj = self.model(**values)
+                    try:
+                        with db.begin_nested():
+                            db.add(obj)
+                        objs.append((row, obj))
+                    except IntegrityError as e:
+                        self._error(report, row, f"Constraint violation: {e.orig}", values["phone"])
+            # Read IDs before commit expires the objects
+            created.extend({"index": row, "id": obj.id, "name": obj.name} for row, obj in objs)
+            db.commit()
+        report["created"] = len(created)
+        return created, report
+
+    async def import_stream(self, request: Request, fmt: str) -> dict:
+        """Import a CSV / NDJSON request body chunk by chunk."""
+        report = self.new_report()
+        start = 0
+        db = SessionLocal()
+        try:
+            async for raw_rows in stream_rows(request, fmt, settings.BULK_IMPORT_CHUNK_SIZE):
+                await run_in_threadpool(self.import_chunk, db, raw_rows, start, report)
+                start += len(raw_rows)
+        finally:
+            db.close()
+        return public_report(report)
+
+
+def public_report(report: dict) -> dict:
+    result = {k: v for k, v in report.items() if not k.startswith("_")}
+    result["errors_truncated"] = report["errors_count"] > len(report["errors"])
+    return result
+
+
+def _check_agent_refs(db: Session, rows: list[dict]) -> dict:
+    """assigned_adm_id must reference an existing ADM."""
+    adm_ids = {r["assigned_adm_id"] for r in rows if r.get("assigned_adm_id")}
+    if not adm_ids:
+        return {}
+    known = {i for (i,) in db.query(ADM.id).filter(ADM.id.in_(adm_ids)).all()}
+    return {
+        i: f"Unknown assigned_adm_id {r['assigned_adm_id']}"
+        for i, r in enumerate(rows)
+        if r.get("assigned_adm_id") and r["assigned_adm_id"] not in known
+    }
+
+
+agent_importer = BulkImporter(Agent, AgentCreate, check_refs=_check_agent_refs)
+adm_importer = BulkImporter(ADM, ADMCreate)
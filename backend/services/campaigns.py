@@ -0,0 +1,518 @@
+"""
+Campaigns — one WhatsApp template sent to a whole segment of agents.
+
+A campaign names a template, a channel and a segment (e.g. dormant agents
+under West ADMs whose dormancy reason is economic). Launching it copies the
+segment into campaign_recipients with a single INSERT ... SELECT, so the
+audience never passes through Python; WhatsApp campaigns leave out agents
+who have opted out (and skip any who opt out before their turn). From then on each recipient row holds
+its own delivery state: pending, sent, failed or skipped.
+
+The runner works one claimed campaign at a time, in batches of
+CAMPAIGN_BATCH_SIZE:
+
+  1. fetch: the next pending recipients in id order (keyset pagination),
+     joined with the agent and ADM columns the template needs
+  2. render: ``render_many`` per language over the compiled template.
+     Telegram gets the rendered text; WhatsApp gets the approved template
+     and its params, as it requires for business-initiated messages
+  3. send: through one ``channels.session`` for the whole campaign —
+     pooled connections, CHANNEL_SEND_CONCURRENCY in flight and at most
+     CAMPAIGN_SEND_RATE messages per second
+  4. record: every recipient's outcome in one executemany UPDATE, plus the
+     campaign counters and a renewed lease, in one transaction
+
+Progress is durable per batch. A worker that dies (or hits an error) leaves
+its campaign "running" with an expiring lease; the next claim resumes from
+the pending recipients, so at most the batch in flight at the crash is sent
+twice. Pausing or cancelling takes effect at the next batch boundary.
+
+Campaign rows accumulate send_seconds (waiting on the channel APIs) and
+overhead_seconds (fetch, render, write); ``campaign_metrics`` turns them
+into throughput and per-message overhead.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from domain.enums import AgentLifecycleState, DormancyReasonCategory
+from domain.whatsapp_templates import TEMPLATES, get_compiled_template, language_code, render_many
+from models import ADM, Agent, Campaign, CampaignRecipient
+from services.channels import OutboundMessage, SendResult, WhatsAppTemplate, channels
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("whatsapp", "telegram")
+
+# Template params filled per recipient from the agent and ADM rows (a campaign
+# param of the same name is the fallback for adm_name / reason when empty)
+AGENT_PARAMS = frozenset({
+    "agent_name", "adm_name", "location", "lifecycle_state", "dormancy_reason", "reason", "days_in_state",
+})
+
+_RECIPIENT_COLUMNS = (
+    CampaignRecipient.id, CampaignRecipient.agent_id,
+    Agent.name.label("agent_name"), Agent.phone, Agent.language, Agent.location, Agent.lifecycle_state,
+    Agent.dormancy_reason, Agent.dormancy_duration_days, Agent.whatsapp_opted_out_at,
+    ADM.name.label("adm_name"), ADM.telegram_chat_id,
+)
+
+
+class _Job(NamedTuple):
+    """The parts of a claimed campaign the runner needs."""
+    id: int
+    template_name: str
+    channel: str
+    language: Optional[str]
+    params: dict
+
+
+# ---------------------------------------------------------------------------
+# Segments
+# ---------------------------------------------------------------------------
+
+def segment_filters(segment: dict) -> list:
+    """SQL filters on Agent for a segment definition.
+
+    Keys (all optional, combined with AND): lifecycle_states,
+    dormancy_reason_category, dormancy_reasons, region (ADM region prefix,
+    e.g. "West"), state, location, adm_ids, languages, min_engagement,
+    max_engagement, min_dormancy_days.
+    """
+    filters = []
+    for key, value in segment.items():
+        if value is None or value == []:
+            continue
+        if key == "lifecycle_states":
+            unknown = set(value) - {s.value for s in AgentLifecycleState}
+            if unknown:
+                raise ValueError(f"Unknown lifecycle states: {', '.join(sorted(unknown))}")
+            filters.append(Agent.lifecycle_state.in_(value))
+        elif key == "dormancy_reason_category":
+            if value not in {c.value for c in DormancyReasonCategory}:
+                raise ValueError(f"Unknown dormancy reason category '{value}'")
+            filters.append(Agent.dormancy_reason.like(f"{value}.%"))
+        elif key == "dormancy_reasons":
+            filters.append(Agent.dormancy_reason.in_(value))
+        elif key == "region":
+            filters.append(Agent.assigned_adm_id.in_(select(ADM.id).where(ADM.region.ilike(f"{value}%"))))
+        elif key == "state":
+            filters.append(func.lower(Agent.state) == value.lower())
+        elif key == "location":
+            filters.append(func.lower(Agent.location) == value.lower())
+        elif key == "adm_ids":
+            filters.append(Agent.assigned_adm_id.in_(value))
+        elif key == "languages":
+            filters.append(Agent.language.in_(value))
+        elif key == "min_engagement":
+            filters.append(Agent.engagement_score >= value)
+        elif key == "max_engagement":
+            filters.append(Agent.engagement_score <= value)
+        elif key == "min_dormancy_days":
+            filters.append(Agent.dormancy_duration_days >= value)
+        else:
+            raise ValueError(f"Unknown segment field '{key}'")
+    return filters
+
+
+def campaign_metrics(campaign: Campaign) -> dict:
+    """Throughput and per-message overhead from a campaign's counters."""
+    processed = (campaign.sent_count or 0) + (campaign.failed_count or 0) + (campaign.skipped_count or 0)
+    elapsed = (campaign.send_seconds or 0.0) + (campaign.overhead_seconds or 0.0)
+    return {
+        "pending": max((campaign.total_recipients or 0) - processed, 0),
+        "messages_per_second": round(processed / elapsed, 1) if elapsed else None,
+        "overhead_ms_per_message": (
+            round(1000 * (campaign.overhead_seconds or 0.0) / processed, 3) if processed else None
+        ),
+    }
+
+
+class CampaignEngine:
+    """Creates campaigns and delivers their messages in resumable batches."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Creating and steering campaigns
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def create(db: Session, name: str, template_name: str, channel: str = "whatsapp",
+               language: Optional[str] = None, segment: Optional[dict] = None,
+               params: Optional[dict] = None) -> Campaign:
+        """Validate and store a draft campaign."""
+        template = TEMPLATES.get(template_name)
+        if template is None:
+            raise ValueError(f"Template '{template_name}' not found")
+        if channel not in CHANNELS:
+            raise ValueError(f"Unknown channel '{channel}'")
+        segment, params = segment or {}, params or {}
+        segment_filters(segment)
+        missing = template.params - AGENT_PARAMS - params.keys()
+        if missing:
+            raise ValueError(f"Template '{template_name}' needs params: {', '.join(sorted(missing))}")
+        campaign = Campaign(
+            name=name, template_name=template_name, channel=channel, language=language,
+            segment=json.dumps(segment), params=json.dumps(params, default=str), status="draft",
+        )
+        db.add(campaign)
+        db.flush()
+        return campaign
+
+    @staticmethod
+    def audience_size(db: Session, segment: dict) -> int:
+        """Number of agents a segment currently matches."""
+        return db.execute(select(func.count(Agent.id)).where(*segment_filters(segment))).scalar() or 0
+
+    @staticmethod
+    def launch(db: Session, campaign: Campaign) -> Campaign:
+        """Snapshot the segment into recipients and hand the campaign to the runner."""
+        if campaign.status != "draft":
+            raise LookupError(f"Campaign {campaign.id} is already {campaign.status}")
+        filters = segment_filters(json.loads(campaign.segment or "{}"))
+        if campaign.channel == "whatsapp":
+            filters.append(Agent.whatsapp_opted_out_at.is_(None))
+        db.execute(
+            insert(CampaignRecipient).from_select(
+                ["campaign_id", "agent_id", "status", "attempts"],
+                select(literal(campaign.id), Agent.id, literal("pending"), literal(0)).where(*filters),
+            )
+        )
+        campaign.total_recipients = db.execute(
+            select(func.count(CampaignRecipient.id)).where(CampaignRecipient.campaign_id == campaign.id)
+        ).scalar()
+        campaign.status = "running"
+        campaign.started_at = datetime.utcnow()
+        return campaign
+
+    @staticmethod
+    def pause(campaign: Campaign) -> Campaign:
+        if campaign.status != "running":
+            raise LookupError(f"Campaign {campaign.id} is {campaign.status}, not running")
+        campaign.status = "paused"
+        return campaign
+
+    @staticmethod
+    def resume(campaign: Campaign) -> Campaign:
+        if campaign.status != "paused":
+            raise LookupError(f"Campaign {campaign.id} is {campaign.status}, not paused")
+        campaign.status = "running"
+        campaign.claimed_until = None
+        return campaign
+
+    @staticmethod
+    def cancel(campaign: Campaign) -> Campaign:
+        """Stop a campaign; recipients not yet messaged stay pending and are never sent."""
+        if campaign.status in ("completed", "cancelled"):
+            raise LookupError(f"Campaign {campaign.id} is already {campaign.status}")
+        campaign.status = "cancelled"
+        campaign.claimed_until = None
+        campaign.completed_at = datetime.utcnow()
+        return campaign
+
+    @staticmethod
+    def retry_failed(db: Session, campaign: Campaign) -> int:
+        """Queue a campaign's failed recipients again; returns how many."""
+        if campaign.status in ("draft", "cancelled"):
+            raise LookupError(f"Campaign {campaign.id} is {campaign.status}")
+        retried = db.execute(
+            update(CampaignRecipient)
+            .where(CampaignRecipient.campaign_id == campaign.id, CampaignRecipient.status == "failed")
+            .values(status="pending")
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if retried:
+            campaign.failed_count = max((campaign.failed_count or 0) - retried, 0)
+            if campaign.status == "completed":
+                campaign.status = "running"
+                campaign.completed_at = None
+                campaign.claimed_until = None
+        return retried
+
+    # ------------------------------------------------------------------
+    # Runner: claim -> (fetch -> render -> send -> record)*
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _lease() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.CAMPAIGN_LEASE_SECONDS)
+
+    def _claim(self) -> tuple[Optional[_Job], Optional[datetime]]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            claimable = (
+                Campaign.status == "running",
+                or_(Campaign.claimed_until.is_(None), Campaign.claimed_until < now),
+            )
+            stmt = select(Campaign.id).where(*claimable).order_by(Campaign.id).limit(1)
+            if settings.is_postgres:
+                stmt = stmt.with_for_update(skip_locked=True)
+            campaign_id = db.execute(stmt).scalar()
+            if campaign_id is None:
+                return None, None
+            lease = self._lease()
+            claimed = db.execute(
+                update(Campaign)
+                .where(Campaign.id == campaign_id, *claimable)
+                .values(claimed_until=lease)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                db.rollback()
+                return None, None
+            row = db.execute(
+                select(Campaign.template_name, Campaign.channel, Campaign.language, Campaign.params)
+                .where(Campaign.id == campaign_id)
+            ).one()
+            db.commit()
+            job = _Job(campaign_id, row.template_name, row.channel, row.language, json.loads(row.params or "{}"))
+            return job, lease
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fetch(campaign_id: int, after_id: int) -> list:
+        db = SessionLocal()
+        try:
+            return db.execute(
+                select(*_RECIPIENT_COLUMNS)
+                .join(Agent, Agent.id == CampaignRecipient.agent_id)
+                .outerjoin(ADM, ADM.id == Agent.assigned_adm_id)
+                .where(
+                    CampaignRecipient.campaign_id == campaign_id,
+                    CampaignRecipient.status == "pending",
+                    CampaignRecipient.id > after_id,
+                )
+                .order_by(CampaignRecipient.id)
+                .limit(settings.CAMPAIGN_BATCH_SIZE)
+            ).all()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _render(job: _Job, rows: list) -> list[OutboundMessage]:
+        by_language: dict[str, list[int]] = {}
+        params = []
+        for i, row in enumerate(rows):
+            values = dict(job.params)
+            values.update(
+                agent_name=row.agent_name or "",
+                adm_name=row.adm_name or values.get("adm_name", "your ADM"),
+                location=row.location or "",
+                lifecycle_state=row.lifecycle_state or "",
+                dormancy_reason=row.dormancy_reason or "",
+                reason=row.dormancy_reason or values.get("reason", ""),
+                days_in_state=row.dormancy_duration_days or 0,
+            )
+            params.append(values)
+            by_language.setdefault(job.language or language_code(row.language), []).append(i)
+
+        texts: list[str] = [""] * len(rows)
+        templates: list[Optional[WhatsAppTemplate]] = [None] * len(rows)
+        for language, indexes in by_language.items():
+            rendered = render_many(job.template_name, language, [params[i] for i in indexes])
+            # Outside a reply window WhatsApp only delivers the approved template
+            variant = language if language in TEMPLATES[job.template_name].variants else "hi"
+            positional = get_compiled_template(job.template_name, variant).positional
+            for i, text in zip(indexes, rendered):
+                texts[i] = text
+                # WhatsApp rejects empty parameters
+                templates[i] = WhatsAppTemplate(
+                    job.template_name, variant, tuple(str(params[i][k]) or "-" for k in positional),
+                )
+
+        if job.channel == "telegram":
+            return [OutboundMessage("telegram", row.telegram_chat_id, text) for row, text in zip(rows, texts)]
+        # No recipient for agents who opted out after launch: they are skipped
+        return [
+            OutboundMessage("whatsapp", None if row.whatsapp_opted_out_at else row.phone, text, template)
+            for row, text, template in zip(rows, texts, templates)
+        ]
+
+    def _record(self, job: _Job, lease: datetime, rows: list, results: list[SendResult],
+                send_seconds: float, overhead_seconds: float) -> Optional[datetime]:
+        """Store a batch's outcomes; returns the renewed lease, or None to stop."""
+        now = datetime.utcnow()
+        counts = {"sent": 0, "failed": 0, "skipped": 0}
+        params = []
+        for row, result in zip(rows, results):
+            counts[result.status] += 1
+            params.append({
+                "b_id": row.id, "b_status": result.status,
+                "b_error": result.error[:300] if result.error else None,
+                "b_sent_at": now if result.status == "sent" else None,
+            })
+        recipients = CampaignRecipient.__table__
+        new_lease = self._lease()
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(recipients)
+                .where(recipients.c.id == bindparam("b_id"))
+                .values(
+                    status=bindparam("b_status"), error=bindparam("b_error"),
+                    sent_at=bindparam("b_sent_at"), attempts=recipients.c.attempts + 1,
+                ),
+                params,
+            )
+            db.execute(
+                update(Campaign)
+                .where(Campaign.id == job.id)
+                .values(
+                    sent_count=Campaign.sent_count + counts["sent"],
+                    failed_count=Campaign.failed_count + counts["failed"],
+                    skipped_count=Campaign.skipped_count + counts["skipped"],
+                    send_seconds=Campaign.send_seconds + send_seconds,
+                    overhead_seconds=Campaign.overhead_seconds + overhead_seconds,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            # Paused, cancelled or reclaimed campaigns stop here
+            renewed = db.execute(
+                update(Campaign)
+                .where(Campaign.id == job.id, Campaign.claimed_until == lease, Campaign.status == "running")
+                .values(claimed_until=new_lease)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return new_lease if renewed else None
+
+    @staticmethod
+    def _finish(job: _Job, lease: datetime, overhead_seconds: float) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Campaign)
+                .where(Campaign.id == job.id, Campaign.claimed_until == lease, Campaign.status == "running")
+                .values(
+                    status="completed", completed_at=datetime.utcnow(), claimed_until=None,
+                    overhead_seconds=Campaign.overhead_seconds + overhead_seconds,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _note_error(job: _Job, error: str) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Campaign)
+                .where(Campaign.id == job.id)
+                .values(last_error=error[:300])
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def deliver(self, job: _Job, lease: datetime) -> dict:
+        """Send a claimed campaign's pending recipients until done, paused or cancelled."""
+        loop = asyncio.get_running_loop()
+        stats = {"messages": 0, "batches": 0}
+        started = time.perf_counter()
+        after_id, write_seconds = 0, 0.0
+        async with channels.session(rate=settings.CAMPAIGN_SEND_RATE or None) as session:
+            while lease is not None:
+                t0 = time.perf_counter()
+                rows = await loop.run_in_executor(None, self._fetch, job.id, after_id)
+                if not rows and after_id:
+                    # Rescan once from the start: retry_failed may have re-queued earlier rows
+                    after_id = 0
+                    continue
+                if not rows:
+                    await loop.run_in_executor(
+                        None, self._finish, job, lease, write_seconds + time.perf_counter() - t0,
+                    )
+                    break
+                after_id = rows[-1].id
+                messages = self._render(job, rows)
+                t1 = time.perf_counter()
+                results = await session.send_many(messages)
+                t2 = time.perf_counter()
+                # A batch's own write time is charged to the next batch (or the finish)
+                lease = await loop.run_in_executor(
+                    None, self._record, job, lease, rows, results, t2 - t1, write_seconds + (t1 - t0),
+                )
+                write_seconds = time.perf_counter() - t2
+                stats["messages"] += len(rows)
+                stats["batches"] += 1
+
+        elapsed = time.perf_counter() - started
+        if stats["messages"]:
+            logger.info(
+                f"Campaign {job.id}: {stats['messages']} messages in {elapsed:.1f}s "
+                f"({stats['messages'] / elapsed:.0f}/s)"
+                + ("" if lease else " — stopped (paused, cancelled or lease lost)")
+            )
+        return {**stats, "seconds": round(elapsed, 3), "stopped": lease is None}
+
+    async def run_next(self) -> bool:
+        """Claim one running campaign and deliver it; False when none is waiting."""
+        loop = asyncio.get_running_loop()
+        job, lease = await loop.run_in_executor(None, self._claim)
+        if job is None:
+            return False
+        try:
+            await self.deliver(job, lease)
+        except Exception as e:
+            # The lease is left to expire, which spaces out the retries
+            logger.error(f"Campaign {job.id} failed mid-run, resuming after its lease: {e}")
+            await loop.run_in_executor(None, self._note_error, job, str(e))
+        return True
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    async def run(self) -> None:
+        while True:
+            try:
+                claimed = await self.run_next()
+            except Exception as e:
+                logger.error(f"Campaign runner step failed: {e}")
+                claimed = False
+            if not claimed:
+                await asyncio.sleep(settings.CAMPAIGN_POLL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+campaign_engine = CampaignEngine()
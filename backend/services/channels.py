@@ -0,0 +1,225 @@
+"""
+Channel Senders — outbound WhatsApp and Telegram delivery.
+
+Playbook steps and other automated outreach hand their messages to
+``channels.send_many``, which delivers a whole batch over one pooled HTTP
+client with at most CHANNEL_SEND_CONCURRENCY requests in flight:
+
+  - whatsapp: WhatsApp Business Cloud API message to the agent's phone
+    (needs ENABLE_WHATSAPP, WHATSAPP_API_URL, WHATSAPP_API_TOKEN and
+    WHATSAPP_PHONE_NUMBER_ID). A message that carries a ``WhatsAppTemplate``
+    goes out as that approved template with its body parameters; WhatsApp
+    only delivers business-initiated messages (campaigns, playbook steps)
+    that way. Plain text is for replies inside the 24-hour window the
+    agent's own message opens (the inbound router).
+  - telegram: Bot API sendMessage to a chat id, e.g. an ADM's
+    telegram_chat_id (needs TELEGRAM_BOT_TOKEN)
+
+Each message gets a status back: "sent", "skipped" (channel not configured
+or no recipient; demo deployments run without either) or "failed" with the
+error, so callers can retry only what actually failed.
+
+Long-running senders (campaigns) open a ``channels.session(rate=...)``
+instead: clients and connections reused across batches, with an optional
+token-bucket limit on messages per second. A session spreads its
+concurrency over several small clients rather than one big pool: httpcore
+checks every pooled connection on each request, so per-request overhead
+grows with the pool (50 connections on one client sent ~3x fewer messages
+per second against the stub than 10 clients of 5). Both API base URLs are
+settings, so a local stub server (benchmarks/channel_stub.py) can stand in
+for WhatsApp and Telegram.
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import re
+from typing import NamedTuple, Optional
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SEND_TIMEOUT_SECONDS = 15
+
+# Connections per pooled client in a session (see the module docstring)
+CONNECTIONS_PER_CLIENT = 5
+
+
+class WhatsAppTemplate(NamedTuple):
+    name: str  # approved template name
+    language: str  # hi | en
+    params: tuple[str, ...] = ()  # body parameters {{1}}, {{2}}, ...
+
+
+class OutboundMessage(NamedTuple):
+    channel: str  # whatsapp | telegram
+    recipient: Optional[str]  # phone number or Telegram chat id
+    text: str
+    template: Optional[WhatsAppTemplate] = None  # whatsapp: send as this template instead of text
+
+
+class SendResult(NamedTuple):
+    status: str  # sent | skipped | failed
+    error: Optional[str] = None
+
+
+def _whatsapp_number(phone: str) -> str:
+    """Digits only, with India's country code added to bare 10-digit numbers."""
+    digits = re.sub(r"\D", "", phone)
+    return f"91{digits}" if len(digits) == 10 else digits
+
+
+def _whatsapp_payload(message: OutboundMessage) -> dict:
+    payload = {"messaging_product": "whatsapp", "to": _whatsapp_number(message.recipient)}
+    template = message.template
+    if template is None:
+        payload.update(type="text", text={"body": message.text})
+        return payload
+    body = {"name": template.name, "language": {"code": template.language}}
+    if template.params:
+        body["components"] = [{
+            "type": "body",
+            "parameters": [{"type": "text", "text": value} for value in template.params],
+        }]
+    payload.update(type="template", template=body)
+    return payload
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` acquisitions per second, bursting up to ``burst``."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self._updated is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                # Waiters queue on the lock, so tokens are handed out in order
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._updated = loop.time()
+                self._tokens = 1.0
+            self._tokens -= 1
+
+
+class ChannelSession:
+    """Pooled clients, concurrency gates and an optional rate limit shared by many batches."""
+
+    def __init__(self, senders: "ChannelSenders", concurrency: int, rate: Optional[float]):
+        self._senders = senders
+        self._concurrency = concurrency
+        self._limiter = RateLimiter(rate) if rate else None
+        self._shards: list[tuple[httpx.AsyncClient, asyncio.Semaphore]] = []
+        self._next = itertools.count()
+
+    async def __aenter__(self) -> "ChannelSession":
+        shards = max(1, math.ceil(self._concurrency / CONNECTIONS_PER_CLIENT))
+        size = math.ceil(self._concurrency / shards)
+        self._shards = [
+            (
+                httpx.AsyncClient(
+                    timeout=SEND_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+                ),
+                asyncio.Semaphore(size),
+            )
+            for _ in range(shards)
+        ]
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await asyncio.gather(*(client.aclose() for client, _ in self._shards))
+
+    async def send_many(self, messages: list[OutboundMessage]) -> list[SendResult]:
+        """Send a batch concurrently; results are in the same order as ``messages``."""
+        if not messages:
+            return []
+        shards = self._shards
+        results = await asyncio.gather(*(
+            self._senders._send(*shards[next(self._next) % len(shards)], m, self._limiter) for m in messages
+        ))
+        failed = sum(1 for r in results if r.status == "failed")
+        if failed:
+            logger.warning(f"Channel send: {failed}/{len(messages)} messages failed")
+        return list(results)
+
+
+class ChannelSenders:
+    """Delivers batches of outbound messages over WhatsApp and Telegram."""
+
+    @property
+    def whatsapp_enabled(self) -> bool:
+        return bool(
+            settings.ENABLE_WHATSAPP and settings.WHATSAPP_API_URL
+            and settings.WHATSAPP_API_TOKEN and settings.WHATSAPP_PHONE_NUMBER_ID
+        )
+
+    @property
+    def telegram_enabled(self) -> bool:
+        return bool(settings.TELEGRAM_BOT_TOKEN)
+
+    async def _send_whatsapp(self, client: httpx.AsyncClient, message: OutboundMessage) -> SendResult:
+        if not self.whatsapp_enabled:
+            return SendResult("skipped", "whatsapp not configured")
+        url = f"{settings.WHATSAPP_API_URL.rstrip('/')}/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
+        resp = await client.post(
+            url,
+            headers={"Authorization": f"Bearer {settings.WHATSAPP_API_TOKEN}"},
+            json=_whatsapp_payload(message),
+        )
+        if resp.status_code >= 300:
+            return SendResult("failed", f"whatsapp {resp.status_code}: {resp.text[:200]}")
+        return SendResult("sent")
+
+    async def _send_telegram(self, client: httpx.AsyncClient, message: OutboundMessage) -> SendResult:
+        if not self.telegram_enabled:
+            return SendResult("skipped", "telegram not configured")
+        resp = await client.post(
+            f"{settings.TELEGRAM_API_URL.rstrip('/')}/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage",
+            json={"chat_id": message.recipient, "text": message.text},
+        )
+        if resp.status_code != 200:
+            return SendResult("failed", f"telegram {resp.status_code}: {resp.text[:200]}")
+        return SendResult("sent")
+
+    async def _send(self, client: httpx.AsyncClient, gate: asyncio.Semaphore,
+                    message: OutboundMessage, limiter: Optional[RateLimiter] = None) -> SendResult:
+        if not message.recipient:
+            return SendResult("skipped", f"no {message.channel} recipient")
+        sender = {"whatsapp": self._send_whatsapp, "telegram": self._send_telegram}.get(message.channel)
+        if sender is None:
+            return SendResult("failed", f"unknown channel '{message.channel}'")
+        async with gate:
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                return await sender(client, message)
+            except httpx.HTTPError as e:
+                return SendResult("failed", f"{message.channel}: {e.__class__.__name__}: {e}"[:300])
+
+    def session(self, rate: Optional[float] = None, concurrency: Optional[int] = None) -> ChannelSession:
+        """A reusable sending session: ``async with channels.session(rate=80) as s``."""
+        return ChannelSession(self, concurrency or settings.CHANNEL_SEND_CONCURRENCY, rate)
+
+    async def send_many(self, messages: list[OutboundMessage]) -> list[SendResult]:
+        """Send a batch concurrently; results are in the same order as ``messages``."""
+        if not messages:
+            return []
+        async with self.session() as session:
+            return await session.send_many(messages)
+
+
+# Singleton instance
+channels = ChannelSenders()
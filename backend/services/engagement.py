@@ -0,0 +1,485 @@
+"""
+Engagement Engine — Agent.engagement_score from decayed activity counters.
+
+The score and its counters are defined in ``domain.engagement``. Each agent
+with any scored activity has an ``agent_engagement`` row holding its
+counters, and the engine keeps those rows and Agent.engagement_score up to
+date:
+
+  - ``observe`` folds events in as they happen, O(1) per event, in the
+    caller's transaction: interactions where they are logged (API, Telegram
+    bot, inbound WhatsApp), feedback tickets when they are raised, and quiz
+    / training scores when the signal consumer applies them. The agent rows
+    are locked, so concurrent writers don't lose updates.
+  - ``refresh`` re-decays every stored row to now and writes the scores
+    that moved. Scores drift as time passes without events, so the nightly
+    lifecycle sweep runs it first, and the sweep's engagement rule sees
+    current scores.
+  - ``rebuild`` recomputes every row from the source tables (interactions,
+    training signals, root feedback tickets). It is the backfill, and it
+    runs on first start when agent_engagement is empty. Counters are summed
+    straight to their value at now, ``sum(w * 0.5 ** (age / half_life))``,
+    so event order does not matter. With NumPy each chunk of rows becomes
+    column arrays and one ``bincount`` per counter. Without NumPy every
+    row goes through ``domain.engagement.apply_event``, which is the
+    reference the vectorised path must match.
+
+Agents with no scored activity keep whatever engagement_score they have
+(seed data or manual edits) until their first event.
+
+Run by hand with ``python -m services.engagement [--rebuild]``.
+"""
+
+import argparse
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from domain.engagement import (
+    CONNECTED_OUTCOMES, COUNTERS, FREQUENCY_SCALE, NEUTRAL, QUIZ_PRIOR, QUIZ_SIGNALS, SECONDS_PER_DAY,
+    TICKET_PENALTY, TICKET_SCALE, WEIGHTS, EngagementCounters, EngagementEvent, apply_event,
+    decay_factor, engagement_score, interaction_event, quiz_event, quiz_score, score_components,
+)
+from models import Agent, AgentEngagement, AgentSignal, FeedbackTicket, Interaction
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE ... CASE statement (keeps bind parameters well under limits)
+UPDATE_BATCH_SIZE = 1000
+
+# Scores that moved less than this are not rewritten by refresh
+_SCORE_EPSILON = 0.05
+
+_EPOCH = datetime(1970, 1, 1)
+
+_ROW_COLUMNS = (
+    AgentEngagement.agent_id, *(getattr(AgentEngagement, name) for name in COUNTERS),
+    AgentEngagement.as_of, AgentEngagement.last_active_at,
+)
+
+
+def _epoch_seconds(value: datetime) -> float:
+    return (value - _EPOCH).total_seconds()
+
+
+# ---------------------------------------------------------------------------
+# Scoring rows: (agent_id, *COUNTERS, as_of, last_active_at) -> score
+# ---------------------------------------------------------------------------
+
+def _scores_python(rows: list, now: datetime) -> list[float]:
+    half_life, recency = settings.ENGAGEMENT_HALF_LIFE_DAYS, settings.ENGAGEMENT_RECENCY_HALF_LIFE_DAYS
+    scores = []
+    for row in rows:
+        counters = EngagementCounters(row[-2], *row[1:-2], last_active_at=row[-1])
+        scores.append(engagement_score(counters, now, half_life, recency))
+    return scores
+
+
+def _scores_numpy(rows: list, now: datetime) -> list[float]:
+    n = len(rows)
+    now_s = _epoch_seconds(now)
+    as_of = np.fromiter((_epoch_seconds(r[-2]) for r in rows), dtype=np.float64, count=n)
+    active = np.fromiter(
+        (_epoch_seconds(r[-1]) if r[-1] else np.nan for r in rows), dtype=np.float64, count=n,
+    )
+    keep = np.exp2(-np.maximum(now_s - as_of, 0) / SECONDS_PER_DAY / settings.ENGAGEMENT_HALF_LIFE_DAYS)
+    contacts, connected, sentiment_sum, sentiment_n, quiz_sum, quiz_n, tickets = (
+        np.fromiter((r[i] or 0.0 for r in rows), dtype=np.float64, count=n) * keep
+        for i in range(1, len(COUNTERS) + 1)
+    )
+    idle_days = np.maximum(now_s - active, 0) / SECONDS_PER_DAY
+    recency = np.where(
+        np.isnan(active), 0.0, np.exp2(-idle_days / settings.ENGAGEMENT_RECENCY_HALF_LIFE_DAYS),
+    )
+    blend = (
+        WEIGHTS["recency"] * (NEUTRAL + (1.0 - NEUTRAL) * recency)
+        + WEIGHTS["frequency"] * (NEUTRAL + (1.0 - NEUTRAL) * (1.0 - np.exp(-connected / FREQUENCY_SCALE)))
+        + WEIGHTS["outcome"] * (connected + 1.0) / (contacts + 2.0)
+        + WEIGHTS["sentiment"] * (1.0 + sentiment_sum / (sentiment_n + 1.0)) / 2.0
+        + WEIGHTS["quiz"] * (quiz_sum + QUIZ_PRIOR) / (quiz_n + 1.0) / 100.0
+    )
+    multiplier = 1.0 - TICKET_PENALTY * (1.0 - np.exp(-tickets / TICKET_SCALE))
+    return np.round(100.0 * blend * multiplier, 1).tolist()
+
+
+def score_rows(rows: list, now: Optional[datetime] = None) -> list[float]:
+    """Engagement score of each (agent_id, *COUNTERS, as_of, last_active_at) row at ``now``."""
+    now = now or datetime.utcnow()
+    if np is not None and rows:
+        return _scores_numpy(rows, now)
+    return _scores_python(rows, now)
+
+
+# ---------------------------------------------------------------------------
+# Full recompute: counters of every agent summed to their value at ``now``
+# ---------------------------------------------------------------------------
+
+class _PythonTotals:
+    """Reference accumulator: every event through apply_event."""
+
+    def __init__(self, now: datetime):
+        self.now = now
+        self.counters: dict[int, EngagementCounters] = {}
+
+    def add(self, events: list[EngagementEvent]) -> None:
+        half_life = settings.ENGAGEMENT_HALF_LIFE_DAYS
+        counters, now = self.counters, self.now
+        for event in events:
+            state = counters.get(event.agent_id)
+            if state is None:
+                state = counters[event.agent_id] = EngagementCounters(now)
+            if event.occurred_at > now:
+                event = event._replace(occurred_at=now)
+            apply_event(state, event, half_life)
+
+    def add_interactions(self, rows: list) -> None:
+        """Interaction rows: (id, agent_id, created_at, outcome, sentiment_score)."""
+        now = self.now
+        self.add([interaction_event(r[1], r[2] or now, r[3], r[4]) for r in rows])
+
+    def rows(self) -> list[tuple]:
+        return [
+            (agent_id, *(getattr(c, name) for name in COUNTERS), c.as_of, c.last_active_at)
+            for agent_id, c in sorted(self.counters.items())
+        ]
+
+
+class _NumpyTotals:
+    """Dense per-agent arrays; each chunk of events is one bincount per counter."""
+
+    def __init__(self, now: datetime):
+        self.now = now
+        self.now_s = _epoch_seconds(now)
+        self.size = 0
+        self.sums = {name: np.zeros(0) for name in COUNTERS}
+        self.last_active = np.zeros(0)
+        self.seen = np.zeros(0, dtype=bool)
+
+    def _grow(self, size: int) -> None:
+        if size <= self.size:
+            return
+        size = max(size, self.size * 2)
+        for name, values in self.sums.items():
+            self.sums[name] = np.concatenate([values, np.zeros(size - self.size)])
+        self.last_active = np.concatenate([self.last_active, np.full(size - self.size, -np.inf)])
+        self.seen = np.concatenate([self.seen, np.zeros(size - self.size, dtype=bool)])
+        self.size = size
+
+    def add_arrays(self, agent_ids, times, contacts, connected, sentiment, quiz, tickets, active) -> None:
+        """One chunk as arrays: times in epoch seconds, NaN where sentiment / quiz is absent."""
+        if not len(agent_ids):
+            return
+        self._grow(int(agent_ids.max()) + 1)
+        times = np.minimum(times, self.now_s)
+        weight = np.exp2(-(self.now_s - times) / SECONDS_PER_DAY / settings.ENGAGEMENT_HALF_LIFE_DAYS)
+        has_sentiment, has_quiz = ~np.isnan(sentiment), ~np.isnan(quiz)
+
+        def add(name, values):
+            self.sums[name] += np.bincount(agent_ids, weights=values, minlength=self.size)
+
+        add("contacts", weight * contacts)
+        add("connected", weight * connected)
+        add("sentiment_sum", np.where(has_sentiment, weight * sentiment, 0.0))
+        add("sentiment_n", np.where(has_sentiment, weight, 0.0))
+        add("quiz_sum", np.where(has_quiz, weight * quiz, 0.0))
+        add("quiz_n", np.where(has_quiz, weight, 0.0))
+        add("tickets", weight * tickets)
+        np.maximum.at(self.last_active, agent_ids[active], times[active])
+        self.seen[agent_ids] = True
+
+    def add(self, events: list[EngagementEvent]) -> None:
+        n = len(events)
+        self.add_arrays(
+            np.fromiter((e.agent_id for e in events), dtype=np.int64, count=n),
+            np.fromiter((_epoch_seconds(e.occurred_at) for e in events), dtype=np.float64, count=n),
+            np.fromiter((e.contacts for e in events), dtype=np.float64, count=n),
+            np.fromiter((e.connected for e in events), dtype=np.float64, count=n),
+            np.fromiter((np.nan if e.sentiment is None else e.sentiment for e in events), dtype=np.float64, count=n),
+            np.fromiter((np.nan if e.quiz is None else e.quiz for e in events), dtype=np.float64, count=n),
+            np.fromiter((e.tickets for e in events), dtype=np.float64, count=n),
+            np.fromiter((e.active for e in events), dtype=bool, count=n),
+        )
+
+    def add_interactions(self, rows: list) -> None:
+        """Interaction rows: (id, agent_id, created_at, outcome, sentiment_score)."""
+        n = len(rows)
+        if not n:
+            return
+        now = self.now
+        connected = np.fromiter(((r[3] or "").lower() in CONNECTED_OUTCOMES for r in rows), dtype=bool, count=n)
+        self.add_arrays(
+            np.fromiter((r[1] for r in rows), dtype=np.int64, count=n),
+            np.fromiter((_epoch_seconds(r[2] or now) for r in rows), dtype=np.float64, count=n),
+            np.ones(n),
+            connected.astype(np.float64),
+            np.clip(np.array([r[4] for r in rows], dtype=np.float64), -1.0, 1.0),
+            np.full(n, np.nan),
+            np.zeros(n),
+            connected,
+        )
+
+    def rows(self) -> list[tuple]:
+        ids = np.flatnonzero(self.seen)
+        columns = [self.sums[name][ids].tolist() for name in COUNTERS]
+        last_active = [
+            datetime.utcfromtimestamp(t) if np.isfinite(t) else None for t in self.last_active[ids].tolist()
+        ]
+        return [
+            (agent_id, *values, self.now, active)
+            for agent_id, *values, active in zip(ids.tolist(), *columns, last_active)
+        ]
+
+
+def new_totals(now: datetime):
+    """Accumulator for a full recompute: NumPy when available, else the reference loop."""
+    return _NumpyTotals(now) if np is not None else _PythonTotals(now)
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class EngagementEngine:
+    """Keeps agent_engagement and Agent.engagement_score in step with agent activity."""
+
+    # ------------------------------------------------------------------
+    # Incremental
+    # ------------------------------------------------------------------
+
+    def observe(self, db: Session, events: Iterable[Optional[EngagementEvent]]) -> dict[int, float]:
+        """Fold events into their agents' counters and scores (caller commits).
+
+        Returns the new score of every agent touched.
+        """
+        events = [e for e in events if e is not None]
+        if not events:
+            return {}
+        agent_ids = sorted({e.agent_id for e in events})
+        agents = {
+            a.id: a for a in db.query(Agent).filter(Agent.id.in_(agent_ids))
+            .order_by(Agent.id).with_for_update()
+        }
+        rows = {
+            r.agent_id: r for r in db.query(AgentEngagement).filter(AgentEngagement.agent_id.in_(agent_ids))
+        }
+        half_life = settings.ENGAGEMENT_HALF_LIFE_DAYS
+        for event in events:
+            if event.agent_id not in agents:
+                continue
+            row = rows.get(event.agent_id)
+            if row is None:
+                row = rows[event.agent_id] = AgentEngagement(agent_id=event.agent_id)
+                db.add(row)
+            apply_event(row, event, half_life)
+
+        now = datetime.utcnow()
+        scores = {}
+        for agent_id, row in rows.items():
+            if agent_id in agents:
+                scores[agent_id] = agents[agent_id].engagement_score = engagement_score(
+                    row, now, half_life, settings.ENGAGEMENT_RECENCY_HALF_LIFE_DAYS,
+                )
+        return scores
+
+    def observe_interactions(self, db: Session, interactions: Iterable) -> dict[int, float]:
+        """``observe`` for Interaction objects or dicts with the Interaction columns."""
+        events = []
+        for i in interactions:
+            get = i.get if isinstance(i, dict) else lambda name, i=i: getattr(i, name)
+            events.append(interaction_event(
+                get("agent_id"), get("created_at") or datetime.utcnow(), get("outcome"), get("sentiment_score"),
+            ))
+        return self.observe(db, events)
+
+    def breakdown(self, db: Session, agent_id: int) -> Optional[dict]:
+        """An agent's score with its components and decayed counters, or None if it has no activity."""
+        row = db.get(AgentEngagement, agent_id)
+        if row is None:
+            return None
+        now = datetime.utcnow()
+        half_life = settings.ENGAGEMENT_HALF_LIFE_DAYS
+        keep = decay_factor(max(0.0, (now - row.as_of).total_seconds()) / SECONDS_PER_DAY, half_life)
+        components = score_components(row, now, half_life, settings.ENGAGEMENT_RECENCY_HALF_LIFE_DAYS)
+        return {
+            "agent_id": agent_id,
+            "engagement_score": engagement_score(row, now, half_life, settings.ENGAGEMENT_RECENCY_HALF_LIFE_DAYS),
+            "components": {name: round(value, 4) for name, value in components.items()},
+            "weights": WEIGHTS,
+            "counters": {name: round((getattr(row, name) or 0.0) * keep, 4) for name in COUNTERS},
+            "last_active_at": row.last_active_at,
+            "half_life_days": half_life,
+        }
+
+    # ------------------------------------------------------------------
+    # Bulk: refresh stored counters / rebuild them from the source tables
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _write_scores(db: Session, scores: dict[int, float]) -> None:
+        agents = Agent.__table__
+        items = sorted(scores.items())
+        for start in range(0, len(items), UPDATE_BATCH_SIZE):
+            batch = dict(items[start:start + UPDATE_BATCH_SIZE])
+            db.execute(
+                update(agents).where(agents.c.id.in_(batch)).values(
+                    engagement_score=case(batch, value=agents.c.id),
+                    # Set explicitly so a score drift doesn't look like an agent edit
+                    updated_at=agents.c.updated_at,
+                )
+            )
+
+    def refresh(self, now: Optional[datetime] = None) -> dict:
+        """Re-score every agent with counters at ``now``; writes only scores that moved."""
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        stats = {"scanned": 0, "updated": 0}
+        db = SessionLocal()
+        try:
+            last_id = 0
+            while True:
+                rows = db.execute(
+                    select(*_ROW_COLUMNS, Agent.engagement_score)
+                    .join(Agent, Agent.id == AgentEngagement.agent_id)
+                    .where(AgentEngagement.agent_id > last_id)
+                    .order_by(AgentEngagement.agent_id)
+                    .limit(settings.ENGAGEMENT_CHUNK_SIZE)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                scores = score_rows([row[:-1] for row in rows], now)
+                changed = {
+                    row[0]: score for row, score in zip(rows, scores)
+                    if abs((row[-1] or 0.0) - score) >= _SCORE_EPSILON
+                }
+                if changed:
+                    self._write_scores(db, changed)
+                    db.commit()
+                stats["scanned"] += len(rows)
+                stats["updated"] += len(changed)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        stats["seconds"] = round(time.monotonic() - started, 2)
+        logger.info(f"Engagement scores refreshed: {stats}")
+        return stats
+
+    @staticmethod
+    def _chunks(db: Session, columns: tuple, key, *criteria):
+        """Keyset scan of a source table in ENGAGEMENT_CHUNK_SIZE chunks (key is the first column)."""
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(*columns).where(key > last_id, *criteria).order_by(key).limit(settings.ENGAGEMENT_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def _accumulate(self, db: Session, totals, now: datetime) -> int:
+        events = 0
+        for rows in self._chunks(
+            db, (Interaction.id, Interaction.agent_id, Interaction.created_at, Interaction.outcome,
+                 Interaction.sentiment_score), Interaction.id,
+        ):
+            totals.add_interactions(rows)
+            events += len(rows)
+
+        for rows in self._chunks(
+            db, (AgentSignal.id, AgentSignal.agent_id, AgentSignal.occurred_at, AgentSignal.signal_type,
+                 AgentSignal.payload), AgentSignal.id,
+            AgentSignal.signal_type.in_([s.value for s in QUIZ_SIGNALS]),
+        ):
+            chunk = []
+            for _, agent_id, occurred_at, signal_type, payload in rows:
+                try:
+                    score = quiz_score(signal_type, json.loads(payload) if payload else {})
+                except ValueError:
+                    score = None
+                if score is not None:
+                    chunk.append(quiz_event(agent_id, occurred_at or now, score))
+            totals.add(chunk)
+            events += len(chunk)
+
+        # Split tickets share one submission: count the root ticket only
+        for rows in self._chunks(
+            db, (FeedbackTicket.id, FeedbackTicket.agent_id, FeedbackTicket.created_at), FeedbackTicket.id,
+            FeedbackTicket.parent_ticket_id.is_(None),
+        ):
+            totals.add([EngagementEvent(r[1], r[2] or now, tickets=1.0) for r in rows])
+            events += len(rows)
+        return events
+
+    def rebuild(self, now: Optional[datetime] = None) -> dict:
+        """Recompute every agent's counters and score from the source tables.
+
+        Meant for backfills and repairs: events written while it runs may be
+        overwritten, so run it when the platform is quiet.
+        """
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        db = SessionLocal()
+        try:
+            totals = new_totals(now)
+            events = self._accumulate(db, totals, now)
+            rows = totals.rows()
+            known = {i for (i,) in db.execute(select(Agent.id))}
+            rows = [row for row in rows if row[0] in known]
+            scores = score_rows(rows, now)
+
+            db.execute(delete(AgentEngagement))
+            for start in range(0, len(rows), UPDATE_BATCH_SIZE):
+                batch = rows[start:start + UPDATE_BATCH_SIZE]
+                db.execute(insert(AgentEngagement), [
+                    {
+                        "agent_id": row[0], **dict(zip(COUNTERS, row[1:-2])),
+                        "as_of": row[-2], "last_active_at": row[-1], "updated_at": now,
+                    }
+                    for row in batch
+                ])
+            self._write_scores(db, dict(zip((row[0] for row in rows), scores)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        stats = {
+            "events": events, "agents": len(rows), "vectorised": np is not None,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        logger.info(f"Engagement counters rebuilt: {stats}")
+        return stats
+
+    def rebuild_if_empty(self, db: Session) -> Optional[dict]:
+        """Backfill on first run (no agent_engagement rows yet)."""
+        if db.query(AgentEngagement.agent_id).first() is not None:
+            return None
+        return self.rebuild()
+
+
+# Singleton instance
+engagement_engine = EngagementEngine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh (or rebuild) agent engagement scores once.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute counters from the source tables")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(engagement_engine.rebuild() if args.rebuild else engagement_engine.refresh())
@@ -0,0 +1,190 @@
+"""
+Exporter — streams whole tables out as CSV, NDJSON or Parquet.
+
+Rows are read with ``yield_per``. On PostgreSQL (psycopg2) that opens a
+server-side cursor, and on SQLite the cursor is already lazy. Either way
+only EXPORT_BATCH_SIZE rows are in memory at a time, whatever the size of
+the export. Each batch is encoded and handed to a generator-based
+``StreamingResponse``. Starlette iterates sync generators in a threadpool,
+so a long export never blocks the event loop.
+
+The generator opens its own session. The request's ``get_db`` session is
+closed as soon as the endpoint returns, which is before the body streams.
+
+Parquet needs ``pyarrow``, which is an optional dependency. Each batch is
+written as one row group and flushed straight to the client.
+"""
+
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, LargeBinary, Select, select
+
+from config import settings
+from database import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def export_columns(model) -> list:
+    """Every exportable column of a model (binary sketches are skipped)."""
+    return [c for c in model.__table__.columns if not isinstance(c.type, LargeBinary)]
+
+
+def _batches(stmt: Select, batch_size: int) -> Iterator[list]:
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Encoders
+# ---------------------------------------------------------------------------
+
+def _csv(names: list[str], batches: Iterator[list]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM so Excel opens UTF-8 names correctly
+    writer.writerow(names)
+    yield ("\ufeff" + buf.getvalue()).encode("utf-8")
+    for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(batch)
+        yield buf.getvalue().encode("utf-8")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson(names: list[str], batches: Iterator[list]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+
+def _arrow_type(column):
+    sql_type = column.type
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Float):
+        return pa.float64()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet(columns: list, batches: Iterator[list]) -> Iterator[bytes]:
+    schema = pa.schema([pa.field(c.name, _arrow_type(c)) for c in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        yield sink.drain()
+        for batch in batches:
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*batch), schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def export_response(
+    entity: str,
+    columns: list,
+    filters: list,
+    order_by,
+    fmt: str = "csv",
+    batch_size: Optional[int] = None,
+) -> StreamingResponse:
+    """Stream ``SELECT columns WHERE filters ORDER BY order_by`` in ``fmt``."""
+    fmt = (fmt or "csv").lower()
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'csv', 'ndjson' or 'parquet'")
+    if fmt == "parquet" and pa is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+
+    stmt = select(*columns).where(*filters).order_by(order_by)
+    batches = _batches(stmt, batch_size or settings.EXPORT_BATCH_SIZE)
+    names = [c.name for c in columns]
+    if fmt == "csv":
+        body = _csv(names, batches)
+    elif fmt == "ndjson":
+        body = _ndjson(names, batches)
+    else:
+        body = _parquet(columns, batches)
+
+    filename = f"{entity}_{datetime.utcnow():%Y%m%d_%H%M%S}.{fmt}"
+    logger.info(f"Export started: {filename}")
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
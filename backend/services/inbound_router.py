@@ -0,0 +1,413 @@
+"""
+Inbound Router — agent replies arriving on the WhatsApp webhook.
+
+The webhook only parses the payload, drops redeliveries (by WhatsApp
+message id) and puts the messages on an in-memory queue, so the provider
+gets its 200 straight away. INBOUND_WORKERS workers drain the queue in
+micro-batches of up to INBOUND_BATCH_SIZE (whatever is waiting, never
+delaying a lone message) and per batch:
+
+  1. resolve each sender through ``PhoneIndex``, an in-memory
+     phone -> agent map loaded once and caught up incrementally from
+     Agent.updated_at (an unknown number forces an early catch-up)
+  2. classify the intent (``classify_intent``, single pass over the text)
+     and build the bot reply with ``get_bot_response``
+  3. write every Interaction row and WHATSAPP_AGENT_REPLIED signal of the
+     batch in one transaction; signals carry the message id as their
+     idempotency key, and a message whose key is already logged writes
+     nothing else either (no second Interaction or engagement event)
+  4. send the replies, and ADM alerts for escalations, for the messages
+     recorded in step 3, over one channel session shared by all workers
+
+A STOP reply sets Agent.whatsapp_opted_out_at and is recorded as an
+opted_out interaction; it raises no engagement signal, and a STOP from an
+agent already opted out is a no-op. Campaigns and playbooks send no more
+WhatsApp messages to opted-out agents.
+
+Messages are acknowledged before they are processed: ones still queued
+when the process dies are lost, as with any in-memory queue; a full queue
+answers 503 so the provider retries later. A batch that fails is put back
+on the queue once, then dropped.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, datetime
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from domain.enums import ContactOutcome, SignalType
+from domain.whatsapp_templates import Intent, classify_intent, get_bot_response, language_code
+from models import ADM, Agent, Interaction
+from services.agent_signals import agent_signals
+from services.channels import ChannelSession, OutboundMessage, channels
+from services.engagement import engagement_engine
+
+logger = logging.getLogger(__name__)
+
+# Message ids remembered for dropping webhook redeliveries
+_SEEN_LIMIT = 50_000
+# The index is rebuilt from scratch this often (drops deleted agents, ADM renames)
+_FULL_RELOAD_SECONDS = 600
+# Minimum gap between catch-ups forced by unknown senders
+_MISS_REFRESH_SECONDS = 2.0
+# Times a failed batch's messages are queued again before they are dropped
+_BATCH_RETRIES = 1
+
+# Rough sentiment of an inbound reply by intent (Interaction.sentiment_score, -1..1)
+_INTENT_SENTIMENT = {
+    Intent.STOP: -0.8,
+    Intent.COMPLAINT: -0.6,
+    Intent.NEGATIVE_CONFIRMATION: -0.3,
+    Intent.GREETING: 0.3,
+    Intent.POSITIVE_CONFIRMATION: 0.5,
+}
+
+
+class InboundMessage(NamedTuple):
+    message_id: str
+    sender: str  # phone number as the provider sends it, e.g. "919876543210"
+    text: str
+    received_at: datetime
+    attempt: int = 0
+
+
+class _AgentEntry(NamedTuple):
+    agent_id: int
+    name: str
+    language: Optional[str]
+    adm_id: Optional[int]
+    adm_name: Optional[str]
+    adm_chat_id: Optional[str]
+
+
+def phone_key(phone: str) -> str:
+    """Last 10 digits: matches "+91 98765 43210", "919876543210" and "9876543210"."""
+    return re.sub(r"\D", "", phone or "")[-10:]
+
+
+def parse_whatsapp_webhook(payload: dict) -> list[InboundMessage]:
+    """Agent messages in a WhatsApp Cloud API webhook payload (status updates are ignored)."""
+    messages = []
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            for message in (change.get("value") or {}).get("messages") or []:
+                kind = message.get("type")
+                if kind == "text":
+                    text = (message.get("text") or {}).get("body", "")
+                elif kind == "button":
+                    text = (message.get("button") or {}).get("text", "")
+                elif kind == "interactive":
+                    interactive = message.get("interactive") or {}
+                    text = (interactive.get("button_reply") or interactive.get("list_reply") or {}).get("title", "")
+                else:
+                    text = (message.get(kind) or {}).get("caption", "") if kind else ""
+                try:
+                    received_at = datetime.utcfromtimestamp(int(message["timestamp"]))
+                except (KeyError, TypeError, ValueError):
+                    received_at = datetime.utcnow()
+                if message.get("id") and message.get("from"):
+                    messages.append(InboundMessage(message["id"], message["from"], text or "", received_at))
+    return messages
+
+
+class PhoneIndex:
+    """In-memory phone -> agent lookup, caught up incrementally from the agents table."""
+
+    _COLUMNS = (
+        Agent.id, Agent.phone, Agent.name, Agent.language, Agent.assigned_adm_id, Agent.updated_at,
+        ADM.name.label("adm_name"), ADM.telegram_chat_id,
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_phone: dict[str, _AgentEntry] = {}
+        self._phone_of: dict[int, str] = {}
+        self._watermark: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._reloaded_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._by_phone)
+
+    def get(self, phone: str) -> Optional[_AgentEntry]:
+        return self._by_phone.get(phone_key(phone))
+
+    @property
+    def due(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= settings.INBOUND_INDEX_REFRESH_SECONDS
+
+    @property
+    def may_refresh_on_miss(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= _MISS_REFRESH_SECONDS
+
+    def refresh(self, db: Session) -> int:
+        """Load agents changed since the last refresh (all of them periodically)."""
+        full = self._watermark is None or time.monotonic() - self._reloaded_at >= _FULL_RELOAD_SECONDS
+        stmt = select(*self._COLUMNS).outerjoin(ADM, ADM.id == Agent.assigned_adm_id)
+        if not full:
+            # >= re-reads rows sharing the watermark's timestamp, which is harmless
+            stmt = stmt.where(Agent.updated_at >= self._watermark)
+        rows = db.execute(stmt).all()
+
+        with self._lock:
+            by_phone = {} if full else self._by_phone
+            phone_of = {} if full else self._phone_of
+            watermark = self._watermark
+            for row in rows:
+                key = phone_key(row.phone)
+                if not key:
+                    continue
+                old = phone_of.get(row.id)
+                if old and old != key and by_phone.get(old, (None,))[0] == row.id:
+                    del by_phone[old]
+                by_phone[key] = _AgentEntry(
+                    row.id, row.name, row.language, row.assigned_adm_id, row.adm_name, row.telegram_chat_id,
+                )
+                phone_of[row.id] = key
+                if row.updated_at and (watermark is None or row.updated_at > watermark):
+                    watermark = row.updated_at
+            self._by_phone, self._phone_of = by_phone, phone_of
+            self._watermark = watermark or datetime.utcnow()
+            self._refreshed_at = time.monotonic()
+            if full:
+                self._reloaded_at = self._refreshed_at
+        return len(rows)
+
+
+class InboundRouter:
+    """Webhook queue plus the worker pool that classifies, records and answers replies."""
+
+    def __init__(self):
+        self.index = PhoneIndex()
+        self._queue: Optional[asyncio.Queue] = None
+        self._session: Optional[ChannelSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._stats: Counter = Counter()
+        self._intents: Counter = Counter()
+
+    # ------------------------------------------------------------------
+    # Webhook side
+    # ------------------------------------------------------------------
+
+    def enqueue(self, messages: Iterable[InboundMessage]) -> int:
+        """Queue messages for the workers; returns how many were new.
+
+        Raises RuntimeError when the router is not running and
+        asyncio.QueueFull when the workers are too far behind.
+        """
+        if self._queue is None:
+            raise RuntimeError("Inbound router is not running")
+        accepted = 0
+        for message in messages:
+            self._stats["received"] += 1
+            if message.message_id in self._seen:
+                self._stats["duplicates"] += 1
+                continue
+            self._queue.put_nowait(message)
+            self._seen[message.message_id] = None
+            if len(self._seen) > _SEEN_LIMIT:
+                self._seen.popitem(last=False)
+            accepted += 1
+        return accepted
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "indexed_agents": len(self.index),
+            "intents": dict(self._intents),
+        }
+
+    # ------------------------------------------------------------------
+    # Workers: resolve -> classify -> record -> reply
+    # ------------------------------------------------------------------
+
+    def _refresh_index(self) -> None:
+        db = SessionLocal()
+        try:
+            self.index.refresh(db)
+        finally:
+            db.close()
+
+    def _plan(self, batch: list[InboundMessage], agents: list) -> list[dict]:
+        """Per message from a known sender: its idempotency key, rows to write and replies to send."""
+        plans = []
+        today = date.today()
+        for message, agent in zip(batch, agents):
+            intent = classify_intent(message.text)
+            self._intents[intent] += 1
+            if agent is None:
+                self._stats["unknown_sender"] += 1
+                continue
+
+            adm_name = agent.adm_name or "your ADM"
+            response = get_bot_response(
+                message.text, agent.name, adm_name, language_code(agent.language), intent=intent,
+            )
+            outbound = [OutboundMessage("whatsapp", message.sender, response["text"])]
+            escalate = bool(response.get("escalate_to_adm"))
+            if escalate and agent.adm_chat_id:
+                outbound.append(OutboundMessage(
+                    "telegram", agent.adm_chat_id,
+                    f"⚠️ {agent.name} on WhatsApp ({intent.replace('_', ' ')}):\n{message.text[:500]}",
+                ))
+
+            plan = {
+                "key": f"whatsapp:{message.message_id}", "agent_id": agent.agent_id,
+                "received_at": message.received_at, "stop": intent == Intent.STOP,
+                "interaction": None, "signal": None, "outbound": outbound,
+            }
+            if agent.adm_id:
+                plan["interaction"] = {
+                    "agent_id": agent.agent_id, "adm_id": agent.adm_id, "type": "whatsapp",
+                    "outcome": ContactOutcome.OPTED_OUT.value if plan["stop"] else "connected",
+                    "notes": f"Inbound [{intent}]: {message.text[:1000]}",
+                    "sentiment_score": _INTENT_SENTIMENT.get(intent),
+                    "follow_up_date": today if escalate else None,
+                    "follow_up_status": "pending" if escalate else "completed",
+                    "created_at": message.received_at,
+                }
+            if not plan["stop"]:
+                plan["signal"] = {
+                    "agent_id": agent.agent_id,
+                    "signal_type": SignalType.WHATSAPP_AGENT_REPLIED.value,
+                    "source": "whatsapp",
+                    "payload": {"intent": intent, "message_id": message.message_id},
+                    "idempotency_key": plan["key"],
+                    "occurred_at": message.received_at,
+                }
+            plans.append(plan)
+        return plans
+
+    @staticmethod
+    def _write(plans: list[dict]) -> set[str]:
+        """Record the batch in one transaction; returns the keys of the messages not recorded before."""
+        db = SessionLocal()
+        try:
+            signals = [p["signal"] for p in plans if p["signal"]]
+            skipped = set()
+            if signals:
+                report = agent_signals.append(db, signals)
+                skipped.update(report["duplicate_keys"])
+                skipped.update(signals[e["index"]]["idempotency_key"] for e in report["errors"])
+
+            recorded = set()
+            for plan in plans:
+                if plan["stop"]:
+                    # Only the first STOP flips the flag, which makes redeliveries no-ops
+                    opted_out = db.execute(
+                        update(Agent)
+                        .where(Agent.id == plan["agent_id"], Agent.whatsapp_opted_out_at.is_(None))
+                        .values(whatsapp_opted_out_at=plan["received_at"])
+                        .returning(Agent.id)
+                        .execution_options(synchronize_session=False)
+                    ).first()
+                    if opted_out:
+                        recorded.add(plan["key"])
+                elif plan["key"] not in skipped:
+                    recorded.add(plan["key"])
+
+            interactions = [p["interaction"] for p in plans if p["interaction"] and p["key"] in recorded]
+            if interactions:
+                db.execute(insert(Interaction), interactions)
+                engagement_engine.observe_interactions(db, interactions)
+            db.commit()
+            return recorded
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _handle(self, batch: list[InboundMessage]) -> None:
+        loop = asyncio.get_running_loop()
+        agents = [self.index.get(m.sender) for m in batch]
+        if self.index.due or (None in agents and self.index.may_refresh_on_miss):
+            await loop.run_in_executor(None, self._refresh_index)
+            agents = [self.index.get(m.sender) for m in batch]
+
+        plans = self._plan(batch, agents)
+        recorded = await loop.run_in_executor(None, self._write, plans)
+        self._stats["processed"] += len(batch)
+        self._stats["duplicates"] += len(plans) - len(recorded)
+        outbound = [m for p in plans if p["key"] in recorded for m in p["outbound"]]
+        results = await self._session.send_many(outbound)
+        self._stats["replies_sent"] += sum(1 for r in results if r.status == "sent")
+        self._stats["replies_failed"] += sum(1 for r in results if r.status == "failed")
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < settings.INBOUND_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._handle(batch)
+            except Exception as e:
+                # Writes are idempotent per message, so a retry never records one twice
+                requeued = 0
+                for message in batch:
+                    if message.attempt >= _BATCH_RETRIES:
+                        continue
+                    try:
+                        queue.put_nowait(message._replace(attempt=message.attempt + 1))
+                    except asyncio.QueueFull:
+                        break
+                    requeued += 1
+                self._stats["requeued"] += requeued
+                self._stats["errors"] += len(batch) - requeued
+                logger.error(
+                    f"Inbound router: batch of {len(batch)} messages failed "
+                    f"({requeued} queued again, {len(batch) - requeued} dropped): {e}"
+                )
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def drain(self) -> None:
+        """Wait until every queued message has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    # ------------------------------------------------------------------
+    # Background workers
+    # ------------------------------------------------------------------
+
+    async def run(self) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._refresh_index)
+        except Exception as e:
+            logger.warning(f"Inbound router: phone index not loaded yet: {e}")
+        async with channels.session() as session:
+            self._session = session
+            await asyncio.gather(*(self._worker() for _ in range(settings.INBOUND_WORKERS)))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=settings.INBOUND_QUEUE_SIZE)
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._session = None
+
+
+# Singleton instance
+inbound_router = InboundRouter()
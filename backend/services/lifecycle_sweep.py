@@ -0,0 +1,300 @@
+"""
+Lifecycle Sweep — nightly AT_RISK / DORMANT evaluation of every agent.
+
+Applies ``domain.lifecycle.evaluate_risk_status`` to the whole agent table:
+
+  - Agents are read in id-ordered chunks (keyset on id), as bare column
+    tuples rather than ORM objects.
+  - Days since last activity is the time since the later of
+    last_policy_sold_date and last_contact_date. An agent with neither keeps
+    its stored dormancy_duration_days, or the days since joining if that is
+    larger.
+  - The rules are evaluated for the whole chunk at once with NumPy. Without
+    NumPy each row goes through evaluate_risk_status, which is the reference
+    the vectorised version must match.
+  - Only rows whose state or day count changed are written, with one
+    ``UPDATE agents SET ... = CASE id WHEN ... END WHERE id IN (...)`` per
+    batch. State changes are logged to agent_lifecycle_transitions, and are
+    also appended to agent_signals (already applied) so that replaying the
+    log reproduces them. Each chunk commits on its own.
+
+``run_sweep(workers=N)`` splits the id range into N contiguous slices and
+sweeps them in separate processes. This only helps on PostgreSQL, because
+SQLite allows one writer at a time, so there it always runs in-process.
+
+Run by hand with ``python -m services.lifecycle_sweep [--workers N]``.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, func, insert, select, update
+
+from config import settings
+from database import SessionLocal, engine
+from domain.enums import AgentLifecycleState
+from domain.lifecycle import evaluate_risk_status
+from models import Agent, AgentLifecycleTransition
+from services.agent_signals import agent_signals, state_change_signal
+from services.engagement import engagement_engine
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE ... CASE statement (keeps bind parameters well under limits)
+UPDATE_BATCH_SIZE = 1000
+
+_STATE_CODES = {state.value: code for code, state in enumerate(AgentLifecycleState)}
+_ACTIVE_CODES = [
+    _STATE_CODES[s] for s in (
+        AgentLifecycleState.ACTIVE, AgentLifecycleState.PRODUCTIVE,
+        AgentLifecycleState.FIRST_SALE, AgentLifecycleState.LICENSED,
+    )
+]
+_AT_RISK_CODE = _STATE_CODES[AgentLifecycleState.AT_RISK]
+
+_COLUMNS = (
+    Agent.id, Agent.lifecycle_state, Agent.engagement_score, Agent.dormancy_duration_days,
+    Agent.last_contact_date, Agent.last_policy_sold_date, Agent.date_of_joining, Agent.created_at,
+)
+
+
+def _ordinal(value) -> int:
+    if value is None:
+        return -1
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def _days_since_activity(row, today: int) -> int:
+    _, _, _, stored, contact, sold, joined, created = row
+    last = max(_ordinal(contact), _ordinal(sold))
+    if last >= 0:
+        return max(0, today - last)
+    start = _ordinal(joined)
+    if start < 0:
+        start = _ordinal(created)
+    return max(stored or 0, today - start if start >= 0 else 0)
+
+
+# ---------------------------------------------------------------------------
+# Evaluation: returns (ids, new state or None, new days) for changed rows only
+# ---------------------------------------------------------------------------
+
+def _evaluate_python(rows: list, today: int) -> list[tuple]:
+    changes = []
+    for row in rows:
+        days = _days_since_activity(row, today)
+        new_state = evaluate_risk_status(
+            row[1], days, row[2] or 0.0,
+            at_risk_threshold_days=settings.LIFECYCLE_AT_RISK_DAYS,
+            dormant_threshold_days=settings.LIFECYCLE_DORMANT_DAYS,
+            engagement_at_risk_threshold=settings.LIFECYCLE_ENGAGEMENT_AT_RISK,
+        )
+        if new_state or days != (row[3] or 0):
+            changes.append((row[0], new_state, days, row[1]))
+    return changes
+
+
+def _evaluate_numpy(rows: list, today: int) -> list[tuple]:
+    n = len(rows)
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+    codes = np.fromiter((_STATE_CODES.get(r[1], -1) for r in rows), dtype=np.int16, count=n)
+    scores = np.fromiter((r[2] or 0.0 for r in rows), dtype=np.float64, count=n)
+    stored = np.fromiter((r[3] or 0 for r in rows), dtype=np.int64, count=n)
+    contact = np.fromiter((_ordinal(r[4]) for r in rows), dtype=np.int64, count=n)
+    sold = np.fromiter((_ordinal(r[5]) for r in rows), dtype=np.int64, count=n)
+    joined = np.fromiter((_ordinal(r[6]) for r in rows), dtype=np.int64, count=n)
+    created = np.fromiter((_ordinal(r[7]) for r in rows), dtype=np.int64, count=n)
+
+    last = np.maximum(contact, sold)
+    start = np.where(joined >= 0, joined, created)
+    since_start = np.where(start >= 0, today - start, 0)
+    days = np.where(last >= 0, np.maximum(today - last, 0), np.maximum(stored, since_start))
+
+    evaluated = np.isin(codes, _ACTIVE_CODES)
+    to_dormant = (evaluated | (codes == _AT_RISK_CODE)) & (days >= settings.LIFECYCLE_DORMANT_DAYS)
+    to_at_risk = evaluated & ~to_dormant & (
+        (days >= settings.LIFECYCLE_AT_RISK_DAYS) | (scores < settings.LIFECYCLE_ENGAGEMENT_AT_RISK)
+    )
+    changed = np.flatnonzero(to_dormant | to_at_risk | (days != stored))
+
+    dormant, at_risk = AgentLifecycleState.DORMANT.value, AgentLifecycleState.AT_RISK.value
+    return [
+        (
+            int(ids[i]),
+            dormant if to_dormant[i] else at_risk if to_at_risk[i] else None,
+            int(days[i]),
+            rows[i][1],
+        )
+        for i in changed
+    ]
+
+
+def evaluate_chunk(rows: list, today: Optional[date] = None) -> list[tuple]:
+    """(agent_id, new_state or None, days, old_state) for every row that changes."""
+    today_ord = (today or datetime.utcnow().date()).toordinal()
+    if np is not None:
+        return _evaluate_numpy(rows, today_ord)
+    return _evaluate_python(rows, today_ord)
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _write(db, changes: list[tuple], now: datetime) -> int:
+    agents = Agent.__table__
+    transitions = 0
+    for start in range(0, len(changes), UPDATE_BATCH_SIZE):
+        batch = changes[start:start + UPDATE_BATCH_SIZE]
+        ids = [c[0] for c in batch]
+        moved = {agent_id: state for agent_id, state, _, _ in batch if state}
+        values = {
+            "dormancy_duration_days": case(
+                {agent_id: days for agent_id, _, days, _ in batch}, value=agents.c.id
+            ),
+            # Set explicitly so day-count-only changes don't bump updated_at
+            "updated_at": agents.c.updated_at,
+        }
+        if moved:
+            values["lifecycle_state"] = case(moved, value=agents.c.id, else_=agents.c.lifecycle_state)
+            values["updated_at"] = case(
+                {agent_id: now for agent_id in moved}, value=agents.c.id, else_=agents.c.updated_at
+            )
+            # Signal log first, so an agent's baseline captures its pre-sweep state
+            agent_signals.append(db, [
+                state_change_signal(agent_id, state, "sweep", f"inactive {days} days")
+                for agent_id, state, days, _ in batch if state
+            ], applied=True)
+        db.execute(update(agents).where(agents.c.id.in_(ids)).values(values))
+
+        if moved:
+            db.execute(insert(AgentLifecycleTransition), [
+                {
+                    "agent_id": agent_id, "from_state": old_state, "to_state": state,
+                    "source": "sweep", "reason": f"inactive {days} days", "created_at": now,
+                }
+                for agent_id, state, days, old_state in batch if state
+            ])
+            transitions += len(moved)
+    return transitions
+
+
+def sweep_range(lo: int, hi: int, today: Optional[date] = None) -> dict:
+    """Sweep agents with lo <= id <= hi, one committed chunk at a time."""
+    today = today or datetime.utcnow().date()
+    stats = {"scanned": 0, "updated": 0, "transitions": 0}
+    db = SessionLocal()
+    try:
+        last_id = lo - 1
+        while True:
+            rows = db.execute(
+                select(*_COLUMNS)
+                .where(Agent.id > last_id, Agent.id <= hi)
+                .order_by(Agent.id)
+                .limit(settings.LIFECYCLE_SWEEP_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            changes = evaluate_chunk(rows, today)
+            if changes:
+                stats["transitions"] += _write(db, changes, datetime.utcnow())
+                db.commit()
+            stats["scanned"] += len(rows)
+            stats["updated"] += len(changes)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return stats
+
+
+def _worker_init() -> None:
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+
+
+def _sweep_slice(bounds: tuple) -> dict:
+    return sweep_range(*bounds)
+
+
+def run_sweep(workers: Optional[int] = None, today: Optional[date] = None) -> dict:
+    """Sweep every agent; ``workers`` > 1 uses parallel processes (PostgreSQL only)."""
+    started = time.monotonic()
+    workers = max(1, workers or settings.LIFECYCLE_SWEEP_WORKERS)
+    if not settings.is_postgres:
+        workers = 1
+
+    db = SessionLocal()
+    try:
+        lo, hi = db.query(func.min(Agent.id), func.max(Agent.id)).one()
+    finally:
+        db.close()
+    if lo is None:
+        return {"scanned": 0, "updated": 0, "transitions": 0, "seconds": 0.0}
+
+    if workers == 1:
+        stats = sweep_range(lo, hi, today)
+    else:
+        step = (hi - lo) // workers + 1
+        slices = [(start, min(start + step - 1, hi), today) for start in range(lo, hi + 1, step)]
+        stats = {"scanned": 0, "updated": 0, "transitions": 0}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) as pool:
+            for part in pool.map(_sweep_slice, slices):
+                for key in stats:
+                    stats[key] += part[key]
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    stats["workers"] = workers
+    stats["vectorized"] = np is not None
+    logger.info(f"Lifecycle sweep complete: {stats}")
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Nightly schedule
+# ---------------------------------------------------------------------------
+
+def _seconds_until(hour_utc: int) -> float:
+    now = datetime.utcnow()
+    run_at = now.replace(hour=hour_utc, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+async def run_nightly() -> None:
+    """Background loop: run the sweep once a day at LIFECYCLE_SWEEP_HOUR_UTC."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(_seconds_until(settings.LIFECYCLE_SWEEP_HOUR_UTC))
+        try:
+            # Decay engagement scores to today first: the sweep's AT_RISK rule reads them
+            await loop.run_in_executor(None, engagement_engine.refresh)
+        except Exception as e:
+            logger.error(f"Engagement refresh failed: {e}")
+        try:
+            await loop.run_in_executor(None, run_sweep)
+        except Exception as e:
+            logger.error(f"Lifecycle sweep failed: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the agent lifecycle sweep once.")
+    parser.add_argument("--workers", type=int, default=None, help="parallel processes (PostgreSQL)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(run_sweep(workers=args.workers))
@@ -0,0 +1,177 @@
+"""
+Pagination — keyset (cursor) paging and optional row counts for list endpoints.
+
+OFFSET paging makes the database walk and discard every skipped row, so deep
+pages get slower as a table grows. Keyset paging instead remembers where the
+last page ended, as the (sort key, id) of its last row, and asks for rows
+strictly after it:
+
+    WHERE sort < :last_sort OR (sort = :last_sort AND id < :last_id)
+    ORDER BY sort DESC, id DESC LIMIT :limit + 1
+
+The id tie-break makes the order total, so rows sharing a sort value are
+neither skipped nor repeated. One extra row is fetched to tell whether
+another page exists. The position is handed to clients as an opaque
+``cursor`` token. Clients should pass it back unchanged and not parse it.
+
+Counting is opt-in via ``include_total``. ``estimate_total`` asks PostgreSQL
+for an estimate: pg_class.reltuples for an unfiltered table, or the planner's
+row estimate for a filtered query. Other databases count exactly.
+
+``skip`` still works when no cursor is given, so existing clients keep
+working.
+"""
+
+import base64
+import json
+import logging
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Table, and_, or_, text
+from sqlalchemy.orm import Query as ORMQuery
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+
+
+# ---------------------------------------------------------------------------
+# Cursor tokens
+# ---------------------------------------------------------------------------
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("unknown cursor value")
+    return value
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    raw = json.dumps([_encode_value(sort_value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple:
+    """Return (sort value, id) from a cursor token; 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+        if not isinstance(row_id, int):
+            raise ValueError("cursor id must be an integer")
+        return _decode_value(sort_value), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ---------------------------------------------------------------------------
+# Paging
+# ---------------------------------------------------------------------------
+
+def keyset_page(
+    query: ORMQuery,
+    sort,
+    tiebreak,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = True,
+) -> Page:
+    """Fetch one page of ``query`` ordered by (sort, tiebreak).
+
+    ``sort`` must not be NULL for any row (wrap nullable columns in
+    ``coalesce``). Items are whatever the query yields: one entity, or a
+    tuple for multi-entity queries.
+    """
+    single = len(query.column_descriptions) == 1
+    if cursor:
+        last_sort, last_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(sort < last_sort, and_(sort == last_sort, tiebreak < last_id)))
+        else:
+            query = query.filter(or_(sort > last_sort, and_(sort == last_sort, tiebreak > last_id)))
+    elif skip:
+        query = query.offset(skip)
+
+    order = (sort.desc(), tiebreak.desc()) if descending else (sort.asc(), tiebreak.asc())
+    rows = (
+        query.add_columns(sort.label("_page_sort"), tiebreak.label("_page_id"))
+        .order_by(*order)
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    items = [row[0] if single else tuple(row[:-2]) for row in rows]
+    return Page(items, next_cursor)
+
+
+# ---------------------------------------------------------------------------
+# Counting
+# ---------------------------------------------------------------------------
+
+def _estimated_count(query: ORMQuery) -> Optional[int]:
+    stmt = query.order_by(None).statement
+    conn = query.session.connection()
+    froms = stmt.get_final_froms()
+    if stmt.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+        estimate = conn.execute(
+            text("SELECT reltuples FROM pg_class WHERE relname = :name"),
+            {"name": froms[0].name},
+        ).scalar()
+    else:
+        compiled = stmt.compile(dialect=conn.dialect)
+        plan = conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = plan[0]["Plan"]["Plan Rows"]
+    # reltuples is -1 until the table is first analysed
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def count_total(query: ORMQuery, include_total: bool = False, estimate: bool = False) -> Optional[int]:
+    """Row count for ``query``: None unless requested, estimated when asked (PostgreSQL)."""
+    if not (include_total or estimate):
+        return None
+    if estimate and settings.is_postgres:
+        try:
+            # Savepoint: a failed EXPLAIN must not abort the request's transaction
+            with query.session.begin_nested():
+                value = _estimated_count(query)
+            if value is not None:
+                return value
+        except Exception as e:
+            logger.warning(f"Count estimate failed, counting exactly: {e}")
+    return query.order_by(None).count()
+
+
+def set_page_headers(response: Response, page: Page, total: Optional[int]) -> None:
+    """For endpoints returning a bare list: put paging metadata in headers."""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
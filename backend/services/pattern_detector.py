@@ -0,0 +1,276 @@
+"""
+Pattern Detector — incremental aggregation alerts for feedback tickets.
+
+Every ticket bumps one counter row per dimension for the day it was created:
+
+  - reason:   the ticket's primary reason code
+  - bucket:   the department bucket
+  - district: the submitting ADM's region
+
+A row holds the ticket count plus HyperLogLog sketches of the distinct
+agents and ADMs involved. Updating a row is O(1). Checking a pattern reads at
+most PATTERN_WINDOW_DAYS small rows and merges their sketches, however many
+tickets the window holds. The counters live in the database, so restarts and
+multiple workers all see the same state. They are bumped in the transaction
+that creates the tickets (``count``), so a ticket is counted exactly when it
+is committed; alerts are checked afterwards (``check``).
+
+An AggregationAlert is raised once the window count reaches the threshold
+configured for that pattern type (PATTERN_THRESHOLD_*). At most one alert is
+active per pattern.
+"""
+
+import hashlib
+import json
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ADM, AggregationAlert, FeedbackTicket, PatternCounter
+from services.feedback_classifier import BUCKET_DISPLAY_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Alerts list the matching ticket IDs; keep that column bounded
+MAX_ALERT_TICKET_IDS = 200
+
+
+# ---------------------------------------------------------------------------
+# HyperLogLog
+# ---------------------------------------------------------------------------
+
+HLL_PRECISION = 10  # 2^10 one-byte registers, ~3% standard error
+HLL_REGISTERS = 1 << HLL_PRECISION
+
+
+def hll_add(registers: Optional[bytes], value) -> bytes:
+    """Return ``registers`` with ``value`` added."""
+    regs = bytearray(registers or bytes(HLL_REGISTERS))
+    h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+    index = h >> (64 - HLL_PRECISION)
+    rest = h & ((1 << (64 - HLL_PRECISION)) - 1)
+    rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+    if rank > regs[index]:
+        regs[index] = rank
+    return bytes(regs)
+
+
+def hll_merge(sketches: Iterable[Optional[bytes]]) -> bytes:
+    """Union of several sketches (register-wise max)."""
+    merged = bytes(HLL_REGISTERS)
+    for sketch in sketches:
+        if sketch:
+            merged = bytes(map(max, merged, sketch))
+    return merged
+
+
+def hll_count(registers: Optional[bytes]) -> int:
+    """Estimated number of distinct values in a sketch."""
+    if not registers:
+        return 0
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction (linear counting)
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+# ---------------------------------------------------------------------------
+# Detector
+# ---------------------------------------------------------------------------
+
+def _thresholds() -> dict[str, int]:
+    return {
+        "reason": settings.PATTERN_THRESHOLD_REASON,
+        "bucket": settings.PATTERN_THRESHOLD_BUCKET,
+        "district": settings.PATTERN_THRESHOLD_DISTRICT,
+    }
+
+
+class PatternDetector:
+    """Maintains daily pattern counters and raises aggregation alerts."""
+
+    def _dimensions(self, db: Session, ticket: FeedbackTicket) -> list[tuple[str, str]]:
+        dims = []
+        if ticket.reason_code:
+            dims.append(("reason", ticket.reason_code))
+        if ticket.bucket:
+            dims.append(("bucket", ticket.bucket))
+        adm = db.get(ADM, ticket.adm_id)
+        if adm and adm.region:
+            dims.append(("district", adm.region))
+        return dims
+
+    def _bump(self, db: Session, pattern_type: str, key: str, day: date,
+              agent_id: int, adm_id: int) -> None:
+        """Add one ticket to the (pattern, day) counter row."""
+        query = db.query(PatternCounter).filter(
+            PatternCounter.pattern_type == pattern_type,
+            PatternCounter.pattern_key == key,
+            PatternCounter.day == day,
+        )
+        counter = query.with_for_update().first()
+        if counter is None:
+            try:
+                with db.begin_nested():
+                    counter = PatternCounter(
+                        pattern_type=pattern_type, pattern_key=key, day=day, ticket_count=0,
+                    )
+                    db.add(counter)
+            except IntegrityError:
+                # Another worker created today's row first
+                counter = query.with_for_update().one()
+        counter.ticket_count = (counter.ticket_count or 0) + 1
+        counter.agents_hll = hll_add(counter.agents_hll, agent_id)
+        counter.adms_hll = hll_add(counter.adms_hll, adm_id)
+
+    def window_stats(self, db: Session, pattern_type: str, key: str) -> dict:
+        """Ticket count and distinct agents/ADMs for a pattern over the window."""
+        cutoff = datetime.utcnow().date() - timedelta(days=settings.PATTERN_WINDOW_DAYS)
+        rows = (
+            db.query(PatternCounter.ticket_count, PatternCounter.agents_hll, PatternCounter.adms_hll)
+            .filter(
+                PatternCounter.pattern_type == pattern_type,
+                PatternCounter.pattern_key == key,
+                PatternCounter.day >= cutoff,
+            )
+            .all()
+        )
+        return {
+            "tickets": sum(r.ticket_count or 0 for r in rows),
+            "agents": hll_count(hll_merge(r.agents_hll for r in rows)),
+            "adms": hll_count(hll_merge(r.adms_hll for r in rows)),
+        }
+
+    def _active_alert(self, db: Session, pattern_type: str, key: str) -> Optional[AggregationAlert]:
+        query = db.query(AggregationAlert).filter(AggregationAlert.status == "active")
+        if pattern_type == "reason":
+            query = query.filter(AggregationAlert.reason_code == key)
+        elif pattern_type == "bucket":
+            query = query.filter(
+                AggregationAlert.pattern_type == "bucket", AggregationAlert.bucket == key,
+            )
+        else:
+            query = query.filter(
+                AggregationAlert.pattern_type == "district", AggregationAlert.region == key,
+            )
+        return query.first()
+
+    def _ticket_ids(self, db: Session, pattern_type: str, key: str) -> list[str]:
+        cutoff = datetime.utcnow() - timedelta(days=settings.PATTERN_WINDOW_DAYS)
+        query = db.query(FeedbackTicket.ticket_id).filter(FeedbackTicket.created_at >= cutoff)
+        if pattern_type == "reason":
+            query = query.filter(FeedbackTicket.reason_code == key)
+        elif pattern_type == "bucket":
+            query = query.filter(FeedbackTicket.bucket == key)
+        else:
+            query = query.join(ADM, ADM.id == FeedbackTicket.adm_id).filter(ADM.region == key)
+        rows = query.order_by(FeedbackTicket.created_at.desc()).limit(MAX_ALERT_TICKET_IDS).all()
+        return [r.ticket_id for r in rows]
+
+    def _raise_alert(self, db: Session, pattern_type: str, key: str,
+                     ticket: FeedbackTicket, stats: dict) -> None:
+        days = settings.PATTERN_WINDOW_DAYS
+        subject = {
+            "reason": f"with reason {key}",
+            "bucket": f"in {BUCKET_DISPLAY_NAMES.get(key, key)}",
+            "district": f"from {key}",
+        }[pattern_type]
+        alert = AggregationAlert(
+            pattern_type=pattern_type,
+            description=(
+                f"Pattern detected: {stats['tickets']} tickets {subject} "
+                f"in last {days} days from {stats['agents']} agents across {stats['adms']} ADMs"
+            ),
+            affected_agents_count=stats["agents"],
+            affected_adms_count=stats["adms"],
+            region=key if pattern_type == "district" else None,
+            bucket=key if pattern_type == "bucket" else ticket.bucket,
+            reason_code=key if pattern_type == "reason" else None,
+            ticket_ids=json.dumps(self._ticket_ids(db, pattern_type, key)),
+        )
+        db.add(alert)
+        logger.info(f"Aggregation alert created for {pattern_type} {key}")
+
+    def count(self, db: Session, tickets: list[FeedbackTicket]) -> list[tuple[str, str]]:
+        """Bump the counters for newly created tickets (caller commits, with the tickets).
+
+        Returns the (pattern_type, key) pairs touched, for ``check``.
+        """
+        touched: set[tuple[str, str]] = set()
+        for ticket in tickets:
+            day = (ticket.created_at or datetime.utcnow()).date()
+            for pattern_type, key in self._dimensions(db, ticket):
+                self._bump(db, pattern_type, key, day, ticket.agent_id, ticket.adm_id)
+                touched.add((pattern_type, key))
+        return sorted(touched)
+
+    def check(self, db: Session, patterns: list[tuple[str, str]], ticket: FeedbackTicket) -> None:
+        """Raise any alerts the touched patterns now call for."""
+        thresholds = _thresholds()
+        for pattern_type, key in patterns:
+            stats = self.window_stats(db, pattern_type, key)
+            if stats["tickets"] < thresholds[pattern_type]:
+                continue
+            if self._active_alert(db, pattern_type, key):
+                continue
+            self._raise_alert(db, pattern_type, key, ticket, stats)
+        db.commit()
+
+    def backfill_if_empty(self, db: Session) -> int:
+        """Seed counters from the tickets in the current window on first run."""
+        if db.query(PatternCounter.id).first() is not None:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=settings.PATTERN_WINDOW_DAYS)
+        rows = (
+            db.query(
+                FeedbackTicket.reason_code, FeedbackTicket.bucket, FeedbackTicket.agent_id,
+                FeedbackTicket.adm_id, FeedbackTicket.created_at, ADM.region,
+            )
+            .outerjoin(ADM, ADM.id == FeedbackTicket.adm_id)
+            .filter(FeedbackTicket.created_at >= cutoff)
+            .all()
+        )
+        counters: dict[tuple[str, str, date], PatternCounter] = {}
+        for row in rows:
+            day = row.created_at.date()
+            for pattern_type, key in (
+                ("reason", row.reason_code), ("bucket", row.bucket), ("district", row.region),
+            ):
+                if not key:
+                    continue
+                counter = counters.get((pattern_type, key, day))
+                if counter is None:
+                    counter = counters[(pattern_type, key, day)] = PatternCounter(
+                        pattern_type=pattern_type, pattern_key=key, day=day, ticket_count=0,
+                    )
+                counter.ticket_count += 1
+                counter.agents_hll = hll_add(counter.agents_hll, row.agent_id)
+                counter.adms_hll = hll_add(counter.adms_hll, row.adm_id)
+        db.add_all(counters.values())
+        db.commit()
+        logger.info(f"Pattern counters backfilled from {len(rows)} tickets ({len(counters)} rows)")
+        return len(rows)
+
+    def prune(self, db: Session) -> int:
+        """Delete counter rows that have fallen out of the window."""
+        cutoff = datetime.utcnow().date() - timedelta(days=settings.PATTERN_WINDOW_DAYS + 1)
+        deleted = (
+            db.query(PatternCounter)
+            .filter(PatternCounter.day < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+
+
+# Singleton instance
+pattern_detector = PatternDetector()
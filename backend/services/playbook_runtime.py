@@ -0,0 +1,447 @@
+"""
+Playbook Runtime — runs agents through playbooks, one due step at a time.
+
+Each journey is a PlaybookRun row holding the playbook, the step to execute
+next and when it falls due. A step's delay_days is the wait before it runs,
+and its branching rules are resolved when it executes (against the run's
+context, e.g. agent_replied or quiz_score reported through the API).
+
+The scheduler loop works in batches of PLAYBOOK_RUNTIME_BATCH_SIZE:
+
+  1. claim: due, unleased active runs are leased in one guarded UPDATE
+     (``FOR UPDATE SKIP LOCKED`` on PostgreSQL, so several workers can
+     share the queue), then read back with their agent and ADM columns
+  2. plan: each step is executed in memory through the playbook registry
+     (indexed definitions, pre-compiled rules); success criteria and
+     max_duration_days are checked first
+  3. send: all messages of the batch go out concurrently through the
+     channel senders; voice-call steps become ADM diary entries
+  4. advance: every claimed run is written back with one executemany
+     UPDATE, guarded by its lease so a run reclaimed after a lease expiry
+     is never overwritten by a slow worker
+
+The runtime's own context keys (last_step, last_send_status, ...) are
+merged into the stored context in SQL when the run advances, so responses
+recorded through the API while a step was in flight are kept. A partial
+unique index allows one active run per agent.
+
+WhatsApp steps for an agent who has opted out send nothing and the run
+moves on; ADM steps still happen. Failed sends keep the run on the same
+step and retry with backoff until PLAYBOOK_MAX_ATTEMPTS, after which the
+run is marked failed. A crashed worker's claims simply expire after
+PLAYBOOK_RUNTIME_LEASE_SECONDS.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import Text, bindparam, cast, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from domain.enums import PlaybookActionType
+from domain.playbook_engine import PLAYBOOK_REGISTRY
+from domain.whatsapp_templates import TEMPLATES, get_compiled_template, language_code, render_template_safe
+from models import ADM, Agent, DiaryEntry, PlaybookRun
+from services.channels import OutboundMessage, SendResult, WhatsAppTemplate, channels
+
+logger = logging.getLogger(__name__)
+
+_AGENT_CHANNEL_ACTIONS = (PlaybookActionType.WHATSAPP_MESSAGE, PlaybookActionType.WHATSAPP_TRAINING)
+_ADM_CHANNEL_ACTIONS = (
+    PlaybookActionType.ADM_NUDGE, PlaybookActionType.TELEGRAM_MESSAGE, PlaybookActionType.ESCALATE,
+)
+# Minutes before retrying a step whose send failed, by attempt number
+_RETRY_BACKOFF_MINUTES = (5, 30, 120)
+
+_CLAIM_COLUMNS = (
+    PlaybookRun.id, PlaybookRun.agent_id, PlaybookRun.playbook_name, PlaybookRun.current_step,
+    PlaybookRun.context, PlaybookRun.attempts, PlaybookRun.started_at,
+    Agent.name.label("agent_name"), Agent.phone, Agent.language, Agent.lifecycle_state,
+    Agent.dormancy_reason, Agent.dormancy_duration_days, Agent.assigned_adm_id, Agent.whatsapp_opted_out_at,
+    ADM.name.label("adm_name"), ADM.telegram_chat_id,
+)
+
+
+def _merge_context(column, updates):
+    """SQL for ``column`` (a JSON object as text) with ``updates`` merged in, atomically."""
+    current = func.coalesce(column, "{}")
+    if settings.is_postgres:
+        return cast(cast(current, JSONB).op("||")(cast(updates, JSONB)), Text)
+    return func.json_patch(current, updates)
+
+
+def _step_context(row, context: dict) -> dict:
+    """Run context plus the agent fields steps substitute into their messages."""
+    reason = row.dormancy_reason or ""
+    merged = {
+        "agent_name": row.agent_name or "",
+        "adm_name": row.adm_name or "your ADM",
+        "lifecycle_state": row.lifecycle_state or "",
+        "dormancy_reason": reason,
+        "dormancy_reason_category": reason.split(".")[0] if "." in reason else "",
+        "dormancy_duration_days": str(row.dormancy_duration_days or 0),
+    }
+    merged.update(context)
+    return merged
+
+
+class PlaybookRuntime:
+    """Starts playbook runs and executes their due steps in batches."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Starting and steering runs
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _new_run(agent_id: int, playbook: dict, now: datetime) -> dict:
+        first = PLAYBOOK_REGISTRY.first_step(playbook["name"])
+        return {
+            "agent_id": agent_id,
+            "playbook_name": playbook["name"],
+            "current_step": first.step_number,
+            "status": "active",
+            "next_due_at": now + timedelta(days=first.delay_days),
+            "context": "{}",
+            "attempts": 0,
+            "started_at": now,
+            "updated_at": now,
+        }
+
+    @staticmethod
+    def _select(agent) -> Optional[dict]:
+        reason = agent.dormancy_reason
+        category = reason.split(".")[0] if reason and "." in reason else None
+        return PLAYBOOK_REGISTRY.select(agent.lifecycle_state or "dormant", category)
+
+    def start_run(self, db: Session, agent_id: int, playbook_name: Optional[str] = None) -> PlaybookRun:
+        """Start one agent on a playbook (the recommended one when no name is given)."""
+        agent = db.query(Agent).filter(Agent.id == agent_id).first()
+        if not agent:
+            raise ValueError(f"Agent {agent_id} not found")
+        playbook = PLAYBOOK_REGISTRY.get(playbook_name) if playbook_name else self._select(agent)
+        if playbook is None:
+            raise ValueError(f"No playbook '{playbook_name}'" if playbook_name else "No matching playbook")
+        if db.query(PlaybookRun.id).filter(
+            PlaybookRun.agent_id == agent_id, PlaybookRun.status == "active",
+        ).first():
+            raise LookupError(f"Agent {agent_id} already has an active playbook run")
+        run = PlaybookRun(**self._new_run(agent_id, playbook, datetime.utcnow()))
+        try:
+            with db.begin_nested():
+                db.add(run)
+        except IntegrityError:
+            # A concurrent start won the unique index
+            raise LookupError(f"Agent {agent_id} already has an active playbook run")
+        return run
+
+    def enroll(self, db: Session, agent_ids: Iterable[int]) -> dict:
+        """Start every listed agent on its recommended playbook, in bulk."""
+        agent_ids = list(dict.fromkeys(agent_ids))
+        report = {"enrolled": 0, "already_running": 0, "no_playbook": 0, "not_found": 0}
+        now = datetime.utcnow()
+        chunk = settings.PLAYBOOK_RUNTIME_BATCH_SIZE
+        for start in range(0, len(agent_ids), chunk):
+            ids = agent_ids[start:start + chunk]
+            agents = db.execute(
+                select(Agent.id, Agent.lifecycle_state, Agent.dormancy_reason).where(Agent.id.in_(ids))
+            ).all()
+            running = set(db.execute(
+                select(PlaybookRun.agent_id).where(
+                    PlaybookRun.agent_id.in_(ids), PlaybookRun.status == "active",
+                )
+            ).scalars())
+            rows = []
+            for agent in agents:
+                if agent.id in running:
+                    report["already_running"] += 1
+                    continue
+                playbook = self._select(agent)
+                if playbook is None:
+                    report["no_playbook"] += 1
+                    continue
+                rows.append(self._new_run(agent.id, playbook, now))
+            report["not_found"] += len(ids) - len(agents)
+            if not rows:
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(insert(PlaybookRun), rows)
+                report["enrolled"] += len(rows)
+            except IntegrityError:
+                # A concurrent start or enroll got some of these agents first
+                for row in rows:
+                    try:
+                        with db.begin_nested():
+                            db.execute(insert(PlaybookRun), [row])
+                        report["enrolled"] += 1
+                    except IntegrityError:
+                        report["already_running"] += 1
+        return report
+
+    @staticmethod
+    def update_context(db: Session, run: PlaybookRun, updates: dict) -> PlaybookRun:
+        """Merge agent responses (agent_replied, quiz_score, ...) into a run's context.
+
+        The merge happens in SQL, so it neither loses nor is lost to a
+        concurrent update, including the runtime advancing the run.
+        """
+        db.execute(
+            update(PlaybookRun)
+            .where(PlaybookRun.id == run.id)
+            .values(context=_merge_context(PlaybookRun.context, json.dumps(updates, default=str)))
+            .execution_options(synchronize_session=False)
+        )
+        db.expire(run, ["context"])
+        return run
+
+    @staticmethod
+    def cancel(run: PlaybookRun) -> PlaybookRun:
+        if run.status == "active":
+            run.status = "cancelled"
+            run.completed_at = datetime.utcnow()
+            run.claimed_until = None
+        return run
+
+    # ------------------------------------------------------------------
+    # Scheduler: claim -> plan -> send -> advance
+    # ------------------------------------------------------------------
+
+    def _claim(self) -> tuple[list, Optional[datetime]]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            lease = now + timedelta(seconds=settings.PLAYBOOK_RUNTIME_LEASE_SECONDS)
+            claimable = (
+                PlaybookRun.status == "active",
+                PlaybookRun.next_due_at <= now,
+                or_(PlaybookRun.claimed_until.is_(None), PlaybookRun.claimed_until < now),
+            )
+            due = (
+                select(PlaybookRun.id)
+                .where(*claimable)
+                .order_by(PlaybookRun.next_due_at)
+                .limit(settings.PLAYBOOK_RUNTIME_BATCH_SIZE)
+            )
+            if settings.is_postgres:
+                due = due.with_for_update(skip_locked=True)
+            ids = list(db.execute(due).scalars())
+            if not ids:
+                return [], None
+            # Re-checking the guard makes concurrent claimers on SQLite safe too
+            db.execute(
+                update(PlaybookRun)
+                .where(PlaybookRun.id.in_(ids), *claimable)
+                .values(claimed_until=lease)
+                .execution_options(synchronize_session=False)
+            )
+            rows = db.execute(
+                select(*_CLAIM_COLUMNS)
+                .join(Agent, Agent.id == PlaybookRun.agent_id)
+                .outerjoin(ADM, ADM.id == Agent.assigned_adm_id)
+                .where(PlaybookRun.id.in_(ids), PlaybookRun.claimed_until == lease)
+            ).all()
+            db.commit()
+            return rows, lease
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _plan(row, now: datetime) -> dict:
+        """Execute one claimed step in memory: its outbound message and next state."""
+        plan = {
+            "run_id": row.id, "agent_id": row.agent_id, "adm_id": row.assigned_adm_id,
+            "playbook": row.playbook_name, "step": row.current_step, "status": "active",
+            "attempts": row.attempts or 0, "message": None, "diary": None, "error": None,
+            "context_updates": {},
+        }
+        context = json.loads(row.context or "{}")
+        playbook = PLAYBOOK_REGISTRY.get(row.playbook_name)
+        if playbook is None:
+            plan.update(status="failed", error=f"unknown playbook '{row.playbook_name}'")
+            return plan
+
+        target = playbook.get("success_criteria", {}).get("target_state")
+        if target and row.lifecycle_state == target:
+            plan["status"] = "succeeded"
+            return plan
+        max_days = playbook.get("max_duration_days")
+        if max_days and row.started_at and now - row.started_at > timedelta(days=max_days):
+            plan["status"] = "expired"
+            return plan
+
+        step_context = _step_context(row, context)
+        result = PLAYBOOK_REGISTRY.execute(row.playbook_name, row.current_step, step_context)
+        if result is None:
+            plan["status"] = "completed"
+            return plan
+
+        action = result.action_type
+        config = PLAYBOOK_REGISTRY.step(row.playbook_name, row.current_step).step.get("action_config", {})
+        text = result.message
+        for key, value in step_context.items():
+            # execute_playbook_step substitutes strings only (e.g. {quiz_score})
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                text = text.replace(f"{{{key}}}", str(value))
+        if not text and config.get("template") in TEMPLATES:
+            text = render_template_safe(config["template"], language_code(row.language), step_context)
+        text = text or result.step_name
+
+        if action in _AGENT_CHANNEL_ACTIONS and row.whatsapp_opted_out_at:
+            # The agent replied STOP: the step passes without a message
+            plan["context_updates"]["last_send_status"] = "opted_out"
+        elif action in _AGENT_CHANNEL_ACTIONS:
+            template = None
+            if config.get("template") in TEMPLATES:
+                # Steps are business-initiated: WhatsApp needs the approved template
+                language = language_code(row.language)
+                variant = language if language in TEMPLATES[config["template"]].variants else "hi"
+                positional = get_compiled_template(config["template"], variant).positional
+                # WhatsApp rejects empty parameters
+                template = WhatsAppTemplate(config["template"], variant, tuple(
+                    str(step_context.get(k) or "-") for k in positional
+                ))
+            plan["message"] = OutboundMessage("whatsapp", row.phone, text, template)
+        elif action in _ADM_CHANNEL_ACTIONS:
+            plan["message"] = OutboundMessage("telegram", row.telegram_chat_id, text)
+        elif action == PlaybookActionType.VOICE_CALL and row.assigned_adm_id:
+            plan["diary"] = text
+
+        plan["context_updates"].update(last_step=row.current_step, last_step_at=now.isoformat())
+        if result.route_to_playbook and PLAYBOOK_REGISTRY.get(result.route_to_playbook):
+            next_playbook = PLAYBOOK_REGISTRY.get(result.route_to_playbook)["name"]
+            following = PLAYBOOK_REGISTRY.first_step(next_playbook)
+        else:
+            next_playbook = row.playbook_name
+            following = PLAYBOOK_REGISTRY.next_step(row.playbook_name, row.current_step, result.next_step)
+        plan["next"] = (next_playbook, following)
+        return plan
+
+    @staticmethod
+    def _advance(plans: list[dict], results: list[SendResult], lease: datetime) -> dict:
+        now = datetime.utcnow()
+        stats = {"executed": 0, "retrying": 0, "finished": 0}
+        params, diary = [], []
+        for plan, sent in zip(plans, results):
+            playbook, step, status = plan["playbook"], plan["step"], plan["status"]
+            attempts, next_due, error = plan["attempts"], None, plan["error"]
+
+            if status == "active" and sent and sent.status == "failed":
+                attempts += 1
+                error = sent.error
+                if attempts >= settings.PLAYBOOK_MAX_ATTEMPTS:
+                    status = "failed"
+                else:
+                    backoff = _RETRY_BACKOFF_MINUTES[min(attempts, len(_RETRY_BACKOFF_MINUTES)) - 1]
+                    next_due = now + timedelta(minutes=backoff)
+                    stats["retrying"] += 1
+            elif status == "active":
+                stats["executed"] += 1
+                if sent:
+                    plan["context_updates"]["last_send_status"] = sent.status
+                if plan["diary"]:
+                    diary.append({
+                        "adm_id": plan["adm_id"], "agent_id": plan["agent_id"],
+                        "scheduled_date": date.today(), "entry_type": "follow_up",
+                        "notes": plan["diary"], "status": "scheduled", "created_at": now,
+                    })
+                playbook, following = plan["next"]
+                attempts, error = 0, None
+                if following is None:
+                    status = "completed"
+                else:
+                    step = following.step_number
+                    next_due = now + timedelta(days=following.delay_days)
+
+            if status != "active":
+                stats["finished"] += 1
+            params.append({
+                "b_id": plan["run_id"], "b_lease": lease, "b_playbook": playbook, "b_step": step,
+                "b_status": status, "b_due": next_due, "b_context": json.dumps(plan["context_updates"], default=str),
+                "b_attempts": attempts, "b_error": error[:300] if error else None,
+                "b_completed": now if status != "active" else None,
+            })
+
+        runs = PlaybookRun.__table__
+        stmt = (
+            update(runs)
+            .where(runs.c.id == bindparam("b_id"), runs.c.claimed_until == bindparam("b_lease"))
+            .values(
+                playbook_name=bindparam("b_playbook"), current_step=bindparam("b_step"),
+                status=bindparam("b_status"), next_due_at=bindparam("b_due"),
+                context=_merge_context(runs.c.context, bindparam("b_context")), attempts=bindparam("b_attempts"),
+                last_error=bindparam("b_error"), completed_at=bindparam("b_completed"),
+                claimed_until=None, updated_at=now,
+            )
+        )
+        db = SessionLocal()
+        try:
+            db.execute(stmt, params)
+            if diary:
+                db.execute(insert(DiaryEntry), diary)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return stats
+
+    async def run_due(self) -> int:
+        """Execute one batch of due steps; returns the number of runs claimed."""
+        loop = asyncio.get_running_loop()
+        rows, lease = await loop.run_in_executor(None, self._claim)
+        if not rows:
+            return 0
+        now = datetime.utcnow()
+        plans = [self._plan(row, now) for row in rows]
+        outbound = [p["message"] for p in plans if p["message"]]
+        sent = iter(await channels.send_many(outbound))
+        results = [next(sent) if p["message"] else None for p in plans]
+        stats = await loop.run_in_executor(None, self._advance, plans, results, lease)
+        logger.info(f"Playbook runtime: {len(rows)} runs claimed, {stats}")
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    async def run(self) -> None:
+        while True:
+            try:
+                claimed = await self.run_due()
+            except Exception as e:
+                logger.error(f"Playbook runtime step failed: {e}")
+                claimed = 0
+            # A full batch means more steps are due — go again immediately
+            if claimed < settings.PLAYBOOK_RUNTIME_BATCH_SIZE:
+                await asyncio.sleep(settings.PLAYBOOK_RUNTIME_POLL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+playbook_runtime = PlaybookRuntime()
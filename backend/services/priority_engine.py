@@ -0,0 +1,225 @@
+"""
+Priority Engine — ranked "call these agents today" lists for every ADM.
+
+Applies the scoring rules of ``domain.adm_intelligence.rank_priority_agents``
+to the whole agent table in one columnar pass instead of one dict at a time:
+
+  - Agents are read as bare column tuples (no ORM objects, no date strings)
+    and the rules are evaluated over arrays of state, dates and engagement.
+    With NumPy this is vectorised; without it each row is scored in Python.
+  - Each ADM keeps a bounded min-heap of its best TOP_K candidates, ordered
+    like rank_priority_agents (score, then urgency, then agent id), so the
+    pass never sorts a whole portfolio.
+  - Only heap survivors are turned into ``PriorityAgent`` objects, by
+    handing their row to rank_priority_agents itself, so context and action
+    text always match the reference implementation.
+
+Results are cached per ADM. A fingerprint per ADM (agent count, latest
+updated_at, summed dormancy days and engagement, today's date) comes from a
+single GROUP BY; only ADMs whose fingerprint changed are re-scored, so an
+agent edit, reassignment, sweep or signal invalidates just its own ADM.
+
+The license-expiry rule is not applied: agents have no license expiry column.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from domain.adm_intelligence import PriorityAgent, rank_priority_agents
+from domain.enums import AgentLifecycleState
+from models import Agent
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_URGENCY_RANK = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2}
+_NO_LOW_ENGAGEMENT_RULE = (
+    AgentLifecycleState.ONBOARDED.value,
+    AgentLifecycleState.TERMINATED.value,
+    AgentLifecycleState.LAPSED.value,
+)
+
+_COLUMNS = (
+    Agent.id, Agent.assigned_adm_id, Agent.name, Agent.lifecycle_state, Agent.dormancy_reason,
+    Agent.dormancy_duration_days, Agent.engagement_score, Agent.last_contact_date,
+    Agent.date_of_joining,
+)
+
+
+def _ordinal(value) -> int:
+    return value.toordinal() if value else -1
+
+
+# ---------------------------------------------------------------------------
+# Scoring: (score, urgency rank) per row, same rules as rank_priority_agents
+# ---------------------------------------------------------------------------
+
+def _score_python(rows: list, today: int) -> tuple[list, list]:
+    scores, urgencies = [], []
+    for row in rows:
+        state, engagement = row[3], row[6] or 0.0
+        score, urgency = 0, 2
+        if state == AgentLifecycleState.AT_RISK:
+            score, urgency = 80, 1
+        elif state == AgentLifecycleState.DORMANT:
+            score, urgency = 60, 1
+        elif state == AgentLifecycleState.ONBOARDED and row[8] and today - row[8].toordinal() > 7:
+            score, urgency = 40, 1
+        if row[7] and today - row[7].toordinal() > 30:
+            score += 30
+        if engagement < 20 and state not in _NO_LOW_ENGAGEMENT_RULE:
+            score += 20
+        scores.append(score)
+        urgencies.append(urgency)
+    return scores, urgencies
+
+
+def _score_numpy(rows: list, today: int) -> tuple:
+    n = len(rows)
+    states = np.array([r[3] or "" for r in rows], dtype=object)
+    engagement = np.fromiter((r[6] or 0.0 for r in rows), dtype=np.float64, count=n)
+    contact = np.fromiter((_ordinal(r[7]) for r in rows), dtype=np.int64, count=n)
+    joined = np.fromiter((_ordinal(r[8]) for r in rows), dtype=np.int64, count=n)
+
+    at_risk = states == AgentLifecycleState.AT_RISK.value
+    dormant = states == AgentLifecycleState.DORMANT.value
+    new_uncontacted = (states == AgentLifecycleState.ONBOARDED.value) & (joined >= 0) & (today - joined > 7)
+    stale_contact = (contact >= 0) & (today - contact > 30)
+    low_engagement = (engagement < 20) & ~np.isin(states, _NO_LOW_ENGAGEMENT_RULE)
+
+    scores = 80 * at_risk + 60 * dormant + 40 * new_uncontacted + 30 * stale_contact + 20 * low_engagement
+    urgencies = np.where(at_risk | dormant | new_uncontacted, 1, 2)
+    return scores, urgencies
+
+
+def score_rows(rows: list, today: Optional[date] = None) -> tuple:
+    """Priority score and urgency rank (1 HIGH, 2 MEDIUM) for each agent row."""
+    today_ord = (today or date.today()).toordinal()
+    if np is not None and rows:
+        return _score_numpy(rows, today_ord)
+    return _score_python(rows, today_ord)
+
+
+def _to_priority_agent(row) -> PriorityAgent:
+    agent_id, _, name, state, reason, days, engagement, contact, joined = row
+    return rank_priority_agents([{
+        "id": agent_id,
+        "name": name,
+        "lifecycle_state": state,
+        "dormancy_reason": reason,
+        "dormancy_duration_days": days or 0,
+        "days_in_state": days or 0,
+        "engagement_score": engagement or 0.0,
+        "last_contact_date": contact,
+        "date_of_joining": joined,
+    }], max_results=1)[0]
+
+
+def rank_portfolios(rows: list, top_k: int, today: Optional[date] = None) -> dict[int, list[PriorityAgent]]:
+    """Top ``top_k`` PriorityAgents per ADM for agent rows spanning many ADMs."""
+    scores, urgencies = score_rows(rows, today)
+    if np is not None and rows:
+        candidates = np.flatnonzero(scores > 0).tolist()
+        scores, urgencies = scores.tolist(), urgencies.tolist()
+    else:
+        candidates = [i for i, score in enumerate(scores) if score > 0]
+
+    # Min-heap per ADM; the root is the weakest kept candidate
+    heaps: dict[int, list] = {}
+    for i in candidates:
+        row = rows[i]
+        key = (scores[i], -urgencies[i], -row[0], i)
+        heap = heaps.setdefault(row[1], [])
+        if len(heap) < top_k:
+            heapq.heappush(heap, key)
+        elif key > heap[0]:
+            heapq.heapreplace(heap, key)
+
+    return {
+        adm_id: [_to_priority_agent(rows[key[3]]) for key in sorted(heap, reverse=True)]
+        for adm_id, heap in heaps.items()
+    }
+
+
+# ---------------------------------------------------------------------------
+# Per-ADM cache
+# ---------------------------------------------------------------------------
+
+class PriorityEngine:
+    """Serves cached per-ADM priority lists, re-scoring only ADMs that changed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: dict[int, tuple] = {}  # adm_id -> (fingerprint, [PriorityAgent])
+
+    @staticmethod
+    def _fingerprints(db: Session, adm_ids: Optional[list]) -> dict[int, tuple]:
+        today = date.today()
+        stmt = (
+            select(
+                Agent.assigned_adm_id, func.count(Agent.id), func.max(Agent.updated_at),
+                func.sum(Agent.dormancy_duration_days), func.sum(Agent.engagement_score),
+            )
+            .where(Agent.assigned_adm_id.isnot(None))
+            .group_by(Agent.assigned_adm_id)
+        )
+        if adm_ids is not None:
+            stmt = stmt.where(Agent.assigned_adm_id.in_(adm_ids))
+        return {adm_id: (today, *rest) for adm_id, *rest in db.execute(stmt).all()}
+
+    def top_many(self, db: Session, adm_ids: Optional[Iterable[int]] = None) -> dict[int, list[PriorityAgent]]:
+        """Cached priority lists for the given ADMs (every ADM with agents when None)."""
+        adm_ids = list(adm_ids) if adm_ids is not None else None
+        fingerprints = self._fingerprints(db, adm_ids)
+        # The lock only guards the dict: the agent query and the re-scoring
+        # run outside it, so one slow ADM doesn't hold up every other reader
+        with self._lock:
+            seen = {adm_id: self._cache.get(adm_id) for adm_id in fingerprints}
+        lists = {adm_id: entry[1] for adm_id, entry in seen.items() if entry and entry[0] == fingerprints[adm_id]}
+        stale = [adm_id for adm_id in fingerprints if adm_id not in lists]
+        if stale:
+            stmt = select(*_COLUMNS).where(Agent.assigned_adm_id.isnot(None))
+            if len(stale) < len(fingerprints) or adm_ids is not None:
+                stmt = stmt.where(Agent.assigned_adm_id.in_(stale))
+            ranked = rank_portfolios(db.execute(stmt).all(), settings.PRIORITY_CACHE_TOP_K)
+            with self._lock:
+                for adm_id in stale:
+                    lists[adm_id] = ranked.get(adm_id, [])
+                    # Leave an entry another request stored (or dropped) meanwhile alone
+                    if self._cache.get(adm_id) is seen[adm_id]:
+                        self._cache[adm_id] = (fingerprints[adm_id], lists[adm_id])
+            logger.debug(f"Priority lists re-scored for {len(stale)} ADM(s)")
+        return {
+            adm_id: lists.get(adm_id, [])
+            for adm_id in (adm_ids if adm_ids is not None else fingerprints)
+        }
+
+    def top(self, db: Session, adm_id: int, limit: int = 5,
+            exclude: Iterable[int] = ()) -> list[PriorityAgent]:
+        """An ADM's highest-priority agents, best first."""
+        excluded = set(exclude)
+        ranked = self.top_many(db, [adm_id])[adm_id]
+        return [p for p in ranked if p.agent_id not in excluded][:limit]
+
+    def invalidate(self, adm_id: Optional[int] = None) -> None:
+        """Drop cached lists (all ADMs when no id is given)."""
+        with self._lock:
+            if adm_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(adm_id, None)
+
+
+# Singleton instance
+priority_engine = PriorityEngine()
@@ -0,0 +1,271 @@
+"""
+Recommendation Table — ADM recommendations precomputed per agent state.
+
+``domain.adm_intelligence.get_recommendation_for_agent`` and
+``compute_system_recommendation`` are pure functions of a few agent fields,
+and the numeric fields only matter through a threshold or two. The domain
+is therefore finite: lifecycle state x dormancy reason (a taxonomy code or
+none) x a bucket per numeric field. Both functions are evaluated once per
+key when the table is built (at startup), and serving a recommendation is a
+dict lookup.
+
+Buckets (upper bounds inclusive) follow the thresholds the functions branch on:
+
+    days in state          <=14 | 15-30 | >30   onboarded > 14, at-risk > 30
+    days since contact     never | <=30 | >30   dormant discovery call
+    days since engaged     never | <=7 | >7     dormant re-engagement window
+    engagement score       <=20 | 20-50 | >50   not read by the current rules
+
+Each key is evaluated at two values inside its buckets. Text that quotes
+the days in state ("At-risk for 45 days") becomes a template filled in on
+lookup; a key whose results differ in any other way is left out and
+computed directly. When a threshold in the domain functions changes, its
+edges here must change with it (``python -m benchmarks.recommendations``
+checks the table against direct calls). Dormancy reasons outside the taxonomy are looked up as no reason,
+which is how both functions treat them; lifecycle states outside
+AgentLifecycleState are computed directly.
+
+Portfolio rows use the same agent fields as the priority engine:
+dormancy_duration_days as days in state, and ``agent_engagement``'s
+last_active_at as the last positive signal.
+"""
+
+import logging
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from domain.adm_intelligence import compute_system_recommendation, get_recommendation_for_agent
+from domain.dormancy_taxonomy import DORMANCY_TAXONOMY
+from domain.enums import AgentLifecycleState
+from models import Agent, AgentEngagement
+
+logger = logging.getLogger(__name__)
+
+DAYS_IN_STATE_EDGES = (14, 30)
+LAST_CONTACT_EDGES = (30,)
+LAST_ENGAGED_EDGES = (7,)
+ENGAGEMENT_EDGES = (20.0, 50.0)
+
+_NEVER = -1
+
+_STATES = tuple(state.value for state in AgentLifecycleState)
+_REASONS = frozenset(reason["code"] for reason in DORMANCY_TAXONOMY)
+
+_PORTFOLIO_COLUMNS = (
+    Agent.id, Agent.name, Agent.lifecycle_state, Agent.dormancy_reason, Agent.dormancy_duration_days,
+    Agent.engagement_score, Agent.last_contact_date, AgentEngagement.last_active_at,
+)
+
+
+def _sample(bucket: int, edges: tuple, alternate: bool = False):
+    """A value inside the bucket: its upper edge (or just past the last edge), or the value below it."""
+    if bucket == _NEVER:
+        return None
+    value = edges[bucket] if bucket < len(edges) else edges[-1] + 2
+    return value - 1 if alternate else value
+
+
+def _buckets(edges: tuple, never: bool = False) -> range:
+    return range(_NEVER if never else 0, len(edges) + 1)
+
+
+def _template(a: str, b: str, days_a: int, days_b: int) -> Optional[str]:
+    """``a`` with the days in state as a format field, if that reproduces both samples."""
+    template = a.replace("%", "%%").replace(str(days_a), "%(days_in_state)s")
+    if template % {"days_in_state": days_a} == a and template % {"days_in_state": days_b} == b:
+        return template
+    return None
+
+
+def _entry(a: dict, b: dict, days_a: int, days_b: int) -> Optional[tuple[dict, tuple]]:
+    """Table entry from two evaluations in the same buckets, or None if it can't be tabulated.
+
+    Fields that differ must be text that quotes the days in state (e.g. "At-risk
+    for 45 days"); they are stored as templates and filled in on lookup.
+    """
+    if a.keys() != b.keys():
+        return None
+    values, templated = dict(a), []
+    for field, value in a.items():
+        if value == b[field]:
+            continue
+        template = _template(value, b[field], days_a, days_b) if isinstance(value, str) else None
+        if template is None:
+            return None
+        values[field] = template
+        templated.append(field)
+    return values, tuple(templated)
+
+
+def _fill(entry: tuple[dict, tuple], days_in_state: int) -> dict:
+    values, templated = entry
+    values = values.copy()
+    for field in templated:
+        values[field] = values[field] % {"days_in_state": days_in_state}
+    return values
+
+
+class RecommendationTable:
+    """Both recommendation functions, tabulated over the finite agent-state domain."""
+
+    def __init__(self):
+        # (recommendations, summaries), swapped as one reference on rebuild
+        self._snapshot: Optional[tuple[dict, dict]] = None
+
+    def build(self) -> int:
+        """Evaluate both functions for every key and swap the new table in."""
+        reasons = (None, *sorted(_REASONS))
+        recommendations = {}
+        summaries = {}
+        for state in _STATES:
+            for reason in reasons:
+                for days in _buckets(DAYS_IN_STATE_EDGES):
+                    days_a, days_b = _sample(days, DAYS_IN_STATE_EDGES), _sample(days, DAYS_IN_STATE_EDGES, True)
+                    for engagement in _buckets(ENGAGEMENT_EDGES):
+                        for contact in _buckets(LAST_CONTACT_EDGES, never=True):
+                            entry = _entry(
+                                get_recommendation_for_agent(
+                                    state, reason, days_a,
+                                    _sample(engagement, ENGAGEMENT_EDGES), _sample(contact, LAST_CONTACT_EDGES),
+                                ),
+                                get_recommendation_for_agent(
+                                    state, reason, days_b,
+                                    _sample(engagement, ENGAGEMENT_EDGES, True), _sample(contact, LAST_CONTACT_EDGES, True),
+                                ),
+                                days_a, days_b,
+                            )
+                            if entry is not None:
+                                recommendations[(state, reason, days, engagement, contact)] = entry
+                    for engaged in _buckets(LAST_ENGAGED_EDGES, never=True):
+                        entry = _entry(
+                            {"summary": compute_system_recommendation(
+                                state, days_a, _sample(engaged, LAST_ENGAGED_EDGES), reason,
+                            )},
+                            {"summary": compute_system_recommendation(
+                                state, days_b, _sample(engaged, LAST_ENGAGED_EDGES, True), reason,
+                            )},
+                            days_a, days_b,
+                        )
+                        if entry is not None:
+                            (values, templated) = entry
+                            summaries[(state, reason, days, engaged)] = (values["summary"], bool(templated))
+
+        self._snapshot = (recommendations, summaries)
+        logger.info(f"Recommendation table built: {len(recommendations)} recommendations, {len(summaries)} summaries")
+        return len(recommendations) + len(summaries)
+
+    def _tables(self) -> tuple[dict, dict]:
+        if self._snapshot is None:
+            self.build()
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Lookups (same arguments as the domain functions)
+    # ------------------------------------------------------------------
+
+    def recommendation(
+        self,
+        lifecycle_state: str,
+        dormancy_reason: Optional[str] = None,
+        days_in_state: int = 0,
+        engagement_score: float = 0.0,
+        last_contact_days_ago: Optional[int] = None,
+    ) -> dict:
+        """get_recommendation_for_agent from the table (a fresh dict; the talking-point lists are shared)."""
+        recommendations = (self._snapshot or self._tables())[0]
+        entry = recommendations.get((
+            lifecycle_state,
+            dormancy_reason if dormancy_reason in _REASONS else None,
+            bisect_left(DAYS_IN_STATE_EDGES, days_in_state),
+            bisect_left(ENGAGEMENT_EDGES, engagement_score or 0.0),
+            _NEVER if last_contact_days_ago is None else bisect_left(LAST_CONTACT_EDGES, last_contact_days_ago),
+        ))
+        if entry is None:
+            return get_recommendation_for_agent(
+                lifecycle_state, dormancy_reason, days_in_state, engagement_score, last_contact_days_ago,
+            )
+        values, templated = entry
+        if not templated:
+            return values.copy()
+        return _fill(entry, days_in_state)
+
+    def summary(
+        self,
+        lifecycle_state: str,
+        days_in_state: int = 0,
+        last_positive_signal_days_ago: Optional[int] = None,
+        dormancy_reason: Optional[str] = None,
+    ) -> str:
+        """compute_system_recommendation from the table."""
+        summaries = (self._snapshot or self._tables())[1]
+        entry = summaries.get((
+            lifecycle_state,
+            dormancy_reason if dormancy_reason in _REASONS else None,
+            bisect_left(DAYS_IN_STATE_EDGES, days_in_state),
+            _NEVER if last_positive_signal_days_ago is None else bisect_left(LAST_ENGAGED_EDGES, last_positive_signal_days_ago),
+        ))
+        if entry is None:
+            return compute_system_recommendation(
+                lifecycle_state, days_in_state, last_positive_signal_days_ago, dormancy_reason,
+            )
+        line, templated = entry
+        return line % {"days_in_state": days_in_state} if templated else line
+
+    # ------------------------------------------------------------------
+    # Agents
+    # ------------------------------------------------------------------
+
+    def for_row(self, row, today: date, now: datetime) -> dict:
+        """Recommendation for one _PORTFOLIO_COLUMNS row."""
+        agent_id, name, state, reason, days, engagement, last_contact, last_active = row
+        state = state or AgentLifecycleState.DORMANT.value
+        days = days or 0
+        contact_days = (today - last_contact).days if last_contact else None
+        engaged_days = (now - last_active).days if last_active else None
+        return {
+            "agent_id": agent_id,
+            "agent_name": name,
+            "lifecycle_state": state,
+            "dormancy_reason": reason,
+            "system_recommendation": self.summary(state, days, engaged_days, reason),
+            **self.recommendation(state, reason, days, engagement or 0.0, contact_days),
+        }
+
+    def for_agent(self, db: Session, agent_id: int) -> Optional[dict]:
+        """Recommendation for one agent, or None when it does not exist."""
+        row = db.execute(
+            select(*_PORTFOLIO_COLUMNS)
+            .outerjoin(AgentEngagement, AgentEngagement.agent_id == Agent.id)
+            .where(Agent.id == agent_id)
+        ).first()
+        if row is None:
+            return None
+        return self.for_row(row, date.today(), datetime.utcnow())
+
+    def for_portfolio(self, db: Session, adm_id: int, lifecycle_state: Optional[str] = None) -> dict:
+        """Recommendations for every agent assigned to an ADM, in one query."""
+        query = (
+            select(*_PORTFOLIO_COLUMNS)
+            .outerjoin(AgentEngagement, AgentEngagement.agent_id == Agent.id)
+            .where(Agent.assigned_adm_id == adm_id)
+            .order_by(Agent.id)
+        )
+        if lifecycle_state:
+            query = query.where(Agent.lifecycle_state == lifecycle_state)
+        today, now = date.today(), datetime.utcnow()
+        agents = [self.for_row(row, today, now) for row in db.execute(query)]
+        return {
+            "adm_id": adm_id,
+            "total": len(agents),
+            "by_action": dict(Counter(agent["action"] for agent in agents)),
+            "agents": agents,
+        }
+
+
+# Singleton instance
+recommendation_table = RecommendationTable()
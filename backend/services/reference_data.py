@@ -0,0 +1,245 @@
+"""
+Reference Data Cache — process-wide, read-mostly lookup tables.
+
+ReasonTaxonomy and Product (which also backs the bot's training catalogue)
+are read on nearly every ticket view, /feedback flow and /train flow, but
+change only when an admin edits them. Each table is loaded once into an
+immutable, indexed snapshot shared by every request in the process:
+
+  - reasons:  by code, active reasons by bucket (display order)
+  - products: by id, active products by category (name order)
+
+Freshness: a cheap fingerprint query (row count, max id, max timestamp) runs
+at most every VERSION_CHECK_SECONDS; the snapshot is rebuilt only when the
+fingerprint changes. The snapshot version is a hash of its rows, so a
+reload that finds no real change keeps the same ETag. In-process writers call ``invalidate()`` so their edits
+show up immediately, and a full reload every FULL_RELOAD_SECONDS covers
+in-place edits to ReasonTaxonomy (which has no updated_at column).
+
+Each snapshot carries a ``version`` string used as the HTTP ETag, so the bot
+and the frontend can revalidate with If-None-Match and get a 304 instead of
+re-downloading an unchanged taxonomy (see ``etag_response``).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import ReasonTaxonomy, Product
+
+logger = logging.getLogger(__name__)
+
+VERSION_CHECK_SECONDS = 30
+FULL_RELOAD_SECONDS = 600
+
+# Immutable row types mirroring the ORM columns (work with from_attributes schemas)
+ReasonRow = namedtuple("ReasonRow", [c.name for c in ReasonTaxonomy.__table__.columns])
+ProductRow = namedtuple("ProductRow", [c.name for c in Product.__table__.columns])
+
+
+@dataclass(frozen=True)
+class ReasonIndex:
+    """Immutable snapshot of the ReasonTaxonomy table."""
+    version: str
+    by_code: Mapping[str, ReasonRow]
+    active_by_bucket: Mapping[str, tuple]
+
+    def name(self, code: str) -> str:
+        """Human-readable reason name for a code (the code itself as fallback)."""
+        row = self.by_code.get(code)
+        return row.reason_name if row else code
+
+    def active(self, bucket: Optional[str] = None) -> list:
+        """Active reasons ordered by bucket then display order."""
+        if bucket:
+            return list(self.active_by_bucket.get(bucket, ()))
+        return [row for rows in self.active_by_bucket.values() for row in rows]
+
+
+@dataclass(frozen=True)
+class ProductIndex:
+    """Immutable snapshot of the Product table."""
+    version: str
+    by_id: Mapping[int, ProductRow]
+    active_by_category: Mapping[str, tuple]
+
+    def get(self, product_id: int) -> Optional[ProductRow]:
+        return self.by_id.get(product_id)
+
+    def active(self, category: Optional[str] = None) -> list:
+        """Active products ordered by category then name."""
+        if category:
+            return list(self.active_by_category.get(category, ()))
+        return [row for rows in self.active_by_category.values() for row in rows]
+
+
+def _group(rows: list, key: str) -> Mapping[str, tuple]:
+    grouped: dict = {}
+    for row in rows:
+        grouped.setdefault(getattr(row, key), []).append(row)
+    return MappingProxyType({k: tuple(v) for k, v in sorted(grouped.items())})
+
+
+def _content_version(rows: list) -> str:
+    """Stable hash of a snapshot's rows, so unchanged data keeps its ETag."""
+    return hashlib.sha1(repr(rows).encode()).hexdigest()[:16]
+
+
+def _build_reasons(db: Session) -> ReasonIndex:
+    rows = [
+        ReasonRow(*(getattr(r, f) for f in ReasonRow._fields))
+        for r in db.query(ReasonTaxonomy).order_by(
+            ReasonTaxonomy.bucket, ReasonTaxonomy.display_order,
+        ).all()
+    ]
+    return ReasonIndex(
+        version=_content_version(rows),
+        by_code=MappingProxyType({r.code: r for r in rows}),
+        active_by_bucket=_group([r for r in rows if r.active], "bucket"),
+    )
+
+
+def _build_products(db: Session) -> ProductIndex:
+    rows = [
+        ProductRow(*(getattr(p, f) for f in ProductRow._fields))
+        for p in db.query(Product).order_by(Product.category, Product.name).all()
+    ]
+    return ProductIndex(
+        version=_content_version(rows),
+        by_id=MappingProxyType({p.id: p for p in rows}),
+        active_by_category=_group([p for p in rows if p.active], "category"),
+    )
+
+
+class _CachedTable:
+    """One cached snapshot plus its fingerprint bookkeeping."""
+
+    def __init__(self, name: str, model, timestamp_column, builder: Callable):
+        self.name = name
+        self.model = model
+        self.timestamp_column = timestamp_column
+        self.builder = builder
+        self.snapshot = None
+        self.fingerprint = None
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+        self.refreshing = False
+        # Bumped by invalidate(), so a refresh that read before a write
+        # doesn't mark the table as checked
+        self.generation = 0
+
+    def _fingerprint(self, db: Session) -> tuple:
+        count, max_id, max_ts = db.query(
+            func.count(self.model.id), func.max(self.model.id), func.max(self.timestamp_column),
+        ).one()
+        return count, max_id, str(max_ts)
+
+    def _fresh(self, now: float) -> bool:
+        return self.snapshot is not None and now - self.checked_at < VERSION_CHECK_SECONDS
+
+    def get(self, db: Session, lock: threading.Lock):
+        now = time.monotonic()
+        if self._fresh(now):
+            return self.snapshot
+        # The lock only guards the bookkeeping: callers include async handlers
+        # (via run_sync), so no DB round trip may happen while it is held.
+        # One caller refreshes; the others keep serving the current snapshot.
+        with lock:
+            if self._fresh(now) or (self.refreshing and self.snapshot is not None):
+                return self.snapshot
+            self.refreshing = True
+            generation = self.generation
+        savepoint = None
+        try:
+            # A failed read rolls back only this savepoint, never the caller's pending writes
+            savepoint = db.begin_nested()
+            fingerprint = self._fingerprint(db)
+            stale = now - self.loaded_at >= FULL_RELOAD_SECONDS
+            snapshot = None
+            if self.snapshot is None or fingerprint != self.fingerprint or stale:
+                snapshot = self.builder(db)
+            savepoint.commit()
+            with lock:
+                if snapshot is not None:
+                    if self.snapshot is None or snapshot.version != self.snapshot.version:
+                        self.snapshot = snapshot
+                        logger.info(f"Reference data '{self.name}' loaded (version {snapshot.version})")
+                    self.fingerprint = fingerprint
+                if generation == self.generation:
+                    if snapshot is not None:
+                        self.loaded_at = now
+                    self.checked_at = now
+        except Exception as e:
+            # Table may not exist yet on first deploy — serve what we have
+            logger.warning(f"Could not load reference data '{self.name}': {e}")
+            if savepoint is not None and savepoint.is_active:
+                savepoint.rollback()
+        finally:
+            self.refreshing = False
+        return self.snapshot
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+
+
+_EMPTY_REASONS = ReasonIndex(version="empty", by_code=MappingProxyType({}), active_by_bucket=MappingProxyType({}))
+_EMPTY_PRODUCTS = ProductIndex(version="empty", by_id=MappingProxyType({}), active_by_category=MappingProxyType({}))
+
+
+class ReferenceDataCache:
+    """Loads reference tables once per process and serves immutable snapshots."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reasons = _CachedTable(
+            "reasons", ReasonTaxonomy, ReasonTaxonomy.created_at, _build_reasons,
+        )
+        self._products = _CachedTable(
+            "products", Product, Product.updated_at, _build_products,
+        )
+
+    def reasons(self, db: Session) -> ReasonIndex:
+        return self._reasons.get(db, self._lock) or _EMPTY_REASONS
+
+    def products(self, db: Session) -> ProductIndex:
+        return self._products.get(db, self._lock) or _EMPTY_PRODUCTS
+
+    def invalidate(self, *names: str) -> None:
+        """Force a re-check on next read (all tables when no name is given)."""
+        for table in (self._reasons, self._products):
+            if not names or table.name in names:
+                table.invalidate()
+
+
+# ---------------------------------------------------------------------------
+# HTTP helpers
+# ---------------------------------------------------------------------------
+
+def etag_response(request: Request, version: str, build: Callable[[], object]) -> Response:
+    """Serve ``build()`` as JSON with an ETag, or 304 if the client is current.
+
+    ``Cache-Control: no-cache`` makes browsers revalidate every time, which
+    with the ETag turns repeat loads into empty 304s.
+    """
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=json.loads(json.dumps(build(), default=str)), headers=headers)
+
+
+# Singleton instance
+reference_data = ReferenceDataCache()
@@ -0,0 +1,371 @@
+"""
+SLA Monitor — proactive warning / breach / escalation for department queues.
+
+SLA status used to be computed only when a ticket was read, so
+DepartmentQueue.sla_status and escalation_level went stale and department
+dashboards filtered on old data. The monitor keeps every open queue entry's
+next SLA transition in a hierarchical timing wheel and applies transitions
+when they fall due:
+
+  on_track -> warning     when 75% of the SLA window has elapsed
+  warning  -> breached    at the deadline (escalation_level 1: dept head)
+  breached -> level 2     one further SLA window past the deadline (CXO)
+
+Scheduling and cancelling are O(1), and each tick only touches the
+entries that are due. Due transitions are applied with one guarded bulk
+UPDATE per transition type. The guard re-checks that the ticket is still
+open and past its threshold, so a stale wheel entry can never regress a
+row. Only rows that actually changed produce notifications, so
+several processes running the monitor won't double-notify.
+
+Deadlines come from the ticket (set via FeedbackClassifier.compute_sla_deadline
+at submission); the window length from FeedbackClassifier.get_sla_hours.
+Startup reload reads only the needed columns of open tickets through the
+(status, sla_deadline) index, and a periodic resync picks up changes made by
+other processes.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Hashable, Optional
+
+import httpx
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import DepartmentQueue, FeedbackTicket
+from services.feedback_classifier import FeedbackClassifier
+
+logger = logging.getLogger(__name__)
+
+# Ticket statuses whose department SLA is still running
+SLA_OPEN_STATUSES = ("received", "classified", "routed", "pending_dept", "pending_adm")
+# Queue statuses that are no longer waiting on the department
+_QUEUE_DONE_STATUSES = ("responded", "closed")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _ts(dt: datetime) -> float:
+    return (dt - _EPOCH).total_seconds()
+
+
+# ---------------------------------------------------------------------------
+# Hierarchical timing wheel
+# ---------------------------------------------------------------------------
+
+class TimingWheel:
+    """Hierarchical timing wheel (Varghese & Lauck) keyed by an id.
+
+    Level 0 has one slot per tick; each higher level's slot spans a full
+    rotation of the level below. Timers far in the future sit in a coarse
+    slot and cascade down as their time approaches. Timers beyond the top
+    level wait in an overflow list that is re-examined once per top-level
+    rotation.
+    """
+
+    def __init__(self, tick_seconds: float = 60, sizes: tuple = (60, 24, 64)):
+        self.tick_seconds = tick_seconds
+        self.sizes = sizes
+        self.spans = []  # ticks covered by one slot of each level
+        span = 1
+        for size in sizes:
+            self.spans.append(span)
+            span *= size
+        self.horizon = span
+        self.levels: list[list[dict]] = [[{} for _ in range(size)] for size in sizes]
+        self.overflow: dict[Hashable, tuple[int, Any]] = {}
+        self.current_tick: Optional[int] = None
+        # key -> (expire_tick, payload); a timer is live only while present here
+        self._timers: dict[Hashable, tuple[int, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def _tick_of(self, when: float) -> int:
+        return int(when // self.tick_seconds)
+
+    def _place(self, key: Hashable, expire_tick: int, payload: Any) -> None:
+        delay = expire_tick - self.current_tick
+        for level, (size, span) in enumerate(zip(self.sizes, self.spans)):
+            if delay < size * span:
+                slot = (max(expire_tick, self.current_tick) // span) % size
+                self.levels[level][slot][key] = (expire_tick, payload)
+                return
+        self.overflow[key] = (expire_tick, payload)
+
+    def schedule(self, key: Hashable, when: float, payload: Any = None) -> None:
+        """Fire ``payload`` at ``when`` (epoch seconds); replaces any timer for ``key``."""
+        if self.current_tick is None:
+            self.current_tick = self._tick_of(time.time())
+        expire_tick = self._tick_of(when)
+        self._timers[key] = (expire_tick, payload)
+        self._place(key, expire_tick, payload)
+
+    def cancel(self, key: Hashable) -> None:
+        # Slots are cleaned lazily: stale slot entries are skipped on expiry
+        self._timers.pop(key, None)
+
+    def _live(self, key: Hashable, entry: tuple) -> bool:
+        return self._timers.get(key) == entry
+
+    def _cascade(self, level: int, slot: int) -> None:
+        bucket, self.levels[level][slot] = self.levels[level][slot], {}
+        for key, entry in bucket.items():
+            if self._live(key, entry):
+                self._place(key, *entry)
+
+    def advance(self, now: float) -> list[tuple[Hashable, Any]]:
+        """Move the wheel to ``now`` and return the (key, payload) pairs that expired."""
+        target = self._tick_of(now)
+        if self.current_tick is None:
+            self.current_tick = target
+        due = []
+        while True:
+            # Expire everything in the current level-0 slot
+            slot = self.current_tick % self.sizes[0]
+            bucket = self.levels[0][slot]
+            for key, entry in list(bucket.items()):
+                if entry[0] > self.current_tick:
+                    continue  # a later rotation
+                del bucket[key]
+                if self._live(key, entry):
+                    del self._timers[key]
+                    due.append((key, entry[1]))
+            if self.current_tick >= target:
+                break
+            self.current_tick += 1
+            # Cascade higher levels whose slot boundary we just crossed
+            for level in range(1, len(self.sizes)):
+                span = self.spans[level]
+                if self.current_tick % span:
+                    break
+                self._cascade(level, (self.current_tick // span) % self.sizes[level])
+            if self.current_tick % self.horizon == 0 and self.overflow:
+                pending, self.overflow = self.overflow, {}
+                for key, entry in pending.items():
+                    if self._live(key, entry):
+                        self._place(key, *entry)
+        return due
+
+
+# ---------------------------------------------------------------------------
+# SLA monitor
+# ---------------------------------------------------------------------------
+
+# transition -> (queue sla_status after, escalation_level after)
+_TRANSITIONS = {
+    "warning": ("warning", 0),
+    "breached": ("breached", 1),
+    "escalated": ("breached", 2),
+}
+
+
+def _next_transition(sla_status: Optional[str], escalation_level: Optional[int]) -> Optional[str]:
+    if (escalation_level or 0) >= 2:
+        return None
+    if sla_status == "breached" or (escalation_level or 0) >= 1:
+        return "escalated"
+    if sla_status == "warning":
+        return "breached"
+    return "warning"
+
+
+def _fire_at(kind: str, deadline: datetime, window: timedelta) -> datetime:
+    if kind == "warning":
+        return deadline - window * 0.25
+    if kind == "breached":
+        return deadline
+    return deadline + window
+
+
+class SLAMonitor:
+    """Schedules SLA transitions for open department queue entries."""
+
+    def __init__(self):
+        self.wheel = TimingWheel(tick_seconds=settings.SLA_MONITOR_TICK_SECONDS)
+        # Route handlers (event loop and threadpool) and the monitor thread share the wheel
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_sync = 0.0
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def track(self, queue_id: int, ticket_id: str, department: str,
+              deadline: datetime, sla_hours: int,
+              sla_status: str = "on_track", escalation_level: int = 0) -> None:
+        """(Re)schedule the next SLA transition for a queue entry."""
+        kind = _next_transition(sla_status, escalation_level)
+        with self._lock:
+            if kind is None or deadline is None:
+                self.wheel.cancel(queue_id)
+                return
+            window = timedelta(hours=sla_hours)
+            self.wheel.schedule(
+                queue_id,
+                _ts(_fire_at(kind, deadline, window)),
+                (kind, ticket_id, department, deadline, window),
+            )
+
+    def untrack(self, queue_id: int) -> None:
+        with self._lock:
+            self.wheel.cancel(queue_id)
+
+    def load(self, db: Session) -> int:
+        """Schedule every open queue entry (startup and periodic resync)."""
+        rows = db.execute(
+            select(
+                DepartmentQueue.id, DepartmentQueue.department,
+                DepartmentQueue.sla_status, DepartmentQueue.escalation_level,
+                FeedbackTicket.ticket_id, FeedbackTicket.bucket, FeedbackTicket.priority,
+                FeedbackTicket.sla_deadline,
+            )
+            .join(DepartmentQueue, DepartmentQueue.ticket_id == FeedbackTicket.id)
+            .where(
+                FeedbackTicket.status.in_(SLA_OPEN_STATUSES),
+                FeedbackTicket.sla_deadline.isnot(None),
+                DepartmentQueue.status.notin_(_QUEUE_DONE_STATUSES),
+            )
+        ).all()
+        for row in rows:
+            sla_hours = FeedbackClassifier.get_sla_hours(row.bucket, row.priority or "medium")
+            self.track(
+                row.id, row.ticket_id, row.department, row.sla_deadline, sla_hours,
+                row.sla_status, row.escalation_level,
+            )
+        self._last_sync = time.monotonic()
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Applying transitions
+    # ------------------------------------------------------------------
+
+    def apply(self, db: Session, due: list) -> list[dict]:
+        """Apply due transitions in bulk; return events for rows that changed."""
+        now = datetime.utcnow()
+        by_kind: dict[str, dict[int, tuple]] = {}
+        for queue_id, payload in due:
+            by_kind.setdefault(payload[0], {})[queue_id] = payload
+
+        events = []
+        for kind, entries in by_kind.items():
+            sla_status, level = _TRANSITIONS[kind]
+            window_ok = [
+                qid for qid, (_, _, _, deadline, window) in entries.items()
+                if _fire_at(kind, deadline, window) <= now
+            ]
+            if not window_ok:
+                continue
+            still_open = select(FeedbackTicket.id).where(
+                FeedbackTicket.status.in_(SLA_OPEN_STATUSES),
+                FeedbackTicket.sla_deadline.isnot(None),
+            )
+            if kind != "warning":
+                still_open = still_open.where(FeedbackTicket.sla_deadline <= now)
+            guard = and_(
+                DepartmentQueue.id.in_(window_ok),
+                DepartmentQueue.ticket_id.in_(still_open),
+                DepartmentQueue.status.notin_(_QUEUE_DONE_STATUSES),
+            )
+            if kind == "warning":
+                guard = and_(guard, DepartmentQueue.sla_status == "on_track")
+            else:
+                guard = and_(guard, DepartmentQueue.escalation_level < level)
+
+            # Row locks make a concurrent monitor wait, then fail the guard
+            changed = [
+                r.id for r in db.execute(
+                    select(DepartmentQueue.id).where(guard).with_for_update()
+                ).all()
+            ]
+            if not changed:
+                continue
+            db.execute(
+                update(DepartmentQueue)
+                .where(DepartmentQueue.id.in_(changed))
+                .values(sla_status=sla_status, escalation_level=level, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            for qid in changed:
+                _, ticket_id, department, deadline, window = entries[qid]
+                events.append({
+                    "event": kind,
+                    "queue_id": qid,
+                    "ticket_id": ticket_id,
+                    "department": department,
+                    "sla_deadline": deadline.isoformat(),
+                    "escalation_level": level,
+                })
+                # Queue the following transition (if any) from the new state
+                self.track(qid, ticket_id, department, deadline,
+                           window.total_seconds() / 3600, sla_status, level)
+        db.commit()
+        return events
+
+    async def notify(self, events: list[dict]) -> None:
+        """Log transitions and POST them to SLA_ALERT_WEBHOOK_URL if configured."""
+        for e in events:
+            logger.info(
+                f"SLA {e['event']}: {e['ticket_id']} ({e['department']}), "
+                f"escalation level {e['escalation_level']}"
+            )
+        if not events or not settings.SLA_ALERT_WEBHOOK_URL:
+            return
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                await client.post(settings.SLA_ALERT_WEBHOOK_URL, json={"events": events})
+        except Exception as e:
+            logger.warning(f"SLA alert webhook failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+
+    def _sync_step(self, resync: bool) -> list[dict]:
+        db = SessionLocal()
+        try:
+            if resync:
+                count = self.load(db)
+                logger.info(f"SLA monitor tracking {count} open queue entries")
+            with self._lock:
+                due = self.wheel.advance(time.time())
+            return self.apply(db, due) if due else []
+        except Exception as e:
+            db.rollback()
+            logger.error(f"SLA monitor step failed: {e}")
+            return []
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        resync_seconds = settings.SLA_MONITOR_RESYNC_MINUTES * 60
+        while True:
+            resync = time.monotonic() - self._last_sync >= resync_seconds or not self._last_sync
+            events = await loop.run_in_executor(None, self._sync_step, resync)
+            await self.notify(events)
+            await asyncio.sleep(self.wheel.tick_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+sla_monitor = SLAMonitor()
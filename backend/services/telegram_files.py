@@ -0,0 +1,370 @@
+"""
+Telegram File Proxy — streams voice notes and attachments to the web dashboard.
+
+The frontend cannot use Telegram file_ids directly, so the backend proxies
+them. This service keeps that cheap:
+
+- getFile lookups (file_id -> file_path) are cached in memory for less than
+  the hour Telegram guarantees a download path stays valid.
+- Files are streamed in chunks (never held in memory) and written through to
+  a bounded on-disk cache keyed by file_id, so repeat plays are served
+  locally. The least recently used files are evicted past the size cap.
+- Single ``Range: bytes=start-end`` requests are honoured (206 Partial
+  Content), which browsers need for seeking in audio/video and large PDFs.
+  Cached files serve ranges from disk; uncached ranges are forwarded to
+  Telegram while the full file is cached in the background.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Telegram keeps a getFile path valid for at least one hour
+FILE_PATH_TTL_SECONDS = 50 * 60
+FILE_PATH_CACHE_SIZE = 10_000
+
+CONTENT_TYPE_MAP = {
+    "pdf": "application/pdf",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "oga": "audio/ogg",
+    "mp4": "video/mp4",
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xls": "application/vnd.ms-excel",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "txt": "text/plain",
+    "zip": "application/zip",
+}
+
+
+def content_type_for(file_path: str) -> str:
+    ext = file_path.rsplit(".", 1)[-1].lower() if "." in file_path else ""
+    return CONTENT_TYPE_MAP.get(ext, "application/octet-stream")
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """Parse a single ``bytes=start-end`` range into inclusive offsets.
+
+    Returns None when there is no usable range (serve the whole file).
+    Raises HTTPException(416) when the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_s, _, end_s = range_header[6:].strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # Suffix range: last N bytes
+            start = max(0, size - int(end_s))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+class TelegramFileProxy:
+    """Resolves, caches and streams Telegram files."""
+
+    def __init__(self):
+        self.cache_dir = settings.TELEGRAM_FILE_CACHE_DIR
+        self.max_cache_bytes = settings.TELEGRAM_FILE_CACHE_MAX_MB * 1024 * 1024
+        self._client: Optional[httpx.AsyncClient] = None
+        # file_id -> (expires_at, file_path, file_size)
+        self._paths: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._filling: set[str] = set()
+        # Background cache fills; the loop only keeps weak references to tasks
+        self._fill_tasks: set[asyncio.Task] = set()
+
+    @property
+    def _token(self) -> str:
+        token = settings.TELEGRAM_BOT_TOKEN
+        if not token:
+            raise HTTPException(status_code=503, detail="Telegram integration not configured")
+        return token
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(30, read=60))
+        return self._client
+
+    # ------------------------------------------------------------------
+    # getFile lookup cache
+    # ------------------------------------------------------------------
+
+    async def resolve(self, file_id: str) -> tuple[str, int]:
+        """Return (file_path, file_size) for a file_id, using the lookup cache."""
+        cached = self._paths.get(file_id)
+        if cached and cached[0] > time.monotonic():
+            self._paths.move_to_end(file_id)
+            return cached[1], cached[2]
+
+        resp = await self._get_client().get(
+            f"https://api.telegram.org/bot{self._token}/getFile",
+            params={"file_id": file_id},
+        )
+        if resp.status_code != 200:
+            raise HTTPException(status_code=404, detail="File not found on Telegram")
+        data = resp.json()
+        if not data.get("ok"):
+            raise HTTPException(status_code=404, detail="Telegram file lookup failed")
+
+        file_path = data["result"].get("file_path", "")
+        file_size = data["result"].get("file_size", 0) or 0
+        if not file_path:
+            raise HTTPException(status_code=404, detail="No file path returned")
+
+        self._paths[file_id] = (time.monotonic() + FILE_PATH_TTL_SECONDS, file_path, file_size)
+        self._paths.move_to_end(file_id)
+        while len(self._paths) > FILE_PATH_CACHE_SIZE:
+            self._paths.popitem(last=False)
+        return file_path, file_size
+
+    # ------------------------------------------------------------------
+    # On-disk cache
+    # ------------------------------------------------------------------
+
+    def _cache_paths(self, file_id: str) -> tuple[str, str]:
+        key = hashlib.sha256(file_id.encode()).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".bin", base + ".json"
+
+    def _cached(self, file_id: str) -> Optional[tuple[str, str, int]]:
+        """Return (data_path, telegram_file_path, size) if the file is on disk."""
+        data_path, meta_path = self._cache_paths(file_id)
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            size = os.path.getsize(data_path)
+        except (OSError, ValueError):
+            return None
+        # Mark as recently used for LRU eviction
+        try:
+            os.utime(data_path)
+        except OSError:
+            pass
+        return data_path, meta["file_path"], size
+
+    def _evict(self) -> None:
+        """Delete least recently used files until the cache fits its cap."""
+        try:
+            entries = [
+                entry for entry in os.scandir(self.cache_dir)
+                if entry.name.endswith(".bin")
+            ]
+        except OSError:
+            return
+        stats = []
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # evicted by a concurrent _evict
+            stats.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_cache_bytes:
+                break
+            for victim in (path, path[:-4] + ".json"):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+
+    def _commit(self, part_path: str, data_path: str, meta_path: str, file_id: str, file_path: str) -> None:
+        """Publish a completed download into the cache, then enforce the cap."""
+        os.replace(part_path, data_path)
+        with open(meta_path, "w") as meta:
+            json.dump({"file_id": file_id, "file_path": file_path}, meta)
+        self._evict()
+
+    async def _stream_upstream(self, file_id: str, file_path: str, response: httpx.Response,
+                               cache: bool, claimed: bool = False):
+        """Yield upstream chunks, writing them through to the disk cache.
+
+        ``claimed`` means the caller already added file_id to ``_filling``.
+        """
+        data_path, meta_path = self._cache_paths(file_id)
+        part_path = f"{data_path}.{os.getpid()}.part"
+        fh = None
+        if cache and (claimed or file_id not in self._filling):
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fh = open(part_path, "wb")
+                self._filling.add(file_id)
+            except OSError as e:
+                logger.warning(f"Telegram file cache unavailable: {e}")
+        completed = False
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                if fh:
+                    fh.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            await response.aclose()
+            if fh:
+                fh.close()
+                self._filling.discard(file_id)
+                if completed:
+                    # The rename and eviction scan touch the whole cache directory
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self._commit, part_path, data_path, meta_path, file_id, file_path,
+                    )
+                else:
+                    # Client went away mid-download — don't keep a truncated file
+                    try:
+                        os.remove(part_path)
+                    except OSError:
+                        pass
+
+    async def _fill_cache(self, file_id: str, file_path: str) -> None:
+        """Background download of the full file into the disk cache (file_id already claimed)."""
+        try:
+            response = await self._open_upstream(file_path, None)
+            async for _ in self._stream_upstream(file_id, file_path, response, cache=True, claimed=True):
+                pass
+        except Exception as e:
+            logger.warning(f"Background cache fill failed for {file_id}: {e}")
+        finally:
+            self._filling.discard(file_id)
+
+    def _start_fill(self, file_id: str, file_path: str) -> None:
+        """Claim file_id and download it in the background, unless a fill is running."""
+        if file_id in self._filling:
+            return
+        self._filling.add(file_id)
+        task = asyncio.create_task(self._fill_cache(file_id, file_path))
+        self._fill_tasks.add(task)
+        task.add_done_callback(self._fill_tasks.discard)
+
+    async def _open_upstream(self, file_path: str, range_header: Optional[str]) -> httpx.Response:
+        client = self._get_client()
+        headers = {"Range": range_header} if range_header else {}
+        request = client.build_request(
+            "GET", f"https://api.telegram.org/file/bot{self._token}/{file_path}", headers=headers,
+        )
+        response = await client.send(request, stream=True)
+        if response.status_code not in (200, 206):
+            await response.aclose()
+            raise HTTPException(status_code=502, detail="Failed to download file from Telegram")
+        return response
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def stream(
+        self,
+        file_id: str,
+        range_header: Optional[str] = None,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Response:
+        """Build a streaming (optionally partial) response for a Telegram file."""
+        # Blocking file I/O stays off the event loop
+        cached = await asyncio.get_running_loop().run_in_executor(None, self._cached, file_id)
+        if cached:
+            data_path, file_path, size = cached
+            return self._local_response(
+                data_path, size, range_header,
+                media_type or content_type_for(file_path),
+                filename or file_path.rsplit("/", 1)[-1],
+            )
+
+        file_path, file_size = await self.resolve(file_id)
+        media_type = media_type or content_type_for(file_path)
+        filename = filename or file_path.rsplit("/", 1)[-1]
+        cacheable = self.max_cache_bytes > 0 and file_size <= self.max_cache_bytes
+        headers = {"Content-Disposition": f'inline; filename="{filename}"', "Accept-Ranges": "bytes"}
+
+        wants_range = bool(range_header) and range_header.strip() != "bytes=0-"
+        if wants_range:
+            # Seek into a file we don't have yet: forward the range, cache in background
+            response = await self._open_upstream(file_path, range_header)
+            for name in ("Content-Range", "Content-Length"):
+                if name in response.headers:
+                    headers[name] = response.headers[name]
+            if cacheable:
+                self._start_fill(file_id, file_path)
+            return StreamingResponse(
+                self._stream_upstream(file_id, file_path, response, cache=False),
+                status_code=response.status_code,
+                media_type=media_type,
+                headers=headers,
+            )
+
+        response = await self._open_upstream(file_path, None)
+        if "Content-Length" in response.headers:
+            headers["Content-Length"] = response.headers["Content-Length"]
+        return StreamingResponse(
+            self._stream_upstream(file_id, file_path, response, cache=cacheable),
+            media_type=media_type,
+            headers=headers,
+        )
+
+    @staticmethod
+    def _local_response(data_path: str, size: int, range_header: Optional[str],
+                        media_type: str, filename: str) -> Response:
+        byte_range = parse_range(range_header, size)
+        start, end = byte_range if byte_range else (0, size - 1)
+
+        def _read():
+            with open(data_path, "rb") as fh:
+                fh.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = fh.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+        headers = {
+            "Content-Disposition": f'inline; filename="{filename}"',
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(end - start + 1),
+        }
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return StreamingResponse(
+            _read(),
+            status_code=206 if byte_range else 200,
+            media_type=media_type,
+            headers=headers,
+        )
+
+
+# Singleton instance
+telegram_files = TelegramFileProxy()
@@ -0,0 +1,373 @@
+"""
+Ticket Analytics — SLA compliance and resolution-time statistics in SQL.
+
+Resolution time is ``department_responded_at - created_at`` in hours. Stats
+cover tickets *resolved* in the requested period, i.e. filtered on
+department_responded_at, and are reported overall, by bucket and by
+priority:
+
+  resolved, sla_met, sla_compliance_pct, mean_hours, p50_hours, p90_hours
+
+Live mode aggregates in the database. PostgreSQL computes the percentiles
+with ``percentile_cont``. SQLite has no ordered-set aggregates, so only the
+per-ticket hours column is streamed back, already sorted, and interpolated
+the same way.
+
+Long ranges (a start date more than ANALYTICS_ROLLUP_MIN_DAYS back) read
+``ticket_daily_rollups``: one row per (resolution day, bucket, priority)
+with counts, the hours sum and a fixed-bin hours histogram. Past days never change, so a daily job
+(``run_daily``, also run once at startup) rolls up every complete day, and
+reads add the days after the last rollup (normally just today) live. Reads
+never write. On PostgreSQL the job takes an advisory lock, so only one
+worker rebuilds at a time. Percentiles from the histogram are interpolated
+within a bin, so they are approximate, and the result says so
+(``approximate``). Without a date range the stats are live, so the default
+summary's percentiles are exact.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Optional
+
+from sqlalchemy import and_, case, func, text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import FeedbackTicket, TicketDailyRollup
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (hours) of the rollup histogram bins; the last bin is open-ended
+HOUR_BINS = (1, 2, 4, 8, 12, 24, 36, 48, 72, 96, 120, 168, 336)
+
+# pg_try_advisory_xact_lock key for the rollup job
+_ROLLUP_LOCK_KEY = 0x7469636B  # "tick"
+
+
+def _hours_expr():
+    responded, created = FeedbackTicket.department_responded_at, FeedbackTicket.created_at
+    if settings.is_postgres:
+        return func.extract("epoch", responded - created) / 3600.0
+    return (func.julianday(responded) - func.julianday(created)) * 24.0
+
+
+def _sla_met_expr():
+    return func.sum(case(
+        (and_(
+            FeedbackTicket.sla_deadline.isnot(None),
+            FeedbackTicket.department_responded_at <= FeedbackTicket.sla_deadline,
+        ), 1),
+        else_=0,
+    ))
+
+
+def _start_of(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _percentile_cont(values: list, p: float) -> Optional[float]:
+    """Linear-interpolated percentile of sorted values (same as percentile_cont)."""
+    if not values:
+        return None
+    pos = (len(values) - 1) * p
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def _histogram_percentile(hist: list, total: int, p: float) -> Optional[float]:
+    if not total:
+        return None
+    target = p * total
+    seen = 0
+    lower = 0.0
+    for upper, count in zip(HOUR_BINS + (None,), hist):
+        if count and seen + count >= target:
+            if upper is None:
+                return float(lower)  # open-ended bin: report its lower bound
+            return lower + (upper - lower) * (target - seen) / count
+        seen += count
+        lower = upper if upper is not None else lower
+    return float(lower)
+
+
+def _stats(resolved: int, sla_met: int, hours_sum: Optional[float],
+           p50: Optional[float], p90: Optional[float]) -> dict:
+    def _r(v):
+        return round(v, 1) if v is not None else None
+    return {
+        "resolved": resolved,
+        "sla_met": sla_met,
+        "sla_compliance_pct": round(sla_met / resolved * 100, 1) if resolved else 0.0,
+        "mean_hours": _r(hours_sum / resolved) if resolved and hours_sum is not None else None,
+        "p50_hours": _r(p50),
+        "p90_hours": _r(p90),
+    }
+
+
+class TicketAnalytics:
+    """SQL-side SLA / resolution-time analytics with a daily rollup."""
+
+    # ------------------------------------------------------------------
+    # Live (exact) statistics
+    # ------------------------------------------------------------------
+
+    def _live(self, db: Session, filters: list, group_col=None) -> dict:
+        hours = _hours_expr()
+        cols = [func.count(FeedbackTicket.id), _sla_met_expr(), func.sum(hours)]
+        if settings.is_postgres:
+            cols += [
+                func.percentile_cont(0.5).within_group(hours),
+                func.percentile_cont(0.9).within_group(hours),
+            ]
+        keys = [group_col] if group_col is not None else []
+        query = db.query(*keys, *cols).filter(*filters)
+        if group_col is not None:
+            query = query.group_by(group_col)
+
+        result = {}
+        for row in query.all():
+            key = row[0] if group_col is not None else None
+            n, met, total_hours = row[len(keys):len(keys) + 3]
+            p50 = p90 = None
+            if settings.is_postgres:
+                p50, p90 = row[len(keys) + 3:]
+            result[key] = [n or 0, int(met or 0), total_hours, p50, p90]
+
+        if not settings.is_postgres and result:
+            # SQLite: stream the sorted hours column and interpolate per group
+            query = db.query(*keys, hours.label("hours")).filter(*filters)
+            order = keys + [hours]
+            rows = query.order_by(*order).all()
+            grouped = groupby(rows, key=lambda r: r[0] if group_col is not None else None)
+            for key, group in grouped:
+                values = [r.hours for r in group if r.hours is not None]
+                if key in result:
+                    result[key][3] = _percentile_cont(values, 0.5)
+                    result[key][4] = _percentile_cont(values, 0.9)
+
+        return {key: _stats(*vals) for key, vals in result.items()}
+
+    def _histogram_rows(self, db: Session, filters: list, group_cols: list) -> list:
+        """Per-group count, SLA met, hours sum and binned hours histogram."""
+        hours = _hours_expr()
+        bins = []
+        lower = None
+        for upper in HOUR_BINS + (None,):
+            cond = []
+            if lower is not None:
+                cond.append(hours >= lower)
+            if upper is not None:
+                cond.append(hours < upper)
+            bins.append(func.sum(case((and_(*cond), 1), else_=0)))
+            lower = upper
+        query = (
+            db.query(*group_cols, func.count(FeedbackTicket.id), _sla_met_expr(), func.sum(hours), *bins)
+            .filter(*filters)
+            .group_by(*group_cols)
+        )
+        k = len(group_cols)
+        return [
+            (tuple(row[:k]), row[k] or 0, int(row[k + 1] or 0), row[k + 2] or 0.0,
+             [int(c or 0) for c in row[k + 3:]])
+            for row in query.all()
+        ]
+
+    # ------------------------------------------------------------------
+    # Daily rollups
+    # ------------------------------------------------------------------
+
+    def refresh_rollups(self, db: Session) -> int:
+        """Roll up every complete day not yet in ticket_daily_rollups (the daily job).
+
+        Returns the number of rollup rows written; 0 when another worker
+        holds the job's lock.
+        """
+        if settings.is_postgres and not db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ROLLUP_LOCK_KEY},
+        ).scalar():
+            db.rollback()
+            return 0
+        today = datetime.utcnow().date()
+        start = db.query(func.max(TicketDailyRollup.day)).scalar()
+        if start is None:
+            first = db.query(func.min(FeedbackTicket.department_responded_at)).scalar()
+            if first is None:
+                db.rollback()
+                return 0
+            start = first.date()
+        if start >= today:
+            db.rollback()
+            return 0
+        responded = FeedbackTicket.department_responded_at
+        day_expr = func.date(responded)
+        rows = self._histogram_rows(
+            db,
+            [responded >= _start_of(start), responded < _start_of(today)],
+            [day_expr, FeedbackTicket.bucket, FeedbackTicket.priority],
+        )
+        # The last rolled-up day may have been partial when it was built
+        db.query(TicketDailyRollup).filter(TicketDailyRollup.day >= start).delete(
+            synchronize_session=False
+        )
+        for (day, bucket, priority), n, met, hours_sum, hist in rows:
+            if isinstance(day, str):  # SQLite returns date() as text
+                day = date.fromisoformat(day)
+            db.add(TicketDailyRollup(
+                day=day, bucket=bucket, priority=priority or "medium",
+                responded_count=n, sla_met_count=met,
+                resolution_hours_sum=hours_sum, resolution_histogram=json.dumps(hist),
+            ))
+        db.commit()
+        logger.info(f"Ticket rollups refreshed from {start} ({len(rows)} rows)")
+        return len(rows)
+
+    def _from_rollups(self, db: Session, date_from: Optional[date], date_to: Optional[date],
+                      department: Optional[str]) -> dict:
+        rolled_up_to = db.query(func.max(TicketDailyRollup.day)).scalar()
+        if isinstance(rolled_up_to, str):
+            rolled_up_to = date.fromisoformat(rolled_up_to)
+
+        # (bucket, priority) -> [n, met, hours_sum, hist]
+        parts: list[tuple] = []
+        query = db.query(TicketDailyRollup)
+        if date_from:
+            query = query.filter(TicketDailyRollup.day >= date_from)
+        if date_to:
+            query = query.filter(TicketDailyRollup.day <= date_to)
+        if department:
+            query = query.filter(TicketDailyRollup.bucket == department)
+        for r in query.all():
+            parts.append((r.bucket, r.priority, r.responded_count, r.sla_met_count,
+                          r.resolution_hours_sum, json.loads(r.resolution_histogram or "[]")))
+
+        # Days the job hasn't rolled up yet (normally just today) are read live
+        live_from = rolled_up_to + timedelta(days=1) if rolled_up_to else None
+        if date_from and (live_from is None or date_from > live_from):
+            live_from = date_from
+        if date_to is None or live_from is None or date_to >= live_from:
+            responded = FeedbackTicket.department_responded_at
+            filters = [responded.isnot(None)]
+            if live_from:
+                filters.append(responded >= _start_of(live_from))
+            if date_to:
+                filters.append(responded < _start_of(date_to + timedelta(days=1)))
+            if department:
+                filters.append(FeedbackTicket.bucket == department)
+            for (bucket, priority), n, met, hours_sum, hist in self._histogram_rows(
+                db, filters, [FeedbackTicket.bucket, FeedbackTicket.priority],
+            ):
+                parts.append((bucket, priority or "medium", n, met, hours_sum, hist))
+
+        def _merge(items) -> dict:
+            n = met = 0
+            hours_sum = 0.0
+            hist = [0] * (len(HOUR_BINS) + 1)
+            for _, _, pn, pmet, psum, phist in items:
+                n += pn
+                met += pmet
+                hours_sum += psum or 0.0
+                hist = [a + b for a, b in zip(hist, phist)] if phist else hist
+            return _stats(n, met, hours_sum, _histogram_percentile(hist, n, 0.5),
+                          _histogram_percentile(hist, n, 0.9))
+
+        by_bucket = {}
+        for key in sorted({p[0] for p in parts}):
+            by_bucket[key] = _merge(p for p in parts if p[0] == key)
+        by_priority = {}
+        for key in sorted({p[1] for p in parts}):
+            by_priority[key] = _merge(p for p in parts if p[1] == key)
+        return {
+            "source": "rollup",
+            "approximate": True,
+            "overall": _merge(parts),
+            "by_bucket": by_bucket,
+            "by_priority": by_priority,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def resolution_stats(
+        self,
+        db: Session,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        department: Optional[str] = None,
+        adm_id: Optional[int] = None,
+        use_rollup: Optional[bool] = None,
+    ) -> dict:
+        """SLA compliance and resolution-time stats for tickets resolved in the range.
+
+        ``use_rollup=None`` picks rollups automatically for ranges starting
+        more than ANALYTICS_ROLLUP_MIN_DAYS back. Without a start date it
+        aggregates live, so the default summary reports exact percentiles.
+        Rollups have no ADM dimension, so an ``adm_id`` filter always uses
+        live aggregation. ``approximate`` is true when the percentiles come
+        from the rollup histograms.
+        """
+        if use_rollup is None:
+            span = ((date_to or datetime.utcnow().date()) - date_from).days if date_from else None
+            use_rollup = span is not None and span > settings.ANALYTICS_ROLLUP_MIN_DAYS
+        if use_rollup and adm_id is None:
+            return self._from_rollups(db, date_from, date_to, department)
+
+        responded = FeedbackTicket.department_responded_at
+        filters = [responded.isnot(None)]
+        if date_from:
+            filters.append(responded >= _start_of(date_from))
+        if date_to:
+            filters.append(responded < _start_of(date_to + timedelta(days=1)))
+        if department:
+            filters.append(FeedbackTicket.bucket == department)
+        if adm_id:
+            filters.append(FeedbackTicket.adm_id == adm_id)
+
+        empty = _stats(0, 0, None, None, None)
+        return {
+            "source": "live",
+            "approximate": False,
+            "overall": self._live(db, filters).get(None, empty),
+            "by_bucket": self._live(db, filters, FeedbackTicket.bucket),
+            "by_priority": self._live(db, filters, FeedbackTicket.priority),
+        }
+
+
+# Singleton instance
+ticket_analytics = TicketAnalytics()
+
+
+def refresh_rollups() -> int:
+    """Run the rollup job once on its own session."""
+    db = SessionLocal()
+    try:
+        return ticket_analytics.refresh_rollups(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _seconds_until(hour_utc: int) -> float:
+    now = datetime.utcnow()
+    run_at = now.replace(hour=hour_utc, minute=5, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+async def run_daily() -> None:
+    """Background loop: roll up the previous day at ANALYTICS_ROLLUP_HOUR_UTC (a few minutes past)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(_seconds_until(settings.ANALYTICS_ROLLUP_HOUR_UTC))
+        try:
+            await loop.run_in_executor(None, refresh_rollups)
+        except Exception as e:
+            logger.error(f"Ticket rollup job failed: {e}")
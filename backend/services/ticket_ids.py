@@ -0,0 +1,191 @@
+"""
+Ticket ID Allocator — hands out FB-YYYY-NNNNN feedback ticket IDs.
+
+The old approach read the latest ticket_id and added one, so concurrent
+submissions could pick the same number and fail on the unique constraint.
+Numbers now come from a per-year counter that only ever moves forward:
+
+  - PostgreSQL: a sequence per year (``feedback_ticket_seq_YYYY``) with
+    INCREMENT BY TICKET_ID_BLOCK_SIZE. Each nextval() reserves a whole block
+    for this process, which formats IDs from it locally until it runs out.
+    The block is sized from the sequence's own increment, read in the same
+    query, so processes configured with different block sizes never
+    overlap. ``prepare`` raises the increment to a larger configured size
+    (shrinking it could hand out numbers inside blocks already reserved).
+    Sequences are non-transactional, so a rolled-back submission just leaves
+    a gap — numbers are unique, not gapless. ``prepare`` creates this and
+    next year's sequences at startup; a request that finds one missing
+    creates it in a savepoint of its own transaction. The process lock only
+    guards the local blocks: callers include async handlers (via run_sync),
+    so nextval and the DDL run outside it.
+  - SQLite: a row per year in ``ticket_id_counters`` incremented inside the
+    caller's transaction. SQLite's database-wide write lock serialises
+    allocations, and the increment rolls back together with the ticket.
+
+Both counters start above the highest number already used that year, so the
+switch-over needs no data migration.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, text, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import FeedbackTicket, TicketIdCounter
+
+logger = logging.getLogger(__name__)
+
+
+def _prefix(year: int) -> str:
+    return f"FB-{year}-"
+
+
+def _highest_used(db: Session, year: int) -> int:
+    """Highest ticket number already issued for ``year`` (0 if none)."""
+    prefix = _prefix(year)
+    # Longer suffix = bigger number; among equal lengths string order works
+    last = (
+        db.query(FeedbackTicket.ticket_id)
+        .filter(FeedbackTicket.ticket_id.like(f"{prefix}%"))
+        .order_by(func.length(FeedbackTicket.ticket_id).desc(), FeedbackTicket.ticket_id.desc())
+        .first()
+    )
+    if not last:
+        return 0
+    try:
+        return int(last.ticket_id[len(prefix):])
+    except ValueError:
+        return 0
+
+
+class TicketIdAllocator:
+    """Allocates unique, per-year ticket numbers."""
+
+    def __init__(self, block_size: int = 20):
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        # year -> blocks of [next number, end (exclusive)] — PostgreSQL only
+        self._blocks: dict[int, list[list[int]]] = {}
+        # Years whose sequence exists (created by prepare or on demand)
+        self._sequences: set[int] = set()
+
+    # ------------------------------------------------------------------
+    # PostgreSQL: sequence per year, block allocation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _sequence_name(year: int) -> str:
+        return f"feedback_ticket_seq_{year}"
+
+    def _create_sequence(self, db: Session, year: int) -> None:
+        start = _highest_used(db, year) + 1
+        db.execute(text(
+            f"CREATE SEQUENCE IF NOT EXISTS {self._sequence_name(year)} "
+            f"START WITH {start} INCREMENT BY {self.block_size}"
+        ))
+
+    def prepare(self, db: Session) -> None:
+        """Create this and next year's sequences (startup; no-op outside PostgreSQL)."""
+        if not settings.is_postgres:
+            return
+        year = datetime.utcnow().year
+        for y in (year, year + 1):
+            self._create_sequence(db, y)
+            name = self._sequence_name(y)
+            increment = db.execute(text(
+                f"SELECT seqincrement FROM pg_sequence WHERE seqrelid = '{name}'::regclass"
+            )).scalar_one()
+            if increment < self.block_size:
+                # Safe only upwards: the next block starts past every block already taken
+                db.execute(text(f"ALTER SEQUENCE {name} INCREMENT BY {self.block_size}"))
+                logger.info(f"Ticket sequence {name}: increment {increment} -> {self.block_size}")
+            elif increment > self.block_size:
+                logger.info(f"Ticket sequence {name} keeps increment {increment} (blocks sized from it)")
+        db.commit()
+        self._sequences.update((year, year + 1))
+
+    def _take(self, year: int) -> Optional[int]:
+        """Next number from this process's blocks, or None when they are used up (lock held)."""
+        blocks = self._blocks.get(year)
+        while blocks:
+            block = blocks[-1]
+            if block[0] < block[1]:
+                block[0] += 1
+                return block[0] - 1
+            blocks.pop()
+        return None
+
+    def _next_postgres(self, db: Session, year: int) -> int:
+        with self._lock:
+            number = self._take(year)
+        if number is not None:
+            return number
+
+        name = self._sequence_name(year)
+        if year not in self._sequences:
+            # Missed by prepare(): create it in the request's transaction
+            try:
+                with db.begin_nested():
+                    self._create_sequence(db, year)
+            except DBAPIError as e:
+                # Another request created it at the same moment (and has committed by now)
+                logger.info(f"Ticket sequence for {year} created concurrently: {e}")
+            self._sequences.add(year)
+        try:
+            start, increment = db.execute(text(
+                f"SELECT nextval('{name}'), "
+                f"(SELECT seqincrement FROM pg_sequence WHERE seqrelid = '{name}'::regclass)"
+            )).one()
+        except DBAPIError:
+            # The transaction that created it rolled back: create it again next time
+            self._sequences.discard(year)
+            raise
+        with self._lock:
+            if increment > 1:
+                self._blocks.setdefault(year, []).append([start + 1, start + increment])
+        return start
+
+    # ------------------------------------------------------------------
+    # SQLite (and anything else): counter row in the caller's transaction
+    # ------------------------------------------------------------------
+
+    def _next_counter(self, db: Session, year: int) -> int:
+        scope = f"feedback_ticket:{year}"
+        bump = (
+            update(TicketIdCounter)
+            .where(TicketIdCounter.scope == scope)
+            .values(next_value=TicketIdCounter.next_value + 1)
+        )
+        if db.execute(bump).rowcount == 0:
+            first = _highest_used(db, year) + 1
+            try:
+                with db.begin_nested():
+                    db.add(TicketIdCounter(scope=scope, next_value=first + 1))
+                return first
+            except IntegrityError:
+                # Another writer created the row first
+                db.execute(bump)
+        value = db.query(TicketIdCounter.next_value).filter(TicketIdCounter.scope == scope).scalar()
+        return value - 1
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def next_ticket_id(self, db: Session) -> str:
+        """Allocate the next ticket ID for the current year."""
+        year = datetime.utcnow().year
+        if settings.is_postgres:
+            number = self._next_postgres(db, year)
+        else:
+            number = self._next_counter(db, year)
+        return f"{_prefix(year)}{number:05d}"
+
+
+# Singleton instance
+ticket_id_allocator = TicketIdAllocator(block_size=settings.TICKET_ID_BLOCK_SIZE)
@@ -0,0 +1,129 @@
+"""
+Cache check: the bot's API client serves repeat GETs from its cache and drops what a write changes.
+
+Drives ``APIClient`` against an in-process fake backend (an httpx
+MockTransport that counts the requests it gets), with the shapes the real
+endpoints return, including the JSON list from
+/feedback-tickets/reasons/by-bucket:
+
+  - C concurrent identical GETs per endpoint must reach the backend once
+    (single flight), and the next N reads none at all (cache hits)
+  - an error response is never cached
+  - submitting or closing a ticket must drop the ticket lists and the
+    cached /adm/{id}/home and /adm/{id}/stats responses (they show
+    open-ticket counts): only the ADM's when its telegram id is passed,
+    every ADM's otherwise
+
+Reports backend requests and cached reads per second.
+
+Run from bot/:
+  python -m benchmarks.api_cache [--concurrency 50] [--reads 10000]
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from utils.api_client import APIClient
+
+REASONS = [{"bucket": "finance", "reasons": [{"code": "FIN-01", "label": "Commission delay"}]}]
+
+
+class FakeBackend:
+    """Answers the endpoints the check uses and counts requests per path."""
+
+    def __init__(self):
+        self.requests: Counter = Counter()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/api/v1")
+        self.requests[path] += 1
+        if path == "/feedback-tickets/reasons/by-bucket":
+            return httpx.Response(200, json=REASONS)
+        if path == "/feedback-tickets/":
+            return httpx.Response(200, json={"tickets": [], "total": 0})
+        if path.endswith("/home") or path.endswith("/stats"):
+            return httpx.Response(200, json={"open_tickets": self.requests["/feedback-tickets/submit"]})
+        if path == "/feedback-tickets/submit":
+            return httpx.Response(201, json={"ticket_id": "FB-2026-00001"})
+        if path.endswith("/close"):
+            return httpx.Response(200, json={"status": "ok"})
+        return httpx.Response(404, json={"detail": "Not found"})
+
+
+def _client(backend: FakeBackend) -> APIClient:
+    client = APIClient(base_url="http://backend/api/v1")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(backend))
+    return client
+
+
+async def _check(args) -> list[str]:
+    backend = FakeBackend()
+    client = _client(backend)
+    problems = []
+    reads = {
+        "/feedback-tickets/reasons/by-bucket": client.get_reason_taxonomy,
+        "/feedback-tickets/": lambda: client.get_adm_tickets(1),
+        "/adm/111/home": lambda: client.get_bot_home(111),
+        "/adm/111/stats": lambda: client.get_adm_stats(111),
+        "/adm/222/home": lambda: client.get_bot_home(222),
+    }
+
+    for path, read in reads.items():
+        results = await asyncio.gather(*(read() for _ in range(args.concurrency)))
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            await read()
+        seconds = time.perf_counter() - started
+        print(f"  {path:38} backend requests {backend.requests[path]}   "
+              f"cached reads {args.reads / seconds:10,.0f}/s")
+        if backend.requests[path] != 1:
+            problems.append(f"{path}: {backend.requests[path]} backend requests, expected 1")
+        if path.endswith("by-bucket") and results[0] != REASONS:
+            problems.append(f"{path}: returned {results[0]!r}")
+
+    for _ in range(2):
+        await client.get("/training/no-such-product")  # a cached path, answered 404
+    if backend.requests["/training/no-such-product"] != 2:
+        problems.append("an error response was cached")
+
+    await client.submit_feedback_ticket({"agent_id": 1, "adm_id": 1}, telegram_id=111)
+    before = dict(backend.requests)
+    for read in reads.values():
+        await read()
+    changed = {p for p in reads if backend.requests[p] > before.get(p, 0)}
+    expected = {"/feedback-tickets/", "/adm/111/home", "/adm/111/stats"}
+    print(f"  after submit (telegram id 111): refetched {sorted(changed)}")
+    if changed != expected:
+        problems.append(f"submit refetched {sorted(changed)}, expected {sorted(expected)}")
+
+    await client.close_ticket("FB-2026-00001")
+    before = dict(backend.requests)
+    for read in reads.values():
+        await read()
+    changed = {p for p in reads if backend.requests[p] > before.get(p, 0)}
+    expected = {"/feedback-tickets/", "/adm/111/home", "/adm/111/stats", "/adm/222/home"}
+    print(f"  after close (no telegram id):    refetched {sorted(changed)}")
+    if changed != expected:
+        problems.append(f"close refetched {sorted(changed)}, expected {sorted(expected)}")
+
+    await client.close()
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50, help="identical GETs in flight at once")
+    parser.add_argument("--reads", type=int, default=10_000, help="cached reads timed per endpoint")
+    args = parser.parse_args()
+
+    problems = asyncio.run(_check(args))
+    assert not problems, problems
+    print("cache hits, single flight and invalidation as expected")
+
+
+if __name__ == "__main__":
+    main()
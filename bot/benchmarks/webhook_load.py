@@ -0,0 +1,289 @@
+"""
+Load test: Telegram updates through the webhook ingest and its workers, end to end.
+
+Starts a fake Telegram Bot API (which also answers the backend API calls the
+handlers make), the ingest app from ``webhook.py`` with WEBHOOK_WORKERS
+worker processes, and posts ``/help`` updates from C chats at a fixed rate
+R for D seconds. Every update is answered by the worker with a
+sendMessage, which the fake API records. Reports:
+
+  - ingest ack latency (p50 / p99) and status counts
+  - replies delivered per second, and end-to-end latency from the POST to the
+    reply (p50 / p99), pairing each chat's replies with its updates in order
+  - updates that never got a reply
+
+``--kill-worker-at S`` kills one worker S seconds in. Its shard answers 503
+until the supervisor restarts it; the driver retries those like Telegram
+does. Updates already queued to the killed worker are lost and show up as
+unanswered.
+
+Driver, fake API, ingest and workers share the machine; give it at least
+WEBHOOK_WORKERS + 1 cores before reading the numbers as the bot's capacity.
+
+Run from bot/:
+  python -m benchmarks.webhook_load [--rate 1000] [--seconds 10] [--chats 2000] [--workers 4] [--kill-worker-at 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+import urllib.parse
+from collections import defaultdict, deque
+from typing import Optional
+
+# Retry delay for 503s (Telegram backs off for about this long)
+_RETRY_SECONDS = 0.5
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _pct(values: list, p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 1)
+
+
+def _update(update_id: int, chat_id: int) -> bytes:
+    return json.dumps({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "ADM"},
+            "text": "/help", "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    }).encode()
+
+
+class FakeTelegram:
+    """Bot API methods the workers call, plus GET /api/v1/... for the backend client."""
+
+    def __init__(self):
+        self.replies: dict[int, list[float]] = defaultdict(list)
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @staticmethod
+    def _params(body: bytes) -> dict:
+        """Bot API parameters; PTB form-encodes them with JSON values."""
+        return {
+            key: json.loads(value) if value[:1] in "[{" or value.lstrip("-").isdigit() else value
+            for key, value in urllib.parse.parse_qsl(body.decode())
+        }
+
+    def _respond(self, method: str, path: str, body: bytes) -> dict:
+        if path.startswith("/api/"):
+            return {"id": 1, "name": "Bench ADM", "telegram_id": 0}
+        name = path.rsplit("/", 1)[-1]
+        if name == "getMe":
+            return {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}}
+        if name == "sendMessage":
+            data = self._params(body)
+            chat_id = int(data.get("chat_id", 0))
+            self.replies[chat_id].append(time.perf_counter())
+            return {"ok": True, "result": {
+                "message_id": self.requests, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", ""),
+            }}
+        return {"ok": True, "result": True}
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {
+                    k.strip().lower(): v.strip()
+                    for k, _, v in (line.partition(":") for line in lines[1:] if line)
+                }
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                data = json.dumps(self._respond(method, path.split("?", 1)[0], body)).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, port: int) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", port, backlog=1024)
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def _post(reader, writer, path: str, body: bytes) -> int:
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = next((int(line.split(":", 1)[1]) for line in lines[1:] if line.lower().startswith("content-length:")), 0)
+    await reader.readexactly(length)
+    return int(lines[0].split(" ", 2)[1])
+
+
+async def _drive(args, port: int, path: str) -> dict:
+    """Post updates at ``args.rate`` per second; 503s are retried after _RETRY_SECONDS."""
+    total = int(args.rate * args.seconds)
+    queue: asyncio.Queue = asyncio.Queue()
+    sent_at: dict[int, deque] = defaultdict(deque)
+    acks: list[float] = []
+    statuses: dict[int, int] = defaultdict(int)
+    start = time.perf_counter() + 0.2
+    for i in range(total):
+        queue.put_nowait((start + i / args.rate, i + 1, 1_000_000 + i % args.chats))
+
+    async def connection():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            while True:
+                try:
+                    due, update_id, chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if pending_retries[0] == 0:
+                        return
+                    await asyncio.sleep(0.05)
+                    continue
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                posted = time.perf_counter()
+                status = await _post(reader, writer, path, _update(update_id, chat_id))
+                acks.append(time.perf_counter() - posted)
+                statuses[status] += 1
+                if status == 200:
+                    sent_at[chat_id].append(posted)
+                else:
+                    pending_retries[0] += 1
+                    asyncio.get_running_loop().call_later(_RETRY_SECONDS, retry, update_id, chat_id)
+        finally:
+            writer.close()
+
+    pending_retries = [0]
+
+    def retry(update_id: int, chat_id: int) -> None:
+        pending_retries[0] -= 1
+        queue.put_nowait((0.0, update_id, chat_id))
+
+    await asyncio.gather(*(connection() for _ in range(args.connections)))
+    return {"acks": acks, "statuses": dict(statuses), "sent_at": sent_at, "start": start, "total": total}
+
+
+async def _run(args) -> None:
+    telegram_port, ingest_port = _free_port(), _free_port()
+    os.environ.update({
+        "TELEGRAM_API_BASE_URL": f"http://127.0.0.1:{telegram_port}/bot",
+        "API_BASE_URL": f"http://127.0.0.1:{telegram_port}/api/v1",
+        "API_HTTP2": "false",
+        "WEBHOOK_URL": "",
+        "WEBHOOK_SECRET": "",
+        "WEBHOOK_WORKERS": str(args.workers),
+        "MAX_CONCURRENT_UPDATES": str(args.concurrent_updates),
+        "LOG_LEVEL": "WARNING",
+    })
+    import uvicorn
+    from config import config
+    from webhook import WorkerPool, build_ingest_app
+
+    fake = FakeTelegram()
+    await fake.start(telegram_port)
+    pool = WorkerPool("123:bench", args.workers)
+    pool.start()
+    server = uvicorn.Server(uvicorn.Config(
+        build_ingest_app("123:bench", pool), host="127.0.0.1", port=ingest_port, log_level="warning",
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    # Wait until every worker answers (its first reply proves it is up)
+    warmup_chats = list(range(args.workers))
+    reader, writer = await asyncio.open_connection("127.0.0.1", ingest_port)
+    deadline = time.perf_counter() + 60
+    while not all(fake.replies.get(c) for c in warmup_chats) and time.perf_counter() < deadline:
+        for c in warmup_chats:
+            if not fake.replies.get(c):
+                await _post(reader, writer, config.WEBHOOK_PATH, _update(0, c))
+        await asyncio.sleep(0.5)
+    writer.close()
+    for c in warmup_chats:
+        fake.replies.pop(c, None)
+
+    killer = None
+    if args.kill_worker_at is not None:
+        async def kill():
+            await asyncio.sleep(args.kill_worker_at)
+            victim = pool.workers[0]
+            print(f"killing worker 0 (pid {victim.pid}) at {args.kill_worker_at}s")
+            os.kill(victim.pid, signal.SIGKILL)
+        killer = asyncio.create_task(kill())
+
+    driven = await _drive(args, ingest_port, config.WEBHOOK_PATH)
+    posted_until = time.perf_counter()
+    expected = sum(len(times) for times in driven["sent_at"].values())
+    while sum(len(fake.replies.get(c, ())) for c in driven["sent_at"]) < expected:
+        if time.perf_counter() - posted_until > args.drain_seconds:
+            break
+        await asyncio.sleep(0.1)
+    if killer:
+        await killer
+
+    latencies, answered, last_reply = [], 0, driven["start"]
+    for chat_id, posts in driven["sent_at"].items():
+        for posted, replied in zip(posts, fake.replies.get(chat_id, ())):
+            latencies.append(replied - posted)
+            last_reply = max(last_reply, replied)
+            answered += 1
+    span = last_reply - driven["start"]
+    acks = driven["acks"]
+    print(
+        f"offered {driven['total']:,} updates at {args.rate:,}/s from {args.chats:,} chats "
+        f"over {args.workers} workers ({args.concurrent_updates} concurrent updates each)"
+    )
+    print(f"ingest: statuses {driven['statuses']}   ack p50 {_pct(acks, 0.5)} ms   p99 {_pct(acks, 0.99)} ms")
+    print(
+        f"replies: {answered:,} in {span:.2f}s = {answered / span:,.0f}/s   "
+        f"end-to-end p50 {_pct(latencies, 0.5)} ms   p99 {_pct(latencies, 0.99)} ms   "
+        f"unanswered {driven['total'] - answered:,}   worker restarts {pool.restarts}"
+    )
+
+    server.should_exit = True
+    await serving
+    pool.stop()
+    await fake.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=int, default=1000, help="updates per second")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrent-updates", type=int, default=64, help="MAX_CONCURRENT_UPDATES per worker")
+    parser.add_argument("--connections", type=int, default=40, help="webhook connections (WEBHOOK_MAX_CONNECTIONS)")
+    parser.add_argument("--kill-worker-at", type=float, default=None, metavar="SECONDS")
+    parser.add_argument("--drain-seconds", type=float, default=30.0, help="wait for outstanding replies")
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,10 +15,29 @@ class BotConfig:
     # Telegram
     TELEGRAM_BOT_TOKEN: str = ""
     BOT_USERNAME: str = "ADMPlatformBot"
+    # Override to point the bot at a local fake Telegram server (load testing)
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org/bot"
+
+    # Update ingestion: "polling" (legacy, single process) or "webhook"
+    BOT_MODE: str = "polling"
+    WEBHOOK_URL: str = ""          # Public HTTPS URL registered with Telegram
+    WEBHOOK_SECRET: str = ""       # Sent back by Telegram in X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8443
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_WORKERS: int = 4       # Worker processes; updates sharded by chat_id
+    WEBHOOK_MAX_CONNECTIONS: int = 40
+    WEBHOOK_SUPERVISE_SECONDS: float = 2.0  # How often dead worker processes are restarted
+    MAX_CONCURRENT_UPDATES: int = 64  # Per worker; updates of one chat stay ordered
 
     # Backend API
     API_BASE_URL: str = "http://localhost:8000/api/v1"
     API_TIMEOUT: int = 30
+    API_MAX_KEEPALIVE_CONNECTIONS: int = 5
+    API_MAX_CONNECTIONS: int = 10
+    API_HTTP2: bool = True
+    API_CACHE_ENABLED: bool = True  # Per-endpoint TTL cache for GETs (see APIClient)
+    API_CACHE_MAX_ENTRIES: int = 2048  # Least recently used entries are evicted beyond this
 
     # AI / Anthropic
     ANTHROPIC_API_KEY: str = ""
@@ -40,8 +59,24 @@ class BotConfig:
         return cls(
             TELEGRAM_BOT_TOKEN=os.getenv("TELEGRAM_BOT_TOKEN", ""),
             BOT_USERNAME=os.getenv("BOT_USERNAME", "ADMPlatformBot"),
+            TELEGRAM_API_BASE_URL=os.getenv("TELEGRAM_API_BASE_URL", "https://api.telegram.org/bot"),
+            BOT_MODE=os.getenv("BOT_MODE", "polling").lower(),
+            WEBHOOK_URL=os.getenv("WEBHOOK_URL", os.getenv("TELEGRAM_WEBHOOK_URL", "")),
+            WEBHOOK_SECRET=os.getenv("WEBHOOK_SECRET", ""),
+            WEBHOOK_HOST=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            WEBHOOK_PORT=int(os.getenv("WEBHOOK_PORT", "8443")),
+            WEBHOOK_PATH=os.getenv("WEBHOOK_PATH", "/telegram/webhook"),
+            WEBHOOK_WORKERS=int(os.getenv("WEBHOOK_WORKERS", "4")),
+            WEBHOOK_MAX_CONNECTIONS=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40")),
+            WEBHOOK_SUPERVISE_SECONDS=float(os.getenv("WEBHOOK_SUPERVISE_SECONDS", "2")),
+            MAX_CONCURRENT_UPDATES=int(os.getenv("MAX_CONCURRENT_UPDATES", "64")),
             API_BASE_URL=os.getenv("API_BASE_URL", "http://localhost:8000/api/v1"),
             API_TIMEOUT=int(os.getenv("API_TIMEOUT", "30")),
+            API_MAX_KEEPALIVE_CONNECTIONS=int(os.getenv("API_MAX_KEEPALIVE_CONNECTIONS", "5")),
+            API_MAX_CONNECTIONS=int(os.getenv("API_MAX_CONNECTIONS", "10")),
+            API_HTTP2=os.getenv("API_HTTP2", "true").lower() in ("true", "1", "yes"),
+            API_CACHE_ENABLED=os.getenv("API_CACHE_ENABLED", "true").lower() in ("true", "1", "yes"),
+            API_CACHE_MAX_ENTRIES=int(os.getenv("API_CACHE_MAX_ENTRIES", "2048")),
             ANTHROPIC_API_KEY=os.getenv("ANTHROPIC_API_KEY", ""),
             DEFAULT_LANGUAGE=os.getenv("DEFAULT_LANGUAGE", "en"),
             MAX_AGENTS_PER_PAGE=int(os.getenv("MAX_AGENTS_PER_PAGE", "8")),
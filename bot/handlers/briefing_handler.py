@@ -41,14 +41,6 @@ async def briefing_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     telegram_id = update.effective_user.id
     user = update.effective_user
 
-    # Get profile
-    profile = await api_client.get_adm_profile(telegram_id)
-
-    if profile and not profile.get("error"):
-        name = profile.get("name", user.first_name or "ADM")
-    else:
-        name = user.first_name or "ADM"
-
     # Show loading message
     loading_msg = await update.message.reply_text(
         f"{E_SUNRISE} <b>Loading your briefing...</b>\n\n"
@@ -56,8 +48,16 @@ async def briefing_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         parse_mode="HTML",
     )
 
-    # Fetch briefing data from API
-    briefing_resp = await api_client.get_morning_briefing(telegram_id)
+    # Profile + briefing in a single backend round trip
+    home = await api_client.get_bot_home(telegram_id, sections=("profile", "briefing"))
+    profile = home.get("profile") if not home.get("error") else None
+
+    if profile:
+        name = profile.get("name", user.first_name or "ADM")
+    else:
+        name = user.first_name or "ADM"
+
+    briefing_resp = home.get("briefing") if not home.get("error") else home
 
     if briefing_resp and not briefing_resp.get("error"):
         briefing_data = briefing_resp
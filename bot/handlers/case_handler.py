@@ -391,7 +391,7 @@ async def case_detail_action(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Close case
     if data.startswith("caseclose_"):
         ticket_id = data.replace("caseclose_", "")
-        result = await api_client.close_ticket(ticket_id)
+        result = await api_client.close_ticket(ticket_id, telegram_id=query.from_user.id)
         if result.get("status") == "ok":
             await query.edit_message_text(
                 f"{E_CHECK} <b>Case {ticket_id} closed.</b>\n\n"
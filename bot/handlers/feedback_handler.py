@@ -631,7 +631,7 @@ async def confirm_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         "voice_file_id": fb.get("voice_file_id"),
     }
 
-    result = await api_client.submit_feedback_ticket(payload)
+    result = await api_client.submit_feedback_ticket(payload, telegram_id=update.effective_user.id)
 
     if result.get("error"):
         logger.warning("Feedback ticket submission failed: %s", result)
@@ -849,7 +849,7 @@ async def fb_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         "voice_file_id": ilog.get("fb_voice_file_id"),
     }
 
-    result = await api_client.submit_feedback_ticket(payload)
+    result = await api_client.submit_feedback_ticket(payload, telegram_id=update.effective_user.id)
 
     if result.get("error"):
         logger.warning("Feedback ticket submission from /log failed: %s", result)
@@ -72,16 +72,16 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     telegram_id = update.effective_user.id
     user = update.effective_user
 
-    # Get profile
-    profile = await api_client.get_adm_profile(telegram_id)
+    # Profile + stats in a single backend round trip
+    home = await api_client.get_bot_home(telegram_id, sections=("profile", "stats"))
+    profile = home.get("profile") if not home.get("error") else None
 
-    if profile and not profile.get("error"):
+    if profile:
         name = profile.get("name", user.first_name or "ADM")
     else:
         name = user.first_name or "ADM"
 
-    # Fetch stats from API
-    stats_resp = await api_client.get_adm_stats(telegram_id)
+    stats_resp = home.get("stats") if not home.get("error") else home
 
     if stats_resp and not stats_resp.get("error"):
         stats_data = stats_resp
@@ -260,10 +260,11 @@ async def stats_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         telegram_id = update.effective_user.id
         user = update.effective_user
 
-        profile = await api_client.get_adm_profile(telegram_id)
-        name = (profile.get("name", user.first_name) if profile and not profile.get("error") else user.first_name) or "ADM"
+        home = await api_client.get_bot_home(telegram_id, sections=("profile", "stats"))
+        profile = home.get("profile") if not home.get("error") else None
+        name = (profile.get("name", user.first_name) if profile else user.first_name) or "ADM"
 
-        stats_resp = await api_client.get_adm_stats(telegram_id)
+        stats_resp = home.get("stats") if not home.get("error") else home
 
         if stats_resp and not stats_resp.get("error"):
             stats_data = stats_resp
@@ -1,6 +1,6 @@
 """
 ADM Platform Telegram Bot - Main Entry Point.
-Registers all handlers and starts polling.
+Registers all handlers and starts polling (default) or webhook ingestion.
 
 Usage:
     python telegram_bot.py
@@ -8,6 +8,7 @@ Usage:
 Environment variables:
     TELEGRAM_BOT_TOKEN  - Bot token from @BotFather
     API_BASE_URL        - Backend API URL (default: http://localhost:8000/api/v1)
+    BOT_MODE            - "polling" (default) or "webhook" (see webhook.py)
 """
 
 import logging
@@ -81,7 +82,7 @@ async def agents_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """Handle /agents command - list assigned agents."""
     telegram_id = update.effective_user.id
 
-    agents_resp = await api_client.get_assigned_agents(telegram_id)
+    agents_resp = await api_client.get_assigned_agents(telegram_id, include_total=True)
 
     if agents_resp.get("error"):
         # API error — distinguish from "no agents"
@@ -226,7 +227,7 @@ async def close_ticket_callback(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
 
     ticket_id = query.data.split(":", 1)[1]
-    result = await api_client.close_ticket(ticket_id)
+    result = await api_client.close_ticket(ticket_id, telegram_id=query.from_user.id)
 
     if result.get("status") == "ok":
         await query.edit_message_text(f"✅ Ticket {ticket_id} closed successfully.")
@@ -319,6 +320,33 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
 # Post-init: set bot commands in Telegram menu
 # ---------------------------------------------------------------------------
 
+BOT_COMMANDS = [
+    ("start", "Register / Restart"),
+    ("briefing", "Morning briefing / Subah ki report"),
+    ("diary", "Today's schedule / Aaj ka diary"),
+    ("agents", "Your agents / Aapke agents"),
+    ("feedback", "Capture agent feedback"),
+    ("log", "Log an interaction"),
+    ("train", "Product training modules"),
+    ("ask", "AI product answers"),
+    ("stats", "Your performance stats"),
+    ("cases", "Case history per agent"),
+    ("tickets", "View your open tickets"),
+    ("voice", "Toggle voice notes on/off"),
+    ("help", "Show all commands"),
+]
+
+
+async def set_bot_commands(bot) -> None:
+    """Publish the command list shown in the Telegram menu."""
+    commands = [BotCommand(name, desc) for name, desc in BOT_COMMANDS]
+    try:
+        await bot.set_my_commands(commands)
+        logger.info("Bot commands set successfully.")
+    except Exception as exc:
+        logger.warning("Could not set bot commands: %s", exc)
+
+
 async def post_init(application: Application) -> None:
     """Post-initialization: claim exclusive update access and set bot commands.
 
@@ -326,6 +354,9 @@ async def post_init(application: Application) -> None:
     Both run polling simultaneously, causing duplicate/mixed responses.
     deleteWebhook(drop_pending_updates=True) forces Telegram to invalidate
     the old polling session, so only THIS instance receives updates.
+
+    Only used in polling mode — in webhook mode the ingest process owns the
+    webhook registration (see webhook.py).
     """
     # Force-claim exclusive update access — kills any other polling session
     try:
@@ -350,26 +381,7 @@ async def post_init(application: Application) -> None:
     except Exception as e:
         logger.warning("Could not verify backend health at startup: %s", e)
 
-    commands = [
-        BotCommand("start", "Register / Restart"),
-        BotCommand("briefing", "Morning briefing / Subah ki report"),
-        BotCommand("diary", "Today's schedule / Aaj ka diary"),
-        BotCommand("agents", "Your agents / Aapke agents"),
-        BotCommand("feedback", "Capture agent feedback"),
-        BotCommand("log", "Log an interaction"),
-        BotCommand("train", "Product training modules"),
-        BotCommand("ask", "AI product answers"),
-        BotCommand("stats", "Your performance stats"),
-        BotCommand("cases", "Case history per agent"),
-        BotCommand("tickets", "View your open tickets"),
-        BotCommand("voice", "Toggle voice notes on/off"),
-        BotCommand("help", "Show all commands"),
-    ]
-    try:
-        await application.bot.set_my_commands(commands)
-        logger.info("Bot commands set successfully.")
-    except Exception as exc:
-        logger.warning("Could not set bot commands: %s", exc)
+    await set_bot_commands(application.bot)
 
 
 # ---------------------------------------------------------------------------
@@ -386,29 +398,32 @@ async def post_shutdown(application: Application) -> None:
 # Main
 # ---------------------------------------------------------------------------
 
-def main() -> None:
-    """Build and run the Telegram bot."""
-    token = config.TELEGRAM_BOT_TOKEN
-
-    if not token:
-        logger.error(
-            "TELEGRAM_BOT_TOKEN is not set! "
-            "Please set the TELEGRAM_BOT_TOKEN environment variable."
-        )
-        sys.exit(1)
-
-    BOT_VERSION = "2.7.2-force-rebuild-2026-02-24"
-    logger.info("Starting ADM Platform Telegram Bot v%s", BOT_VERSION)
-    logger.info("API Base URL: %s", config.API_BASE_URL)
+def build_application(token: str, webhook_worker: bool = False) -> Application:
+    """Build the Application and register every handler.
 
-    # Build application
-    application = (
+    Args:
+        token: Bot token from @BotFather.
+        webhook_worker: True when the application is fed by the webhook
+            ingest process instead of polling Telegram itself.
+    """
+    builder = (
         Application.builder()
         .token(token)
-        .post_init(post_init)
-        .post_shutdown(post_shutdown)
-        .build()
+        .base_url(config.TELEGRAM_API_BASE_URL)
     )
+    if webhook_worker:
+        # Updates are pushed into application.update_queue by webhook.py, so
+        # no Updater is needed. Updates run concurrently, but the processor
+        # keeps each chat's updates in arrival order.
+        from webhook import ChatOrderedUpdateProcessor
+        builder = (
+            builder
+            .updater(None)
+            .concurrent_updates(ChatOrderedUpdateProcessor(config.MAX_CONCURRENT_UPDATES))
+        )
+    else:
+        builder = builder.post_init(post_init).post_shutdown(post_shutdown)
+    application = builder.build()
 
     # ------------------------------------------------------------------
     # Register conversation handlers (order matters - first match wins)
@@ -526,6 +541,32 @@ def main() -> None:
     # ------------------------------------------------------------------
     application.add_error_handler(error_handler)
 
+    return application
+
+
+def main() -> None:
+    """Build and run the Telegram bot."""
+    token = config.TELEGRAM_BOT_TOKEN
+
+    if not token:
+        logger.error(
+            "TELEGRAM_BOT_TOKEN is not set! "
+            "Please set the TELEGRAM_BOT_TOKEN environment variable."
+        )
+        sys.exit(1)
+
+    BOT_VERSION = "2.7.2-force-rebuild-2026-02-24"
+    logger.info("Starting ADM Platform Telegram Bot v%s", BOT_VERSION)
+    logger.info("API Base URL: %s", config.API_BASE_URL)
+
+    if config.BOT_MODE == "webhook":
+        from webhook import run_webhook
+        logger.info("BOT_MODE=webhook — starting ingest server + %d workers", config.WEBHOOK_WORKERS)
+        run_webhook(token)
+        return
+
+    application = build_application(token)
+
     # ------------------------------------------------------------------
     # Start polling
     # ------------------------------------------------------------------
@@ -6,11 +6,22 @@ Features:
 - Automatic retry with exponential backoff for transient failures
 - Configurable timeouts per request type
 - Connection health tracking
+- Per-endpoint TTL cache for GETs with single-flight coalescing of identical
+  in-flight requests; writes invalidate the keys they affect
+- Expired entries that carry an ETag are revalidated with If-None-Match, so
+  unchanged reference data (reasons, training catalogue) comes back as a 304
+- The cache is bounded (API_CACHE_MAX_ENTRIES, least recently used evicted
+  first); expired entries are dropped on read and swept on insert
 """
 
 import asyncio
+import copy
 import logging
+import re
+import time
+from collections import OrderedDict
 from typing import Any, Optional
+from urllib.parse import urlencode
 
 import httpx
 
@@ -18,6 +29,35 @@ from config import config
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401 — httpx needs it for HTTP/2
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+# GET paths worth caching and for how long (seconds). First match wins;
+# anything not listed is always fetched fresh.
+_CACHE_TTLS: list[tuple[re.Pattern, float]] = [
+    (re.compile(r"^/adm/profile/[^/]+$"), 300),
+    (re.compile(r"^/adm/[^/]+/stats$"), 30),
+    (re.compile(r"^/adm/[^/]+/home$"), 30),
+    (re.compile(r"^/adm/[^/]+/agents(/priority)?$"), 30),
+    (re.compile(r"^/adm/[^/]+/briefing$"), 60),
+    (re.compile(r"^/feedback-tickets/reasons(/by-bucket)?$"), 600),
+    (re.compile(r"^/training/"), 600),
+    (re.compile(r"^/feedback-tickets/$"), 15),
+    (re.compile(r"^/feedback-tickets/[^/]+(/messages)?$"), 15),
+]
+
+# Cached responses that show open-ticket counts (per ADM telegram id)
+_TICKET_COUNT_KEYS = re.compile(r"^/adm/[^/]+/(home|stats)\?")
+
+# How long past its TTL an entry with an ETag is kept for revalidation
+_ETAG_GRACE_SECONDS = 600
+# Minimum interval between sweeps of expired entries (run on insert)
+_SWEEP_INTERVAL_SECONDS = 30
+
 
 class APIClient:
     """Async HTTP client wrapper for the ADM Platform API."""
@@ -28,6 +68,17 @@ class APIClient:
         self._client: Optional[httpx.AsyncClient] = None
         self._consecutive_failures = 0
         self._max_consecutive_failures = 10
+        # key -> (expires_at, response, etag); key is path + "?" + sorted query.
+        # Ordered by last use, oldest first
+        self._cache: OrderedDict[str, tuple[float, dict, Optional[str]]] = OrderedDict()
+        self._next_sweep = 0.0
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Bumped on every invalidation so a GET that was in flight while a
+        # write happened doesn't repopulate the cache with pre-write data
+        self._cache_generation = 0
+        # (telegram_id, search, page) -> cursor that starts that page of the
+        # ADM's agent list, so paging forward is a keyset seek, not an OFFSET
+        self._agent_page_cursors: dict[tuple, str] = {}
 
     async def _get_client(self) -> httpx.AsyncClient:
         if self._client is None or self._client.is_closed:
@@ -35,10 +86,11 @@ class APIClient:
                 base_url=self.base_url,
                 timeout=self.timeout,
                 headers={"Content-Type": "application/json"},
+                http2=config.API_HTTP2 and _HTTP2_AVAILABLE,
                 # Keep connections alive for performance
                 limits=httpx.Limits(
-                    max_keepalive_connections=5,
-                    max_connections=10,
+                    max_keepalive_connections=config.API_MAX_KEEPALIVE_CONNECTIONS,
+                    max_connections=config.API_MAX_CONNECTIONS,
                     keepalive_expiry=30,
                 ),
             )
@@ -63,15 +115,26 @@ class APIClient:
         path: str,
         retries: int = 2,
         retry_delay: float = 1.0,
+        response_meta: Optional[dict] = None,
         **kwargs,
     ) -> dict[str, Any]:
-        """Execute an HTTP request with automatic retry on transient errors."""
+        """Execute an HTTP request with automatic retry on transient errors.
+
+        If ``response_meta`` is given it receives the final ``status`` and
+        ``etag``. A 304 Not Modified returns an empty dict.
+        """
         last_exc = None
 
         for attempt in range(1, retries + 2):  # +2 because range is exclusive
             client = await self._get_client()
             try:
                 response = await client.request(method, path, **kwargs)
+                if response_meta is not None:
+                    response_meta["status"] = response.status_code
+                    response_meta["etag"] = response.headers.get("etag")
+                if response.status_code == 304:
+                    self._consecutive_failures = 0
+                    return {}
                 response.raise_for_status()
                 self._consecutive_failures = 0  # Reset on success
                 return response.json()
@@ -129,8 +192,108 @@ class APIClient:
             }
         return {"error": True, "detail": str(last_exc)}
 
+    # ------------------------------------------------------------------
+    # Response cache
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cache_ttl(path: str) -> float:
+        for pattern, ttl in _CACHE_TTLS:
+            if pattern.match(path):
+                return ttl
+        return 0
+
+    @staticmethod
+    def _cache_key(path: str, params: Optional[dict]) -> str:
+        query = urlencode(sorted((params or {}).items()))
+        return f"{path}?{query}"
+
+    @staticmethod
+    def _revalidatable(entry: tuple, now: float) -> bool:
+        """Whether an expired entry is still worth an If-None-Match."""
+        return bool(entry[2]) and entry[0] + _ETAG_GRACE_SECONDS > now
+
+    def _store(self, key: str, entry: tuple) -> None:
+        """Insert an entry as most recently used, then enforce the bounds."""
+        now = time.monotonic()
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        if now >= self._next_sweep:
+            self._next_sweep = now + _SWEEP_INTERVAL_SECONDS
+            for stale_key in [
+                k for k, e in self._cache.items() if e[0] <= now and not self._revalidatable(e, now)
+            ]:
+                del self._cache[stale_key]
+        while len(self._cache) > config.API_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, *prefixes: str) -> None:
+        """Drop cached responses whose key starts with any of the prefixes."""
+        self._cache_generation += 1
+        for key in [k for k in self._cache if k.startswith(prefixes)]:
+            del self._cache[key]
+
+    def _invalidate_ticket_counts(self, telegram_id: Optional[int]) -> None:
+        """Drop the home / stats responses of one ADM, or of every ADM when unknown."""
+        if telegram_id:
+            self.invalidate(f"/adm/{telegram_id}/home?", f"/adm/{telegram_id}/stats?")
+            return
+        self._cache_generation += 1
+        for key in [k for k in self._cache if _TICKET_COUNT_KEYS.match(k)]:
+            del self._cache[key]
+
+    def clear_cache(self) -> None:
+        self._cache_generation += 1
+        self._cache.clear()
+
+    async def _fetch(self, path: str, params: Optional[dict],
+                     stale: Optional[tuple]) -> tuple[dict, Optional[str]]:
+        """GET for the cache; revalidates an expired entry by its ETag."""
+        meta: dict = {}
+        headers = {"If-None-Match": stale[2]} if stale and stale[2] else None
+        result = await self._request(
+            "GET", path, params=params, headers=headers, response_meta=meta,
+        )
+        if meta.get("status") == 304 and stale:
+            return stale[1], stale[2]
+        return result, meta.get("etag")
+
     async def get(self, path: str, params: Optional[dict] = None) -> dict:
-        return await self._request("GET", path, params=params)
+        ttl = self._cache_ttl(path) if config.API_CACHE_ENABLED else 0
+        if not ttl:
+            return await self._request("GET", path, params=params)
+
+        key = self._cache_key(path, params)
+        hit = self._cache.get(key)
+        if hit:
+            now = time.monotonic()
+            if hit[0] > now:
+                self._cache.move_to_end(key)
+                return copy.deepcopy(hit[1])
+            if not self._revalidatable(hit, now):
+                del self._cache[key]
+                hit = None
+
+        # Single-flight: identical GETs already in progress share one request
+        pending = self._inflight.get(key)
+        if pending is None:
+            generation = self._cache_generation
+            pending = asyncio.ensure_future(self._fetch(path, params, hit))
+            self._inflight[key] = pending
+            try:
+                result, etag = await asyncio.shield(pending)
+            finally:
+                self._inflight.pop(key, None)
+            # Errors are never cached so a retry can recover immediately
+            # (some endpoints return a JSON list, which is never an error body)
+            failed = isinstance(result, dict) and result.get("error")
+            if not failed and generation == self._cache_generation:
+                self._store(key, (time.monotonic() + ttl, result, etag))
+        else:
+            result, _ = await asyncio.shield(pending)
+
+        # Callers sometimes annotate responses in place; keep the cached copy clean
+        return copy.deepcopy(result)
 
     async def post(self, path: str, data: Optional[dict] = None) -> dict:
         return await self._request("POST", path, json=data)
@@ -149,12 +312,14 @@ class APIClient:
         self, telegram_id: int, name: str, employee_id: str, region: str
     ) -> dict:
         """Register a new ADM via Telegram."""
-        return await self.post("/adm/register", data={
+        result = await self.post("/adm/register", data={
             "telegram_id": telegram_id,
             "name": name,
             "employee_id": employee_id,
             "region": region,
         })
+        self.invalidate(f"/adm/profile/{telegram_id}?", f"/adm/{telegram_id}/")
+        return result
 
     async def get_adm_profile(self, telegram_id: int) -> dict:
         """Get ADM profile by Telegram user ID."""
@@ -164,18 +329,47 @@ class APIClient:
         """Get ADM performance statistics."""
         return await self.get(f"/adm/{telegram_id}/stats")
 
+    async def get_bot_home(self, telegram_id: int, sections: tuple = ("profile", "stats")) -> dict:
+        """Fetch several ADM sections in one round trip.
+
+        Sections: profile, stats, priority_agents, open_tickets, briefing.
+        The response has one key per requested section.
+        """
+        return await self.get(
+            f"/adm/{telegram_id}/home", params={"sections": ",".join(sections)}
+        )
+
     # ------------------------------------------------------------------
     # Agent endpoints
     # ------------------------------------------------------------------
 
     async def get_assigned_agents(
-        self, telegram_id: int, page: int = 1, search: Optional[str] = None
+        self,
+        telegram_id: int,
+        page: int = 1,
+        search: Optional[str] = None,
+        include_total: bool = False,
     ) -> dict:
-        """Get list of agents assigned to this ADM."""
+        """Get list of agents assigned to this ADM.
+
+        Pages reached by paging forward are fetched with the cursor returned
+        by the previous page; other pages fall back to the page number.
+        """
         params: dict[str, Any] = {"page": page}
         if search:
             params["search"] = search
-        return await self.get(f"/adm/{telegram_id}/agents", params=params)
+        if include_total:
+            params["include_total"] = "true"
+        cursor = self._agent_page_cursors.get((telegram_id, search, page)) if page > 1 else None
+        if cursor:
+            params["cursor"] = cursor
+        result = await self.get(f"/adm/{telegram_id}/agents", params=params)
+        next_cursor = result.get("next_cursor") if isinstance(result, dict) else None
+        if next_cursor:
+            if len(self._agent_page_cursors) >= 10_000:
+                self._agent_page_cursors.pop(next(iter(self._agent_page_cursors)))
+            self._agent_page_cursors[(telegram_id, search, page + 1)] = next_cursor
+        return result
 
     async def get_agent_detail(self, agent_id: str) -> dict:
         """Get detailed information about a specific agent."""
@@ -205,7 +399,10 @@ class APIClient:
 
     async def log_interaction(self, data: dict) -> dict:
         """Log an interaction with an agent via telegram-friendly endpoint."""
-        return await self.post("/interactions/telegram", data=data)
+        result = await self.post("/interactions/telegram", data=data)
+        # Stats, agent lists, priority and briefing all reflect interactions
+        self.invalidate(f"/adm/{data.get('adm_telegram_id')}/")
+        return result
 
     async def get_interactions(
         self, telegram_id: int, agent_id: Optional[str] = None
@@ -286,9 +483,15 @@ class APIClient:
         """Get feedback reason taxonomy by bucket (for pick-and-choose UI)."""
         return await self.get("/feedback-tickets/reasons/by-bucket")
 
-    async def submit_feedback_ticket(self, data: dict) -> dict:
-        """Submit a feedback ticket through the new workflow."""
-        return await self.post("/feedback-tickets/submit", data=data)
+    async def submit_feedback_ticket(self, data: dict, telegram_id: Optional[int] = None) -> dict:
+        """Submit a feedback ticket through the new workflow.
+
+        ``telegram_id`` limits the home / stats invalidation to that ADM.
+        """
+        result = await self.post("/feedback-tickets/submit", data=data)
+        self.invalidate("/feedback-tickets/?")
+        self._invalidate_ticket_counts(telegram_id)
+        return result
 
     async def get_feedback_tickets(self, adm_id: int = None) -> dict:
         """Get feedback tickets for an ADM."""
@@ -299,18 +502,27 @@ class APIClient:
 
     async def rate_script(self, ticket_id: str, rating: str, feedback: str = "") -> dict:
         """Rate a generated communication script."""
-        return await self.post(f"/feedback-tickets/{ticket_id}/rate-script", data={
+        result = await self.post(f"/feedback-tickets/{ticket_id}/rate-script", data={
             "rating": rating,
             "feedback": feedback,
         })
+        self.invalidate(f"/feedback-tickets/{ticket_id}?")
+        return result
 
     async def get_adm_tickets(self, adm_id: int) -> dict:
         """Get open feedback tickets for an ADM."""
         return await self.get("/feedback-tickets/", params={"adm_id": adm_id, "limit": 20})
 
-    async def close_ticket(self, ticket_id: str) -> dict:
-        """Close a feedback ticket."""
-        return await self.post(f"/feedback-tickets/{ticket_id}/close")
+    async def close_ticket(self, ticket_id: str, telegram_id: Optional[int] = None) -> dict:
+        """Close a feedback ticket (``telegram_id`` as for submit_feedback_ticket)."""
+        result = await self.post(f"/feedback-tickets/{ticket_id}/close")
+        self.invalidate(
+            "/feedback-tickets/?",
+            f"/feedback-tickets/{ticket_id}?",
+            f"/feedback-tickets/{ticket_id}/",
+        )
+        self._invalidate_ticket_counts(telegram_id)
+        return result
 
     async def get_ticket_messages(self, ticket_id: str) -> dict:
         """Get conversation thread messages for a ticket."""
@@ -332,7 +544,9 @@ class APIClient:
             payload["voice_file_id"] = voice_file_id
         if metadata_json:
             payload["metadata_json"] = metadata_json
-        return await self.post(f"/feedback-tickets/{ticket_id}/messages", data=payload)
+        result = await self.post(f"/feedback-tickets/{ticket_id}/messages", data=payload)
+        self.invalidate(f"/feedback-tickets/{ticket_id}?", f"/feedback-tickets/{ticket_id}/")
+        return result
 
     async def get_ticket_by_id(self, ticket_id: str) -> dict:
         """Get a single ticket by ticket_id."""
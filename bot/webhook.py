@@ -0,0 +1,345 @@
+"""
+Webhook ingestion mode for the ADM Platform Telegram Bot.
+
+Polling (``run_polling``) adds up to a second of latency per update and ties
+the bot to a single process. In webhook mode the bot is split in two:
+
+  * Ingest process — a small Starlette app served by uvicorn. Telegram POSTs
+    each update to ``WEBHOOK_PATH``; the handler validates the secret token,
+    picks a worker by ``chat_id % WEBHOOK_WORKERS`` and acknowledges with 200
+    immediately. No handler code runs here.
+  * Worker processes — each runs a full ``Application`` (built by
+    ``telegram_bot.build_application``) without an Updater and feeds the raw
+    updates it receives into ``application.update_queue``. The ingest
+    process supervises them: a shard whose worker has died answers 503 (so
+    Telegram redelivers) until the worker is restarted, which happens every
+    ``WEBHOOK_SUPERVISE_SECONDS``.
+
+Sharding by chat_id keeps every chat on the same worker, so in-memory
+ConversationHandler state and per-user ordering hold. Inside a worker,
+updates are processed concurrently by ``ChatOrderedUpdateProcessor``, which
+only serialises updates that belong to the same chat.
+
+Usage:
+    BOT_MODE=webhook WEBHOOK_URL=https://bot.example.com/telegram/webhook \\
+    WEBHOOK_SECRET=... python telegram_bot.py
+
+For load testing, point ``TELEGRAM_API_BASE_URL`` at a local fake Telegram
+server and POST updates straight to the ingest port.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue as queue_mod
+import signal
+from typing import Any, Awaitable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Max updates a worker moves from its process queue in one hop
+_DRAIN_BATCH = 256
+
+# Size of the base class semaphore, which is taken before the chat lock (see below)
+_UNBOUNDED = 1 << 30
+
+
+# ---------------------------------------------------------------------------
+# Per-chat ordered concurrent processing (runs inside each worker)
+# ---------------------------------------------------------------------------
+
+def _update_chat_id(update: object) -> Optional[int]:
+    """Chat (or, failing that, user) id an update belongs to."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while keeping each chat's updates in order.
+
+    A lock per chat_id makes a chat's second update wait for its first, which
+    ConversationHandler relies on (state is only written after the callback
+    returns). Total concurrency is bounded by a semaphore taken *after* the
+    chat lock, so updates queued behind a busy chat don't hold slots other
+    chats could use. ``BaseUpdateProcessor.process_update`` takes its own
+    semaphore before the chat lock; that one is sized never to block.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        self._limit = max_concurrent_updates
+        super().__init__(_UNBOUNDED)
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._waiters: dict[int, int] = {}
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        return self._limit
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = _update_chat_id(update)
+        if chat_id is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        self._waiters[chat_id] = self._waiters.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                async with self._slots:
+                    await coroutine
+        finally:
+            # Drop idle locks so the dict doesn't grow with every chat ever seen
+            self._waiters[chat_id] -= 1
+            if not self._waiters[chat_id]:
+                del self._waiters[chat_id]
+                del self._chat_locks[chat_id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+async def _worker_loop(token: str, index: int, inbox: "multiprocessing.Queue") -> None:
+    from telegram_bot import build_application, post_shutdown
+
+    application = build_application(token, webhook_worker=True)
+    await application.initialize()
+    await application.start()
+    logger.info("Webhook worker %d ready.", index)
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            # Block in a thread, then drain whatever else is already queued
+            batch = [await loop.run_in_executor(None, inbox.get)]
+            while len(batch) < _DRAIN_BATCH:
+                try:
+                    batch.append(inbox.get_nowait())
+                except queue_mod.Empty:
+                    break
+
+            stop = False
+            for raw in batch:
+                if raw is None:
+                    stop = True
+                    break
+                try:
+                    update = Update.de_json(json.loads(raw), application.bot)
+                except Exception as exc:
+                    logger.warning("Worker %d: dropping malformed update: %s", index, exc)
+                    continue
+                await application.update_queue.put(update)
+            if stop:
+                break
+    finally:
+        logger.info("Webhook worker %d shutting down...", index)
+        await application.stop()
+        await application.shutdown()
+        await post_shutdown(application)
+
+
+def _worker_main(token: str, index: int, inbox: "multiprocessing.Queue") -> None:
+    """Entry point of a worker process."""
+    logging.basicConfig(
+        format=config.LOG_FORMAT,
+        level=getattr(logging, config.LOG_LEVEL, logging.INFO),
+    )
+    # The ingest process coordinates shutdown by sending None
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_loop(token, index, inbox))
+
+
+# ---------------------------------------------------------------------------
+# Ingest process
+# ---------------------------------------------------------------------------
+
+class WorkerPool:
+    """The worker processes and their inboxes, one per shard."""
+
+    def __init__(self, token: str, num_workers: int):
+        self._token = token
+        self._ctx = multiprocessing.get_context("spawn")
+        self.inboxes: list = [None] * num_workers
+        self.workers: list = [None] * num_workers
+        self.restarts = 0
+
+    def __len__(self) -> int:
+        return len(self.workers)
+
+    def _spawn(self, index: int) -> None:
+        # A worker that died may have held its queue's reader lock, so a
+        # restarted worker gets a fresh inbox (updates still in the old one are lost)
+        inbox = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self._token, index, inbox),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        proc.start()
+        self.inboxes[index], self.workers[index] = inbox, proc
+
+    def start(self) -> None:
+        for index in range(len(self)):
+            self._spawn(index)
+        logger.info("Started %d webhook workers (PIDs %s).",
+                    len(self), ", ".join(str(p.pid) for p in self.workers))
+
+    def put(self, index: int, body: bytes) -> bool:
+        """Queue an update for a shard; False when the shard's worker is down."""
+        if not self.workers[index].is_alive():
+            return False
+        self.inboxes[index].put(body)
+        return True
+
+    def restart_dead(self) -> list[int]:
+        """Restart every worker that has exited; returns their shard indexes."""
+        dead = [i for i, proc in enumerate(self.workers) if not proc.is_alive()]
+        for index in dead:
+            logger.error("Webhook worker %d exited (code %s) — restarting.", index, self.workers[index].exitcode)
+            self._spawn(index)
+            self.restarts += 1
+        return dead
+
+    def alive(self) -> int:
+        return sum(1 for proc in self.workers if proc.is_alive())
+
+    def stop(self) -> None:
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for proc in self.workers:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        logger.info("All webhook workers stopped.")
+
+
+def shard_for(data: dict, num_workers: int) -> int:
+    """Pick the worker for a raw update dict by chat_id (falls back to user id).
+
+    Mirrors ``_update_chat_id`` on the raw JSON so the ingest process never
+    has to build ``Update`` objects.
+    """
+    for key, payload in data.items():
+        if not isinstance(payload, dict):
+            continue
+        message = payload.get("message") if key == "callback_query" else payload
+        if isinstance(message, dict) and isinstance(message.get("chat"), dict):
+            return int(message["chat"]["id"]) % num_workers
+        if isinstance(payload.get("from"), dict):
+            return int(payload["from"]["id"]) % num_workers
+        if isinstance(payload.get("user"), dict):
+            return int(payload["user"]["id"]) % num_workers
+    return int(data.get("update_id", 0)) % num_workers
+
+
+def build_ingest_app(token: str, pool: WorkerPool):
+    """Starlette app that accepts Telegram webhook POSTs and shards them."""
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    num_workers = len(pool)
+    supervisor: list[asyncio.Task] = []
+
+    async def receive_update(request: Request) -> Response:
+        if config.WEBHOOK_SECRET and (
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token") != config.WEBHOOK_SECRET
+        ):
+            return Response(status_code=403)
+        body = await request.body()
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return Response(status_code=400)
+        if not pool.put(shard_for(data, num_workers), body):
+            # Worker down: let Telegram redeliver once the supervisor has restarted it
+            return Response(status_code=503)
+        return Response(status_code=200)
+
+    async def health(request: Request) -> Response:
+        alive = pool.alive()
+        return JSONResponse(
+            {"status": "ok" if alive == num_workers else "degraded", "workers": num_workers,
+             "alive": alive, "restarts": pool.restarts},
+        )
+
+    async def supervise() -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(config.WEBHOOK_SUPERVISE_SECONDS)
+            try:
+                await loop.run_in_executor(None, pool.restart_dead)
+            except Exception as exc:
+                logger.error("Webhook worker supervision failed: %s", exc)
+
+    async def on_startup() -> None:
+        supervisor.append(asyncio.create_task(supervise()))
+        if not config.WEBHOOK_URL:
+            logger.warning("WEBHOOK_URL not set — not registering webhook with Telegram.")
+            return
+        from telegram import Bot
+        from telegram_bot import set_bot_commands
+
+        bot = Bot(token, base_url=config.TELEGRAM_API_BASE_URL)
+        async with bot:
+            await bot.set_webhook(
+                url=config.WEBHOOK_URL,
+                secret_token=config.WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+            )
+            logger.info("Webhook registered: %s", config.WEBHOOK_URL)
+            await set_bot_commands(bot)
+
+    async def on_shutdown() -> None:
+        for task in supervisor:
+            task.cancel()
+
+    return Starlette(
+        routes=[
+            Route(config.WEBHOOK_PATH, receive_update, methods=["POST"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        on_startup=[on_startup],
+        on_shutdown=[on_shutdown],
+    )
+
+
+def run_webhook(token: str) -> None:
+    """Start the worker processes and serve the ingest endpoint (blocking)."""
+    import uvicorn
+
+    pool = WorkerPool(token, max(1, config.WEBHOOK_WORKERS))
+    pool.start()
+    try:
+        uvicorn.run(
+            build_ingest_app(token, pool),
+            host=config.WEBHOOK_HOST,
+            port=config.WEBHOOK_PORT,
+            log_level="warning",
+        )
+    finally:
+        pool.stop()
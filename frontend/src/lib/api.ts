@@ -52,6 +52,8 @@ export const api = {
   getDormancyReasons: () => fetchAPI<any>('/analytics/dormancy-reasons'),
   getRegionalData: () => fetchAPI<any[]>('/analytics/regional'),
   getADMPerformance: () => fetchAPI<any[]>('/analytics/adm-performance'),
+  getPriorityAgents: (admId?: number, limit: number = 5) =>
+    fetchAPI<any[]>(`/analytics/priority-agents?limit=${limit}${admId ? `&adm_id=${admId}` : ''}`),
   getFeedbackTrends: (period?: string) =>
     fetchAPI<any>(`/analytics/feedback-trends?period=${period || 'weekly'}`),
   getActivityFeed: (limit: number = 20) =>
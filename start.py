@@ -216,6 +216,11 @@ def main():
     if os.environ.get("ENABLE_POLLING_BOT", "").lower() in ("true", "1", "yes"):
         logger.info("ENABLE_POLLING_BOT=true — starting polling bot (legacy mode)")
         start_telegram_bot(port)
+    elif os.environ.get("BOT_MODE", "").lower() == "webhook":
+        # Bot subprocess serves the webhook ingest endpoint on WEBHOOK_PORT
+        # and fans updates out to WEBHOOK_WORKERS worker processes.
+        logger.info("BOT_MODE=webhook — starting webhook bot")
+        start_telegram_bot(port)
     else:
         logger.info("Telegram bot disabled on Railway (running on Vercel via webhook)")
 